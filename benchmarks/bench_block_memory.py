@@ -0,0 +1,66 @@
+# ABOUTME: Measures the memory held by converted blocks as nodes and as plain dicts
+# ABOUTME: Run with `python -m benchmarks.bench_block_memory` from the repo root
+
+import argparse
+import gc
+import timeit
+import tracemalloc
+
+from benchmarks.html_corpus import CORPUS as HTML_CORPUS
+from benchmarks.markdown_corpus import CORPUS as MARKDOWN_CORPUS
+from src.converters.html_converter import HTMLConverter
+from src.converters.markdown_converter import MarkdownConverter
+
+
+def retained(build) -> tuple:
+    """Return the bytes and peak bytes allocated while building, and the result"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare block nodes with the equivalent JSON dicts"
+    )
+    parser.add_argument(
+        "--units", type=int, default=1_000, help="Repetitions of each corpus entry"
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Timing repetitions")
+    args = parser.parse_args()
+
+    documents = [
+        ("markdown", name, MarkdownConverter(), unit)
+        for name, unit in MARKDOWN_CORPUS.items()
+    ] + [("html", name, HTMLConverter(), unit) for name, unit in HTML_CORPUS.items()]
+
+    print(
+        f"{'source':<9} {'document':<14} {'form':<6} {'held KB':>9} "
+        f"{'peak KB':>9} {'best ms':>9} {'ratio':>6}"
+    )
+    for source, name, converter, unit in documents:
+        text = unit * args.units
+        forms = {
+            "nodes": lambda converter=converter, text=text: (
+                converter.convert_nodes(text)
+            ),
+            "dicts": lambda converter=converter, text=text: converter.convert(text),
+        }
+        held = {}
+        for form, build in forms.items():
+            blocks, current, peak = retained(build)
+            del blocks
+            held[form] = current
+            best = min(timeit.repeat(build, number=1, repeat=args.repeat))
+            ratio = f"{held['dicts'] / held['nodes']:.2f}" if form == "dicts" else ""
+            print(
+                f"{source:<9} {name:<14} {form:<6} {current / 1024:>9.0f} "
+                f"{peak / 1024:>9.0f} {best * 1000:>9.2f} {ratio:>6}"
+            )
+
+
+if __name__ == "__main__":
+    main()
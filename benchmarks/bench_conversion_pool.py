@@ -0,0 +1,76 @@
+# ABOUTME: Compares batch conversion in-process with the ConversionService worker pool
+# ABOUTME: Run with `python -m benchmarks.bench_conversion_pool --workers 2 4`
+
+import argparse
+import os
+import time
+
+from benchmarks.html_corpus import CORPUS as HTML_CORPUS
+from benchmarks.markdown_corpus import CORPUS as MARKDOWN_CORPUS
+from src.converters.conversion_service import ConversionService
+
+
+def build_batch(posts: int, units: int) -> list:
+    """Build a batch of Markdown and HTML posts of about the same size"""
+    sources = [(unit, "markdown") for unit in MARKDOWN_CORPUS.values()] + [
+        (unit, "html") for unit in HTML_CORPUS.values()
+    ]
+    return [
+        (sources[index % len(sources)][0] * units, sources[index % len(sources)][1])
+        for index in range(posts)
+    ]
+
+
+def timed(service: ConversionService, batch: list, repeat: int) -> float:
+    """Return the best wall time of converting the batch"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        service.convert_many(batch)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time ConversionService.convert_many with and without workers"
+    )
+    parser.add_argument("--posts", type=int, default=200, help="Posts in the batch")
+    parser.add_argument(
+        "--units", type=int, default=50, help="Repetitions of the corpus per post"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        nargs="+",
+        default=[2, 4],
+        help="Worker counts to compare with in-process conversion",
+    )
+    parser.add_argument("--chunk-size", type=int, default=8, help="Jobs per chunk")
+    parser.add_argument("--repeat", type=int, default=3, help="Timing repetitions")
+    args = parser.parse_args()
+
+    batch = build_batch(args.posts, args.units)
+    size = sum(len(content) for content, _ in batch)
+    print(f"{args.posts} posts, {size / 1e6:.1f} MB, {os.cpu_count()} CPUs")
+    print(f"{'workers':>8} {'best s':>9} {'MB/s':>7} {'speedup':>8}")
+
+    with ConversionService(max_workers=1) as service:
+        serial = timed(service, batch, args.repeat)
+    print(f"{'serial':>8} {serial:>9.2f} {size / 1e6 / serial:>7.1f} {1:>8.2f}")
+
+    for workers in args.workers:
+        with ConversionService(
+            max_workers=workers, chunk_size=args.chunk_size, serial_threshold=0
+        ) as service:
+            # Start the workers before timing
+            service.convert_many(batch[: workers * 2])
+            best = timed(service, batch, args.repeat)
+        print(
+            f"{workers:>8} {best:>9.2f} {size / 1e6 / best:>7.1f} "
+            f"{serial / best:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# ABOUTME: Measures the size of the draft_body and update payload written for each corpus
+# ABOUTME: Run with `python -m benchmarks.bench_draft_payload --against <git rev>`
+
+import argparse
+import subprocess
+import types
+from typing import Any, Dict, Tuple
+
+from benchmarks.generated_corpus import generate_corpus
+from benchmarks.html_corpus import CORPUS as HTML_CORPUS
+from benchmarks.markdown_corpus import CORPUS as MARKDOWN_CORPUS
+from src.converters.block_builder import BlockBuilder
+from src.converters.draft_body import DraftBodySerializer
+from src.converters.html_converter import HTMLConverter
+from src.converters.markdown_converter import MarkdownConverter
+from src.utils import json_codec
+
+BUILDER_PATH = "src/converters/block_builder.py"
+SERIALIZER_PATH = "src/converters/draft_body.py"
+
+
+def load_module(revision: str, path: str) -> types.ModuleType:
+    """Load a module as it was at a git revision"""
+    source = subprocess.run(
+        ["git", "show", f"{revision}:{path}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    module = types.ModuleType(f"{path.rsplit('/', 1)[-1][:-3]}_{revision}")
+    exec(compile(source, f"{revision}:{path}", "exec"), module.__dict__)
+    return module
+
+
+def count_text_nodes(node: Any) -> int:
+    """Count the text nodes in a serialized ProseMirror document"""
+    if isinstance(node, dict):
+        own = 1 if node.get("type") == "text" else 0
+        return own + count_text_nodes(node.get("content"))
+    if isinstance(node, list):
+        return sum(count_text_nodes(child) for child in node)
+    return 0
+
+
+def measure(
+    content: str, content_type: str, builder: Any, serializer: Any
+) -> Tuple[int, int, int]:
+    """Convert and serialize one document
+
+    Returns:
+        Text nodes, draft_body bytes and update payload bytes
+    """
+    converter: Any = (
+        MarkdownConverter() if content_type == "markdown" else HTMLConverter()
+    )
+    converter.builder = builder
+    document = serializer.serialize(converter.convert_nodes(content))
+    body = json_codec.dumps(document)
+    # The drafts API takes draft_body as a JSON string inside the request
+    payload = json_codec.dumps({"draft_body": body})
+    return (
+        count_text_nodes(document),
+        len(body.encode()),
+        len(payload.encode()),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Report draft_body and update payload sizes on the corpora"
+    )
+    parser.add_argument(
+        "--against",
+        metavar="REV",
+        help="Also measure the block builder and serializer at this git revision",
+    )
+    parser.add_argument(
+        "--units", type=int, default=100, help="Repetitions of each corpus entry"
+    )
+    args = parser.parse_args()
+
+    writers = {"current": (BlockBuilder(), DraftBodySerializer())}
+    if args.against:
+        writers[args.against] = (
+            load_module(args.against, BUILDER_PATH).BlockBuilder(),
+            load_module(args.against, SERIALIZER_PATH).DraftBodySerializer(),
+        )
+
+    documents: Dict[str, Tuple[str, str]] = {}
+    for name, unit in MARKDOWN_CORPUS.items():
+        documents[f"md/{name}"] = (unit * args.units, "markdown")
+    for name, unit in HTML_CORPUS.items():
+        documents[f"html/{name}"] = (unit * args.units, "html")
+    documents.update(generate_corpus())
+
+    header = f"{'document':<24}"
+    for name in writers:
+        header += f" {name + ' nodes':>16} {name + ' KB':>14}"
+    if args.against:
+        header += f" {'payload':>8}"
+    print(header)
+
+    for name, (content, content_type) in documents.items():
+        row = f"{name:<24}"
+        payloads = []
+        for builder, serializer in writers.values():
+            nodes, body, payload = measure(content, content_type, builder, serializer)
+            payloads.append(payload)
+            row += f" {nodes:>16,} {body / 1024:>14.1f}"
+        if args.against:
+            row += f" {payloads[0] / payloads[1]:>8.2f}"
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
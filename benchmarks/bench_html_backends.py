@@ -0,0 +1,56 @@
+# ABOUTME: Compares HTMLConverter throughput across the installed parse backends
+# ABOUTME: Run with `python -m benchmarks.bench_html_backends` from the repo root
+
+import argparse
+import timeit
+
+from benchmarks.html_corpus import CORPUS
+from src.converters.html_backends import available_backends
+from src.converters.html_converter import HTMLConverter
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time HTMLConverter.convert with each installed backend"
+    )
+    parser.add_argument(
+        "--units",
+        type=int,
+        nargs="+",
+        default=[10, 1_000],
+        help="Repetitions of each corpus entry",
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Timing repetitions")
+    args = parser.parse_args()
+
+    converters = {name: HTMLConverter(name) for name in available_backends()}
+    print(f"Installed backends: {', '.join(converters)}")
+    print(
+        f"{'document':<10} {'units':>6} {'KB':>8} {'backend':<11} "
+        f"{'best ms':>10} {'MB/s':>7} {'vs bs4':>7} {'same':>5}"
+    )
+
+    for name, unit in CORPUS.items():
+        for units in args.units:
+            html = unit * units
+            expected = converters["bs4"].convert(html)
+            baseline = None
+            for backend, converter in reversed(converters.items()):
+                best = min(
+                    timeit.repeat(
+                        lambda converter=converter, html=html: converter.convert(html),
+                        number=1,
+                        repeat=args.repeat,
+                    )
+                )
+                baseline = baseline or best
+                same = converter.convert(html) == expected
+                print(
+                    f"{name:<10} {units:>6} {len(html) / 1024:>8.1f} {backend:<11} "
+                    f"{best * 1000:>10.2f} {len(html) / best / 1e6:>7.2f} "
+                    f"{baseline / best:>6.1f}x {'yes' if same else 'NO':>5}"
+                )
+
+
+if __name__ == "__main__":
+    main()
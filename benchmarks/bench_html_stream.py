@@ -0,0 +1,85 @@
+# ABOUTME: Compares streaming HTML conversion with converting a whole BeautifulSoup tree
+# ABOUTME: Run with `python -m benchmarks.bench_html_stream` from the repo root
+
+import argparse
+import gc
+import random
+import timeit
+import tracemalloc
+from typing import Callable
+
+from benchmarks.generated_corpus import html_post
+from src.converters.conversion_budget import ConversionBudget
+from src.converters.html_backends import SoupBackend
+from src.converters.html_converter import HTMLConverter
+
+
+def peak_kb(call: Callable[[], object]) -> float:
+    """Peak memory allocated while running a call"""
+    gc.collect()
+    tracemalloc.start()
+    call()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time and measure the memory of streaming HTML conversion"
+    )
+    parser.add_argument(
+        "--sections",
+        type=int,
+        nargs="+",
+        default=[200, 1_000, 4_000],
+        help="Sections in each generated post",
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Timing repetitions")
+    args = parser.parse_args()
+
+    converter = HTMLConverter(
+        "bs4", budget=ConversionBudget(max_chars=None, time_limit=None)
+    )
+    backend = SoupBackend()
+
+    def whole_tree(html: str) -> int:
+        """Parse the whole document, then convert it, as before streaming"""
+        meter = converter.budget.meter()
+        root = backend.parse(html, meter)
+        return sum(1 for _ in converter._walk(backend.children(root), meter))
+
+    def streamed(html: str) -> int:
+        """Convert a chunk at a time, handing each block on"""
+        return sum(1 for _ in converter.iter_nodes(html))
+
+    print(
+        f"{'sections':>8} {'KB':>8} {'tree ms':>9} {'stream ms':>10} "
+        f"{'tree peak KB':>13} {'stream peak KB':>15}"
+    )
+    for sections in args.sections:
+        post = html_post(random.Random(0), sections)
+        html = f"<html><body><article>{post}</article></body></html>"
+        assert whole_tree(html) == streamed(html)
+        timings = [
+            min(
+                timeit.repeat(
+                    lambda call=call, html=html: call(html),
+                    number=1,
+                    repeat=args.repeat,
+                )
+            )
+            for call in (whole_tree, streamed)
+        ]
+        peaks = [
+            peak_kb(lambda call=call, html=html: call(html))
+            for call in (whole_tree, streamed)
+        ]
+        print(
+            f"{sections:>8} {len(html) / 1024:>8.0f} {timings[0] * 1000:>9.1f} "
+            f"{timings[1] * 1000:>10.1f} {peaks[0]:>13.0f} {peaks[1]:>15.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
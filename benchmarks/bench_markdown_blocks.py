@@ -0,0 +1,76 @@
+# ABOUTME: Compares MarkdownConverter block parsing with an earlier version of it
+# ABOUTME: Run with `python -m benchmarks.bench_markdown_blocks --against <git rev>`
+
+import argparse
+import subprocess
+import timeit
+import types
+
+from benchmarks.markdown_corpus import CORPUS
+from src.converters.markdown_converter import MarkdownConverter
+
+CONVERTER_PATH = "src/converters/markdown_converter.py"
+
+
+def load_converter(revision: str) -> MarkdownConverter:
+    """Build a MarkdownConverter from the module as it was at a git revision"""
+    source = subprocess.run(
+        ["git", "show", f"{revision}:{CONVERTER_PATH}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    module = types.ModuleType(f"markdown_converter_{revision}")
+    exec(compile(source, f"{revision}:{CONVERTER_PATH}", "exec"), module.__dict__)
+    return module.MarkdownConverter()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time MarkdownConverter.convert on the shared corpus"
+    )
+    parser.add_argument(
+        "--against",
+        metavar="REV",
+        help="Also time the converter at this git revision, e.g. HEAD~1",
+    )
+    parser.add_argument(
+        "--units", type=int, default=1_000, help="Repetitions of each corpus entry"
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="Timing repetitions")
+    args = parser.parse_args()
+
+    converters = {"current": MarkdownConverter()}
+    if args.against:
+        converters[args.against] = load_converter(args.against)
+
+    header = f"{'document':<14} {'lines':>7}"
+    for name in converters:
+        header += f" {name + ' ms':>14}"
+    if args.against:
+        header += f" {'ratio':>7}"
+    print(header)
+
+    for name, unit in CORPUS.items():
+        markdown = unit * args.units
+        row = f"{name:<14} {markdown.count(chr(10)) + 1:>7}"
+        timings = []
+        for converter in converters.values():
+            best = min(
+                timeit.repeat(
+                    lambda converter=converter, markdown=markdown: (
+                        converter.convert(markdown)
+                    ),
+                    number=1,
+                    repeat=args.repeat,
+                )
+            )
+            timings.append(best)
+            row += f" {best * 1000:>14.2f}"
+        if args.against:
+            row += f" {timings[0] / timings[1]:>7.2f}"
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
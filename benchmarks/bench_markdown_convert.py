@@ -0,0 +1,39 @@
+# ABOUTME: Benchmark for MarkdownConverter.convert on long, block-heavy posts
+# ABOUTME: Run with `python -m benchmarks.bench_markdown_convert` from the repo root
+
+import argparse
+import timeit
+
+from benchmarks.markdown_corpus import SECTION
+from src.converters.markdown_converter import MarkdownConverter
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time MarkdownConverter.convert")
+    parser.add_argument(
+        "--sections",
+        type=int,
+        nargs="+",
+        default=[10, 100, 1_000],
+        help="Number of sections in the generated post",
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Timing repetitions")
+    args = parser.parse_args()
+
+    converter = MarkdownConverter()
+    print(f"{'sections':>9} {'lines':>8} {'best ms':>10} {'lines/s':>12}")
+    for sections in args.sections:
+        markdown = SECTION * sections
+        lines = markdown.count("\n") + 1
+        best = min(
+            timeit.repeat(
+                lambda markdown=markdown: converter.convert(markdown),
+                number=1,
+                repeat=args.repeat,
+            )
+        )
+        print(f"{sections:>9} {lines:>8} {best * 1000:>10.2f} {lines / best:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
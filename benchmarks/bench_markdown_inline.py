@@ -0,0 +1,49 @@
+# ABOUTME: Benchmark for MarkdownConverter's inline tokenizer on growing paragraphs
+# ABOUTME: Run with `python -m benchmarks.bench_markdown_inline` from the repo root
+
+import argparse
+import timeit
+
+from src.converters.markdown_converter import MarkdownConverter
+
+# Paragraph shapes: typical prose, span-dense text and unclosed openers
+SAMPLES = {
+    "prose": "Some words with **bold**, *emphasis* and a [link](https://x.com). ",
+    "dense": "**b** *i* `c` [l](u) ",
+    "unclosed": "*a [b `c ",
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time MarkdownConverter inline parsing"
+    )
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[1_000, 10_000, 100_000],
+        help="Paragraph lengths in characters",
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Timing repetitions")
+    args = parser.parse_args()
+
+    converter = MarkdownConverter()
+    print(f"{'sample':<10} {'chars':>9} {'best ms':>10} {'ns/char':>9}")
+    for name, unit in SAMPLES.items():
+        for size in args.sizes:
+            text = (unit * (size // len(unit) + 1))[:size]
+            best = min(
+                timeit.repeat(
+                    lambda text=text: converter._parse_inline_formatting(text),
+                    number=1,
+                    repeat=args.repeat,
+                )
+            )
+            print(
+                f"{name:<10} {size:>9} {best * 1000:>10.2f} {best / size * 1e9:>9.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
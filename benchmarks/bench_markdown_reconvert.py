@@ -0,0 +1,73 @@
+# ABOUTME: Benchmark for reconverting an edited Markdown document with a document_id
+# ABOUTME: Run with `python -m benchmarks.bench_markdown_reconvert` from the repo root
+
+import argparse
+import random
+import timeit
+
+from benchmarks.generated_corpus import code_heavy, essay, link_dense
+from benchmarks.markdown_corpus import CORPUS
+from src.converters.markdown_converter import MarkdownConverter
+
+
+def edit_one_paragraph(markdown: str) -> str:
+    """Add a sentence to the paragraph closest to the middle of the document"""
+    end = markdown.find("\n\n", len(markdown) // 2)
+    return markdown[:end] + " One more sentence." + markdown[end:]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time converting a document again after a one paragraph edit"
+    )
+    parser.add_argument(
+        "--lines", type=int, default=10_000, help="Lines in each corpus document"
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="Timing repetitions")
+    args = parser.parse_args()
+
+    documents = {}
+    for name, unit in CORPUS.items():
+        documents[name] = unit * (args.lines // unit.count("\n"))
+    rng = random.Random(0)
+    documents["essay"] = essay(rng)
+    documents["code_heavy"] = code_heavy(rng)
+    documents["link_dense"] = link_dense(rng)
+
+    converter = MarkdownConverter()
+    print(
+        f"{'document':<14} {'lines':>7} {'full ms':>9} {'same ms':>9} "
+        f"{'edited ms':>10} {'speedup':>8}"
+    )
+    for name, markdown in documents.items():
+        edited = edit_one_paragraph(markdown)
+        assert converter.convert_nodes(edited, name) == converter.convert_nodes(edited)
+
+        converter.convert_nodes(markdown, name)
+        same = min(
+            timeit.repeat(
+                lambda markdown=markdown, name=name: converter.convert_nodes(
+                    markdown, name
+                ),
+                number=1,
+                repeat=args.repeat,
+            )
+        )
+
+        def after_unedited(*document_id, markdown=markdown, edited=edited, name=name):
+            """Time converting the edited text just after the unedited one"""
+            converter.convert_nodes(markdown, name)
+            start = timeit.default_timer()
+            converter.convert_nodes(edited, *document_id)
+            return timeit.default_timer() - start
+
+        full = min(after_unedited() for _ in range(args.repeat))
+        changed = min(after_unedited(name) for _ in range(args.repeat))
+        print(
+            f"{name:<14} {edited.count(chr(10)) + 1:>7} {full * 1000:>9.2f} "
+            f"{same * 1000:>9.2f} {changed * 1000:>10.2f} {full / changed:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
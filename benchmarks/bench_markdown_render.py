@@ -0,0 +1,84 @@
+# ABOUTME: Compares rendering stored post bodies as Markdown with an earlier version
+# ABOUTME: Run with `python -m benchmarks.bench_markdown_render --against <git rev>`
+
+import argparse
+import subprocess
+import timeit
+import types
+from unittest.mock import Mock
+
+from benchmarks.markdown_corpus import CORPUS
+from src.converters.draft_body import DraftBodySerializer
+from src.converters.markdown_converter import MarkdownConverter
+from src.handlers.post_handler import PostHandler
+from src.utils import json_codec
+
+HANDLER_PATH = "src/handlers/post_handler.py"
+
+
+def load_handler(revision: str) -> PostHandler:
+    """Build a PostHandler from the module as it was at a git revision"""
+    source = subprocess.run(
+        ["git", "show", f"{revision}:{HANDLER_PATH}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    module = types.ModuleType(f"post_handler_{revision}")
+    exec(compile(source, f"{revision}:{HANDLER_PATH}", "exec"), module.__dict__)
+    return module.PostHandler(Mock())
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time PostHandler._extract_readable_content on the shared corpus"
+    )
+    parser.add_argument(
+        "--against",
+        metavar="REV",
+        help="Also time the handler at this git revision, e.g. HEAD~1",
+    )
+    parser.add_argument(
+        "--units", type=int, default=1_000, help="Repetitions of each corpus entry"
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="Timing repetitions")
+    args = parser.parse_args()
+
+    handlers = {"current": PostHandler(Mock())}
+    if args.against:
+        handlers[args.against] = load_handler(args.against)
+
+    header = f"{'document':<14} {'blocks':>7}"
+    for name in handlers:
+        header += f" {name + ' ms':>14}"
+    if args.against:
+        header += f" {'ratio':>7}"
+    print(header)
+
+    converter = MarkdownConverter()
+    serializer = DraftBodySerializer()
+    for name, unit in CORPUS.items():
+        # Drafts come back from the API as ProseMirror documents in JSON text
+        body = serializer.serialize(converter.convert(unit * args.units))
+        post = {"draft_body": json_codec.dumps(body)}
+        row = f"{name:<14} {len(body['content']):>7}"
+        timings = []
+        for handler in handlers.values():
+            best = min(
+                timeit.repeat(
+                    lambda handler=handler, post=post: (
+                        handler._extract_readable_content(post)
+                    ),
+                    number=1,
+                    repeat=args.repeat,
+                )
+            )
+            timings.append(best)
+            row += f" {best * 1000:>14.2f}"
+        if args.against:
+            row += f" {timings[1] / timings[0]:>7.2f}"
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
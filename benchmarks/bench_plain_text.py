@@ -0,0 +1,92 @@
+# ABOUTME: Compares writing plain text to a draft body directly with the block pipeline
+# ABOUTME: Run with `python -m benchmarks.bench_plain_text`
+
+import argparse
+import gc
+import random
+import timeit
+import tracemalloc
+from typing import Callable
+from unittest.mock import Mock
+
+from benchmarks.generated_corpus import WORDS
+from src.handlers.post_handler import PostHandler
+
+
+def transcript(rng: random.Random, turns: int) -> str:
+    """A meeting transcript: one short paragraph per turn"""
+    return "\n\n".join(
+        f"Speaker {rng.randint(1, 4)} [{turn // 60:02d}:{turn % 60:02d}]: "
+        + " ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 60)))
+        for turn in range(turns)
+    )
+
+
+def log_dump(rng: random.Random, lines: int) -> str:
+    """Log output: long runs of lines with the odd blank line and quoting"""
+    parts = []
+    for number in range(lines):
+        parts.append(
+            f'2024-01-01T00:00:{number % 60:02d} INFO request path="/{rng.choice(WORDS)}"'
+            f"\tstatus={rng.choice([200, 404, 500])}"
+        )
+        if number % 20 == 19:
+            parts.append("")
+    return "\n".join(parts)
+
+
+def peak_kb(call: Callable[[], object]) -> float:
+    """Peak memory allocated while running a call"""
+    gc.collect()
+    tracemalloc.start()
+    call()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time plain text to draft_body, directly and through blocks"
+    )
+    parser.add_argument(
+        "--scale", type=int, default=10_000, help="Turns or log lines per document"
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="Timing repetitions")
+    args = parser.parse_args()
+
+    handler = PostHandler(Mock())
+    serializer = handler.draft_serializer
+    rng = random.Random(0)
+    documents = {
+        "transcript": transcript(rng, args.scale),
+        "log_dump": log_dump(rng, args.scale * 5),
+    }
+
+    print(
+        f"{'document':<12} {'KB':>7} {'blocks ms':>10} {'direct ms':>10} "
+        f"{'speedup':>8} {'blocks peak KB':>15} {'direct peak KB':>15}"
+    )
+    for name, text in documents.items():
+        calls = {
+            "blocks": lambda text=text: serializer.dumps(
+                handler._plain_text_to_blocks(text)
+            ),
+            "direct": lambda text=text: serializer.dumps_plain_text(text),
+        }
+        assert calls["blocks"]() == calls["direct"]()
+        timings = {
+            label: min(timeit.repeat(call, number=1, repeat=args.repeat))
+            for label, call in calls.items()
+        }
+        peaks = {label: peak_kb(call) for label, call in calls.items()}
+        print(
+            f"{name:<12} {len(text) / 1024:>7.0f} {timings['blocks'] * 1000:>10.2f} "
+            f"{timings['direct'] * 1000:>10.2f} "
+            f"{timings['blocks'] / timings['direct']:>7.1f}x "
+            f"{peaks['blocks']:>15.0f} {peaks['direct']:>15.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+# ABOUTME: Fuzzes the Markdown and HTML converters with seeded degenerate input
+# ABOUTME: Fails if a conversion crashes, overruns its time limit or is unusually slow
+
+import argparse
+import random
+import sys
+import time
+import traceback
+from typing import List, Optional
+
+from benchmarks.generated_corpus import (
+    HTML_FRAGMENTS,
+    MARKDOWN_FRAGMENTS,
+    pathological,
+)
+from src.converters.conversion_budget import ConversionBudget, ConversionLimitError
+from src.converters.html_converter import HTMLConverter
+from src.converters.markdown_converter import MarkdownConverter
+
+# Inputs shorter than this are dominated by per-call overhead and are not
+# held to the throughput floor. HTML is only held to the time limit:
+# html.parser takes quadratic time on some unclosed markup
+MIN_RATED_SIZE = 10_000
+
+# How far past its time limit a conversion may stop, in seconds
+OVERRUN_GRACE = 0.5
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Convert random degenerate documents and report the slowest"
+    )
+    parser.add_argument("--seconds", type=float, default=30.0, help="How long to fuzz")
+    parser.add_argument("--seed", type=int, default=0, help="First seed")
+    parser.add_argument(
+        "--max-size",
+        type=int,
+        default=200_000,
+        help="Largest document, in characters",
+    )
+    parser.add_argument(
+        "--time-limit",
+        type=float,
+        default=2.0,
+        help="Time limit of each conversion, in seconds",
+    )
+    parser.add_argument(
+        "--min-mb-per-s",
+        type=float,
+        default=0.1,
+        help="Fail if a Markdown document converts slower than this",
+    )
+    args = parser.parse_args(argv)
+
+    budget = ConversionBudget(time_limit=args.time_limit)
+    converters = {
+        "markdown": (MarkdownConverter(budget), MARKDOWN_FRAGMENTS),
+        "html": (HTMLConverter(budget=budget), HTML_FRAGMENTS),
+    }
+    results = []
+    failures = []
+    seed = args.seed
+    started = time.perf_counter()
+    while time.perf_counter() - started < args.seconds:
+        rng = random.Random(seed)
+        content_type = rng.choice(sorted(converters))
+        converter, fragments = converters[content_type]
+        content = pathological(rng, fragments, rng.randint(1, args.max_size))
+
+        outcome = "ok"
+        start = time.perf_counter()
+        try:
+            converter.convert_nodes(content)
+        except ConversionLimitError:
+            outcome = "limit"
+        except Exception:
+            outcome = "error"
+            failures.append(
+                f"Seed {seed} ({content_type}) failed:\n{traceback.format_exc()}"
+            )
+        elapsed = time.perf_counter() - start
+        results.append((elapsed, seed, content_type, outcome, content))
+        seed += 1
+
+    results.sort(reverse=True)
+    limited = sum(1 for result in results if result[3] == "limit")
+    print(
+        f"{len(results)} documents, {limited} over budget, {len(failures)} failed "
+        f"(seeds {args.seed}-{seed - 1})"
+    )
+    print(f"\n{'seed':>8} {'type':<9} {'KB':>7} {'ms':>8} {'MB/s':>8} {'':<6} start")
+    for elapsed, seed, content_type, outcome, content in results[:10]:
+        print(
+            f"{seed:>8} {content_type:<9} {len(content) / 1024:>7.0f} "
+            f"{elapsed * 1000:>8.0f} {len(content) / elapsed / 1e6:>8.3f} "
+            f"{outcome:<6} {content[:30]!r}"
+        )
+
+    for elapsed, seed, content_type, outcome, content in results:
+        if elapsed > args.time_limit + OVERRUN_GRACE:
+            failures.append(
+                f"Seed {seed} ({content_type}) ran {elapsed:.2f}s, past the "
+                f"{args.time_limit:g}s limit"
+            )
+        elif (
+            outcome == "ok"
+            and content_type == "markdown"
+            and len(content) >= MIN_RATED_SIZE
+            and len(content) / elapsed / 1e6 < args.min_mb_per_s
+        ):
+            failures.append(
+                f"Seed {seed} ({content_type}) converted slower than "
+                f"{args.min_mb_per_s} MB/s"
+            )
+    for failure in failures:
+        print(f"\n{failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,222 @@
+# ABOUTME: Generates the benchmark suite's corpus of realistic and adversarial posts
+# ABOUTME: Seeded, so every run and every machine benchmarks the same documents
+
+import random
+from typing import Dict, List, Tuple
+
+from src.converters.conversion_budget import MAX_NESTING_DEPTH
+
+WORDS = (
+    "the of and to in is that it for on with as was by at from this be "
+    "writer reader post newsletter subscriber essay draft story idea week "
+    "because however although meanwhile finally people market culture "
+    "science history design software growth research question answer"
+).split()
+LANGUAGES = ["python", "javascript", "bash", "sql", "go"]
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    text = " ".join(rng.choice(WORDS) for _ in range(words))
+    return text[0].upper() + text[1:] + "."
+
+
+def _paragraph(rng: random.Random, sentences: int) -> str:
+    return " ".join(_sentence(rng, rng.randint(8, 20)) for _ in range(sentences))
+
+
+def _marked_paragraph(rng: random.Random) -> str:
+    """A paragraph with some emphasis, bold and a link"""
+    words = _paragraph(rng, rng.randint(3, 6)).split(" ")
+    for _ in range(3):
+        index = rng.randrange(len(words))
+        words[index] = rng.choice(
+            [
+                f"**{words[index]}**",
+                f"*{words[index]}*",
+                f"[{words[index]}](https://example.com/{index})",
+            ]
+        )
+    return " ".join(words)
+
+
+def short_post(rng: random.Random) -> str:
+    """A newsletter update of a few hundred words"""
+    parts = [f"# {_sentence(rng, 5)[:-1]}"]
+    for _ in range(4):
+        parts.append(_marked_paragraph(rng))
+    parts.append("- " + _sentence(rng, 6) + "\n- " + _sentence(rng, 7))
+    return "\n\n".join(parts) + "\n"
+
+
+def essay(rng: random.Random, words: int = 50_000) -> str:
+    """A long essay: sections of paragraphs, quotes and lists"""
+    parts: List[str] = []
+    count = 0
+    while count < words:
+        parts.append(f"## {_sentence(rng, 4)[:-1]}")
+        for _ in range(rng.randint(4, 8)):
+            paragraph = _marked_paragraph(rng)
+            count += paragraph.count(" ") + 1
+            parts.append(paragraph)
+        if rng.random() < 0.5:
+            parts.append("> " + _paragraph(rng, 2))
+        if rng.random() < 0.5:
+            parts.append("\n".join(f"{n}. {_sentence(rng, 8)}" for n in range(1, 5)))
+    return "\n\n".join(parts) + "\n"
+
+
+def code_heavy(rng: random.Random, blocks: int = 150) -> str:
+    """A tutorial alternating short explanations and long code blocks"""
+    parts: List[str] = []
+    for number in range(blocks):
+        parts.append(_paragraph(rng, 2) + " Run `make test` afterwards.")
+        lines = [
+            f"    value_{line} = compute({line}, '{rng.choice(WORDS)}')  # step"
+            for line in range(rng.randint(10, 40))
+        ]
+        language = LANGUAGES[number % len(LANGUAGES)]
+        parts.append(
+            f"```{language}\ndef step_{number}():\n" + "\n".join(lines) + "\n```"
+        )
+    return "\n\n".join(parts) + "\n"
+
+
+def link_dense(rng: random.Random, paragraphs: int = 400) -> str:
+    """A link roundup where most words are links or inline code"""
+    parts: List[str] = []
+    for number in range(paragraphs):
+        items = []
+        for index in range(12):
+            word = rng.choice(WORDS)
+            items.append(
+                rng.choice(
+                    [
+                        f"[{word}](https://example.com/{number}/{index}?ref=roundup)",
+                        f"`{word}()`",
+                        f"***{word}***",
+                        word,
+                    ]
+                )
+            )
+        parts.append(" ".join(items))
+    return "\n\n".join(parts) + "\n"
+
+
+def html_post(rng: random.Random, sections: int = 200) -> str:
+    """An editor-produced HTML post with formatting, lists and figures"""
+    parts: List[str] = []
+    for number in range(sections):
+        parts.append(f"<h2>{_sentence(rng, 4)}</h2>")
+        parts.append(
+            f"<p>{_sentence(rng, 10)} <strong>{rng.choice(WORDS)}</strong> "
+            f'<em>{rng.choice(WORDS)}</em> <a href="https://example.com/{number}">'
+            f"{rng.choice(WORDS)}</a> {_sentence(rng, 12)}</p>"
+        )
+        parts.append(
+            "<ul>"
+            + "".join(f"<li>{_sentence(rng, 5)}</li>" for _ in range(3))
+            + "</ul>"
+        )
+        if number % 5 == 0:
+            parts.append(
+                f'<figure><img src="https://example.com/{number}.jpg" alt="Photo">'
+                f"<figcaption>{_sentence(rng, 6)}</figcaption></figure>"
+            )
+    return "\n".join(parts)
+
+
+def nested_html(depth: int = 400, paragraphs: int = 50) -> str:
+    """HTML nested hundreds of inline and block elements deep"""
+    inline = "".join(f"<{tag}>" for tag in ["span", "em", "strong"] * (depth // 3))
+    closing = "".join(
+        f"</{tag}>" for tag in reversed(["span", "em", "strong"] * (depth // 3))
+    )
+    blocks = "<div>" * depth + "<p>Deep paragraph</p>" + "</div>" * depth
+    return f"<p>{inline}Deeply formatted text{closing}</p>" * paragraphs + blocks
+
+
+def adversarial_markdown(size: int = 20_000) -> str:
+    """Markdown built to trip up backtracking: unclosed spans and markers
+
+    Quotes and lists are nested as deep as the conversion budget allows.
+    """
+    return "\n\n".join(
+        [
+            "*" * size,
+            "[" * (size // 2) + "](" * (size // 4),
+            "`" * (size // 10) + " unclosed code " + "**a " * (size // 10),
+            "> " * MAX_NESTING_DEPTH + "deep quote",
+            "\n".join("  " * level + "- item" for level in range(MAX_NESTING_DEPTH)),
+            ("a " * size) + "\\*" * (size // 4),
+        ]
+    )
+
+
+def adversarial_html(size: int = 5_000) -> str:
+    """HTML with thousands of unclosed tags and attribute soup"""
+    return (
+        "<p><b><i>" * (size // 10)
+        + "text "
+        + "<a href='x' "
+        + 'data-x="' * (size // 10)
+        + "<ul><li>" * (size // 20)
+        + "&amp;" * size
+    )
+
+
+# Fragments degenerate model output repeats: markers that open spans and
+# blocks but rarely close them
+MARKDOWN_FRAGMENTS = [
+    "*", "**", "***", "_", "[", "]", "](", ")", "`", "```", "\\", "\\*", "![",
+    "> ", "- ", "1. ", "# ", "---", "<!--", "-->", "    ", "\t", "\n", "\n\n",
+    "a", "word ",
+]  # fmt: skip
+HTML_FRAGMENTS = [
+    "<p>", "</p>", "<b>", "<i>", "<em>", "</em>", "<div>", "</div>", "<ul>",
+    "<li>", "<ol>", "<pre><code>", "<blockquote>", "<a href='x'>", "</a>",
+    "<img src='x.png'>", "<hr>", "<!--", "-->", "&amp;", "&#x", "<", ">", "'",
+    '"', "text ",
+]  # fmt: skip
+
+
+def pathological(rng: random.Random, fragments: List[str], size: int) -> str:
+    """Degenerate input of about ``size`` characters
+
+    Either one fragment repeated, a few fragments cycled, or random soup.
+    """
+    shape = rng.random()
+    if shape < 0.4:
+        unit = rng.choice(fragments)
+    elif shape < 0.7:
+        unit = "".join(rng.choice(fragments) for _ in range(rng.randint(2, 4)))
+    else:
+        parts: List[str] = []
+        length = 0
+        while length < size:
+            part = rng.choice(fragments) * rng.choice([1, 1, 2, 10, 100])
+            parts.append(part)
+            length += len(part)
+        return "".join(parts)
+    return unit * max(1, size // len(unit))
+
+
+def generate_corpus(seed: int = 0) -> Dict[str, Tuple[str, str]]:
+    """Build every document of the corpus
+
+    Args:
+        seed: Seed for the generated text
+
+    Returns:
+        Mapping of document name to (content, content_type)
+    """
+    rng = random.Random(seed)
+    return {
+        "short_post": (short_post(rng), "markdown"),
+        "essay_50k_words": (essay(rng), "markdown"),
+        "code_heavy": (code_heavy(rng), "markdown"),
+        "link_dense": (link_dense(rng), "markdown"),
+        "html_post": (html_post(rng), "html"),
+        "nested_html": (nested_html(), "html"),
+        "adversarial_markdown": (adversarial_markdown(), "markdown"),
+        "adversarial_html": (adversarial_html(), "html"),
+    }
@@ -0,0 +1,64 @@
+# ABOUTME: Shared HTML corpus for the converter benchmarks
+# ABOUTME: Each entry is one unit of a document shape, repeated to the wanted size
+
+# Rich text pasted from an editor: dense inline formatting, few line breaks
+PASTED = (
+    "<h2>Section heading</h2>"
+    "<p>A paragraph with <strong>bold</strong>, <em>emphasis</em>, "
+    "<strong><em>both at once</em></strong>, <code>inline code</code> and a "
+    '<a href="https://example.com">link</a>.</p>'
+    "<ul><li>First item</li><li>Second <b>item</b></li><li>Third item</li></ul>"
+    "<ol><li>One</li><li>Two</li></ol>"
+    "<blockquote>A quote with <i>emphasis</i></blockquote>"
+    '<pre><code class="language-python">print("code")\n</code></pre>'
+    "<hr>"
+)
+
+# A post from a WordPress export after clean_wordpress_html: pretty-printed
+# block markup with figures, comments and entities
+WORDPRESS = """<h3>A heading &amp; more</h3>
+
+<p>WordPress wraps every paragraph and keeps the
+source line breaks, with the occasional <a href="https://example.com/post">link
+to another post</a> and&nbsp;non-breaking spaces.</p>
+
+<figure class="wp-block-image size-large">
+  <img src="https://example.com/wp-content/uploads/photo.jpg" alt="A photo">
+  <figcaption>A caption</figcaption>
+</figure>
+
+<ul>
+  <li>An item</li>
+  <li>Another <strong>item</strong></li>
+</ul>
+
+<blockquote class="wp-block-quote">
+  <p>Quoted text</p>
+  <cite>Someone</cite>
+</blockquote>
+
+"""
+
+# Rich text copied out of Google Docs: every stretch of text in its own
+# styled span, bold split across elements and links broken at each span
+GOOGLE_DOCS = (
+    '<p dir="ltr"><span style="font-weight:400">The </span>'
+    '<span style="font-weight:400">quarterly </span>'
+    '<span style="font-weight:400">numbers came in </span>'
+    '<b><span style="font-weight:700">well </span></b>'
+    '<b><span style="font-weight:700">ahead</span></b>'
+    '<span style="font-weight:400"> of the </span>'
+    '<a href="https://example.com/report"><span>full </span></a>'
+    '<a href="https://example.com/report"><span>report</span></a>'
+    '<span style="font-weight:400">.</span><span></span></p>'
+    '<p dir="ltr"><span style="font-weight:400"></span></p>'
+    '<p dir="ltr"><i><span>A note </span></i><i><span>in italics</span></i>'
+    '<span style="font-weight:400"> and </span><span>a closing </span>'
+    "<span>line.</span></p>"
+)
+
+CORPUS = {
+    "pasted": PASTED,
+    "wordpress": WORDPRESS,
+    "google_docs": GOOGLE_DOCS,
+}
@@ -0,0 +1,63 @@
+# ABOUTME: Shared Markdown corpus for the converter benchmarks
+# ABOUTME: Each entry is one unit of a document shape, repeated to the wanted size
+
+# One section of a typical long post
+SECTION = """## Section heading
+
+A paragraph that runs over
+several source lines with **bold** text
+and a [link](https://example.com).
+
+- First item
+- Second item
+- Third item
+
+1. One
+2. Two
+
+> A quote
+> over two lines
+
+```python
+print("code")
+```
+
+---
+
+"""
+
+# Plain prose, the bulk of most posts
+PROSE = """A paragraph of ordinary prose that wraps across a couple of source
+lines, with the occasional *emphasis* and a [link](https://example.com).
+
+"""
+
+# Lists nested a few levels deep, mixing bullets and numbers, with
+# multi-paragraph and lazily continued items
+NESTED_LISTS = """- Top level item
+  with a lazy continuation
+  1. Numbered child
+  2. Another child
+
+     With a second paragraph
+     - Deepest item
+- Back at the top
+
+"""
+
+# Quotes holding paragraphs, a nested quote and a list
+QUOTES = """> An opening line
+continued lazily
+>
+> > A nested quote
+>
+> - A list in a quote
+
+"""
+
+CORPUS = {
+    "section": SECTION,
+    "prose": PROSE,
+    "nested_lists": NESTED_LISTS,
+    "quotes": QUOTES,
+}
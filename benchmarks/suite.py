@@ -0,0 +1,250 @@
+# ABOUTME: Benchmark suite for the converters, draft body writer and Markdown renderer
+# ABOUTME: Run with `python -m benchmarks.suite --save baseline.json` or `--compare baseline.json`
+
+import argparse
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+from unittest.mock import Mock
+
+from benchmarks.generated_corpus import generate_corpus
+from src.converters.block_builder import BlockBuilder
+from src.converters.draft_body import DraftBodySerializer
+from src.converters.html_converter import HTMLConverter
+from src.converters.markdown_converter import MarkdownConverter
+from src.handlers.post_handler import PostHandler
+from src.utils import json_codec
+
+RESULTS_VERSION = 1
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    """Return the nearest-rank percentile of a list of samples"""
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, round(fraction * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+def build_cases() -> Dict[str, Dict[str, Callable[[], Any]]]:
+    """Build the benchmarked calls for every corpus document
+
+    Returns:
+        Mapping of "case/document" to the call and the input size in bytes
+    """
+    converters = {"markdown": MarkdownConverter(), "html": HTMLConverter()}
+    builder = BlockBuilder()
+    serializer = DraftBodySerializer()
+    handler = PostHandler(Mock())
+
+    cases = {}
+    for name, (content, content_type) in generate_corpus().items():
+        converter = converters[content_type]
+        blocks = converter.convert_nodes(content)
+        body = serializer.dumps(blocks)
+        size = len(content.encode())
+        lines = [line for line in content.split("\n") if line.strip()]
+
+        cases[f"convert/{name}"] = {
+            "call": lambda converter=converter, content=content: (
+                converter.convert_nodes(content)
+            ),
+            "bytes": size,
+        }
+        cases[f"block_builder/{name}"] = {
+            "call": lambda lines=lines: [builder.paragraph(line) for line in lines],
+            "bytes": size,
+        }
+        cases[f"draft_body/{name}"] = {
+            "call": lambda blocks=blocks: serializer.dumps(blocks),
+            "bytes": len(body.encode()),
+        }
+        cases[f"render/{name}"] = {
+            "call": lambda body=body: handler._extract_readable_content(
+                {"draft_body": body}
+            ),
+            "bytes": len(body.encode()),
+        }
+        if content_type == "markdown":
+            # The same text posted as content_type="plain"
+            cases[f"plain/{name}"] = {
+                "call": lambda content=content: (serializer.dumps_plain_text(content)),
+                "bytes": size,
+            }
+            # The whole draft pipeline, with a paywall in the middle
+            middle = content.find("\n\n", len(content) // 2)
+            paywalled = content[:middle] + "\n\n<!-- PAYWALL -->" + content[middle:]
+            cases[f"paywall/{name}"] = {
+                "call": lambda paywalled=paywalled: handler._prepare_draft_blocks(
+                    "Title", paywalled, "markdown"
+                ),
+                "bytes": len(paywalled.encode()),
+            }
+    return cases
+
+
+def measure(
+    call: Callable[[], Any],
+    size: int,
+    min_time: float,
+    min_runs: int,
+    max_runs: int,
+) -> Dict[str, float]:
+    """Time a call repeatedly and measure its peak memory once
+
+    Args:
+        call: The benchmarked call
+        size: Input size in bytes, for throughput
+        min_time: Keep timing until this many seconds have passed
+        min_runs: Fewest timed runs
+        max_runs: Most timed runs
+
+    Returns:
+        Throughput, p50/p99 latency and peak memory of the call
+    """
+    call()
+    samples: List[float] = []
+    started = time.perf_counter()
+    while len(samples) < max_runs and (
+        len(samples) < min_runs or time.perf_counter() - started < min_time
+    ):
+        gc.collect()
+        start = time.perf_counter()
+        call()
+        samples.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    call()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    p50 = percentile(samples, 0.5)
+    return {
+        "runs": len(samples),
+        "mb_per_s": round(size / p50 / 1e6, 3),
+        "p50_ms": round(p50 * 1000, 3),
+        "p99_ms": round(percentile(samples, 0.99) * 1000, 3),
+        "peak_kb": round(peak / 1024, 1),
+    }
+
+
+def compare(
+    results: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Dict[str, float]],
+    threshold: float,
+    memory_threshold: float,
+) -> List[str]:
+    """List the benchmarks that regressed against a baseline
+
+    Latency is compared at p50, which is far less noisy than p99.
+
+    Args:
+        results: Results of this run
+        baseline: Results of the baseline run
+        threshold: Allowed slowdown, e.g. 0.25 for 25%
+        memory_threshold: Allowed growth of peak memory
+
+    Returns:
+        One line per regression
+    """
+    regressions = []
+    for key, result in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        if result["p50_ms"] > base["p50_ms"] * (1 + threshold):
+            regressions.append(
+                f"{key}: p50 {base['p50_ms']:.2f} ms -> {result['p50_ms']:.2f} ms"
+            )
+        if result["peak_kb"] > base["peak_kb"] * (1 + memory_threshold) + 64:
+            regressions.append(
+                f"{key}: peak {base['peak_kb']:.0f} KB -> {result['peak_kb']:.0f} KB"
+            )
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Benchmark conversion on a generated corpus"
+    )
+    parser.add_argument(
+        "--only", metavar="TEXT", help="Only run benchmarks whose name contains TEXT"
+    )
+    parser.add_argument("--save", metavar="PATH", help="Write results as JSON")
+    parser.add_argument(
+        "--compare", metavar="PATH", help="Fail if slower than these saved results"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.25,
+        help="Allowed p50 slowdown against --compare (default 0.25 = 25%%)",
+    )
+    parser.add_argument(
+        "--memory-threshold",
+        type=float,
+        default=0.25,
+        help="Allowed peak memory growth against --compare",
+    )
+    parser.add_argument(
+        "--min-time", type=float, default=1.0, help="Seconds to time each benchmark"
+    )
+    parser.add_argument("--min-runs", type=int, default=5, help="Fewest timed runs")
+    parser.add_argument("--max-runs", type=int, default=200, help="Most timed runs")
+    args = parser.parse_args(argv)
+
+    cases = build_cases()
+    if args.only:
+        cases = {key: case for key, case in cases.items() if args.only in key}
+
+    print(
+        f"{'benchmark':<36} {'KB':>7} {'MB/s':>7} {'p50 ms':>9} {'p99 ms':>9} "
+        f"{'peak KB':>9}"
+    )
+    results = {}
+    for key, case in cases.items():
+        result = measure(
+            case["call"], case["bytes"], args.min_time, args.min_runs, args.max_runs
+        )
+        results[key] = result
+        print(
+            f"{key:<36} {case['bytes'] / 1024:>7.0f} {result['mb_per_s']:>7.2f} "
+            f"{result['p50_ms']:>9.2f} {result['p99_ms']:>9.2f} "
+            f"{result['peak_kb']:>9.0f}"
+        )
+
+    if args.save:
+        report = {
+            "version": RESULTS_VERSION,
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "json_codec": json_codec.codec.name,
+            "results": results,
+        }
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nSaved results to {args.save}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(
+            results, baseline["results"], args.threshold, args.memory_threshold
+        )
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) against {args.compare}:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"\nNo regressions against {args.compare}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
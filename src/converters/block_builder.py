@@ -1,27 +1,43 @@
 # ABOUTME: BlockBuilder class for creating Substack JSON block format
 # ABOUTME: Provides methods to create all supported block types with proper structure
 
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+from src.converters.block_nodes import (
+    HORIZONTAL_RULE,
+    PAYWALL,
+    Block,
+    Text,
+    coalesce,
+    link_marks,
+    marks_for,
+)
 
 
 class BlockBuilder:
-    """Builder class for creating Substack JSON blocks"""
+    """Builder class for creating Substack JSON blocks
+
+    Blocks are immutable slotted nodes (see block_nodes) that read like the
+    JSON dicts; call ``to_dict()`` on them where plain dicts are needed.
+    """
 
-    def paragraph(self, content: Union[str, List[Dict[str, Any]]]) -> Dict[str, Any]:
+    def paragraph(self, content: Union[str, List[Dict[str, Any]]]) -> Block:
         """Create a paragraph block
 
         Args:
-            content: Either a string or a list of text objects with formatting
+            content: Either a string or a list of text objects with formatting.
+                Adjacent text with the same marks is merged into one run and
+                empty text is dropped
 
         Returns:
-            A paragraph block dictionary
+            A paragraph block
         """
         if isinstance(content, str):
-            content = [{"type": "text", "content": content}]
+            return Block("paragraph", (Text(content),))
 
-        return {"type": "paragraph", "content": content}
+        return Block("paragraph", coalesce(content))
 
-    def header(self, content: str, level: int) -> Dict[str, Any]:
+    def header(self, content: str, level: int) -> Block:
         """Create a header block
 
         Args:
@@ -29,7 +45,7 @@ class BlockBuilder:
             level: Header level (1-6)
 
         Returns:
-            A header block dictionary
+            A header block
 
         Raises:
             ValueError: If level is not between 1 and 6
@@ -46,46 +62,46 @@ class BlockBuilder:
             6: "heading-six",
         }
 
-        return {
-            "type": header_types[level],
-            "content": [{"type": "text", "content": content}],
-        }
+        return Block(header_types[level], (Text(content),))
 
-    def unordered_list(self, items: List[str]) -> Dict[str, Any]:
+    def unordered_list(self, items: List[Union[str, List[Dict[str, Any]]]]) -> Block:
         """Create an unordered (bulleted) list
 
         Args:
-            items: List of item strings
+            items: List of items, each either a string or a list of the
+                blocks in the item (paragraphs, nested lists, ...)
 
         Returns:
-            A bulleted list block dictionary
+            A bulleted list block
         """
-        content = []
-        for item in items:
-            content.append(
-                {"type": "bulleted-list-item", "content": [self.paragraph(item)]}
-            )
+        content = tuple(
+            Block("bulleted-list-item", self._item_blocks(item)) for item in items
+        )
 
-        return {"type": "bulleted-list", "content": content}
+        return Block("bulleted-list", content)
 
-    def ordered_list(self, items: List[str]) -> Dict[str, Any]:
+    def ordered_list(
+        self, items: List[Union[str, List[Dict[str, Any]]]], start: int = 1
+    ) -> Block:
         """Create an ordered (numbered) list
 
         Args:
-            items: List of item strings
+            items: List of items, each either a string or a list of the
+                blocks in the item (paragraphs, nested lists, ...)
+            start: Number of the first item
 
         Returns:
-            An ordered list block dictionary
+            An ordered list block
         """
-        content = []
-        for item in items:
-            content.append(
-                {"type": "ordered-list-item", "content": [self.paragraph(item)]}
-            )
+        content = tuple(
+            Block("ordered-list-item", self._item_blocks(item)) for item in items
+        )
 
-        return {"type": "ordered-list", "content": content}
+        if start != 1:
+            return Block("ordered-list", content, (("start", start),))
+        return Block("ordered-list", content)
 
-    def code_block(self, code: str, language: str = "") -> Dict[str, Any]:
+    def code_block(self, code: str, language: str = "") -> Block:
         """Create a code block
 
         Args:
@@ -93,22 +109,22 @@ class BlockBuilder:
             language: Optional language identifier
 
         Returns:
-            A code block dictionary
+            A code block
         """
-        return {"type": "code", "language": language, "content": code}
+        return Block("code", code, (("language", language),))
 
-    def blockquote(self, content: str) -> Dict[str, Any]:
+    def blockquote(self, content: Union[str, List[Dict[str, Any]]]) -> Block:
         """Create a blockquote
 
         Args:
-            content: The quote text
+            content: The quote text, or a list of the blocks in the quote
 
         Returns:
-            A blockquote block dictionary
+            A blockquote block
         """
-        return {"type": "blockquote", "content": [self.paragraph(content)]}
+        return Block("blockquote", self._item_blocks(content))
 
-    def image(self, src: str, alt: str, caption: str = "") -> Dict[str, Any]:
+    def image(self, src: str, alt: str, caption: str = "") -> Block:
         """Create an image block
 
         Args:
@@ -117,11 +133,13 @@ class BlockBuilder:
             caption: Optional caption
 
         Returns:
-            An image block dictionary
+            An image block
         """
-        return {"type": "captioned-image", "src": src, "alt": alt, "caption": caption}
+        return Block(
+            "captioned-image", None, (("src", src), ("alt", alt), ("caption", caption))
+        )
 
-    def link(self, text: str, href: str) -> Dict[str, Any]:
+    def link(self, text: str, href: str) -> Text:
         """Create a link text object
 
         Args:
@@ -129,31 +147,28 @@ class BlockBuilder:
             href: The link URL
 
         Returns:
-            A text object with link mark
+            A text object with link mark; the mark is shared with other
+            links to the same URL
         """
-        return {
-            "type": "text",
-            "content": text,
-            "marks": [{"type": "link", "href": href}],
-        }
+        return Text(text, link_marks(href))
 
-    def horizontal_rule(self) -> Dict[str, Any]:
+    def horizontal_rule(self) -> Block:
         """Create a horizontal rule
 
         Returns:
-            A horizontal rule block dictionary
+            The shared horizontal rule block
         """
-        return {"type": "hr"}
+        return HORIZONTAL_RULE
 
-    def paywall(self) -> Dict[str, Any]:
+    def paywall(self) -> Block:
         """Create a paywall marker
 
         Returns:
-            A paywall block dictionary
+            The shared paywall block
         """
-        return {"type": "paywall"}
+        return PAYWALL
 
-    def text(self, content: str, marks: Optional[List[str]] = None) -> Dict[str, Any]:
+    def text(self, content: str, marks: Optional[Sequence[str]] = None) -> Text:
         """Create a text object with optional formatting marks
 
         Args:
@@ -161,11 +176,15 @@ class BlockBuilder:
             marks: Optional list of mark types (e.g., ["strong", "em"])
 
         Returns:
-            A text object dictionary
+            A text object; its marks tuple is shared with other text using
+            the same marks
         """
-        text_obj = {"type": "text", "content": content}
-
         if marks:
-            text_obj["marks"] = [{"type": mark} for mark in marks]
+            return Text(content, marks_for(marks))
+        return Text(content)
 
-        return text_obj
+    def _item_blocks(self, content: Union[str, List[Dict[str, Any]]]) -> tuple:
+        """Wrap text in a paragraph; lists of blocks are used as they are"""
+        if isinstance(content, str):
+            return (self.paragraph(content),)
+        return tuple(content)
@@ -0,0 +1,249 @@
+# ABOUTME: Compact immutable nodes for Substack blocks, text runs and marks
+# ABOUTME: They read like the JSON dicts they stand for and turn into them with to_dict()
+
+from abc import abstractmethod
+from collections.abc import Mapping
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+_set_slot = object.__setattr__
+
+
+class Node(Mapping):
+    """Base class for the immutable block nodes
+
+    A node has the same keys as the JSON dict it stands for, so code
+    written against that form (``block["type"]``, ``block.get("content")``)
+    works unchanged, and a node compares equal to its dict. ``to_dict``
+    gives the plain JSON form for anything that must be serialized.
+    """
+
+    __slots__ = ()
+
+    def __setattr__(self, name: str, value: Any):
+        raise AttributeError(f"{type(self).__name__} nodes are immutable")
+
+    def __delattr__(self, name: str):
+        raise AttributeError(f"{type(self).__name__} nodes are immutable")
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return repr(self.to_dict())
+
+    @abstractmethod
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the node as a plain JSON-serializable dict"""
+
+
+class Mark(Node):
+    """A formatting mark on a text run, e.g. strong, em, code or link"""
+
+    __slots__ = ("type", "href")
+
+    def __init__(self, type: str, href: Optional[str] = None):
+        _set_slot(self, "type", type)
+        _set_slot(self, "href", href)
+
+    def __getitem__(self, key: str) -> Any:
+        if key == "type":
+            return self.type
+        if key == "href" and self.href is not None:
+            return self.href
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        yield "type"
+        if self.href is not None:
+            yield "href"
+
+    def __reduce__(self):
+        return Mark, (self.type, self.href)
+
+    def to_dict(self) -> Dict[str, Any]:
+        if self.href is None:
+            return {"type": self.type}
+        return {"type": self.type, "href": self.href}
+
+
+class Text(Node):
+    """A run of text with a tuple of marks"""
+
+    __slots__ = ("content", "marks")
+
+    type = "text"
+
+    def __init__(self, content: str, marks: Tuple[Mark, ...] = ()):
+        _set_slot(self, "content", content)
+        _set_slot(self, "marks", marks)
+
+    def __getitem__(self, key: str) -> Any:
+        if key == "type":
+            return "text"
+        if key == "content":
+            return self.content
+        if key == "marks" and self.marks:
+            return list(self.marks)
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        yield "type"
+        yield "content"
+        if self.marks:
+            yield "marks"
+
+    def __reduce__(self):
+        return Text, (self.content, self.marks)
+
+    def to_dict(self) -> Dict[str, Any]:
+        if not self.marks:
+            return {"type": "text", "content": self.content}
+        return {
+            "type": "text",
+            "content": self.content,
+            "marks": [mark.to_dict() for mark in self.marks],
+        }
+
+
+class Block(Node):
+    """A block, or a list item, with its children or text and extra attributes
+
+    ``content`` is a tuple of child nodes, the code text of a code block,
+    or None for blocks without content. ``attrs`` holds the remaining keys
+    (language, src, start, ...) as (key, value) pairs.
+    """
+
+    __slots__ = ("type", "content", "attrs")
+
+    def __init__(
+        self,
+        type: str,
+        content: Union[None, str, Tuple[Any, ...]] = None,
+        attrs: Tuple[Tuple[str, Any], ...] = (),
+    ):
+        _set_slot(self, "type", type)
+        _set_slot(self, "content", content)
+        _set_slot(self, "attrs", attrs)
+
+    def __getitem__(self, key: str) -> Any:
+        if key == "type":
+            return self.type
+        if key == "content" and self.content is not None:
+            content = self.content
+            return content if isinstance(content, str) else list(content)
+        for name, value in self.attrs:
+            if name == key:
+                return value
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        yield "type"
+        for name, _ in self.attrs:
+            yield name
+        if self.content is not None:
+            yield "content"
+
+    def __reduce__(self):
+        return Block, (self.type, self.content, self.attrs)
+
+    def to_dict(self) -> Dict[str, Any]:
+        block = {"type": self.type}
+        block.update(self.attrs)
+        content = self.content
+        if isinstance(content, tuple):
+            block["content"] = to_dicts(content)
+        elif content is not None:
+            block["content"] = content
+        return block
+
+
+HORIZONTAL_RULE = Block("hr")
+PAYWALL = Block("paywall")
+
+# Interned mark tuples keyed by mark types
+_MARKS: Dict[Tuple[str, ...], Tuple[Mark, ...]] = {}
+
+# Interned link marks keyed by href. Unlike mark types, hrefs never stop
+# coming, so the table is emptied once it holds LINK_MARKS_SIZE of them
+_LINK_MARKS: Dict[str, Tuple[Mark, ...]] = {}
+LINK_MARKS_SIZE = 4096
+
+
+def marks_for(types: Sequence[str]) -> Tuple[Mark, ...]:
+    """Return the shared tuple of marks for a sequence of mark types"""
+    key = tuple(types)
+    marks = _MARKS.get(key)
+    if marks is None:
+        marks = _MARKS[key] = tuple(Mark(mark_type) for mark_type in key)
+    return marks
+
+
+def link_marks(href: str) -> Tuple[Mark, ...]:
+    """Return the shared tuple holding the link mark for ``href``"""
+    marks = _LINK_MARKS.get(href)
+    if marks is None:
+        if len(_LINK_MARKS) >= LINK_MARKS_SIZE:
+            _LINK_MARKS.clear()
+        marks = _LINK_MARKS[href] = (Mark("link", href),)
+    return marks
+
+
+def coalesce(runs: Iterable[Any]) -> Tuple[Any, ...]:
+    """Merge adjacent text runs with the same marks and drop empty runs
+
+    The inline parsers split text wherever a span might start, and editor
+    HTML wraps words in elements that carry no formatting, so a paragraph
+    often arrives as many short runs with the same marks. Anything that is
+    not a Text node is kept where it is.
+
+    Args:
+        runs: Text runs, and possibly other nodes or dicts
+
+    Returns:
+        The runs with each stretch of same-marked text joined into one node
+    """
+    merged: List[Any] = []
+    first: Optional[Text] = None
+    pieces: List[str] = []
+    for run in runs:
+        if not isinstance(run, Text):
+            if first is not None:
+                merged.append(_joined(first, pieces))
+                first = None
+            merged.append(run)
+            continue
+        if not run.content:
+            continue
+        if first is not None:
+            marks = run.marks
+            if marks is first.marks or marks == first.marks:
+                pieces.append(run.content)
+                continue
+            merged.append(_joined(first, pieces))
+        first = run
+        pieces = [run.content]
+    if first is not None:
+        merged.append(_joined(first, pieces))
+    return tuple(merged)
+
+
+def _joined(first: Text, pieces: List[str]) -> Text:
+    """The run of ``first`` holding all of ``pieces``, reusing it if it is alone"""
+    if len(pieces) == 1:
+        return first
+    return Text("".join(pieces), first.marks)
+
+
+def to_dicts(nodes: Sequence[Any]) -> List[Any]:
+    """Convert nodes to plain dicts, leaving anything else as it is"""
+    return [node.to_dict() if isinstance(node, Node) else node for node in nodes]
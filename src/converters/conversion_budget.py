@@ -0,0 +1,153 @@
+# ABOUTME: ConversionBudget limits the size, nesting depth and running time of a conversion
+# ABOUTME: Converters meter their work against it and raise ConversionLimitError past a limit
+
+import time
+from typing import Optional
+
+# Longest input one conversion accepts, in characters: several times the
+# longest real posts (a 50,000 word essay is about 350,000)
+MAX_CONTENT_CHARS = 2_000_000
+
+# Deepest nesting of block quotes and lists. A list level is four levels
+# of JSON in a draft body and orjson stops at 255, while the writers that
+# walk the blocks recurse per level
+MAX_NESTING_DEPTH = 50
+
+# Seconds one conversion may run
+TIME_LIMIT = 10.0
+
+# Lines or elements between reads of the clock
+CHECK_INTERVAL = 64
+
+
+class ConversionLimitError(ValueError):
+    """Raised when content is too long, too deeply nested or too slow to convert"""
+
+
+class ConversionBudget:
+    """Limits on the work converting one document may take
+
+    Content written by a model is sometimes degenerate: megabytes of
+    repeated markers, or quotes and lists nested hundreds deep. The
+    converters check each conversion against these limits as they go and
+    stop with a ConversionLimitError saying which was exceeded, instead of
+    keeping a worker busy for minutes or failing with a RecursionError.
+    Any limit can be None to turn it off.
+
+    The time limit is checked as the work goes only where the work is in
+    Python: Markdown conversion and HTML parsed with bs4. The selectolax and
+    lxml backends parse in C and cannot be interrupted, so their parse is
+    only checked once it has finished; walking the tree is metered as usual.
+    """
+
+    def __init__(
+        self,
+        max_chars: Optional[int] = MAX_CONTENT_CHARS,
+        max_depth: Optional[int] = MAX_NESTING_DEPTH,
+        time_limit: Optional[float] = TIME_LIMIT,
+    ):
+        """Initialize the budget
+
+        Args:
+            max_chars: Longest input, in characters
+            max_depth: Deepest nesting of block quotes and lists
+            time_limit: Seconds a conversion may run
+
+        Raises:
+            ValueError: If a limit is not positive
+        """
+        for name, value in (
+            ("max_chars", max_chars),
+            ("max_depth", max_depth),
+            ("time_limit", time_limit),
+        ):
+            if value is not None and value <= 0:
+                raise ValueError(f"{name} must be positive or None")
+
+        self.max_chars = max_chars
+        self.max_depth = max_depth
+        self.time_limit = time_limit
+
+    def meter(self) -> "BudgetMeter":
+        """Start metering one conversion against this budget"""
+        return BudgetMeter(self)
+
+
+class BudgetMeter:
+    """Tracks the work done by one conversion against its ConversionBudget"""
+
+    __slots__ = ("budget", "chars", "steps", "deadline", "paused_at")
+
+    def __init__(self, budget: ConversionBudget):
+        self.budget = budget
+        self.chars = 0
+        self.steps = 0
+        self.deadline: Optional[float] = None
+        if budget.time_limit is not None:
+            self.deadline = time.monotonic() + budget.time_limit
+        self.paused_at = 0.0
+
+    def add(self, chars: int):
+        """Count input read and one step of work
+
+        Raises:
+            ConversionLimitError: If the input is too long or time ran out
+        """
+        # Called for every line, so the checks are inlined
+        self.chars += chars
+        max_chars = self.budget.max_chars
+        if max_chars is not None and self.chars > max_chars:
+            self.check_length(self.chars)
+        self.steps += 1
+        if not self.steps % CHECK_INTERVAL:
+            self.check_time()
+
+    def check_length(self, length: int):
+        """Raise ConversionLimitError if ``length`` characters is too long"""
+        max_chars = self.budget.max_chars
+        if max_chars is not None and length > max_chars:
+            raise ConversionLimitError(
+                f"Content is longer than the {max_chars:,} character limit "
+                "for one conversion"
+            )
+
+    def tick(self):
+        """Count one step of work, reading the clock every CHECK_INTERVAL steps
+
+        Raises:
+            ConversionLimitError: If time ran out
+        """
+        self.steps += 1
+        if self.steps % CHECK_INTERVAL == 0:
+            self.check_time()
+
+    def check_time(self):
+        """Raise ConversionLimitError if the conversion ran out of time"""
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            raise ConversionLimitError(
+                f"Conversion took longer than the {self.budget.time_limit:g} "
+                "second limit; the content may be malformed"
+            )
+
+    def check_depth(self, depth: int):
+        """Raise ConversionLimitError if ``depth`` is deeper than allowed"""
+        max_depth = self.budget.max_depth
+        if max_depth is not None and depth > max_depth:
+            raise ConversionLimitError(
+                f"Content is nested more than {max_depth} levels deep"
+            )
+
+    def pause(self):
+        """Check the time and stop the clock, e.g. while a caller handles a block
+
+        Raises:
+            ConversionLimitError: If time ran out
+        """
+        self.paused_at = time.monotonic()
+        if self.deadline is not None and self.paused_at > self.deadline:
+            self.check_time()
+
+    def resume(self):
+        """Restart the clock stopped by ``pause``"""
+        if self.deadline is not None:
+            self.deadline += time.monotonic() - self.paused_at
@@ -0,0 +1,270 @@
+# ABOUTME: ConversionService runs Markdown/HTML conversion and rendering in worker processes
+# ABOUTME: Batches jobs in chunks across a process pool, converting small inputs in-process
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Iterable, List, Optional, Tuple
+
+from src.converters.html_converter import HTMLConverter
+from src.converters.markdown_converter import MarkdownConverter
+from src.converters.markdown_renderer import MarkdownRenderer
+
+logger = logging.getLogger(__name__)
+
+# Jobs a worker can run: converting "markdown" or "html" to blocks, or
+# rendering a stored body back to Markdown
+JOB_KINDS = ("markdown", "html", "render")
+
+# Inputs smaller than this (in characters) convert faster in-process than
+# the round trip to a worker takes
+SERIAL_THRESHOLD = 8192
+
+# Workers are started without forking: the server process runs threads
+# (the event loop and to_thread jobs) whose locks a fork would copy mid-use
+START_METHOD = (
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+# Converters of the current thread, built on first use. Small jobs run in
+# threads of the server process, and converters keep per-parse state
+# (such as lxml's parser and its error log), so threads never share them
+_local = threading.local()
+
+
+def _run_job(kind: str, payload: Any) -> Any:
+    """Run one job with this thread's converters"""
+    tools = getattr(_local, "tools", None)
+    if tools is None:
+        tools = _local.tools = {
+            "markdown": MarkdownConverter(),
+            "html": HTMLConverter(),
+            "render": MarkdownRenderer(),
+        }
+    if kind == "render":
+        return tools["render"].render_body(payload).strip()
+    return tools[kind].convert_nodes(payload)
+
+
+def _run_chunk(jobs: List[Tuple[str, Any]]) -> List[Any]:
+    """Run a chunk of jobs in order, in a worker process"""
+    return [_run_job(kind, payload) for kind, payload in jobs]
+
+
+def _check_kind(kind: str):
+    if kind not in JOB_KINDS:
+        raise ValueError(f"Unsupported conversion job: {kind}")
+
+
+def _job_size(payload: Any) -> int:
+    """Size of a job's input in characters
+
+    Decoded bodies count as empty: pickling them for a worker costs about
+    as much as rendering them.
+    """
+    return len(payload) if isinstance(payload, str) else 0
+
+
+class ConversionService:
+    """Converts content across a pool of worker processes
+
+    Conversion is CPU-bound Python, so threads do not speed it up and it
+    blocks the event loop when run inline. The service sends jobs to a
+    ``ProcessPoolExecutor`` and returns results in input order. Batches are
+    split into chunks so each round trip to a worker carries several
+    documents. Inputs below ``serial_threshold`` characters, and every job
+    when only one worker is available, run in the calling process, where
+    they cost less than the transfer to a worker would.
+
+    If worker processes cannot be started or the pool breaks, the service
+    logs a warning and converts in-process from then on.
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        chunk_size: int = 8,
+        serial_threshold: int = SERIAL_THRESHOLD,
+    ):
+        """Initialize the service; worker processes start on first use
+
+        Args:
+            max_workers: Number of worker processes, defaults to the CPU count
+                (at most 8). With 1, everything runs in-process.
+            chunk_size: Jobs sent to a worker at a time by the batch methods
+            serial_threshold: Batches and documents smaller than this many
+                characters are converted in-process
+
+        Raises:
+            ValueError: If invalid settings provided
+        """
+        if max_workers is None:
+            max_workers = min(os.cpu_count() or 1, 8)
+        if not isinstance(max_workers, int) or max_workers < 1:
+            raise ValueError("max_workers must be a positive integer")
+        if not isinstance(chunk_size, int) or chunk_size < 1:
+            raise ValueError("chunk_size must be a positive integer")
+
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+        self.serial_threshold = serial_threshold
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_failed = max_workers == 1
+
+    def convert_many(self, documents: Iterable[Tuple[str, str]]) -> List[List[Any]]:
+        """Convert a batch of documents to blocks
+
+        Args:
+            documents: (content, content_type) pairs, where content_type is
+                "markdown" or "html"
+
+        Returns:
+            The blocks of each document, in input order
+
+        Raises:
+            ValueError: If a content type is not supported
+        """
+        jobs = []
+        for content, content_type in documents:
+            if content_type not in ("markdown", "html"):
+                raise ValueError(f"Unsupported content type: {content_type}")
+            jobs.append((content_type, content))
+        return self.run_many(jobs)
+
+    def render_many(self, bodies: Iterable[Any]) -> List[str]:
+        """Render a batch of stored post bodies as Markdown
+
+        Args:
+            bodies: Post bodies, as JSON text or decoded
+
+        Returns:
+            The Markdown of each body, in input order
+        """
+        return self.run_many([("render", body) for body in bodies])
+
+    def run_many(self, jobs: List[Tuple[str, Any]]) -> List[Any]:
+        """Run a batch of (kind, payload) jobs and return results in order
+
+        Args:
+            jobs: Jobs whose kind is one of JOB_KINDS
+
+        Returns:
+            One result per job, in input order
+
+        Raises:
+            ValueError: If a job kind is not supported
+        """
+        for kind, _ in jobs:
+            _check_kind(kind)
+        total = sum(_job_size(payload) for _, payload in jobs)
+        pool = None
+        if len(jobs) > 1 and total >= self.serial_threshold:
+            pool = self._get_pool()
+        if pool is None:
+            return _run_chunk(jobs)
+
+        chunks = [
+            jobs[start : start + self.chunk_size]
+            for start in range(0, len(jobs), self.chunk_size)
+        ]
+        try:
+            results: List[Any] = []
+            for chunk_results in pool.map(_run_chunk, chunks):
+                results.extend(chunk_results)
+            return results
+        except (BrokenProcessPool, OSError) as e:
+            self._disable_pool(e)
+            return _run_chunk(jobs)
+
+    async def convert(self, content: str, content_type: str) -> List[Any]:
+        """Convert one document without blocking the event loop
+
+        Args:
+            content: The content to convert
+            content_type: "markdown" or "html"
+
+        Returns:
+            The document's blocks
+
+        Raises:
+            ValueError: If the content type is not supported
+        """
+        if content_type not in ("markdown", "html"):
+            raise ValueError(f"Unsupported content type: {content_type}")
+        return await self.run(content_type, content)
+
+    async def render(self, body: Any) -> str:
+        """Render one stored post body as Markdown without blocking the event loop
+
+        Args:
+            body: The body or draft_body of a post, as JSON text or decoded
+
+        Returns:
+            The Markdown text
+        """
+        return await self.run("render", body)
+
+    async def run(self, kind: str, payload: Any) -> Any:
+        """Run one job in a worker, or in a thread when it is small
+
+        Args:
+            kind: One of JOB_KINDS
+            payload: The job's input
+
+        Returns:
+            The job's result
+
+        Raises:
+            ValueError: If the job kind is not supported
+        """
+        _check_kind(kind)
+        pool = None
+        if _job_size(payload) >= self.serial_threshold:
+            pool = self._get_pool()
+        if pool is not None:
+            loop = asyncio.get_running_loop()
+            try:
+                return await loop.run_in_executor(pool, _run_job, kind, payload)
+            except (BrokenProcessPool, OSError) as e:
+                self._disable_pool(e)
+        return await asyncio.to_thread(_run_job, kind, payload)
+
+    def close(self):
+        """Shut down the worker processes"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+
+    def __enter__(self) -> "ConversionService":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _get_pool(self) -> Optional[ProcessPoolExecutor]:
+        """Return the worker pool, starting it on first use"""
+        if self._pool_failed:
+            return None
+        if self._pool is None:
+            try:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context(START_METHOD),
+                )
+            except (OSError, NotImplementedError) as e:
+                self._disable_pool(e)
+        return self._pool
+
+    def _disable_pool(self, error: Exception):
+        """Fall back to in-process conversion after the pool fails"""
+        logger.warning(
+            f"Conversion workers unavailable, converting in-process: {error}"
+        )
+        self._pool_failed = True
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
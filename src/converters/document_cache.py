@@ -0,0 +1,61 @@
+# ABOUTME: DocumentCache keeps what the last conversion of each edited document produced
+# ABOUTME: Lets MarkdownConverter reconvert only the parts of a document that changed
+
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+# Documents kept by default; each holds its text and blocks, so a few MB
+# for long posts
+MAX_DOCUMENTS = 16
+
+
+class DocumentCache:
+    """The most recently converted state of a bounded number of documents
+
+    Documents are identified by a key that stays the same while one is
+    edited, such as its post ID. When the cache is full the document
+    converted longest ago is dropped. The stored state is opaque to the
+    cache; the converter that stored it reads it back.
+    """
+
+    def __init__(self, max_documents: int = MAX_DOCUMENTS):
+        """Initialize an empty cache
+
+        Args:
+            max_documents: Most documents to keep
+
+        Raises:
+            ValueError: If max_documents is not positive
+        """
+        if max_documents <= 0:
+            raise ValueError("max_documents must be positive")
+        self.max_documents = max_documents
+        self._states: "OrderedDict[Hashable, Any]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def __contains__(self, document_id: Hashable) -> bool:
+        return document_id in self._states
+
+    def get(self, document_id: Hashable) -> Optional[Any]:
+        """Return the state stored for a document, or None"""
+        state = self._states.get(document_id)
+        if state is not None:
+            self._states.move_to_end(document_id)
+        return state
+
+    def put(self, document_id: Hashable, state: Any):
+        """Store the state of a document, dropping the oldest if full"""
+        self._states[document_id] = state
+        self._states.move_to_end(document_id)
+        while len(self._states) > self.max_documents:
+            self._states.popitem(last=False)
+
+    def discard(self, document_id: Hashable):
+        """Forget a document, e.g. once it is deleted"""
+        self._states.pop(document_id, None)
+
+    def clear(self):
+        """Forget every document"""
+        self._states.clear()
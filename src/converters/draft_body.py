@@ -0,0 +1,367 @@
+# ABOUTME: DraftBodySerializer turns converted blocks into Substack's ProseMirror draft_body
+# ABOUTME: Writes the final document JSON in one walk, keeping native lists, quotes and marks
+
+from collections.abc import Mapping
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from src.converters.block_nodes import Text
+from src.utils import json_codec
+
+HEADING_LEVELS = {
+    "heading-one": 1,
+    "heading-two": 2,
+    "heading-three": 3,
+    "heading-four": 4,
+    "heading-five": 5,
+    "heading-six": 6,
+}
+
+# Comment syntax used for the language banner at the top of code blocks
+COMMENT_CHARS = {
+    "python": "#",
+    "python3": "#",
+    "py": "#",
+    "ruby": "#",
+    "rb": "#",
+    "perl": "#",
+    "bash": "#",
+    "sh": "#",
+    "shell": "#",
+    "yaml": "#",
+    "yml": "#",
+    "makefile": "#",
+    "r": "#",
+    "julia": "#",
+    "elixir": "#",
+    "javascript": "//",
+    "js": "//",
+    "typescript": "//",
+    "ts": "//",
+    "java": "//",
+    "c": "//",
+    "cpp": "//",
+    "c++": "//",
+    "csharp": "//",
+    "cs": "//",
+    "go": "//",
+    "golang": "//",
+    "rust": "//",
+    "rs": "//",
+    "swift": "//",
+    "kotlin": "//",
+    "php": "//",
+    "dart": "//",
+    "scala": "//",
+    "groovy": "//",
+    "sql": "--",
+    "postgresql": "--",
+    "mysql": "--",
+    "lua": "--",
+    "haskell": "--",
+    "elm": "--",
+    "html": "<!--",
+    "xml": "<!--",
+    "css": "/*",
+    "scss": "/*",
+    "sass": "//",
+    "less": "//",
+    "lisp": ";",
+    "clojure": ";",
+    "scheme": ";",
+    "asm": ";",
+    "assembly": ";",
+    "vb": "'",
+    "vbnet": "'",
+    "basic": "'",
+    "matlab": "%",
+    "octave": "%",
+    "latex": "%",
+    "tex": "%",
+    "fortran": "!",
+    "f90": "!",
+    "ada": "--",
+    "pascal": "//",
+    "delphi": "//",
+}
+
+# The JSON around the paragraphs of plain text, as json_codec writes it
+PLAIN_BODY_START = (
+    '{"type":"doc","content":[{"type":"paragraph","content":[{"type":"text","text":'
+)
+PLAIN_PARAGRAPH_SEPARATOR = '}]},{"type":"paragraph","content":[{"type":"text","text":'
+PLAIN_BODY_END = "}]}]}"
+EMPTY_BODY = '{"type":"doc","content":[]}'
+
+
+def plain_paragraphs(text: str) -> Iterator[str]:
+    """Yield the paragraphs of plain text: blank-line separated, stripped, non-empty
+
+    The text is scanned rather than split, so only one paragraph is copied
+    out of it at a time.
+    """
+    start = 0
+    while True:
+        end = text.find("\n\n", start)
+        paragraph = (text[start:end] if end != -1 else text[start:]).strip()
+        if paragraph:
+            yield paragraph
+        if end == -1:
+            return
+        start = end + 2
+
+
+class DraftBodySerializer:
+    """Serializes Substack blocks straight to the draft_body document
+
+    Takes the blocks made by the converters (nodes or plain dicts) and
+    builds the ``{"type": "doc", "content": [...]}`` document that the
+    drafts API stores, without going through python-substack's Post
+    builder. Lists stay bullet_list/ordered_list nodes, block quotes keep
+    their nested blocks and headings keep their inline marks.
+    """
+
+    def serialize(self, blocks: Iterable[Mapping]) -> Dict[str, Any]:
+        """Build the draft_body document for a list of blocks
+
+        Args:
+            blocks: Substack blocks from the converters
+
+        Returns:
+            The ProseMirror document as a dict
+        """
+        return {"type": "doc", "content": self._nodes(blocks)}
+
+    def dumps(self, blocks: Iterable[Mapping]) -> str:
+        """Build the draft_body document as the JSON string the API expects
+
+        Args:
+            blocks: Substack blocks from the converters
+
+        Returns:
+            The ProseMirror document as a JSON string
+        """
+        return json_codec.dumps(self.serialize(blocks))
+
+    def dumps_plain_text(self, text: str) -> str:
+        """Write plain text straight to the draft_body JSON string
+
+        Plain text only ever becomes paragraphs of unmarked text, so only
+        the paragraphs themselves go through the codec, to be escaped, and
+        are joined into the document in one step. No blocks are built and
+        no document is walked. The result is the same string ``dumps``
+        gives for the paragraph blocks of ``plain_paragraphs(text)``.
+
+        Args:
+            text: Plain text, paragraphs separated by blank lines
+
+        Returns:
+            The ProseMirror document as a JSON string
+        """
+        dumps = json_codec.dumps
+        paragraphs = [dumps(paragraph) for paragraph in plain_paragraphs(text)]
+        if not paragraphs:
+            return EMPTY_BODY
+        # Open and close the document on the end paragraphs, so the body is
+        # copied once, by the join
+        paragraphs[0] = PLAIN_BODY_START + paragraphs[0]
+        paragraphs[-1] += PLAIN_BODY_END
+        return PLAIN_PARAGRAPH_SEPARATOR.join(paragraphs)
+
+    def comment_char(self, language: str) -> str:
+        """Get the comment syntax for a language, "#" when it is not known
+
+        Args:
+            language: Programming language name
+
+        Returns:
+            Comment character(s) for that language
+        """
+        return COMMENT_CHARS.get(language.lower(), "#")
+
+    def _nodes(self, blocks: Iterable[Mapping]) -> List[Dict[str, Any]]:
+        """Serialize a sequence of blocks, skipping anything that is not a block"""
+        nodes = []
+        for block in blocks:
+            if isinstance(block, Mapping):
+                node = self._node(block)
+                if node is not None:
+                    nodes.append(node)
+        return nodes
+
+    def _node(self, block: Mapping) -> Optional[Dict[str, Any]]:
+        """Serialize one block to its ProseMirror node"""
+        block_type = block.get("type")
+        content = block.get("content")
+
+        if block_type == "paragraph":
+            return self._with_content({"type": "paragraph"}, self._inline(content))
+
+        if block_type in HEADING_LEVELS:
+            node = {"type": "heading", "attrs": {"level": HEADING_LEVELS[block_type]}}
+            return self._with_content(node, self._inline(content))
+
+        if block_type in ("bulleted-list", "ordered-list"):
+            return self._list(block)
+
+        if block_type == "blockquote":
+            return {"type": "blockquote", "content": self._container(content)}
+
+        if block_type == "code":
+            return self._code(content or "", block.get("language", ""))
+
+        if block_type == "captioned-image":
+            return self._image(
+                block.get("src", ""), block.get("alt", ""), block.get("caption", "")
+            )
+
+        if block_type == "hr":
+            return {"type": "horizontal_rule"}
+
+        if block_type == "paywall":
+            return {"type": "paywall"}
+
+        # Anything else is kept as a paragraph of its text
+        text = self._plain_text(content)
+        if not text:
+            return None
+        return {"type": "paragraph", "content": [{"type": "text", "text": text}]}
+
+    def _list(self, block: Mapping) -> Dict[str, Any]:
+        """Serialize a list with one list_item per item"""
+        items = [
+            {"type": "list_item", "content": self._container(item.get("content"))}
+            for item in block.get("content") or []
+            if isinstance(item, Mapping)
+        ]
+        if block.get("type") == "bulleted-list":
+            return {"type": "bullet_list", "content": items}
+
+        node = {"type": "ordered_list", "content": items}
+        start = block.get("start", 1)
+        if start != 1:
+            node["attrs"] = {"start": start}
+        return node
+
+    def _container(self, blocks: Any) -> List[Dict[str, Any]]:
+        """Serialize the blocks of a list item or quote, which cannot be empty"""
+        if isinstance(blocks, str):
+            blocks = [{"type": "paragraph", "content": blocks}]
+        nodes = self._nodes(blocks or [])
+        return nodes or [{"type": "paragraph"}]
+
+    def _code(self, code: str, language: str) -> Dict[str, Any]:
+        """Serialize a code block, with a language banner comment on top"""
+        if language:
+            separator = "=" * 20
+            header = (
+                f"{self.comment_char(language)} {separator} "
+                f"{language.upper()} CODE {separator}"
+            )
+            # Only add header if it's not already present
+            if not code.startswith(header):
+                code = f"{header}\n{code}"
+        return self._with_content(
+            {"type": "code_block"}, [{"type": "text", "text": code}] if code else []
+        )
+
+    def _image(self, src: str, alt: str, caption: str) -> Dict[str, Any]:
+        """Serialize an image with the attributes Substack's editor gives new images"""
+        content = [
+            {
+                "type": "image2",
+                "attrs": {
+                    "src": src,
+                    "fullscreen": False,
+                    "imageSize": "normal",
+                    "height": 819,
+                    "width": 1456,
+                    "resizeWidth": 728,
+                    "bytes": None,
+                    "alt": alt,
+                    "title": None,
+                    "type": None,
+                    "href": None,
+                    "belowTheFold": False,
+                    "internalRedirect": None,
+                },
+            }
+        ]
+        if caption:
+            content.append(
+                {"type": "caption", "content": [{"type": "text", "text": caption}]}
+            )
+        return {"type": "captionedImage", "content": content}
+
+    def _inline(self, content: Any) -> List[Dict[str, Any]]:
+        """Serialize the text runs of a paragraph or heading
+
+        Text runs use "content" in blocks and "text" in ProseMirror; both
+        are read. Empty runs are dropped since ProseMirror rejects empty
+        text nodes, and adjacent runs with the same marks are written as
+        one node, which is what the editor itself saves.
+        """
+        if isinstance(content, str):
+            return [{"type": "text", "text": content}] if content else []
+
+        nodes = []
+        pieces: List[str] = []
+        marks: Any = ()
+        for item in content or []:
+            if isinstance(item, Text):
+                text = item.content
+                item_marks: Any = item.marks
+            elif isinstance(item, Mapping):
+                text = item.get("content") or item.get("text")
+                item_marks = item.get("marks") or ()
+            else:
+                continue
+            if not text:
+                continue
+            if not isinstance(text, str):
+                text = self._plain_text(text)
+                if not text:
+                    continue
+            if pieces and (item_marks is marks or item_marks == marks):
+                pieces.append(text)
+                continue
+            if pieces:
+                nodes.append(self._text(pieces, marks))
+            pieces = [text]
+            marks = item_marks
+        if pieces:
+            nodes.append(self._text(pieces, marks))
+        return nodes
+
+    def _text(self, pieces: List[str], marks: Any) -> Dict[str, Any]:
+        """Serialize one text node from its pieces of text and its marks"""
+        text = pieces[0] if len(pieces) == 1 else "".join(pieces)
+        node = {"type": "text", "text": text}
+        if marks:
+            node["marks"] = [self._mark(mark) for mark in marks]
+        return node
+
+    def _mark(self, mark: Mapping) -> Dict[str, Any]:
+        """Serialize a mark; link targets go in attrs.href"""
+        mark_type = mark.get("type")
+        if mark_type != "link":
+            return {"type": mark_type}
+        href = mark.get("href") or (mark.get("attrs") or {}).get("href")
+        return {"type": "link", "attrs": {"href": href}}
+
+    def _plain_text(self, content: Any) -> str:
+        """Join the text inside any block content, without formatting"""
+        if isinstance(content, str):
+            return content
+        if isinstance(content, Mapping):
+            return content.get("text") or self._plain_text(content.get("content"))
+        if isinstance(content, (list, tuple)):
+            return "".join(self._plain_text(item) for item in content)
+        return ""
+
+    def _with_content(
+        self, node: Dict[str, Any], content: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Attach content to a node, leaving the key out when it is empty"""
+        if content:
+            node["content"] = content
+        return node
@@ -0,0 +1,686 @@
+# ABOUTME: Interchangeable HTML parse backends used by HTMLConverter
+# ABOUTME: Prefers C-accelerated selectolax or lxml and falls back to BeautifulSoup
+
+import re
+from abc import ABC, abstractmethod
+from collections import Counter, deque
+from html.parser import HTMLParser
+from typing import (
+    AbstractSet,
+    Any,
+    Callable,
+    Deque,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Union,
+)
+
+from bs4 import BeautifulSoup, CData, NavigableString, ParserRejectedMarkup
+from bs4.builder import HTMLParserTreeBuilder
+from bs4.element import PreformattedString, Tag
+
+from src.converters.conversion_budget import (
+    MAX_CONTENT_CHARS,
+    BudgetMeter,
+    ConversionLimitError,
+)
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:  # pragma: no cover - depends on the environment
+    LexborHTMLParser = None
+
+try:
+    from lxml import etree
+except ImportError:  # pragma: no cover - depends on the environment
+    etree = None
+
+
+# Elements whose text BeautifulSoup leaves out of an ancestor's get_text()
+RAW_TEXT_TAGS = frozenset(["script", "style", "template"])
+# Outside these, BeautifulSoup collapses strings made only of whitespace
+PRESERVE_WHITESPACE_TAGS = frozenset(["pre", "textarea"])
+SPECIAL_TEXT_TAGS = tuple(RAW_TEXT_TAGS | PRESERVE_WHITESPACE_TAGS)
+SPECIAL_TEXT_SELECTOR = ", ".join(sorted(SPECIAL_TEXT_TAGS))
+# HTML5 parsers drop a newline straight after these start tags, html.parser keeps it
+LEADING_NEWLINE_TAG = re.compile(r"(<(?:pre|textarea|listing)\b[^>]*>)(?=\n)", re.I)
+ASCII_SPACES = " \t\n\x0c\r"
+# Elements whose children a SoupStream hands over only with them: html.parser
+# reads their content as raw text, or bs4 treats the strings in them apart
+KEEP_CHILDREN_TAGS = (
+    RAW_TEXT_TAGS
+    | PRESERVE_WHITESPACE_TAGS
+    | frozenset(
+        ["title", "xmp", "iframe", "noembed", "noframes", "noscript", "plaintext"]
+    )
+)
+# Elements BeautifulSoup's html.parser tree closes as soon as they open
+VOID_TAGS = frozenset(HTMLParserTreeBuilder().empty_element_tags)
+
+
+class ParserLimitError(ConversionLimitError):
+    """Raised when a C parser would drop content at a limit of its own
+
+    BeautifulSoup has no such limits, so HTMLConverter parses the document
+    with it instead.
+    """
+
+
+class HiddenString(str):
+    """Comment or other markup text that get_text() leaves out
+
+    The converter still turns these into text nodes where a child's
+    strings are copied one by one, as it always has with BeautifulSoup.
+    """
+
+
+class HTMLBackend(ABC):
+    """Parses HTML and exposes the few tree operations HTMLConverter uses
+
+    Every backend reproduces what BeautifulSoup's ``html.parser`` builder
+    gives the converter: ``children`` yields text as plain strings,
+    comments as HiddenString and elements as backend nodes, and ``text``
+    matches ``Tag.get_text()``, which skips comments and script/style
+    contents.
+    Backends agree on well-formed HTML; malformed markup (such as an
+    unclosed ``<p>`` or ``<li>``) may be repaired differently by each parser.
+    """
+
+    name = ""
+    available = False
+
+    @abstractmethod
+    def parse(self, html: str, meter: Optional[BudgetMeter] = None) -> Any:
+        """Parse an HTML fragment and return a node holding its top-level nodes
+
+        Args:
+            html: The HTML fragment
+            meter: Budget of the conversion. Only the pure-Python backend
+                checks it while parsing; the C parsers run to completion
+
+        Raises:
+            ConversionLimitError: If the conversion runs out of time
+            ParserLimitError: If the parser would drop content at a limit
+                of its own
+        """
+
+    @abstractmethod
+    def children(
+        self, node: Any, preserve_whitespace: Optional[bool] = None
+    ) -> Iterator[Union[str, Any]]:
+        """Yield the child nodes of an element, text as plain strings
+
+        Args:
+            node: The element
+            preserve_whitespace: Whether the element is or is inside a
+                <pre> or <textarea>, when the caller already knows; saves
+                looking through its ancestors
+        """
+
+    @abstractmethod
+    def preserves_whitespace(self, node: Any) -> bool:
+        """Check whether an element is or is inside a <pre> or <textarea>"""
+
+    @abstractmethod
+    def tag(self, node: Any) -> str:
+        """Return the lowercase tag name of an element"""
+
+    @abstractmethod
+    def get(self, node: Any, name: str, default: str = "") -> str:
+        """Return an attribute value, with multi-valued ones joined by spaces"""
+
+    @abstractmethod
+    def text(self, node: Any) -> str:
+        """Return the text of an element like BeautifulSoup's get_text()"""
+
+    @abstractmethod
+    def find(self, node: Any, name: str) -> Optional[Any]:
+        """Return the first descendant element with the given tag name"""
+
+
+class _MeteredSoup(BeautifulSoup):
+    """BeautifulSoup that counts every parse event against a BudgetMeter
+
+    html.parser searches to the end of the document again for each unclosed
+    comment or tag, and deep runs of unclosed elements make tree building
+    walk a long stack, so malformed markup can take quadratic time. The
+    checks between events stop such a parse when its time runs out.
+    """
+
+    def __init__(self, markup: str, meter: BudgetMeter):
+        # Set before parsing starts in BeautifulSoup.__init__
+        self._budget_meter = meter
+        super().__init__(markup, "html.parser")
+
+    def handle_starttag(self, *args, **kwargs):
+        self._budget_meter.check_time()
+        return super().handle_starttag(*args, **kwargs)
+
+    def handle_endtag(self, *args, **kwargs):
+        self._budget_meter.check_time()
+        return super().handle_endtag(*args, **kwargs)
+
+    def handle_data(self, data: str):
+        self._budget_meter.check_time()
+        return super().handle_data(data)
+
+
+class _OpenTag(NamedTuple):
+    """An element the stream's parser has not seen closed yet"""
+
+    name: str
+    # Offset of the start tag in the fed HTML
+    start: int
+    start_tag: str
+
+
+class _OpenElements(HTMLParser):
+    """Follows which elements are open, nesting them as bs4's html.parser tree
+
+    Keeps only tag names and where each parse event starts in the fed
+    HTML; SoupStream has BeautifulSoup build the nodes. As in BeautifulSoup's
+    tree, void elements never stay open and an end tag closes the latest
+    open element of its name along with everything inside it.
+    """
+
+    def __init__(self, meter: BudgetMeter, on_close: Callable[[int, int], None]):
+        """Start with no open elements
+
+        Args:
+            meter: Budget of the conversion, checked at every parse event
+            on_close: Called with the stack index of the outermost element
+                an end tag closes and the offset of the end tag, before
+                they are removed from ``stack``
+        """
+        super().__init__(convert_charrefs=False)
+        self._meter = meter
+        self._on_close = on_close
+        self.stack: List[_OpenTag] = []
+        self._open_counts: Counter = Counter()
+        # Offset of the text being read, until a tag or comment ends it
+        self.text_start: Optional[int] = None
+        # HTML fed but not dropped yet, starting at offset ``dropped``
+        self.source = ""
+        self.dropped = 0
+        self._closed_void_tags: List[str] = []
+        self._line = 1
+        self._line_start = 0
+
+    def feed(self, data: str):
+        self.source += data
+        try:
+            super().feed(data)
+        except AssertionError as e:
+            # BeautifulSoup rejects the markup the same way
+            raise ParserRejectedMarkup(e) from None
+
+    def position(self) -> int:
+        """Offset in the fed HTML of the current event, or of the unparsed rest"""
+        line, column = self.getpos()
+        while self._line < line:
+            start = max(self._line_start - self.dropped, 0)
+            self._line_start = self.dropped + self.source.index("\n", start) + 1
+            self._line += 1
+        return self._line_start + column
+
+    def drop(self, end: int):
+        """Forget the fed HTML before an offset the parser has got past"""
+        self.position()
+        self.source = self.source[end - self.dropped :]
+        self.dropped = end
+
+    def handle_starttag(self, tag, attrs):
+        self._meter.check_time()
+        self.text_start = None
+        if tag in VOID_TAGS:
+            # A matching end tag later on is ignored
+            self._closed_void_tags.append(tag)
+        else:
+            self.stack.append(_OpenTag(tag, self.position(), self.get_starttag_text()))
+            self._open_counts[tag] += 1
+
+    def handle_startendtag(self, tag, attrs):
+        self._meter.check_time()
+        self.text_start = None
+
+    def handle_endtag(self, tag):
+        self._meter.check_time()
+        if tag in self._closed_void_tags:
+            self._closed_void_tags.remove(tag)
+            return
+        self.text_start = None
+        if not self._open_counts[tag]:
+            return
+        index = len(self.stack) - 1
+        while self.stack[index].name != tag:
+            index -= 1
+        self._on_close(index, self.position())
+        for closed in self.stack[index:]:
+            self._open_counts[closed.name] -= 1
+        del self.stack[index:]
+
+    def handle_data(self, data):
+        self._meter.check_time()
+        if self.text_start is None:
+            self.text_start = self.position()
+
+    handle_charref = handle_entityref = handle_data
+
+    def handle_comment(self, data):
+        self._meter.check_time()
+        self.text_start = None
+
+    handle_decl = handle_pi = unknown_decl = handle_comment
+
+
+class SoupStream:
+    """Builds BeautifulSoup nodes from HTML fed a chunk at a time
+
+    The nodes are the ones SoupBackend.parse gives for the whole document,
+    but each is handed over as soon as it is finished, so only the HTML of
+    the elements still open is kept. An element whose tag is in
+    ``whole_tags`` is handed over once it closes; the finished children of
+    any other open element are handed over without waiting for it, so
+    wrappers such as a ``<div>`` or ``<body>`` around the whole document
+    do not keep it in memory. A wrapper is handed over last, holding only
+    what was left in it.
+
+    An html.parser subclass follows which elements are open. The HTML of
+    each finished stretch is then parsed with BeautifulSoup on its own,
+    which builds the same nodes as in the whole document as long as no
+    open element around it changes how its text is read; the children of
+    ``<pre>``, ``<script>`` and similar elements are therefore only handed
+    over with them.
+    """
+
+    def __init__(self, meter: BudgetMeter, whole_tags: AbstractSet[str]):
+        """Start an empty stream
+
+        Args:
+            meter: Budget of the conversion, checked at every parse event
+            whole_tags: Tags of the elements handed over only as a whole
+        """
+        self.whole_tags = whole_tags
+        self._meter = meter
+        self._parser = _OpenElements(meter, self._closing)
+        # The HTML before this offset has been handed over, apart from the
+        # start tags of open wrappers and ``_carry``: the start tags and
+        # remaining HTML of wrappers closed since
+        self._handed = 0
+        self._carry: Deque[str] = deque()
+
+    def feed(self, html: str) -> List[Any]:
+        """Parse the next chunk of HTML
+
+        Returns:
+            The nodes finished so far, in document order, as the top-level
+            nodes of a parse would be
+        """
+        self._parser.feed(html)
+        return self._finished()
+
+    def close(self) -> List[Any]:
+        """Parse what is left, closing any open elements
+
+        Returns:
+            The remaining nodes, in document order
+        """
+        parser = self._parser
+        html = (
+            "".join(tag.start_tag for tag in parser.stack if tag.start < self._handed)
+            + "".join(self._carry)
+            + parser.source[self._handed - parser.dropped :]
+        )
+        self._parser = _OpenElements(self._meter, self._closing)
+        self._handed = 0
+        self._carry.clear()
+        return self._parse(html)
+
+    def release(self, nodes: List[Any]):
+        """Free nodes handed over by ``feed`` once they are converted
+
+        Trees are full of reference cycles; breaking them frees the nodes
+        now instead of at the next full garbage collection.
+        """
+        for node in nodes:
+            # In document order each node is the first left in its parse
+            if isinstance(node, Tag):
+                node.decompose()
+            else:
+                node.extract()
+
+    def _wrappers(self) -> int:
+        """Count the open elements whose finished children are handed over"""
+        count = 0
+        for tag in self._parser.stack:
+            if tag.name in self.whole_tags or tag.name in KEEP_CHILDREN_TAGS:
+                break
+            count += 1
+        return count
+
+    def _closing(self, index: int, end: int):
+        """Keep what is left of wrappers an end tag closes, if handed over from"""
+        parser = self._parser
+        if parser.stack[index].start >= self._handed:
+            # Their HTML is all still there
+            return
+        # Closing a long run of nested wrappers one at a time would copy
+        # their HTML again for each of them if it were a single string
+        self._carry.extendleft(
+            tag.start_tag
+            for tag in reversed(parser.stack[index:])
+            if tag.start < self._handed
+        )
+        self._carry.append(
+            parser.source[self._handed - parser.dropped : end - parser.dropped]
+        )
+        self._handed = end
+
+    def _finished(self) -> List[Any]:
+        """Parse the finished HTML inside each open wrapper and forget it"""
+        parser = self._parser
+        stack = parser.stack
+        wrappers = self._wrappers()
+        if wrappers < len(stack):
+            end = stack[wrappers].start
+        elif parser.text_start is not None:
+            # More of the text may follow in the next chunk
+            end = parser.text_start
+        else:
+            end = parser.position()
+
+        nodes = []
+        # Wrappers with start tags before _handed hold _carry
+        carry_depth = sum(1 for tag in stack[:wrappers] if tag.start < self._handed)
+        for depth in range(wrappers + 1):
+            start = 0
+            if depth:
+                wrapper = stack[depth - 1]
+                start = wrapper.start + len(wrapper.start_tag)
+            stop = stack[depth].start if depth < wrappers else end
+            start = max(start, self._handed)
+            html = ""
+            if stop > start:
+                html = parser.source[start - parser.dropped : stop - parser.dropped]
+            if depth == carry_depth and self._carry:
+                html = "".join(self._carry) + html
+            if html:
+                nodes.extend(self._parse(html))
+
+        self._handed = end
+        self._carry.clear()
+        parser.drop(end)
+        return nodes
+
+    def _parse(self, html: str) -> List[Any]:
+        """Parse finished HTML into its top-level nodes"""
+        if "<" not in html and "\n" not in html:
+            # bs4 warns about text alone that looks like a URL or a file
+            # name; an empty comment before it leaves the text as it is
+            return list(_MeteredSoup("<!---->" + html, self._meter).contents)[1:]
+        return list(_MeteredSoup(html, self._meter).contents)
+
+
+class SoupBackend(HTMLBackend):
+    """Pure-Python backend using BeautifulSoup with the html.parser builder"""
+
+    name = "bs4"
+    available = True
+
+    def parse(self, html: str, meter: Optional[BudgetMeter] = None) -> Any:
+        if meter is not None:
+            return _MeteredSoup(html, meter)
+        return BeautifulSoup(html, "html.parser")
+
+    def children(
+        self, node: Any, preserve_whitespace: Optional[bool] = None
+    ) -> Iterator[Union[str, Any]]:
+        # html.parser already collapsed whitespace while building the tree
+        for child in node.children:
+            if not isinstance(child, NavigableString):
+                yield child
+            elif isinstance(child, PreformattedString) and not isinstance(child, CData):
+                yield HiddenString(child)
+            else:
+                yield str(child)
+
+    def preserves_whitespace(self, node: Any) -> bool:
+        return node.name in PRESERVE_WHITESPACE_TAGS or any(
+            parent.name in PRESERVE_WHITESPACE_TAGS for parent in node.parents
+        )
+
+    def tag(self, node: Any) -> str:
+        return node.name.lower()
+
+    def get(self, node: Any, name: str, default: str = "") -> str:
+        value = node.get(name, default)
+        if isinstance(value, list):
+            return " ".join(value)
+        return value
+
+    def text(self, node: Any) -> str:
+        return node.get_text()
+
+    def find(self, node: Any, name: str) -> Optional[Any]:
+        return node.find(name)
+
+
+class LxmlBackend(HTMLBackend):
+    """libxml2 backend using lxml's HTML parser"""
+
+    name = "lxml"
+    available = etree is not None
+
+    def __init__(self):
+        """Create the parser, keeping comments and allowing very large text nodes
+
+        Raises:
+            ValueError: If lxml is not installed
+        """
+        if not self.available:
+            raise ValueError("The lxml HTML backend requires the lxml package")
+        self._parser = etree.HTMLParser(remove_comments=False, huge_tree=True)
+
+    def parse(self, html: str, meter: Optional[BudgetMeter] = None) -> Any:
+        # huge_tree turns off libxml2's own size limits, so the input is
+        # capped here even when the conversion budget has no length limit
+        if len(html) > MAX_CONTENT_CHARS:
+            raise ParserLimitError(
+                f"Content is longer than the {MAX_CONTENT_CHARS:,} character "
+                "limit of the lxml backend"
+            )
+        document = etree.fromstring(f"<html><body>{html}</body></html>", self._parser)
+        if any(
+            error.type_name == "ERR_RESOURCE_LIMIT" for error in self._parser.error_log
+        ):
+            # Past 2048 levels of nesting libxml2 drops the rest of the document
+            raise ParserLimitError("Content is nested too deeply for the lxml backend")
+        return document.find("body")
+
+    def children(
+        self, node: Any, preserve_whitespace: Optional[bool] = None
+    ) -> Iterator[Union[str, Any]]:
+        if node is None:
+            return
+        preserve = preserve_whitespace
+        if preserve is None:
+            preserve = self.preserves_whitespace(node)
+        if node.text:
+            yield node.text if preserve else _collapse_whitespace(node.text)
+        for child in node:
+            if child.tag is etree.Comment:
+                text = child.text or ""
+                yield HiddenString(text if preserve else _collapse_whitespace(text))
+            elif isinstance(child.tag, str):
+                yield child
+            if child.tail:
+                yield child.tail if preserve else _collapse_whitespace(child.tail)
+
+    def tag(self, node: Any) -> str:
+        return node.tag.lower()
+
+    def get(self, node: Any, name: str, default: str = "") -> str:
+        return node.get(name, default)
+
+    def text(self, node: Any) -> str:
+        preserve = self.preserves_whitespace(node)
+        if next(node.iterdescendants(*SPECIAL_TEXT_TAGS), None) is not None:
+            return "".join(self._strings(node, preserve))
+        if preserve:
+            return "".join(node.itertext())
+        return "".join(map(_collapse_whitespace, node.itertext()))
+
+    def find(self, node: Any, name: str) -> Optional[Any]:
+        return node.find(f".//{name}")
+
+    def preserves_whitespace(self, node: Any) -> bool:
+        return (
+            node.tag in PRESERVE_WHITESPACE_TAGS
+            or next(node.iterancestors(*PRESERVE_WHITESPACE_TAGS), None) is not None
+        )
+
+    def _strings(self, node: Any, preserve: bool) -> Iterator[str]:
+        """Yield descendant text, skipping comments and raw text elements"""
+        if node.text:
+            yield node.text if preserve else _collapse_whitespace(node.text)
+        for child in node:
+            tag = child.tag
+            if isinstance(tag, str) and tag not in RAW_TEXT_TAGS:
+                yield from self._strings(
+                    child, preserve or tag in PRESERVE_WHITESPACE_TAGS
+                )
+            if child.tail:
+                yield child.tail if preserve else _collapse_whitespace(child.tail)
+
+
+class SelectolaxBackend(HTMLBackend):
+    """Lexbor backend using selectolax's HTML5 fragment parser"""
+
+    name = "selectolax"
+    available = LexborHTMLParser is not None
+
+    def __init__(self):
+        """Check the parser is available
+
+        Raises:
+            ValueError: If selectolax is not installed
+        """
+        if not self.available:
+            raise ValueError(
+                "The selectolax HTML backend requires the selectolax package"
+            )
+
+    def parse(self, html: str, meter: Optional[BudgetMeter] = None) -> Any:
+        html = LEADING_NEWLINE_TAG.sub("\\1\n", html)
+        tree = LexborHTMLParser(html, is_fragment=True)
+        return tree.root.parent if tree.root is not None else None
+
+    def children(
+        self, node: Any, preserve_whitespace: Optional[bool] = None
+    ) -> Iterator[Union[str, Any]]:
+        if node is None:
+            return
+        preserve = preserve_whitespace
+        if preserve is None:
+            preserve = self.preserves_whitespace(node)
+        child = node.first_child
+        while child is not None:
+            if child.is_element_node:
+                yield child
+            else:
+                if child.is_text_node:
+                    text = child.text_content
+                    if text:
+                        yield text if preserve else _collapse_whitespace(text)
+                elif child.is_comment_node:
+                    # comment_content strips the comment, BeautifulSoup does not
+                    text = child.html[4:-3]
+                    yield HiddenString(text if preserve else _collapse_whitespace(text))
+            child = child.next
+
+    def tag(self, node: Any) -> str:
+        return node.tag
+
+    def get(self, node: Any, name: str, default: str = "") -> str:
+        value = node.attributes.get(name, default)
+        return default if value is None else value
+
+    def text(self, node: Any) -> str:
+        preserve = self.preserves_whitespace(node)
+        if node.css_first(SPECIAL_TEXT_SELECTOR) is not None:
+            return "".join(self._strings(node, preserve))
+        if preserve:
+            return node.text()
+        return "".join(
+            [
+                _collapse_whitespace(child.text_content)
+                for child in node.traverse(include_text=True)
+                if child.is_text_node
+            ]
+        )
+
+    def find(self, node: Any, name: str) -> Optional[Any]:
+        return node.css_first(name)
+
+    def preserves_whitespace(self, node: Any) -> bool:
+        while node is not None:
+            if node.tag in PRESERVE_WHITESPACE_TAGS:
+                return True
+            node = node.parent
+        return False
+
+    def _strings(self, node: Any, preserve: bool) -> Iterator[str]:
+        """Yield descendant text, skipping comments and raw text elements"""
+        child = node.first_child
+        while child is not None:
+            if child.is_text_node:
+                text = child.text_content
+                if text:
+                    yield text if preserve else _collapse_whitespace(text)
+            elif child.is_element_node and child.tag not in RAW_TEXT_TAGS:
+                yield from self._strings(
+                    child, preserve or child.tag in PRESERVE_WHITESPACE_TAGS
+                )
+            child = child.next
+
+
+def _collapse_whitespace(text: str) -> str:
+    """Reduce an all-whitespace string to one space or newline, as bs4 does"""
+    if not text or text.strip(ASCII_SPACES):
+        return text
+    return "\n" if "\n" in text else " "
+
+
+# Fastest first; "auto" picks the first one that is installed
+BACKENDS = {
+    backend.name: backend for backend in (SelectolaxBackend, LxmlBackend, SoupBackend)
+}
+
+
+def available_backends() -> List[str]:
+    """Return the names of the installed backends, fastest first"""
+    return [name for name, backend in BACKENDS.items() if backend.available]
+
+
+def get_backend(name: str = "auto") -> HTMLBackend:
+    """Create an HTML parse backend
+
+    Args:
+        name: "selectolax", "lxml", "bs4", or "auto" for the fastest one
+            that is installed
+
+    Returns:
+        An HTMLBackend instance
+
+    Raises:
+        ValueError: If the backend is unknown or its package is not installed
+    """
+    if name == "auto":
+        name = available_backends()[0]
+    if name not in BACKENDS:
+        raise ValueError(
+            f"Unknown HTML backend: {name}. Choose from auto, {', '.join(BACKENDS)}"
+        )
+    return BACKENDS[name]()
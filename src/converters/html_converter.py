@@ -1,19 +1,63 @@
 # ABOUTME: HTMLConverter class for converting HTML to Substack JSON blocks
-# ABOUTME: Uses BeautifulSoup to parse HTML and convert to block format
+# ABOUTME: Parses HTML with the fastest installed backend and converts to block format
 
-from typing import Any, Dict, List, Optional
-
-from bs4 import BeautifulSoup, NavigableString, Tag
+import copy
+from functools import partial
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
 from src.converters.block_builder import BlockBuilder
+from src.converters.block_nodes import Block, Text
+from src.converters.conversion_budget import (
+    BudgetMeter,
+    ConversionBudget,
+    ConversionLimitError,
+)
+from src.converters.html_backends import (
+    PRESERVE_WHITESPACE_TAGS,
+    RAW_TEXT_TAGS,
+    HiddenString,
+    ParserLimitError,
+    SoupBackend,
+    SoupStream,
+    get_backend,
+)
+
+# Formatting elements and the mark each adds to the text inside
+INLINE_MARKS = {"strong": "strong", "b": "strong", "em": "em", "i": "em"}
+CODE_MARKS = ("code",)
+
+# Elements that become a block; any other element just groups its children
+BLOCK_TAGS = frozenset("h1 h2 h3 h4 h5 h6 p ul ol pre blockquote img hr".split())
+
+# Characters handed to the streaming parser at a time. html.parser looks
+# through everything not yet parsed on each feed, so feeding small pieces
+# of an unclosed comment or tag would be quadratic
+STREAM_CHUNK_CHARS = 64 * 1024
 
 
 class HTMLConverter:
     """Converts HTML content to Substack JSON block format"""
 
-    def __init__(self):
-        """Initialize the converter with a BlockBuilder instance"""
+    def __init__(
+        self, backend: str = "auto", budget: Optional[ConversionBudget] = None
+    ):
+        """Initialize the converter with a BlockBuilder instance
+
+        Args:
+            backend: HTML parser to use: "selectolax", "lxml", "bs4", or
+                "auto" for the fastest one installed. All produce the same
+                blocks for well-formed HTML. "bs4" parses a chunk at a
+                time, like ``iter_nodes``, to keep the tree small
+            budget: Size and time limits for each conversion, defaults to
+                ConversionBudget(). The blocks made from HTML are flat, so
+                its nesting limit does not apply
+
+        Raises:
+            ValueError: If the backend is unknown or not installed
+        """
         self.builder = BlockBuilder()
+        self.backend = get_backend(backend)
+        self.budget = budget if budget is not None else ConversionBudget()
 
     def convert(self, html: str) -> List[Dict[str, Any]]:
         """Convert HTML to Substack JSON blocks
@@ -23,51 +67,209 @@ class HTMLConverter:
 
         Returns:
             A list of Substack JSON blocks
+
+        Raises:
+            ConversionLimitError: If the content exceeds the converter's budget
+        """
+        return [block.to_dict() for block in self.convert_nodes(html)]
+
+    def convert_nodes(self, html: str) -> List[Block]:
+        """Convert HTML to immutable block nodes
+
+        Same as ``convert`` without turning the nodes into dicts; the nodes
+        read like the dicts and use a fraction of the memory.
+
+        Args:
+            html: The HTML content to convert
+
+        Returns:
+            A list of block nodes
+
+        Raises:
+            ConversionLimitError: If the content exceeds the converter's budget
         """
         if not html or not html.strip():
             return []
 
-        # Parse HTML with BeautifulSoup
-        soup = BeautifulSoup(html, "html.parser")
+        if self.backend.name == SoupBackend.name:
+            # Streaming gives the same tree a piece at a time, in less memory
+            return list(self.iter_nodes(html))
+
+        meter = self.budget.meter()
+        meter.add(len(html))
+
+        # HTML5 parsers normalize line endings and html.parser does not;
+        # doing it up front makes every backend give the same text
+        html = html.replace("\r\n", "\n").replace("\r", "\n")
+        backend = self.backend
+        try:
+            root = backend.parse(html, meter)
+        except ParserLimitError:
+            return list(self.iter_nodes(html))
+        meter.check_time()
+
+        try:
+            return list(self._walk(backend.children(root), meter))
+        except RecursionError:
+            # Collecting the text of a block recurses in some backends
+            raise ConversionLimitError(
+                "Content is nested too deeply to convert"
+            ) from None
+
+    def iter_blocks(
+        self, source: Union[str, Iterable[str]]
+    ) -> Iterator[Dict[str, Any]]:
+        """Convert HTML to Substack JSON blocks one block at a time
+
+        The HTML is parsed with html.parser as it is read, and each block
+        is yielded as soon as its element closes. Finished elements are
+        dropped from the parse tree straight away, so memory is bounded by
+        the largest block rather than the document, even when a wrapper
+        such as ``<body>`` or ``<div>`` encloses everything. On well-formed
+        HTML the blocks are the same as ``convert`` gives with any backend;
+        html.parser may repair malformed markup differently depending on
+        where the chunks split it.
+
+        The converter's budget applies to the whole source. Time spent by
+        the caller between blocks does not count against its time limit.
 
-        blocks = []
+        Args:
+            source: HTML text, a text file object or any iterable of chunks
+                of HTML, split anywhere
 
-        # Process all top-level elements
-        for element in soup.children:
-            if isinstance(element, NavigableString):
-                # Handle text nodes at the root level
-                text = str(element).strip()
-                if text:
-                    blocks.append(self.builder.paragraph(text))
-            else:
-                # Process HTML elements
-                block = self._process_element(element)
-                if block:
-                    if isinstance(block, list):
-                        blocks.extend(block)
-                    else:
-                        blocks.append(block)
+        Yields:
+            Substack JSON blocks
 
-        return blocks
+        Raises:
+            ConversionLimitError: If the content exceeds the converter's budget
+        """
+        for block in self.iter_nodes(source):
+            yield block.to_dict()
 
-    def _process_element(self, element: Tag) -> Optional[Any]:
-        """Process a single HTML element
+    def iter_nodes(self, source: Union[str, Iterable[str]]) -> Iterator[Block]:
+        """Convert HTML to block nodes one block at a time
+
+        Same as ``iter_blocks`` without turning the nodes into dicts.
 
         Args:
-            element: BeautifulSoup Tag element
+            source: HTML text, a text file object or any iterable of chunks
 
-        Returns:
-            A block dict, list of blocks, or None
+        Yields:
+            Immutable block nodes
+
+        Raises:
+            ConversionLimitError: If the content exceeds the converter's budget
         """
-        if not element.name:
-            return None
+        meter = self.budget.meter()
+        stream = SoupStream(meter, BLOCK_TAGS)
+        walker = self
+        if self.backend.name != SoupBackend.name:
+            # The stream builds BeautifulSoup nodes
+            walker = copy.copy(self)
+            walker.backend = SoupBackend()
+
+        try:
+            for chunk in self._iter_chunks(source, meter):
+                nodes = stream.feed(chunk)
+                yield from self._metered(walker._walk(nodes, meter), meter)
+                stream.release(nodes)
+            nodes = stream.close()
+            yield from self._metered(walker._walk(nodes, meter), meter)
+        except RecursionError:
+            raise ConversionLimitError(
+                "Content is nested too deeply to convert"
+            ) from None
+
+    def _walk(self, nodes: Iterable[Any], meter: BudgetMeter) -> Iterator[Block]:
+        """Convert top-level nodes to blocks
+
+        Text and block elements become blocks wherever they are; other
+        elements are walked into with an explicit stack, so deeply nested
+        markup cannot hit the recursion limit.
+        """
+        backend = self.backend
+        stack = [iter(nodes)]
+        while stack:
+            for child in stack[-1]:
+                meter.tick()
+                if isinstance(child, str):
+                    text = child.strip()
+                    if text:
+                        yield self.builder.paragraph(text)
+                elif backend.tag(child) in BLOCK_TAGS:
+                    block = self._process_element(child)
+                    if block:
+                        yield block
+                else:
+                    stack.append(backend.children(child))
+                    break
+            else:
+                stack.pop()
+
+    def _metered(self, blocks: Iterator[Block], meter: BudgetMeter) -> Iterator[Block]:
+        """Yield blocks, stopping the clock while the caller has each"""
+        for block in blocks:
+            meter.pause()
+            yield block
+            meter.resume()
+
+    def _iter_chunks(
+        self, source: Union[str, Iterable[str]], meter: BudgetMeter
+    ) -> Iterator[str]:
+        """Yield the source in chunks of at least STREAM_CHUNK_CHARS
+
+        Line endings are normalized as in ``convert_nodes``; a carriage
+        return at the end of a chunk is held back in case a newline follows.
+        """
+        if isinstance(source, str):
+            meter.check_length(len(source))
+            pieces: Iterable[str] = (
+                source[start : start + STREAM_CHUNK_CHARS]
+                for start in range(0, len(source), STREAM_CHUNK_CHARS)
+            )
+        elif hasattr(source, "read"):
+            pieces = iter(partial(source.read, STREAM_CHUNK_CHARS), "")
+        else:
+            pieces = source
+
+        counted = isinstance(source, str)
+        buffered: List[str] = []
+        size = 0
+        for piece in pieces:
+            if counted:
+                meter.check_time()
+            else:
+                meter.add(len(piece))
+            buffered.append(piece)
+            size += len(piece)
+            if size >= STREAM_CHUNK_CHARS:
+                chunk = "".join(buffered)
+                held = chunk.endswith("\r")
+                if held:
+                    chunk = chunk[:-1]
+                buffered = ["\r"] if held else []
+                size = len(buffered)
+                yield chunk.replace("\r\n", "\n").replace("\r", "\n")
+        chunk = "".join(buffered)
+        if chunk:
+            yield chunk.replace("\r\n", "\n").replace("\r", "\n")
+
+    def _process_element(self, element: Any) -> Optional[Block]:
+        """Convert an element whose tag is one of BLOCK_TAGS
 
-        tag_name = element.name.lower()
+        Args:
+            element: Element node from the parse backend
+
+        Returns:
+            A block, or None if the element is empty
+        """
+        backend = self.backend
+        tag_name = backend.tag(element)
 
         # Headers
         if tag_name in ["h1", "h2", "h3", "h4", "h5", "h6"]:
             level = int(tag_name[1])
-            text = element.get_text().strip()
+            text = backend.text(element).strip()
             return self.builder.header(text, level)
 
         # Paragraphs
@@ -79,46 +281,45 @@ class HTMLConverter:
         # Lists
         elif tag_name == "ul":
             items = []
-            for li in element.find_all("li", recursive=False):
-                items.append(li.get_text().strip())
+            for li in self._list_items(element):
+                items.append(backend.text(li).strip())
             if items:
                 return self.builder.unordered_list(items)
 
         elif tag_name == "ol":
             items = []
-            for li in element.find_all("li", recursive=False):
-                items.append(li.get_text().strip())
+            for li in self._list_items(element):
+                items.append(backend.text(li).strip())
             if items:
                 return self.builder.ordered_list(items)
 
         # Code blocks
         elif tag_name == "pre":
-            code_tag = element.find("code")
-            if code_tag:
+            code_tag = backend.find(element, "code")
+            if code_tag is not None:
                 # Extract language from class if present
                 language = ""
-                if "class" in code_tag.attrs:
-                    for cls in code_tag["class"]:
-                        if cls.startswith("language-"):
-                            language = cls[9:]  # Remove 'language-' prefix
-                            break
+                for cls in backend.get(code_tag, "class").split():
+                    if cls.startswith("language-"):
+                        language = cls[9:]  # Remove 'language-' prefix
+                        break
 
-                code = code_tag.get_text()
+                code = backend.text(code_tag)
                 return self.builder.code_block(code, language)
             else:
                 # Pre without code tag
-                return self.builder.code_block(element.get_text())
+                return self.builder.code_block(backend.text(element))
 
         # Blockquotes
         elif tag_name == "blockquote":
-            text = element.get_text().strip()
+            text = backend.text(element).strip()
             return self.builder.blockquote(text)
 
         # Images
         elif tag_name == "img":
-            src = element.get("src", "")
-            alt = element.get("alt", "")
-            caption = element.get("title", "")
+            src = backend.get(element, "src")
+            alt = backend.get(element, "alt")
+            caption = backend.get(element, "title")
             if src:
                 return self.builder.image(src, alt, caption)
 
@@ -126,28 +327,24 @@ class HTMLConverter:
         elif tag_name == "hr":
             return self.builder.horizontal_rule()
 
-        # For other elements, process their children
-        else:
-            child_blocks = []
-            for child in element.children:
-                if isinstance(child, NavigableString):
-                    text = str(child).strip()
-                    if text:
-                        child_blocks.append(self.builder.paragraph(text))
-                else:
-                    child_block = self._process_element(child)
-                    if child_block:
-                        if isinstance(child_block, list):
-                            child_blocks.extend(child_block)
-                        else:
-                            child_blocks.append(child_block)
-            return child_blocks if child_blocks else None
-
         return None
 
-    def _parse_inline_content(self, element: Tag) -> List[Dict[str, Any]]:
+    def _list_items(self, element: Any) -> List[Any]:
+        """Return the <li> children of a list element"""
+        backend = self.backend
+        return [
+            child
+            for child in backend.children(element)
+            if not isinstance(child, str) and backend.tag(child) == "li"
+        ]
+
+    def _parse_inline_content(self, element: Any) -> List[Text]:
         """Parse inline content with formatting
 
+        Each inline child is walked once, collecting its strings with the
+        marks of the formatting elements around them and, alongside, the
+        text get_text() would return for it.
+
         Args:
             element: The element to parse
 
@@ -155,89 +352,97 @@ class HTMLConverter:
             List of text content with formatting marks
         """
         content = []
-
-        for child in element.children:
-            if isinstance(child, NavigableString):
-                text = str(child)
-                if text:
-                    content.append({"type": "text", "content": text})
+        backend = self.backend
+        builder = self.builder
+        preserve = backend.preserves_whitespace(element)
+
+        for child in backend.children(element, preserve):
+            if isinstance(child, str):
+                if child:
+                    content.append(Text(str(child)))
+                continue
+
+            tag_name = backend.tag(child)
+            runs, text = self._inline_runs(
+                child, tag_name, preserve or tag_name in PRESERVE_WHITESPACE_TAGS
+            )
+
+            if not text:
+                continue
+
+            if tag_name == "code":
+                content.append(builder.text(text, CODE_MARKS))
+            elif tag_name == "a":
+                href = backend.get(child, "href")
+                if href:
+                    content.append(builder.link(text, href))
+                else:
+                    content.append(Text(text))
             else:
-                # Handle inline formatting tags
-                tag_name = child.name.lower() if child.name else ""
-                text = child.get_text()
+                # Formatting inside keeps its marks; links and code inside
+                # become plain (marked) text
+                for run, marks in runs:
+                    content.append(builder.text(run, marks))
 
-                if not text:
-                    continue
-
-                if tag_name in ["strong", "b"]:
-                    # Check for nested formatting
-                    nested_content = self._get_nested_marks(child)
-                    if nested_content:
-                        content.extend(nested_content)
-                    else:
-                        content.append(self.builder.text(text, ["strong"]))
-                elif tag_name in ["em", "i"]:
-                    # Check for nested formatting
-                    nested_content = self._get_nested_marks(child)
-                    if nested_content:
-                        content.extend(nested_content)
-                    else:
-                        content.append(self.builder.text(text, ["em"]))
-                elif tag_name == "code":
-                    content.append(self.builder.text(text, ["code"]))
-                elif tag_name == "a":
-                    href = child.get("href", "")
-                    if href:
-                        content.append(self.builder.link(text, href))
-                    else:
-                        content.append({"type": "text", "content": text})
-                else:
-                    # Handle nested formatting more carefully
-                    nested_content = self._get_nested_marks(child)
-                    if nested_content:
-                        content.extend(nested_content)
-                    else:
-                        content.append({"type": "text", "content": text})
+        return content if content else [Text("")]
 
-        return content if content else [{"type": "text", "content": ""}]
+    def _inline_runs(
+        self, element: Any, tag_name: str, preserve: bool
+    ) -> Tuple[List[Tuple[str, Tuple[str, ...]]], str]:
+        """Collect the strings under an inline element in a single walk
 
-    def _get_nested_marks(
-        self, element: Tag, marks: List[str] = None
-    ) -> List[Dict[str, Any]]:
-        """Get content with nested formatting marks
+        The walk keeps its own stack, so deeply nested markup cannot hit
+        the recursion limit. Each level carries an immutable tuple of the
+        marks from the formatting elements around it.
 
         Args:
-            element: The element to process
-            marks: Accumulated marks from parent elements
+            element: The element to walk
+            tag_name: Its tag name
+            preserve: Whether the element is or is inside a <pre> or <textarea>
 
         Returns:
-            List of text content with appropriate marks
+            (text, marks) for every string, comments included, and the
+            text get_text() returns for the element
         """
-        if marks is None:
-            marks = []
-
-        # Add this element's mark if applicable
-        tag_name = element.name.lower() if element.name else ""
-        current_marks = marks.copy()
-
-        if tag_name in ["strong", "b"] and "strong" not in current_marks:
-            current_marks.append("strong")
-        elif tag_name in ["em", "i"] and "em" not in current_marks:
-            current_marks.append("em")
-
-        content = []
+        backend = self.backend
+        runs = []
+        visible = []
+
+        mark = INLINE_MARKS.get(tag_name)
+        marks = (mark,) if mark is not None else ()
+        # Each level: children iterator, marks, inside script/style, preserve
+        stack = [(backend.children(element, preserve), marks, False, preserve)]
+
+        while stack:
+            children, marks, hidden, preserve = stack[-1]
+            for child in children:
+                if isinstance(child, str):
+                    if not child:
+                        continue
+                    if isinstance(child, HiddenString):
+                        runs.append((str(child), marks))
+                    else:
+                        runs.append((child, marks))
+                        if not hidden:
+                            visible.append(child)
+                    continue
 
-        # Process children
-        for child in element.children:
-            if isinstance(child, NavigableString):
-                text = str(child)
-                if text and current_marks:
-                    content.append(self.builder.text(text, current_marks))
-                elif text:
-                    content.append({"type": "text", "content": text})
+                child_tag = backend.tag(child)
+                child_marks = marks
+                mark = INLINE_MARKS.get(child_tag)
+                if mark is not None and mark not in marks:
+                    child_marks = marks + (mark,)
+                child_preserve = preserve or child_tag in PRESERVE_WHITESPACE_TAGS
+                stack.append(
+                    (
+                        backend.children(child, child_preserve),
+                        child_marks,
+                        hidden or child_tag in RAW_TEXT_TAGS,
+                        child_preserve,
+                    )
+                )
+                break
             else:
-                # Recurse for nested elements
-                nested = self._get_nested_marks(child, current_marks)
-                content.extend(nested)
+                stack.pop()
 
-        return content
+        return runs, "".join(visible)
@@ -1,319 +1,1168 @@
 # ABOUTME: MarkdownConverter class for converting Markdown text to Substack JSON blocks
-# ABOUTME: Uses regex parsing to handle all markdown elements and formatting
+# ABOUTME: Parses CommonMark block structure line by line, then inline formatting
 
+import io
 import re
-from typing import Any, Dict, List, Optional, Tuple
+from bisect import bisect_left
+from typing import Any, Dict, Hashable, Iterable, Iterator, List, Optional, Tuple, Union
 
 from src.converters.block_builder import BlockBuilder
+from src.converters.block_nodes import Block, Text
+from src.converters.conversion_budget import BudgetMeter, ConversionBudget
+from src.converters.document_cache import DocumentCache
+
+# Block kinds in the tree built by _BlockParser
+DOCUMENT = "document"
+BLOCK_QUOTE = "block_quote"
+LIST = "list"
+ITEM = "item"
+PARAGRAPH = "paragraph"
+HEADING = "heading"
+THEMATIC_BREAK = "thematic_break"
+CODE_BLOCK = "code_block"
+PAYWALL = "paywall"
+
+# Container blocks hold other blocks; lists hold only items
+CONTAINER_KINDS = (DOCUMENT, BLOCK_QUOTE, ITEM)
+# Each of these is one level of nesting for the budget's max_depth
+NESTING_KINDS = (BLOCK_QUOTE, LIST)
+
+# Characters of text read between checks of the time budget
+LINE_BATCH_CHARS = 8192
+
+# Segments starting with the same line tried when reconverting an edited
+# document; code blocks in one language, for one, all start alike
+SEGMENT_CANDIDATES = 4
+
+CODE_INDENT = 4
+TAB_STOP = 4
+
+NONSPACE = re.compile(r"[^ \t]")
+
+ATX_HEADING_MARKER = re.compile(r"#{1,6}(?:[ \t]+|$)")
+ATX_CLOSING_SEQUENCE = re.compile(r"(?:^|[ \t]+)#+[ \t]*$")
+CODE_FENCE = re.compile(r"`{3,}(?!.*`)|~{3,}")
+CLOSING_CODE_FENCE = re.compile(r"(?:`{3,}|~{3,})(?=[ \t]*$)")
+SETEXT_HEADING_LINE = re.compile(r"(?:=+|-+)[ \t]*$")
+THEMATIC_BREAK_LINE = re.compile(r"(?:\*[ \t]*){3,}$|(?:_[ \t]*){3,}$|(?:-[ \t]*){3,}$")
+BULLET_LIST_MARKER = re.compile(r"[*+-]")
+ORDERED_LIST_MARKER = re.compile(r"(\d{1,9})([.)])")
+# A paywall marker, e.g. <!-- PAYWALL --> or <!--paywall-->, anywhere in a
+# line or on a line of its own
+PAYWALL_MARKER = re.compile(r"<!--[ \t]*(?:PAYWALL|paywall)[ \t]*-->")
+PAYWALL_LINE = re.compile(PAYWALL_MARKER.pattern + r"[ \t]*$")
+IMAGE_PATTERN = re.compile(r'^!\[([^\]]*)\]\(([^\s]+)(?:\s+"([^"]+)")?\)$')
+
+# Characters that can open an inline span, and any inline syntax at all
+INLINE_START = re.compile(r"[*\[`]")
+INLINE_SYNTAX = re.compile(r"[*\[`\\]")
+# Marks for *em*, **strong** and ***both***, and for `code`
+STAR_MARKS = {1: ("em",), 2: ("strong",), 3: ("strong", "em")}
+CODE_MARKS = ("code",)
+
+
+def _can_contain(parent_kind: str, kind: str) -> bool:
+    """Check a block of one kind can be a child of the other"""
+    if parent_kind == LIST:
+        return kind == ITEM
+    return parent_kind in CONTAINER_KINDS and kind != ITEM
+
+
+class _ListData:
+    """The marker of a list item, shared by the list it starts"""
+
+    __slots__ = ("ordered", "marker", "start", "marker_offset", "padding")
+
+    def __init__(
+        self, ordered: bool, marker: str, start: int, marker_offset: int, padding: int
+    ):
+        self.ordered = ordered
+        # The bullet character, or the delimiter ("." or ")") of ordered items
+        self.marker = marker
+        self.start = start
+        # Columns before the marker, and from the marker to the item content
+        self.marker_offset = marker_offset
+        self.padding = padding
+
+    def matches(self, other: "_ListData") -> bool:
+        """Check an item with this marker continues a list started by ``other``"""
+        return self.ordered == other.ordered and self.marker == other.marker
+
+
+class _Node:
+    """A block in the tree built by _BlockParser"""
+
+    __slots__ = ("kind", "parent", "children", "is_open", "lines", "data", "depth")
+
+    def __init__(self, kind: str, parent: Optional["_Node"]):
+        self.kind = kind
+        self.parent = parent
+        # Block quotes and lists around and including this block
+        self.depth = 0
+        if parent is not None:
+            self.depth = parent.depth + (kind in NESTING_KINDS)
+        self.children: List["_Node"] = []
+        self.is_open = True
+        # Text lines of leaf blocks
+        self.lines: List[str] = []
+        # _ListData for lists and items, the heading level, or for code
+        # blocks the (fence character, fence length, fence indent) of a
+        # fenced block and None for an indented one
+        self.data: Any = None
+
+
+class _BlockParser:
+    """Builds the CommonMark block structure of a document one line at a time
+
+    Follows the parsing strategy described in the CommonMark spec. Each
+    line is first matched against the open container blocks (block
+    quotes, lists and list items), consuming their markers and
+    indentation; then checked for the start of new blocks; and what is
+    left is added to the innermost open block, or to an open paragraph as
+    a lazy continuation line. Work per line is proportional to its length
+    plus the nesting depth, so parsing is linear in the size of the input.
+
+    Top-level blocks are appended to ``finished`` as soon as they close,
+    so callers can convert and release them while parsing continues.
+    Opening a block quote or list deeper than the meter's budget allows
+    raises ConversionLimitError.
+    """
+
+    def __init__(self, meter: Optional[BudgetMeter] = None):
+        self.meter = meter
+        self.document = _Node(DOCUMENT, None)
+        self.tip = self.document
+        self.finished: List[_Node] = []
+
+        # The block starts worth trying for each first character, in the
+        # order the spec gives them precedence
+        dash_starts = (
+            self._start_setext_heading,
+            self._start_thematic_break,
+            self._start_list_item,
+        )
+        list_starts = (self._start_list_item,)
+        self._starts_by_char = {
+            ">": (self._start_block_quote,),
+            "#": (self._start_atx_heading,),
+            "`": (self._start_fenced_code,),
+            "~": (self._start_fenced_code,),
+            "=": (self._start_setext_heading,),
+            "-": dash_starts,
+            "*": dash_starts[1:],
+            "_": (self._start_thematic_break,),
+            "+": list_starts,
+            "<": (self._start_paywall,),
+        }
+        self._starts_by_char.update((digit, list_starts) for digit in "0123456789")
+        # Four or more columns in, only indented code can start
+        self._indented_starts = (self._start_indented_code,)
+
+        # State of the line being parsed
+        self.line = ""
+        self.has_tab = False
+        self.first_nonspace = 0
+        self.offset = 0
+        self.column = 0
+        self.next_nonspace = 0
+        self.next_nonspace_column = 0
+        self.indent = 0
+        self.indented = False
+        self.blank = False
+        self.partially_consumed_tab = False
+        self.all_closed = True
+        self.old_tip = self.document
+        self.last_matched_container = self.document
+
+    def feed(self, line: str):
+        """Incorporate one line (without its newline) into the tree"""
+        if line.endswith("\r"):
+            line = line[:-1]
+        match = NONSPACE.search(line)
+        first_nonspace = match.start() if match else len(line)
+        has_tab = "\t" in line
+        if "<!--" in line and self._split_at_paywall(line, first_nonspace):
+            return
+
+        # Fast paths for the lines that make up most of a typical document:
+        # blank lines between blocks, plain paragraph lines and code lines.
+        # A line whose first character cannot start any block only ever
+        # continues an open paragraph, whatever containers it is in
+        tip = self.tip
+        document = self.document
+        if first_nonspace == len(line):
+            if tip is document:
+                return
+        elif not has_tab:
+            plain = line[first_nonspace] not in self._starts_by_char
+            if tip is document:
+                if plain and first_nonspace < CODE_INDENT:
+                    self._add_child(PARAGRAPH).lines.append(line[first_nonspace:])
+                    return
+            elif tip.kind == PARAGRAPH:
+                if plain or (tip.parent is document and first_nonspace >= CODE_INDENT):
+                    tip.lines.append(line[first_nonspace:])
+                    return
+            elif (
+                tip.kind == CODE_BLOCK
+                and tip.parent is document
+                and tip.data is not None
+                and (
+                    first_nonspace >= CODE_INDENT
+                    or not line.startswith(tip.data[0], first_nonspace)
+                )
+            ):
+                # Not a closing fence; drop up to the opening fence's indentation
+                tip.lines.append(line[min(first_nonspace, tip.data[2]) :])
+                return
+
+        self.line = line
+        self.has_tab = has_tab
+        self.first_nonspace = first_nonspace
+        self.offset = 0
+        self.column = 0
+        self.blank = False
+        self.partially_consumed_tab = False
+        self.old_tip = self.tip
+
+        # Match the line against the open containers, innermost last
+        container = self.document
+        while container.children and container.children[-1].is_open:
+            child = container.children[-1]
+            if child.kind == LIST:
+                # Lists continue as long as their items are not all closed
+                container = child
+                continue
+            self._find_next_nonspace()
+            result = self._continue(child)
+            if result == 1:
+                break
+            if result == 2:
+                # The line closed a code fence and is fully consumed
+                return
+            container = child
+
+        self.all_closed = container is self.old_tip
+        self.last_matched_container = container
+
+        # Look for new block starts
+        matched_leaf = container.kind == CODE_BLOCK
+        while not matched_leaf:
+            self._find_next_nonspace()
+            if self.indented:
+                starts = self._indented_starts
+            elif self.blank:
+                starts = None
+            else:
+                starts = self._starts_by_char.get(line[self.next_nonspace])
+            if starts is None:
+                self._advance_next_nonspace()
+                break
+
+            for start in starts:
+                result = start(container)
+                if result:
+                    container = self.tip
+                    matched_leaf = result == 2
+                    break
+            else:
+                self._advance_next_nonspace()
+                break
+
+        # Add what is left of the line
+        if not self.all_closed and not self.blank and self.tip.kind == PARAGRAPH:
+            # Lazy continuation of a paragraph whose containers did not match
+            self._add_line()
+        else:
+            self._close_unmatched_blocks()
+            if container.kind in (PARAGRAPH, CODE_BLOCK):
+                self._add_line()
+            elif self.offset < len(line) and not self.blank:
+                self._add_child(PARAGRAPH)
+                self._advance_next_nonspace()
+                self._add_line()
+
+    def _split_at_paywall(self, line: str, first_nonspace: int) -> bool:
+        """Feed a paragraph line with a paywall marker inside it as separate lines
+
+        The text before the marker, the marker and the text after it are
+        fed one after the other, so the marker splits the paragraph as if it
+        were on a line of its own. Only lines that start or continue a
+        top-level paragraph are split, as a paywall sits between top-level
+        blocks; markers in code, quotes, lists and headings stay text.
+
+        Returns:
+            Whether the line was split and fed
+        """
+        marker = PAYWALL_MARKER.search(line, first_nonspace)
+        if marker is None or PAYWALL_LINE.match(line, first_nonspace):
+            return False
+        tip = self.tip
+        if tip is self.document:
+            if first_nonspace >= CODE_INDENT:
+                return False
+        elif tip.kind != PARAGRAPH or tip.parent is not self.document:
+            return False
+        first = line[first_nonspace]
+        if first != "<" and (first in self._starts_by_char or "\t" in line):
+            return False
+
+        before = line[: marker.start()]
+        after = line[marker.end() :]
+        if before.strip():
+            self.feed(before)
+        self.feed(marker.group())
+        if after.strip():
+            self.feed(after.lstrip(" \t"))
+        return True
+
+    def close(self):
+        """Close every open block at the end of the input"""
+        while self.tip is not None:
+            self._finalize(self.tip)
+
+    def _continue(self, container: _Node) -> int:
+        """Try to continue an open block with the current line
+
+        Returns:
+            0 if the block continues, 1 if it does not, and 2 if the line
+            closed the block and nothing else is left to do with it
+        """
+        kind = container.kind
+
+        if kind == BLOCK_QUOTE:
+            if self.indented or not self.line.startswith(">", self.next_nonspace):
+                return 1
+            self._advance_next_nonspace()
+            self._advance_offset(1, False)
+            if self._is_space_or_tab(self.offset):
+                self._advance_offset(1, True)
+            return 0
+
+        if kind == ITEM:
+            data = container.data
+            if self.blank:
+                # An item can begin with at most one blank line
+                if not container.children:
+                    return 1
+                self._advance_next_nonspace()
+            elif self.indent >= data.marker_offset + data.padding:
+                self._advance_offset(data.marker_offset + data.padding, True)
+            else:
+                return 1
+            return 0
+
+        if kind == PARAGRAPH:
+            return 1 if self.blank else 0
+
+        if kind == CODE_BLOCK:
+            fence = container.data
+            if fence is None:
+                if self.indent >= CODE_INDENT:
+                    self._advance_offset(CODE_INDENT, True)
+                elif self.blank:
+                    self._advance_next_nonspace()
+                else:
+                    return 1
+                return 0
+
+            fence_char, fence_length, fence_offset = fence
+            if self.indent <= 3 and self.line.startswith(
+                fence_char, self.next_nonspace
+            ):
+                match = CLOSING_CODE_FENCE.match(self.line, self.next_nonspace)
+                if match and match.end() - match.start() >= fence_length:
+                    self._finalize(container)
+                    return 2
+            # Skip up to the fence's own indentation
+            for _ in range(fence_offset):
+                if not self._is_space_or_tab(self.offset):
+                    break
+                self._advance_offset(1, True)
+            return 0
+
+        # Headings and thematic breaks are a single line
+        return 1
+
+    def _start_block_quote(self, container: _Node) -> int:
+        """Start a block quote at a ``>`` marker"""
+        if self.indented or not self.line.startswith(">", self.next_nonspace):
+            return 0
+        self._advance_next_nonspace()
+        self._advance_offset(1, False)
+        if self._is_space_or_tab(self.offset):
+            self._advance_offset(1, True)
+        self._close_unmatched_blocks()
+        self._add_child(BLOCK_QUOTE)
+        return 1
+
+    def _start_atx_heading(self, container: _Node) -> int:
+        """Start a ``#`` heading"""
+        if self.indented:
+            return 0
+        match = ATX_HEADING_MARKER.match(self.line, self.next_nonspace)
+        if not match:
+            return 0
+        self._advance_next_nonspace()
+        self._advance_offset(match.end() - match.start(), False)
+        self._close_unmatched_blocks()
+        heading = self._add_child(HEADING)
+        heading.data = match.group().strip(" \t").count("#")
+        heading.lines.append(
+            ATX_CLOSING_SEQUENCE.sub("", self.line[self.offset :]).strip(" \t")
+        )
+        self._advance_offset(len(self.line) - self.offset, False)
+        # Headings are a single line, so they can be finished right away
+        self._finalize(heading)
+        return 2
+
+    def _start_fenced_code(self, container: _Node) -> int:
+        """Start a code block at a ``` or ~~~ fence"""
+        if self.indented:
+            return 0
+        match = CODE_FENCE.match(self.line, self.next_nonspace)
+        if not match:
+            return 0
+        fence_length = match.end() - match.start()
+        self._close_unmatched_blocks()
+        code = self._add_child(CODE_BLOCK)
+        code.data = (match.group()[0], fence_length, self.indent)
+        self._advance_next_nonspace()
+        self._advance_offset(fence_length, False)
+        return 2
+
+    def _start_setext_heading(self, container: _Node) -> int:
+        """Turn a paragraph underlined with ``=`` or ``-`` into a heading"""
+        if self.indented or container.kind != PARAGRAPH:
+            return 0
+        match = SETEXT_HEADING_LINE.match(self.line, self.next_nonspace)
+        if not match:
+            return 0
+        self._close_unmatched_blocks()
+        heading = _Node(HEADING, container.parent)
+        heading.data = 1 if match.group()[0] == "=" else 2
+        heading.lines = container.lines
+        container.parent.children[-1] = heading
+        self.tip = heading
+        self._advance_offset(len(self.line) - self.offset, False)
+        self._finalize(heading)
+        return 2
+
+    def _start_thematic_break(self, container: _Node) -> int:
+        """Start a thematic break (horizontal rule)"""
+        if self.indented or not THEMATIC_BREAK_LINE.match(
+            self.line, self.next_nonspace
+        ):
+            return 0
+        self._close_unmatched_blocks()
+        self._finalize(self._add_child(THEMATIC_BREAK))
+        self._advance_offset(len(self.line) - self.offset, False)
+        return 2
+
+    def _start_paywall(self, container: _Node) -> int:
+        """Start a paywall at a marker line outside any container
+
+        Markers inside quotes and list items end them, as the paywall can
+        only sit between top-level blocks.
+        """
+        if self.indented or not PAYWALL_LINE.match(self.line, self.next_nonspace):
+            return 0
+        # Only the document, or a top-level paragraph or list the line would
+        # otherwise lazily continue, can be interrupted by a paywall
+        if container is not self.document and container.parent is not self.document:
+            return 0
+        if container.kind not in (DOCUMENT, PARAGRAPH, LIST):
+            return 0
+        self._close_unmatched_blocks()
+        self._finalize(self._add_child(PAYWALL))
+        self._advance_offset(len(self.line) - self.offset, False)
+        return 2
+
+    def _start_list_item(self, container: _Node) -> int:
+        """Start a list item, and a list if it does not continue the open one"""
+        data = self._parse_list_marker(container)
+        if data is None:
+            return 0
+        self._close_unmatched_blocks()
+        if self.tip.kind != LIST or not data.matches(self.tip.data):
+            self._add_child(LIST).data = data
+        self._add_child(ITEM).data = data
+        return 1
+
+    def _start_indented_code(self, container: _Node) -> int:
+        """Start a code block indented by four or more columns"""
+        if not self.indented or self.tip.kind == PARAGRAPH or self.blank:
+            return 0
+        self._advance_offset(CODE_INDENT, True)
+        self._close_unmatched_blocks()
+        self._add_child(CODE_BLOCK)
+        return 2
+
+    def _parse_list_marker(self, container: _Node) -> Optional[_ListData]:
+        """Parse a list marker and the spaces after it, consuming both"""
+        if self.indent >= CODE_INDENT:
+            return None
+        line = self.line
+        position = self.next_nonspace
+
+        match = BULLET_LIST_MARKER.match(line, position)
+        if match:
+            ordered, marker, start = False, match.group(), 1
+        else:
+            match = ORDERED_LIST_MARKER.match(line, position)
+            # Only a list starting at 1 can interrupt a paragraph
+            if not match or (container.kind == PARAGRAPH and int(match.group(1)) != 1):
+                return None
+            ordered, marker, start = True, match.group(2), int(match.group(1))
+
+        marker_end = match.end()
+        if marker_end < len(line) and line[marker_end] not in " \t":
+            return None
+        # An empty item cannot interrupt a paragraph
+        if container.kind == PARAGRAPH and not line[marker_end:].strip(" \t"):
+            return None
+
+        marker_offset = self.indent
+        marker_width = marker_end - position
+        self._advance_next_nonspace()
+
+        if not self.has_tab:
+            # Without tabs characters and columns coincide
+            content = NONSPACE.search(line, marker_end)
+            spaces_after_marker = content.start() - marker_end if content else 0
+            if 1 <= spaces_after_marker < 5:
+                padding = marker_width + spaces_after_marker
+                offset = content.start()
+            else:
+                # Blank items and items starting with indented code take one space
+                padding = marker_width + 1
+                offset = min(marker_end + 1, len(line))
+            self.column += offset - self.offset
+            self.offset = offset
+            return _ListData(ordered, marker, start, marker_offset, padding)
+
+        self._advance_offset(marker_width, True)
+        spaces_start_column = self.column
+        spaces_start_offset = self.offset
+        while True:
+            self._advance_offset(1, True)
+            if not (
+                self.column - spaces_start_column < 5
+                and self._is_space_or_tab(self.offset)
+            ):
+                break
+
+        spaces_after_marker = self.column - spaces_start_column
+        if (
+            spaces_after_marker >= 5
+            or spaces_after_marker < 1
+            or self.offset >= len(line)
+        ):
+            padding = marker_width + 1
+            self.column = spaces_start_column
+            self.offset = spaces_start_offset
+            self.partially_consumed_tab = False
+            if self._is_space_or_tab(self.offset):
+                self._advance_offset(1, True)
+        else:
+            padding = marker_width + spaces_after_marker
+
+        return _ListData(ordered, marker, start, marker_offset, padding)
+
+    def _find_next_nonspace(self):
+        """Find the next non-blank character and the indentation before it"""
+        line = self.line
+        offset = self.offset
+        if offset <= self.first_nonspace:
+            position = self.first_nonspace
+        else:
+            match = NONSPACE.search(line, offset)
+            position = match.start() if match else len(line)
+
+        column = self.column
+        if self.has_tab:
+            for char in line[offset:position]:
+                if char == "\t":
+                    column += TAB_STOP - column % TAB_STOP
+                else:
+                    column += 1
+        else:
+            column += position - offset
+
+        self.blank = position >= len(line)
+        self.next_nonspace = position
+        self.next_nonspace_column = column
+        self.indent = column - self.column
+        self.indented = self.indent >= CODE_INDENT
+
+    def _advance_offset(self, count: int, columns: bool):
+        """Consume ``count`` characters, or columns if a tab is split"""
+        line = self.line
+        length = len(line)
+        if not self.has_tab:
+            count = min(count, length - self.offset)
+            self.offset += count
+            self.column += count
+            self.partially_consumed_tab = False
+            return
+
+        while count > 0 and self.offset < length:
+            if line[self.offset] == "\t":
+                chars_to_tab = TAB_STOP - self.column % TAB_STOP
+                if columns:
+                    self.partially_consumed_tab = chars_to_tab > count
+                    advance = min(chars_to_tab, count)
+                    self.column += advance
+                    if not self.partially_consumed_tab:
+                        self.offset += 1
+                    count -= advance
+                else:
+                    self.partially_consumed_tab = False
+                    self.column += chars_to_tab
+                    self.offset += 1
+                    count -= 1
+            else:
+                self.partially_consumed_tab = False
+                self.offset += 1
+                self.column += 1
+                count -= 1
+
+    def _advance_next_nonspace(self):
+        """Consume the indentation found by _find_next_nonspace"""
+        self.offset = self.next_nonspace
+        self.column = self.next_nonspace_column
+        self.partially_consumed_tab = False
+
+    def _is_space_or_tab(self, position: int) -> bool:
+        """Check the character at ``position`` is a space or tab"""
+        return position < len(self.line) and self.line[position] in " \t"
+
+    def _add_line(self):
+        """Add the rest of the current line to the innermost open block"""
+        prefix = ""
+        if self.partially_consumed_tab:
+            # The unconsumed columns of a split tab become spaces
+            self.offset += 1
+            prefix = " " * (TAB_STOP - self.column % TAB_STOP)
+        self.tip.lines.append(prefix + self.line[self.offset :])
+
+    def _add_child(self, kind: str) -> _Node:
+        """Open a block, closing open blocks that cannot contain it"""
+        while not _can_contain(self.tip.kind, kind):
+            self._finalize(self.tip)
+        node = _Node(kind, self.tip)
+        if self.meter is not None and kind in NESTING_KINDS:
+            self.meter.check_depth(node.depth)
+        self.tip.children.append(node)
+        self.tip = node
+        return node
+
+    def _close_unmatched_blocks(self):
+        """Close the blocks the current line did not continue"""
+        if not self.all_closed:
+            while self.old_tip is not self.last_matched_container:
+                parent = self.old_tip.parent
+                self._finalize(self.old_tip)
+                self.old_tip = parent
+            self.all_closed = True
+
+    def _finalize(self, node: _Node):
+        """Close a block and hand finished top-level blocks to ``finished``"""
+        node.is_open = False
+        parent = node.parent
+
+        if node.kind == CODE_BLOCK:
+            if node.data is not None:
+                # The first line of a fenced block is its info string
+                node.lines[0] = node.lines[0].strip()
+            else:
+                while node.lines and not node.lines[-1].strip(" \t"):
+                    node.lines.pop()
+
+        if parent is self.document:
+            parent.children.pop()
+            self.finished.append(node)
+        # Closed blocks never look up again; dropping the link avoids a
+        # reference cycle, so finished trees are freed as soon as converted
+        node.parent = None
+        self.tip = parent
+
+
+class _Segment:
+    """Lines of a document and the top-level blocks they convert to
+
+    A segment starts and ends where _BlockParser has no open block, so
+    the same lines give the same blocks wherever they appear. A final
+    segment's last blocks were closed by the end of the document, so it
+    can only be reused at the end of one.
+    """
+
+    __slots__ = ("lines", "blocks", "final")
+
+    def __init__(self, lines: List[str], blocks: Tuple[Block, ...], final: bool):
+        self.lines = lines
+        self.blocks = blocks
+        self.final = final
+
+    def matches(self, lines: List[str], index: int) -> bool:
+        """Check the lines starting at ``index`` are this segment's lines"""
+        own = self.lines
+        end = index + len(own)
+        if self.final and end != len(lines):
+            return False
+        return own[0] == lines[index] and lines[index:end] == own
+
+
+class _ConvertedDocument:
+    """The segments of a document's last conversion, kept in a DocumentCache"""
+
+    __slots__ = ("segments", "by_first_line")
+
+    def __init__(self, segments: List[_Segment]):
+        self.segments = segments
+        # Positions of the segments starting with each line
+        self.by_first_line: Dict[str, List[int]] = {}
+        for position, segment in enumerate(segments):
+            self.by_first_line.setdefault(segment.lines[0], []).append(position)
+
+    def find(self, lines: List[str], index: int, expected: int) -> int:
+        """Find a segment identical to the lines starting at ``index``
+
+        The segment at ``expected``, the one after the last reused, is
+        tried first. Otherwise a few of the segments starting with the
+        same line, nearest to it, are tried.
+
+        Returns:
+            The segment's position, or -1 if none matches
+        """
+        segments = self.segments
+        if expected < len(segments) and segments[expected].matches(lines, index):
+            return expected
+        positions = self.by_first_line.get(lines[index])
+        if not positions:
+            return -1
+        nearest = bisect_left(positions, expected)
+        for position in (
+            positions[nearest : nearest + SEGMENT_CANDIDATES]
+            + positions[max(0, nearest - SEGMENT_CANDIDATES) : nearest]
+        ):
+            if segments[position].matches(lines, index):
+                return position
+        return -1
+
+
+class _NextFinder:
+    """Finds the next occurrence of a character, remembering the last answer
+
+    Inline spans look up the closing character from positions that mostly
+    move forward, so reusing the previous result avoids scanning the same
+    stretch of text again and again.
+    """
+
+    __slots__ = ("text", "char", "searched_from", "found")
+
+    def __init__(self, text: str, char: str):
+        self.text = text
+        self.char = char
+        self.searched_from = len(text) + 1
+        self.found = -1
+
+    def __call__(self, start: int) -> int:
+        """Return the index of the next ``char`` at or after ``start``, or -1"""
+        if self.searched_from <= start and (self.found == -1 or start <= self.found):
+            return self.found
+        self.searched_from = start
+        self.found = self.text.find(self.char, start)
+        return self.found
 
 
 class MarkdownConverter:
     """Converts Markdown text to Substack JSON block format"""
 
-    def __init__(self):
-        """Initialize the converter with a BlockBuilder instance"""
+    def __init__(
+        self,
+        budget: Optional[ConversionBudget] = None,
+        document_cache: Optional[DocumentCache] = None,
+    ):
+        """Initialize the converter with a BlockBuilder instance
+
+        Args:
+            budget: Size, nesting and time limits for each conversion,
+                defaults to ConversionBudget()
+            document_cache: Where conversions with a document_id are kept,
+                e.g. one shared by every converter of a server; defaults to
+                a cache of this converter's own
+        """
         self.builder = BlockBuilder()
+        self.budget = budget if budget is not None else ConversionBudget()
+        self.document_cache = (
+            document_cache if document_cache is not None else DocumentCache()
+        )
 
-    def convert(self, markdown: str) -> List[Dict[str, Any]]:
+    def convert(
+        self, markdown: str, document_id: Optional[Hashable] = None
+    ) -> List[Dict[str, Any]]:
         """Convert markdown text to Substack JSON blocks
 
         Args:
             markdown: The markdown text to convert
+            document_id: Identifies a document that is converted again as
+                it is edited, see ``convert_nodes``
 
         Returns:
             A list of Substack JSON blocks
+
+        Raises:
+            ConversionLimitError: If the content exceeds the converter's budget
+        """
+        return [block.to_dict() for block in self.convert_nodes(markdown, document_id)]
+
+    def convert_nodes(
+        self, markdown: str, document_id: Optional[Hashable] = None
+    ) -> List[Block]:
+        """Convert markdown text to immutable block nodes
+
+        Same as ``convert`` without turning the nodes into dicts; the nodes
+        read like the dicts and use a fraction of the memory.
+
+        With a document_id, the blocks are kept in the document cache
+        along with the lines they came from. The next conversion of the
+        same document only parses the lines around what changed and reuses
+        the blocks of the rest, so editing one paragraph of a long post
+        costs about as much as converting that paragraph.
+
+        Args:
+            markdown: The markdown text to convert
+            document_id: Identifies a document that is converted again as
+                it is edited, such as its post ID
+
+        Returns:
+            A list of block nodes
+
+        Raises:
+            ConversionLimitError: If the content exceeds the converter's budget
         """
         if not markdown or not markdown.strip():
             return []
 
-        blocks = []
-        lines = markdown.split("\n")
-        i = 0
+        if document_id is not None:
+            return self._convert_edited(markdown, document_id)
+        return list(self.iter_nodes(markdown))
 
-        while i < len(lines):
-            line = lines[i]
+    def iter_blocks(
+        self, source: Union[str, Iterable[str]]
+    ) -> Iterator[Dict[str, Any]]:
+        """Convert markdown to Substack JSON blocks one block at a time
 
-            # Skip empty lines
-            if not line.strip():
-                i += 1
-                continue
+        Block structure follows CommonMark: lists and block quotes are
+        containers, so items can hold several paragraphs, nested and mixed
+        ordered/bulleted lists, quotes and code, and paragraph lines
+        continue lazily inside them. Setext and ATX headings, thematic
+        breaks, fenced and indented code are supported, and a
+        ``<!-- PAYWALL -->`` marker between top-level blocks, or inside a
+        top-level paragraph (which it splits), becomes a paywall block;
+        other HTML blocks and link reference definitions
+        are treated as paragraph text.
 
-            # Check for code blocks
-            if line.strip().startswith("```"):
-                block, i = self._parse_code_block(lines, i)
-                if block:
-                    blocks.append(block)
-                continue
+        Lines are parsed as they are read and each top-level block is
+        yielded as soon as it is complete, so a file can be converted
+        while it is read and memory is bounded by the largest block
+        rather than the document. Produces the same blocks as ``convert``.
 
-            # Check for headers
-            if line.startswith("#"):
-                block = self._parse_header(line)
-                if block:
-                    blocks.append(block)
-                    i += 1
-                    continue
+        The converter's budget applies to the whole source. Time spent by
+        the caller between blocks does not count against its time limit.
 
-            # Check for horizontal rule
-            if re.match(r"^(\-{3,}|\*{3,}|_{3,})$", line.strip()):
-                blocks.append(self.builder.horizontal_rule())
-                i += 1
-                continue
+        Args:
+            source: Markdown text, a text file object or any iterable of lines
 
-            # Check for blockquote
-            if line.startswith(">"):
-                block, i = self._parse_blockquote(lines, i)
-                if block:
-                    blocks.append(block)
-                continue
+        Yields:
+            Substack JSON blocks
 
-            # Check for lists
-            if re.match(r"^(\*|\-|\+|\d+\.) ", line.strip()):
-                block, i = self._parse_list(lines, i)
-                if block:
-                    blocks.append(block)
-                continue
+        Raises:
+            ConversionLimitError: If the content exceeds the converter's budget
+        """
+        for block in self.iter_nodes(source):
+            yield block.to_dict()
+
+    def iter_nodes(self, source: Union[str, Iterable[str]]) -> Iterator[Block]:
+        """Convert markdown to block nodes one block at a time
+
+        Same as ``iter_blocks`` without turning the nodes into dicts.
+
+        Args:
+            source: Markdown text, a text file object or any iterable of lines
+
+        Yields:
+            Immutable block nodes
+
+        Raises:
+            ConversionLimitError: If the content exceeds the converter's budget
+        """
+        meter = self.budget.meter()
+        parser = _BlockParser(meter)
+
+        for line in self._iter_lines(source, meter):
+            parser.feed(line)
+            if parser.finished:
+                finished, parser.finished = parser.finished, []
+                yield from self._metered_blocks(finished, meter)
+
+        parser.close()
+        yield from self._metered_blocks(parser.finished, meter)
 
-            # Default to paragraph
-            block, i = self._parse_paragraph(lines, i)
-            if block:
-                blocks.append(block)
+    def _convert_edited(self, markdown: str, document_id: Hashable) -> List[Block]:
+        """Convert a document, reusing the blocks of its unchanged segments
 
+        The lines are parsed as usual, but wherever the parser has no open
+        block, the lines ahead are checked against the segments of the
+        last conversion. An identical segment is skipped and its blocks
+        reused, since from there the parse would repeat the previous one.
+        """
+        meter = self.budget.meter()
+        meter.check_length(len(markdown))
+        previous = self.document_cache.get(document_id)
+        if previous is None:
+            previous = _ConvertedDocument([])
+
+        # The lines iter_nodes reads: a final newline does not start a line
+        lines = markdown.split("\n")
+        if markdown.endswith("\n"):
+            lines.pop()
+        count = len(lines)
+
+        parser = _BlockParser(meter)
+        document = parser.document
+        blocks: List[Block] = []
+        segments: List[_Segment] = []
+        pending: List[Block] = []
+        start = 0
+        expected = 0
+        index = 0
+        while index < count:
+            if parser.tip is document:
+                # Nothing is open: a segment can end and another start here
+                if pending:
+                    segments.append(_Segment(lines[start:index], tuple(pending), False))
+                    blocks.extend(pending)
+                    pending = []
+                start = index
+                position = previous.find(lines, index, expected)
+                if position >= 0:
+                    segment = previous.segments[position]
+                    segments.append(segment)
+                    blocks.extend(segment.blocks)
+                    index += len(segment.lines)
+                    start = index
+                    expected = position + 1
+                    continue
+                if NONSPACE.search(lines[index]) is None:
+                    # A blank line between blocks changes nothing
+                    index += 1
+                    start = index
+                    continue
+
+            parser.feed(lines[index])
+            meter.tick()
+            if parser.finished:
+                pending.extend(self._node_to_block(node) for node in parser.finished)
+                parser.finished = []
+            index += 1
+
+        parser.close()
+        pending.extend(self._node_to_block(node) for node in parser.finished)
+        if pending:
+            segments.append(_Segment(lines[start:], tuple(pending), True))
+            blocks.extend(pending)
+
+        self.document_cache.put(document_id, _ConvertedDocument(segments))
         return blocks
 
-    def _parse_header(self, line: str) -> Optional[Dict[str, Any]]:
-        """Parse a header line"""
-        match = re.match(r"^(#{1,6})\s+(.+)$", line)
-        if match:
-            level = len(match.group(1))
-            content = match.group(2).strip()
-            return self.builder.header(content, level)
-        return None
-
-    def _parse_code_block(
-        self, lines: List[str], start: int
-    ) -> Tuple[Optional[Dict[str, Any]], int]:
-        """Parse a code block"""
-        line = lines[start].strip()
-        if not line.startswith("```"):
-            return None, start + 1
-
-        # Extract language if present
-        language = line[3:].strip()
-
-        # Find the closing ```
-        code_lines = []
-        i = start + 1
-        while i < len(lines):
-            if lines[i].strip() == "```":
-                code = "\n".join(code_lines)
-                return self.builder.code_block(code, language), i + 1
-            code_lines.append(lines[i])
-            i += 1
-
-        # If no closing found, treat as paragraph
-        return None, start + 1
-
-    def _parse_blockquote(
-        self, lines: List[str], start: int
-    ) -> Tuple[Optional[Dict[str, Any]], int]:
-        """Parse a blockquote"""
-        quote_lines = []
-        i = start
-
-        while i < len(lines) and lines[i].strip().startswith(">"):
-            content = lines[i].strip()[1:].strip()
-            quote_lines.append(content)
-            i += 1
-
-        if quote_lines:
-            quote_text = " ".join(quote_lines)
-            return self.builder.blockquote(quote_text), i
-
-        return None, start + 1
-
-    def _parse_list(
-        self, lines: List[str], start: int
-    ) -> Tuple[Optional[Dict[str, Any]], int]:
-        """Parse a list (ordered or unordered)"""
-        first_line = lines[start].strip()
-
-        # Determine list type
-        is_ordered = bool(re.match(r"^\d+\. ", first_line))
-
-        items = []
-        i = start
-
-        # Simple list parsing (not handling nested lists in this version)
-        while i < len(lines):
-            line = lines[i].strip()
-
-            if not line:
-                # Empty line might end the list
-                if i + 1 < len(lines) and not re.match(
-                    r"^(\*|\-|\+|\d+\.) ", lines[i + 1].strip()
-                ):
-                    break
-                i += 1
-                continue
+    def _metered_blocks(
+        self, nodes: List[_Node], meter: BudgetMeter
+    ) -> Iterator[Block]:
+        """Convert finished blocks, stopping the clock while the caller has each"""
+        for node in nodes:
+            block = self._node_to_block(node)
+            meter.pause()
+            yield block
+            meter.resume()
 
-            # Check if this line is a list item
-            if is_ordered:
-                match = re.match(r"^\d+\. (.+)$", line)
-            else:
-                match = re.match(r"^(\*|\-|\+) (.+)$", line)
+    def _iter_lines(
+        self, source: Union[str, Iterable[str]], meter: BudgetMeter
+    ) -> Iterator[str]:
+        """Yield lines without their trailing newline, metering the input"""
+        if isinstance(source, str):
+            # Reject text that is too long before parsing any of it; then
+            # only the clock needs checking, once per batch of lines
+            meter.check_length(len(source))
+            # Split on "\n" only, exactly like str.split("\n")
+            text = io.StringIO(source, newline="\n")
+            while True:
+                lines = text.readlines(LINE_BATCH_CHARS)
+                if not lines:
+                    return
+                meter.check_time()
+                for line in lines:
+                    yield line[:-1] if line.endswith("\n") else line
 
-            if match:
-                content = match.group(1) if is_ordered else match.group(2)
-                items.append(content)
-                i += 1
-            else:
-                break
+        for line in source:
+            meter.add(len(line))
+            yield line[:-1] if line.endswith("\n") else line
 
-        if items:
-            if is_ordered:
-                return self.builder.ordered_list(items), i
-            else:
-                return self.builder.unordered_list(items), i
-
-        return None, start + 1
-
-    def _parse_paragraph(
-        self, lines: List[str], start: int
-    ) -> Tuple[Optional[Dict[str, Any]], int]:
-        """Parse a paragraph with inline formatting"""
-        paragraph_lines = []
-        i = start
-
-        while i < len(lines):
-            line = lines[i]
-
-            # Stop at empty lines or special syntax
-            if (
-                not line.strip()
-                or line.startswith("#")
-                or line.startswith(">")
-                or line.strip().startswith("```")
-                or re.match(r"^(\*|\-|\+|\d+\.) ", line.strip())
-                or re.match(r"^(\-{3,}|\*{3,}|_{3,})$", line.strip())
-            ):
-                break
+    def _node_to_block(self, node: _Node) -> Block:
+        """Convert a finished block from the parser to a Substack block"""
+        kind = node.kind
+
+        if kind == PARAGRAPH:
+            return self._paragraph_block(node.lines)
+
+        if kind == HEADING:
+            text = " ".join(line.strip(" \t") for line in node.lines)
+            return self.builder.header(text, node.data)
+
+        if kind == THEMATIC_BREAK:
+            return self.builder.horizontal_rule()
+
+        if kind == PAYWALL:
+            return self.builder.paywall()
+
+        if kind == CODE_BLOCK:
+            lines = node.lines
+            language = ""
+            if node.data is not None:
+                # Only the first word of the info string names the language
+                info = lines[0].split(None, 1)
+                language = info[0] if info else ""
+                lines = lines[1:]
+            return self.builder.code_block("\n".join(lines), language)
+
+        if kind == BLOCK_QUOTE:
+            return self.builder.blockquote(self._child_blocks(node))
+
+        # A list
+        items = [self._child_blocks(item) for item in node.children]
+        if node.data.ordered:
+            return self.builder.ordered_list(items, node.data.start)
+        return self.builder.unordered_list(items)
 
-            paragraph_lines.append(line)
-            i += 1
+    def _child_blocks(self, node: _Node) -> List[Block]:
+        """Convert the children of a block quote or list item"""
+        return [self._node_to_block(child) for child in node.children]
 
-        if paragraph_lines:
-            text = " ".join(paragraph_lines)
+    def _paragraph_block(self, lines: List[str]) -> Block:
+        """Build a paragraph with inline formatting, or an image"""
+        text = " ".join([line.strip(" \t") for line in lines])
 
-            # Check for images first
-            img_match = re.match(
-                r'^!\[([^\]]*)\]\(([^\s]+)(?:\s+"([^"]+)")?\)$', text.strip()
-            )
-            if img_match:
-                alt_text = img_match.group(1)
-                src = img_match.group(2)
-                caption = img_match.group(3) or ""
-                return self.builder.image(src, alt_text, caption), i
+        # Check for images first
+        img_match = text.startswith("![") and IMAGE_PATTERN.match(text)
+        if img_match:
+            alt_text = img_match.group(1)
+            src = img_match.group(2)
+            caption = img_match.group(3) or ""
+            return self.builder.image(src, alt_text, caption)
 
-            # Parse inline formatting
-            content = self._parse_inline_formatting(text)
-            return self.builder.paragraph(content), i
+        # Parse inline formatting
+        content = self._parse_inline_formatting(text)
+        return self.builder.paragraph(content)
 
-        return None, start + 1
+    def _parse_inline_formatting(self, text: str) -> List[Text]:
+        """Parse inline formatting (bold, italic, links, code)
+
+        A single left-to-right scan: at each ``*``, ``[`` or backtick the
+        span is matched using the next occurrence of its closing
+        character, and those lookups are cached so each character is
+        searched past at most a few times. This keeps long paragraphs
+        linear instead of re-searching and re-slicing the rest of the
+        text after every span.
+
+        Spans are matched exactly as the patterns ``***text***``,
+        ``**text**``, ``*text*``, ``[text](url)`` and `` `code` `` would be:
+        the leftmost span wins, and ``***`` beats ``**`` beats ``*`` at
+        the same position.
+        """
+        if not INLINE_SYNTAX.search(text):
+            # Nothing to format or unescape
+            return [Text(text)]
 
-    def _parse_inline_formatting(self, text: str) -> List[Dict[str, Any]]:
-        """Parse inline formatting (bold, italic, links, code)"""
         # Handle escaped characters
         text = text.replace("\\*", "\x00ESCAPED_ASTERISK\x00")
         text = text.replace("\\[", "\x00ESCAPED_BRACKET_OPEN\x00")
         text = text.replace("\\]", "\x00ESCAPED_BRACKET_CLOSE\x00")
 
         elements = []
-        remaining = text
-
-        while remaining:
-            # Find the next formatting element
-            next_match = None
-            next_type = None
-
-            patterns = [
-                (r"\*\*\*([^*]+)\*\*\*", "bold_italic"),  # ***text***
-                (r"\*\*([^*]+)\*\*", "bold"),  # **text**
-                (r"\*([^*]+)\*", "italic"),  # *text*
-                (r"\[([^\]]+)\]\(([^)]+)\)", "link"),  # [text](url)
-                (r"`([^`]+)`", "code"),  # `code`
-            ]
-
-            earliest_pos = len(remaining)
-
-            for pattern, format_type in patterns:
-                match = re.search(pattern, remaining)
-                if match and match.start() < earliest_pos:
-                    earliest_pos = match.start()
-                    next_match = match
-                    next_type = format_type
-
-            if next_match:
-                # Add text before the match
-                if next_match.start() > 0:
-                    plain_text = remaining[: next_match.start()]
-                    elements.append(
-                        self._restore_escaped_chars(
-                            {"type": "text", "content": plain_text}
-                        )
-                    )
+        length = len(text)
+        find_star = _NextFinder(text, "*")
+        find_bracket = _NextFinder(text, "]")
+        find_paren = _NextFinder(text, ")")
+        find_backtick = _NextFinder(text, "`")
 
-                # Add the formatted element
-                if next_type == "bold_italic":
-                    elements.append(
-                        self._restore_escaped_chars(
-                            self.builder.text(next_match.group(1), ["strong", "em"])
-                        )
-                    )
-                elif next_type == "bold":
-                    elements.append(
-                        self._restore_escaped_chars(
-                            self.builder.text(next_match.group(1), ["strong"])
-                        )
-                    )
-                elif next_type == "italic":
-                    elements.append(
-                        self._restore_escaped_chars(
-                            self.builder.text(next_match.group(1), ["em"])
-                        )
-                    )
-                elif next_type == "link":
-                    elements.append(
-                        self._restore_escaped_chars(
-                            self.builder.link(next_match.group(1), next_match.group(2))
-                        )
+        position = 0
+        candidate = INLINE_START.search(text)
+        while candidate:
+            start = candidate.start()
+            char = text[start]
+            element = None
+            end = -1
+
+            if char == "*":
+                # Count leading stars (up to three) to pick the only possible span
+                stars = 1
+                while stars < 3 and text.startswith("*", start + stars):
+                    stars += 1
+                close = find_star(start + stars)
+                if close > start + stars and text.startswith("*" * stars, close):
+                    element = self.builder.text(
+                        text[start + stars : close], STAR_MARKS[stars]
                     )
-                elif next_type == "code":
-                    elements.append(
-                        self._restore_escaped_chars(
-                            self.builder.text(next_match.group(1), ["code"])
+                    end = close + stars
+
+            elif char == "[":
+                close = find_bracket(start + 1)
+                if close > start + 1 and text.startswith("(", close + 1):
+                    paren = find_paren(close + 2)
+                    if paren > close + 2:
+                        element = self.builder.link(
+                            text[start + 1 : close], text[close + 2 : paren]
                         )
-                    )
+                        end = paren + 1
 
-                remaining = remaining[next_match.end() :]
             else:
-                # No more formatting, add the rest as plain text
-                elements.append(
-                    self._restore_escaped_chars({"type": "text", "content": remaining})
-                )
-                break
+                close = find_backtick(start + 1)
+                if close > start + 1:
+                    element = self.builder.text(text[start + 1 : close], CODE_MARKS)
+                    end = close + 1
+
+            if element is None:
+                candidate = INLINE_START.search(text, start + 1)
+                continue
+
+            # Add text before the span, then the span itself
+            if start > position:
+                elements.append(self._restore_escaped_chars(Text(text[position:start])))
+            elements.append(self._restore_escaped_chars(element))
+            position = end
+            candidate = INLINE_START.search(text, position)
+
+        if position < length:
+            # No more formatting, add the rest as plain text
+            elements.append(self._restore_escaped_chars(Text(text[position:])))
+
+        return elements if elements else [Text("")]
+
+    def _restore_escaped_chars(self, element: Any) -> Any:
+        """Restore escaped characters in text content
+
+        Text nodes are immutable, so a new node is returned for them; a
+        dict is updated in place as before.
+        """
+        content = element.get("content")
+        if not isinstance(content, str) or "\x00" not in content:
+            return element
 
-        return elements if elements else [{"type": "text", "content": ""}]
-
-    def _restore_escaped_chars(self, element: Dict[str, Any]) -> Dict[str, Any]:
-        """Restore escaped characters in text content"""
-        if "content" in element and isinstance(element["content"], str):
-            element["content"] = element["content"].replace(
-                "\x00ESCAPED_ASTERISK\x00", "*"
-            )
-            element["content"] = element["content"].replace(
-                "\x00ESCAPED_BRACKET_OPEN\x00", "["
-            )
-            element["content"] = element["content"].replace(
-                "\x00ESCAPED_BRACKET_CLOSE\x00", "]"
-            )
+        content = content.replace("\x00ESCAPED_ASTERISK\x00", "*")
+        content = content.replace("\x00ESCAPED_BRACKET_OPEN\x00", "[")
+        content = content.replace("\x00ESCAPED_BRACKET_CLOSE\x00", "]")
+        if isinstance(element, Text):
+            return Text(content, element.marks)
+        element["content"] = content
         return element
@@ -0,0 +1,376 @@
+# ABOUTME: MarkdownRenderer turns Substack blocks or ProseMirror nodes back into Markdown
+# ABOUTME: Dispatches on node type and streams Markdown that MarkdownConverter reads back
+
+import io
+import logging
+import re
+from collections.abc import Mapping
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, TextIO
+
+from src.converters.draft_body import HEADING_LEVELS
+from src.utils import json_codec
+
+logger = logging.getLogger(__name__)
+
+# Characters MarkdownConverter lets text escape with a backslash
+ESCAPES = str.maketrans({"*": "\\*", "[": "\\[", "]": "\\]"})
+FENCE_RUN = re.compile(r"^ {0,3}(`{3,}|~{3,})", re.M)
+LIST_KINDS = {
+    "bulleted-list": "bullet",
+    "bullet_list": "bullet",
+    "ordered-list": "ordered",
+    "ordered_list": "ordered",
+}
+# Checked with isinstance; dict comes first as the common case
+NODE_TYPES = (dict, Mapping)
+PAYWALL_MARKER = "<!-- PAYWALL -->"
+THEMATIC_BREAK = "---"
+# A rule that is not also read as a list item or setext underline after a marker
+ITEM_THEMATIC_BREAK = "___"
+# Star delimiters for each combination of emphasis marks
+STAR_DELIMITERS = {
+    frozenset(["strong", "em"]): "***",
+    frozenset(["strong"]): "**",
+    frozenset(["em"]): "*",
+}
+
+
+class MarkdownRenderer:
+    """Renders Substack blocks as Markdown
+
+    Accepts both the blocks made by the converters (``heading-two``,
+    ``bulleted-list``, text runs with ``content``) and the ProseMirror
+    nodes of a stored draft body (``heading``, ``bullet_list``, text with
+    ``text``). Each node type maps to one method in a dispatch table, and
+    output is written one top-level block at a time, so a large body can be
+    written to a file without building the whole string.
+
+    Output is Markdown that MarkdownConverter converts back to the same
+    blocks: text is escaped where the converter would read it as markup,
+    lists next to each other switch markers so they stay separate, and
+    code fences are longer than any fence inside the code.
+    """
+
+    def __init__(self):
+        """Build the dispatch table from node type to rendering method"""
+        self._renderers: Dict[str, Callable[[Mapping, bool], List[str]]] = {
+            "paragraph": self._paragraph,
+            "heading": self._heading,
+            "bulleted-list": self._bullet_list,
+            "bullet_list": self._bullet_list,
+            "ordered-list": self._ordered_list,
+            "ordered_list": self._ordered_list,
+            "blockquote": self._blockquote,
+            "code": self._code,
+            "code_block": self._code,
+            "codeBlock": self._code,
+            "captioned-image": self._image,
+            "captionedImage": self._image,
+            "image": self._image,
+            "image2": self._image,
+            "hr": self._thematic_break,
+            "horizontal_rule": self._thematic_break,
+            "paywall": self._paywall,
+        }
+        for block_type in HEADING_LEVELS:
+            self._renderers[block_type] = self._heading
+
+    def render(self, blocks: Iterable[Mapping]) -> str:
+        """Render blocks as a Markdown string
+
+        Args:
+            blocks: Substack blocks or ProseMirror nodes
+
+        Returns:
+            The Markdown text, without a trailing newline
+        """
+        out = io.StringIO()
+        self.write(blocks, out)
+        return out.getvalue()
+
+    def write(self, blocks: Iterable[Mapping], out: TextIO):
+        """Write blocks as Markdown to a text stream, one block at a time
+
+        Args:
+            blocks: Substack blocks or ProseMirror nodes
+            out: Any writable text stream, such as an open file
+        """
+        separator = ""
+        for lines in self._rendered(blocks):
+            out.write(separator)
+            out.write("\n".join(lines))
+            separator = "\n\n"
+
+    def render_body(self, body: Any) -> str:
+        """Render a stored post body as a Markdown string
+
+        Args:
+            body: The body or draft_body of a post, as JSON text or decoded
+
+        Returns:
+            The Markdown text, without a trailing newline
+        """
+        out = io.StringIO()
+        self.write_body(body, out)
+        return out.getvalue()
+
+    def write_body(self, body: Any, out: TextIO):
+        """Write a stored post body as Markdown to a text stream
+
+        The body may hold a ProseMirror document or a ``blocks`` list. Text
+        that is not JSON, or JSON of another shape, is written as it is.
+
+        Args:
+            body: The body or draft_body of a post, as JSON text or decoded
+            out: Any writable text stream
+        """
+        if isinstance(body, str):
+            try:
+                decoded = json_codec.loads(body)
+            except ValueError:
+                # Not JSON, so the body is already text
+                logger.debug("Body string is not JSON, writing it as text")
+                out.write(body)
+                return
+            blocks = _body_blocks(decoded)
+            if blocks is None:
+                logger.warning(f"Unknown JSON body structure: {type(decoded)}")
+                out.write(body)
+                return
+        else:
+            blocks = _body_blocks(body)
+            if blocks is None:
+                logger.warning(f"Post body has no blocks: {type(body)}")
+                return
+
+        self.write(blocks, out)
+
+    def _rendered(self, blocks: Iterable[Mapping]) -> Iterator[List[str]]:
+        """Yield the lines of each block that renders to anything"""
+        previous_list = None
+        for block in blocks:
+            if not isinstance(block, NODE_TYPES):
+                continue
+            block_type = block.get("type")
+            # Two lists in a row of the same kind need different markers
+            list_kind = LIST_KINDS.get(block_type)
+            alternate = list_kind is not None and list_kind == previous_list
+            previous_list = None if alternate else list_kind
+
+            lines = self._renderers.get(block_type, self._fallback)(block, alternate)
+            if lines:
+                yield lines
+
+    def _lines(self, blocks: Iterable[Mapping]) -> List[str]:
+        """Return the lines of nested blocks, separated by blank lines"""
+        lines: List[str] = []
+        for block_lines in self._rendered(blocks):
+            if lines:
+                lines.append("")
+            lines.extend(block_lines)
+        return lines
+
+    def _paragraph(self, block: Mapping, alternate: bool = False) -> List[str]:
+        text = self._inline(block.get("content"), escape=True)
+        return text.split("\n") if text else []
+
+    def _heading(self, block: Mapping, alternate: bool = False) -> List[str]:
+        level = HEADING_LEVELS.get(block.get("type"))
+        if level is None:
+            level = _attrs(block).get("level") or 1
+        # Heading text is not parsed for inline markup, so it is not escaped
+        text = self._inline(block.get("content"), escape=False).replace("\n", " ")
+        return [f"{'#' * level} {text}" if text else "#" * level]
+
+    def _bullet_list(self, block: Mapping, alternate: bool = False) -> List[str]:
+        bullet = "* " if alternate else "- "
+        return self._list_items(block, lambda number: bullet)
+
+    def _ordered_list(self, block: Mapping, alternate: bool = False) -> List[str]:
+        start = block.get("start")
+        if start is None:
+            attrs = _attrs(block)
+            start = attrs.get("start") or attrs.get("order") or 1
+        delimiter = ") " if alternate else ". "
+        return self._list_items(block, lambda number: f"{start + number}{delimiter}")
+
+    def _list_items(self, block: Mapping, marker: Callable[[int], str]) -> List[str]:
+        """Render list items, tight unless an item holds more than one paragraph"""
+        children = [
+            _children(item)
+            for item in block.get("content") or []
+            if isinstance(item, NODE_TYPES)
+        ]
+        tight = all(
+            len(blocks) <= 1
+            and all(child.get("type") == "paragraph" for child in blocks)
+            for blocks in children
+        )
+        lines: List[str] = []
+        for number, blocks in enumerate(children):
+            if number and not tight:
+                lines.append("")
+            item_marker = marker(number)
+            item_lines = self._lines(blocks)
+            if not item_lines:
+                lines.append(item_marker.rstrip())
+                continue
+            first = item_lines[0]
+            if first == THEMATIC_BREAK:
+                first = ITEM_THEMATIC_BREAK
+            lines.append(item_marker + first)
+            indent = " " * len(item_marker)
+            lines.extend(indent + line if line else "" for line in item_lines[1:])
+        return lines
+
+    def _blockquote(self, block: Mapping, alternate: bool = False) -> List[str]:
+        lines = self._lines(_children(block))
+        return ["> " + line if line else ">" for line in lines] or [">"]
+
+    def _code(self, block: Mapping, alternate: bool = False) -> List[str]:
+        content = block.get("content")
+        if not isinstance(content, str):
+            content = _plain_text(content)
+        language = block.get("language") or _attrs(block).get("language") or ""
+
+        # The fence must be longer than any backtick fence inside the code
+        longest = 0
+        if "```" in content:
+            longest = max(
+                (len(run) for run in FENCE_RUN.findall(content) if run[0] == "`"),
+                default=0,
+            )
+        fence = "`" * max(3, longest + 1)
+        lines = [fence + language]
+        if content:
+            lines.extend(content.split("\n"))
+        lines.append(fence)
+        return lines
+
+    def _image(self, block: Mapping, alternate: bool = False) -> List[str]:
+        attrs = _attrs(block)
+        src = block.get("src") or attrs.get("src") or attrs.get("url") or ""
+        alt = block.get("alt") or attrs.get("alt") or ""
+        caption = block.get("caption") or ""
+        content = block.get("content")
+        if isinstance(content, NODE_TYPES):
+            content = [content]
+        if isinstance(content, list):
+            for node in content:
+                if not isinstance(node, NODE_TYPES):
+                    continue
+                if node.get("type") == "image2":
+                    attrs = _attrs(node)
+                    src = src or attrs.get("src") or ""
+                    alt = alt or attrs.get("alt") or ""
+                elif node.get("type") == "caption":
+                    caption = _plain_text(node.get("content"))
+        if caption:
+            return [f'![{alt}]({src} "{caption}")']
+        return [f"![{alt}]({src})"]
+
+    def _thematic_break(self, block: Mapping, alternate: bool = False) -> List[str]:
+        return [THEMATIC_BREAK]
+
+    def _paywall(self, block: Mapping, alternate: bool = False) -> List[str]:
+        return [PAYWALL_MARKER]
+
+    def _fallback(self, block: Mapping, alternate: bool = False) -> List[str]:
+        """Render an unknown block as a paragraph of its text, if it has any"""
+        text = _plain_text(block.get("content"))
+        return text.split("\n") if text else []
+
+    def _inline(self, content: Any, escape: bool) -> str:
+        """Render text runs with their marks
+
+        Args:
+            content: A string or a list of text runs
+            escape: Whether to escape characters the converter reads as markup
+        """
+        if isinstance(content, str):
+            return _escape(content) if escape else content
+
+        parts: List[str] = []
+        for run in content or []:
+            if not isinstance(run, NODE_TYPES):
+                continue
+            if run.get("type") == "hard_break":
+                parts.append("\n")
+                continue
+            text = run.get("content") if "content" in run else run.get("text")
+            if not isinstance(text, str) or not text:
+                continue
+            marks = run.get("marks")
+            if marks:
+                parts.append(self._marked(text, marks, escape))
+            else:
+                parts.append(_escape(text) if escape else text)
+        return "".join(parts)
+
+    def _marked(self, text: str, marks: Iterable[Mapping], escape: bool) -> str:
+        """Wrap one run of text in the Markdown for its marks"""
+        types = set()
+        href: Optional[str] = None
+        for mark in marks:
+            mark_type = mark.get("type")
+            types.add(mark_type)
+            if mark_type == "link":
+                href = mark.get("href") or _attrs(mark).get("href") or ""
+
+        if "code" in types:
+            # Code spans are taken literally
+            return f"`{text}`"
+        if escape:
+            text = _escape(text)
+        stars = STAR_DELIMITERS.get(frozenset(types & {"strong", "em"}), "")
+        text = f"{stars}{text}{stars}"
+        if "strikethrough" in types:
+            text = f"~~{text}~~"
+        if href is not None:
+            text = f"[{text}]({href})"
+        return text
+
+
+def _body_blocks(body: Any) -> Optional[List[Any]]:
+    """Return the blocks of a decoded body, in either stored format"""
+    if not isinstance(body, dict):
+        return None
+    if "blocks" in body:
+        return body["blocks"] or []
+    if body.get("type") == "doc" and "content" in body:
+        return body["content"] or []
+    return None
+
+
+def _escape(text: str) -> str:
+    """Escape the characters MarkdownConverter would read as markup"""
+    if "*" in text or "[" in text or "]" in text:
+        return text.translate(ESCAPES)
+    return text
+
+
+def _attrs(node: Mapping) -> Mapping:
+    attrs = node.get("attrs")
+    return attrs if isinstance(attrs, NODE_TYPES) else {}
+
+
+def _children(node: Mapping) -> List[Mapping]:
+    """Return the child blocks of a list item or quote
+
+    Converter blocks may hold a bare string where a paragraph is meant.
+    """
+    content = node.get("content")
+    if isinstance(content, str):
+        return [{"type": "paragraph", "content": content}] if content else []
+    return [child for child in content or [] if isinstance(child, NODE_TYPES)]
+
+
+def _plain_text(content: Any) -> str:
+    """Join the text inside any content, without formatting"""
+    if isinstance(content, str):
+        return content
+    if isinstance(content, NODE_TYPES):
+        return content.get("text") or _plain_text(content.get("content"))
+    if isinstance(content, (list, tuple)):
+        return "".join(_plain_text(item) for item in content)
+    return ""
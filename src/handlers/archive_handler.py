@@ -0,0 +1,332 @@
+# ABOUTME: ArchiveHandler class for exporting a whole publication to local files
+# ABOUTME: Streams posts to NDJSON and/or per-post Markdown with checkpointed resume
+
+import asyncio
+import logging
+import os
+import re
+from typing import Any, Dict, List, Optional, Set
+
+from src.converters.conversion_service import ConversionService
+from src.handlers.post_handler import PostHandler
+from src.utils import json_codec
+from src.utils.api_wrapper import SubstackAPIError
+from src.utils.front_matter import dump_front_matter
+from src.utils.post_index import PostIndex
+
+logger = logging.getLogger(__name__)
+
+
+class ArchiveHandler:
+    """Handles bulk export of posts to a local directory"""
+
+    SUPPORTED_FORMATS = ["ndjson", "markdown"]
+    NDJSON_FILENAME = "posts.ndjson"
+    CHECKPOINT_FILENAME = ".export_checkpoint"
+    PAGE_SIZE = 25
+
+    def __init__(
+        self, client, concurrency: int = 4, post_index: Optional[PostIndex] = None
+    ):
+        """Initialize the archive handler with an authenticated client
+
+        Args:
+            client: An authenticated Substack API client
+            concurrency: Maximum number of post bodies fetched at once
+            post_index: Optional shared title/slug index refreshed from the listing
+        """
+        if not isinstance(concurrency, int) or concurrency < 1 or concurrency > 16:
+            raise ValueError("concurrency must be an integer between 1 and 16")
+
+        self.client = client
+        self.concurrency = concurrency
+        self.post_handler = PostHandler(client, post_index=post_index)
+        self.conversion_service = ConversionService(
+            max_workers=min(concurrency, os.cpu_count() or 1)
+        )
+
+    async def export_archive(
+        self,
+        output_dir: str,
+        formats: Optional[List[str]] = None,
+        include_markdown: bool = True,
+    ) -> Dict[str, Any]:
+        """Export every post to a local directory
+
+        Posts are listed page by page and their bodies are fetched by a small
+        pool of workers. Each post is written as soon as it arrives, so memory
+        stays bounded by the page size and worker count regardless of how
+        large the publication is. Each format a post is written in is
+        appended to a checkpoint file; re-running with the same output
+        directory skips what is already there and writes the rest, so a
+        second run with another format fills in just that format.
+        If listing the posts fails part way, the posts listed so far are
+        still exported and the summary reports the export as incomplete.
+
+        Args:
+            output_dir: Directory to write the archive into (created if missing)
+            formats: Any of "ndjson" and "markdown" (defaults to both)
+            include_markdown: Add rendered markdown to each NDJSON record
+
+        Returns:
+            Summary with counts of exported, skipped and failed posts, whether
+            every post was listed ("complete") and the listing error if not
+
+        Raises:
+            ValueError: If invalid input provided
+        """
+        if not output_dir or not isinstance(output_dir, str):
+            raise ValueError("output_dir must be a non-empty string")
+
+        if formats is None:
+            formats = list(self.SUPPORTED_FORMATS)
+        if not formats or any(f not in self.SUPPORTED_FORMATS for f in formats):
+            raise ValueError(
+                f"formats must be a non-empty list of: {', '.join(self.SUPPORTED_FORMATS)}"
+            )
+
+        output_dir = os.path.abspath(os.path.expanduser(output_dir))
+        os.makedirs(output_dir, exist_ok=True)
+
+        checkpoint_path = os.path.join(output_dir, self.CHECKPOINT_FILENAME)
+        completed = self._load_checkpoint(checkpoint_path)
+        ndjson_path = os.path.join(output_dir, self.NDJSON_FILENAME)
+        if "ndjson" in formats:
+            self._trim_ndjson(ndjson_path, completed["ndjson"])
+        done = set.intersection(*(completed[fmt] for fmt in formats))
+        logger.info(
+            f"Exporting archive to {output_dir} ({len(done)} posts already done)"
+        )
+
+        summary: Dict[str, Any] = {
+            "output_dir": output_dir,
+            "exported": 0,
+            "skipped": 0,
+            "failed": [],
+            "complete": True,
+        }
+
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        ndjson_file = None
+        if "ndjson" in formats:
+            ndjson_file = open(ndjson_path, "a", encoding="utf-8")
+        checkpoint_file = open(checkpoint_path, "a", encoding="utf-8")
+
+        async def worker():
+            while True:
+                item = await queue.get()
+                try:
+                    if item is None:
+                        return
+                    post_id, missing = item
+                    await self._export_post(
+                        post_id,
+                        output_dir,
+                        missing,
+                        include_markdown,
+                        ndjson_file,
+                        checkpoint_file,
+                    )
+                    summary["exported"] += 1
+                except Exception as e:
+                    logger.error(f"Failed to export post {post_id}: {e}")
+                    summary["failed"].append({"id": post_id, "error": str(e)})
+                finally:
+                    queue.task_done()
+
+        workers = [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+        try:
+            try:
+                async for post in self._iter_listing():
+                    post_id = str(post.get("id"))
+                    missing = [fmt for fmt in formats if post_id not in completed[fmt]]
+                    if not missing:
+                        summary["skipped"] += 1
+                        continue
+                    for fmt in missing:
+                        # Listed once only, even if the listing shifts
+                        completed[fmt].add(post_id)
+                    await queue.put((post_id, missing))
+            except SubstackAPIError as e:
+                # Finish the posts already listed; a re-run picks up the rest
+                logger.error(f"Listing posts failed, export is incomplete: {e}")
+                summary["complete"] = False
+                summary["listing_error"] = str(e)
+
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                task.cancel()
+            if ndjson_file:
+                ndjson_file.close()
+            checkpoint_file.close()
+            # Waiting for the worker processes to exit would block the loop
+            await asyncio.to_thread(self.conversion_service.close)
+
+        summary["message"] = (
+            f"Exported {summary['exported']} post(s), skipped {summary['skipped']} "
+            f"already exported, {len(summary['failed'])} failed"
+        )
+        if not summary["complete"]:
+            summary["message"] += (
+                f". Listing posts failed ({summary['listing_error']}), so the "
+                "archive is incomplete; run the export again to resume"
+            )
+        return summary
+
+    async def _iter_listing(self):
+        """Yield every post from the drafts listing, one page at a time"""
+        offset = 0
+        while True:
+            page = await asyncio.to_thread(
+                self.client.get_drafts,
+                limit=self.PAGE_SIZE,
+                offset=offset,
+                raise_errors=True,
+            )
+            page = list(page or [])
+            for post in page:
+                if isinstance(post, dict) and post.get("id") is not None:
+                    self.post_handler.post_index.update(post)
+                    yield post
+            if len(page) < self.PAGE_SIZE:
+                return
+            offset += len(page)
+
+    async def _export_post(
+        self,
+        post_id: str,
+        output_dir: str,
+        formats: List[str],
+        include_markdown: bool,
+        ndjson_file,
+        checkpoint_file,
+    ):
+        """Fetch a single post and write it in the given formats"""
+        post = await asyncio.to_thread(self.client.get_draft, post_id)
+        if not isinstance(post, dict):
+            raise ValueError(f"Invalid response for post {post_id}: {type(post)}")
+
+        record = self._build_record(post)
+        markdown = None
+        if ("ndjson" in formats and include_markdown) or "markdown" in formats:
+            # Rendering is CPU-bound, so large bodies go to a worker process
+            markdown = await self.conversion_service.render(self._post_body(post))
+
+        # Writes happen on the event loop thread, so lines never interleave
+        if "ndjson" in formats:
+            if include_markdown:
+                record["markdown"] = markdown
+            ndjson_file.write(json_codec.dumps(record) + "\n")
+            ndjson_file.flush()
+
+        if "markdown" in formats:
+            self._write_markdown_file(output_dir, record, markdown or "")
+
+        checkpoint_file.write("".join(f"{fmt} {post_id}\n" for fmt in formats))
+        checkpoint_file.flush()
+
+    def _build_record(self, post: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the metadata record written for each post"""
+        body = self._post_body(post)
+        if body is not None and not isinstance(body, str):
+            body = json_codec.dumps(body)
+
+        return {
+            "id": post.get("id"),
+            "title": post.get("title") or post.get("draft_title") or "Untitled",
+            "subtitle": post.get("subtitle") or post.get("draft_subtitle") or "",
+            "slug": post.get("slug") or post.get("draft_slug"),
+            "status": "published" if post.get("post_date") else "draft",
+            "audience": post.get("audience", "everyone"),
+            "post_date": post.get("post_date"),
+            "draft_updated_at": post.get("draft_updated_at"),
+            "draft_body": body,
+        }
+
+    def _post_body(self, post: Dict[str, Any]) -> Any:
+        """The body archived for a post, in the NDJSON record and Markdown alike
+
+        The published body comes first, as for the title, so a published
+        post with unpublished edits is archived as readers see it.
+        """
+        return post.get("body") or post.get("draft_body")
+
+    def _write_markdown_file(
+        self, output_dir: str, record: Dict[str, Any], markdown: str
+    ):
+        """Write one post as a Markdown file with front matter"""
+        filename = self._markdown_filename(record)
+        metadata = {
+            "id": str(record["id"]),
+            "title": record["title"],
+            "subtitle": record["subtitle"],
+            "audience": record["audience"],
+            "status": record["status"],
+            "post_date": record["post_date"],
+        }
+        path = os.path.join(output_dir, filename)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(dump_front_matter(metadata))
+            f.write("\n")
+            f.write(markdown)
+            f.write("\n")
+
+    def _markdown_filename(self, record: Dict[str, Any]) -> str:
+        """Build a stable, filesystem-safe filename for a post"""
+        slug = record.get("slug") or record.get("title") or ""
+        slug = re.sub(r"[^A-Za-z0-9_-]+", "-", str(slug)).strip("-").lower()[:80]
+        post_id = str(record["id"])
+        return f"{post_id}-{slug}.md" if slug else f"{post_id}.md"
+
+    def _trim_ndjson(self, ndjson_path: str, completed: Set[str]):
+        """Drop NDJSON records of posts missing from the checkpoint
+
+        A post's record is written before its checkpoint line, so a run
+        that stopped in between leaves a record (possibly cut short) for a
+        post that is exported again on resume. Removing it first keeps
+        each post in the file once.
+        """
+        if not os.path.exists(ndjson_path):
+            return
+        # Kept records stream straight to the new file, so memory stays
+        # bounded however large the archive is
+        temporary_path = ndjson_path + ".tmp"
+        dropped = 0
+        with (
+            open(ndjson_path, "r", encoding="utf-8") as source,
+            open(temporary_path, "w", encoding="utf-8") as target,
+        ):
+            for line in source:
+                try:
+                    post_id = str(json_codec.loads(line)["id"])
+                except (ValueError, KeyError, TypeError):
+                    post_id = None
+                if post_id in completed and line.endswith("\n"):
+                    target.write(line)
+                else:
+                    dropped += 1
+        if not dropped:
+            os.remove(temporary_path)
+            return
+
+        logger.info(f"Removing {dropped} unfinished record(s) from {ndjson_path}")
+        os.replace(temporary_path, ndjson_path)
+
+    def _load_checkpoint(self, checkpoint_path: str) -> Dict[str, Set[str]]:
+        """Load the IDs of posts a previous run exported, for each format
+
+        Each line is a format and a post ID; lines in any other shape are
+        ignored, so those posts are exported again.
+        """
+        completed: Dict[str, Set[str]] = {fmt: set() for fmt in self.SUPPORTED_FORMATS}
+        if not os.path.exists(checkpoint_path):
+            return completed
+        with open(checkpoint_path, "r", encoding="utf-8") as f:
+            for line in f:
+                fmt, _, post_id = line.strip().partition(" ")
+                if fmt in completed and post_id:
+                    completed[fmt].add(post_id)
+        return completed
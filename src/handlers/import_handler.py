@@ -0,0 +1,439 @@
+# ABOUTME: ImportHandler class for bulk-creating drafts from local files
+# ABOUTME: Converts Markdown/HTML files in parallel, throttles draft creation, resumes via journal
+
+import asyncio
+import hashlib
+import html
+import logging
+import os
+import re
+import threading
+from collections import deque
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+from urllib.parse import urljoin
+
+from src.converters.conversion_service import ConversionService
+from src.handlers.post_handler import PostHandler
+from src.utils import json_codec
+from src.utils.export_readers import iter_ghost_posts, iter_wxr_posts
+from src.utils.front_matter import parse_front_matter
+from src.utils.post_index import PostIndex
+from src.utils.rate_limiter import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+
+class ImportHandler:
+    """Handles bulk import of local content into Substack drafts"""
+
+    FILE_CONTENT_TYPES = {
+        ".md": "markdown",
+        ".markdown": "markdown",
+        ".html": "html",
+        ".htm": "html",
+    }
+    EXPORT_PLATFORMS = {".xml": "wordpress", ".json": "ghost"}
+    VALID_AUDIENCES = ["everyone", "only_paid", "founding", "only_free"]
+    JOURNAL_FILENAME = ".import_journal"
+    IMG_SRC = re.compile(
+        r"(<img\b[^>]*?\bsrc\s*=\s*)([\"'])(.*?)\2", re.IGNORECASE | re.DOTALL
+    )
+
+    def __init__(
+        self,
+        client,
+        requests_per_minute: float = 20,
+        concurrency: int = 4,
+        post_index: Optional[PostIndex] = None,
+    ):
+        """Initialize the import handler with an authenticated client
+
+        Args:
+            client: An authenticated Substack API client
+            requests_per_minute: Maximum number of drafts created per minute
+            concurrency: Number of files converted in parallel
+            post_index: Optional shared title/slug index updated with new drafts
+
+        Raises:
+            ValueError: If invalid settings provided
+        """
+        if not isinstance(concurrency, int) or concurrency < 1 or concurrency > 16:
+            raise ValueError("concurrency must be an integer between 1 and 16")
+
+        self.client = client
+        self.concurrency = concurrency
+        self.rate_limiter = RateLimiter(requests_per_minute)
+        self.post_handler = PostHandler(client, post_index=post_index)
+        self.conversion_service = ConversionService(
+            max_workers=min(concurrency, os.cpu_count() or 1)
+        )
+        self._image_urls: Dict[str, str] = {}
+        self._image_lock = threading.Lock()
+
+    async def import_directory(
+        self,
+        directory: str,
+        recursive: bool = True,
+        dry_run: bool = False,
+        journal_path: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Create a draft for every Markdown or HTML file in a directory
+
+        Files may start with a front matter block providing ``title``,
+        ``subtitle`` and ``audience``. Without a title, a leading ``# Heading``
+        or the filename is used. A journal keyed by the SHA-256 of each
+        file's bytes records what has been imported, so re-running skips
+        files that were already created, even if they were moved or renamed.
+
+        Args:
+            directory: Directory to import from
+            recursive: Also import files in subdirectories
+            dry_run: Only report what would be imported
+            journal_path: Journal location (defaults to a file in the directory)
+
+        Returns:
+            Summary with imported, skipped and failed files
+
+        Raises:
+            ValueError: If the directory does not exist
+        """
+        if not directory or not isinstance(directory, str):
+            raise ValueError("directory must be a non-empty string")
+
+        directory = os.path.abspath(os.path.expanduser(directory))
+        if not os.path.isdir(directory):
+            raise ValueError(f"Directory not found: {directory}")
+
+        journal_path = journal_path or os.path.join(directory, self.JOURNAL_FILENAME)
+        paths = self._find_files(directory, recursive)
+        logger.info(f"Found {len(paths)} importable file(s) in {directory}")
+
+        return await self.import_items(
+            (self._read_file(path) for path in paths),
+            journal_path,
+            dry_run=dry_run,
+        )
+
+    async def import_export_file(
+        self,
+        path: str,
+        include_pages: bool = False,
+        rehost_images: bool = True,
+        site_url: Optional[str] = None,
+        dry_run: bool = False,
+        journal_path: Optional[str] = None,
+        progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ) -> Dict[str, Any]:
+        """Create a draft for every post in a WordPress or Ghost export
+
+        WordPress WXR (.xml) and Ghost JSON (.json) exports are read as a
+        stream, so files of any size are imported with constant memory.
+        Each post's HTML goes through the HTML converter, and images can
+        be re-uploaded to the Substack CDN so drafts do not depend on the
+        old site. The journal is keyed by the platform's post ID, so an
+        interrupted import resumes where it stopped.
+
+        Args:
+            path: Path to the export file
+            include_pages: Also import pages, not just posts
+            rehost_images: Upload inline images to Substack and rewrite their URLs
+            site_url: Base URL for relative image paths (Ghost's __GHOST_URL__)
+            dry_run: Only report what would be imported
+            journal_path: Journal location (defaults to a file next to the export)
+            progress: Optional callback invoked with the summary after each post
+
+        Returns:
+            Summary with imported, skipped and failed posts
+
+        Raises:
+            ValueError: If the file does not exist or is not a supported export
+        """
+        if not path or not isinstance(path, str):
+            raise ValueError("path must be a non-empty string")
+
+        path = os.path.abspath(os.path.expanduser(path))
+        if not os.path.isfile(path):
+            raise ValueError(f"File not found: {path}")
+
+        platform = self.EXPORT_PLATFORMS.get(os.path.splitext(path)[1].lower())
+        if platform is None:
+            raise ValueError(
+                "Unsupported export file - expected a WordPress .xml or Ghost .json file"
+            )
+
+        journal_path = journal_path or path + self.JOURNAL_FILENAME
+        reader = iter_wxr_posts if platform == "wordpress" else iter_ghost_posts
+        logger.info(f"Importing {platform} export {path}")
+
+        return await self.import_items(
+            self._export_items(
+                reader(path, include_pages=include_pages),
+                platform,
+                rehost_images,
+                site_url,
+            ),
+            journal_path,
+            dry_run=dry_run,
+            progress=progress,
+        )
+
+    async def import_items(
+        self,
+        items: Iterable[Dict[str, Any]],
+        journal_path: str,
+        dry_run: bool = False,
+        progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ) -> Dict[str, Any]:
+        """Run import items through conversion and throttled draft creation
+
+        Each item is a dict with ``key`` (the journal key), ``source`` (a
+        label for reporting), ``title``, ``subtitle``, ``audience``,
+        ``content`` and ``content_type``. Items are consumed lazily and at
+        most ``concurrency`` of them are being converted at any time.
+        Drafts are created in input order.
+
+        Args:
+            items: Iterable of import items
+            journal_path: Path of the resume journal
+            dry_run: Only report what would be imported
+            progress: Optional callback invoked with the summary after each item
+
+        Returns:
+            Summary with imported, skipped and failed items
+        """
+        journal = self._load_journal(journal_path)
+        summary: Dict[str, Any] = {"imported": [], "skipped": [], "failed": []}
+
+        user_id = None
+        if not dry_run:
+            user_id = await asyncio.to_thread(self.client.get_user_id)
+
+        pending: deque = deque()
+        journal_file = None if dry_run else open(journal_path, "a", encoding="utf-8")
+
+        async def finish_oldest():
+            item, task = pending.popleft()
+            try:
+                draft = await task
+                await self.rate_limiter.acquire()
+                result = await asyncio.to_thread(self.post_handler.send_draft, draft)
+                post_id = result.get("id") if isinstance(result, dict) else None
+                entry = {"key": item["key"], "source": item["source"], "id": post_id}
+                journal_file.write(json_codec.dumps(entry) + "\n")
+                journal_file.flush()
+                journal[item["key"]] = post_id
+                summary["imported"].append(
+                    {"source": item["source"], "title": item["title"], "id": post_id}
+                )
+            except Exception as e:
+                logger.error(f"Failed to import {item['source']}: {e}")
+                summary["failed"].append({"source": item["source"], "error": str(e)})
+            if progress:
+                progress(summary)
+
+        try:
+            for item in items:
+                if "error" in item:
+                    summary["failed"].append(
+                        {"source": item["source"], "error": item["error"]}
+                    )
+                    continue
+
+                if item["key"] in journal:
+                    summary["skipped"].append(item["source"])
+                    continue
+
+                # Mark as seen so duplicate files in one run are only created once
+                journal[item["key"]] = None
+
+                if dry_run:
+                    summary["imported"].append(
+                        {"source": item["source"], "title": item["title"], "id": None}
+                    )
+                    continue
+
+                task = asyncio.ensure_future(self._build_item_draft(item, user_id))
+                pending.append((item, task))
+                if len(pending) >= self.concurrency:
+                    await finish_oldest()
+
+            while pending:
+                await finish_oldest()
+        finally:
+            for _, task in pending:
+                task.cancel()
+            if journal_file:
+                journal_file.close()
+            self.conversion_service.close()
+
+        action = "Would import" if dry_run else "Imported"
+        summary["message"] = (
+            f"{action} {len(summary['imported'])} item(s), skipped "
+            f"{len(summary['skipped'])} already imported, "
+            f"{len(summary['failed'])} failed"
+        )
+        return summary
+
+    async def _build_item_draft(self, item: Dict[str, Any], user_id) -> Dict[str, Any]:
+        """Convert one import item into a draft payload
+
+        Images are re-hosted in a thread and the content is converted by
+        the conversion service, so neither blocks the event loop.
+        """
+        content = item["content"]
+        if item.get("rehost_images"):
+            content = await asyncio.to_thread(
+                self._rehost_images, content, item.get("site_url")
+            )
+
+        blocks = await self.conversion_service.convert(content, item["content_type"])
+        return await asyncio.to_thread(
+            self._finish_item_draft, item, content, blocks, user_id
+        )
+
+    def _finish_item_draft(
+        self, item: Dict[str, Any], content: str, blocks: List[Any], user_id
+    ) -> Dict[str, Any]:
+        """Build the draft payload from an item's converted blocks"""
+        return self.post_handler.build_draft(
+            item["title"],
+            content,
+            subtitle=item.get("subtitle"),
+            content_type=item["content_type"],
+            audience=item.get("audience"),
+            user_id=user_id,
+            blocks=blocks,
+        )
+
+    def _export_items(
+        self,
+        posts: Iterable[Dict[str, Any]],
+        platform: str,
+        rehost_images: bool,
+        site_url: Optional[str],
+    ) -> Iterator[Dict[str, Any]]:
+        """Turn posts from an export reader into import items"""
+        for post in posts:
+            source = f"{platform} post {post['id']}"
+            if post.get("slug"):
+                source += f" ({post['slug']})"
+            if not post["html"].strip():
+                yield {"source": source, "error": "Post has no HTML content"}
+                continue
+
+            yield {
+                "key": f"{platform}:{post['id']}",
+                "source": source,
+                "title": (post["title"] or "Untitled")[:280],
+                "subtitle": (post.get("subtitle") or "")[:280],
+                "audience": post.get("audience"),
+                "content": post["html"],
+                "content_type": "html",
+                "rehost_images": rehost_images,
+                "site_url": site_url or post.get("site_url"),
+            }
+
+    def _rehost_images(self, content: str, site_url: Optional[str]) -> str:
+        """Upload the images referenced by HTML and point it at the copies
+
+        Runs in a worker thread. Uploads are cached per URL, and an image
+        that fails to upload keeps its original (absolute) URL.
+        """
+
+        def replace(match: re.Match) -> str:
+            url = html.unescape(match.group(3)).strip()
+            if site_url:
+                url = urljoin(
+                    site_url.rstrip("/") + "/",
+                    url.replace("__GHOST_URL__", site_url.rstrip("/")),
+                )
+            if not url.startswith(("http://", "https://")) or (
+                "substackcdn.com" in url or "substack-post-media" in url
+            ):
+                return match.group(0)
+
+            with self._image_lock:
+                new_url = self._image_urls.get(url)
+            if new_url is None:
+                try:
+                    new_url = self.client.get_image(url).get("url") or url
+                except Exception as e:
+                    logger.warning(f"Could not re-host image {url}: {e}")
+                    new_url = url
+                with self._image_lock:
+                    self._image_urls[url] = new_url
+
+            return f"{match.group(1)}{match.group(2)}{html.escape(new_url)}{match.group(2)}"
+
+        return self.IMG_SRC.sub(replace, content)
+
+    def _find_files(self, directory: str, recursive: bool) -> List[str]:
+        """List importable files in a stable order, skipping hidden entries"""
+        paths = []
+        for root, dirs, files in os.walk(directory):
+            dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+            for name in sorted(files):
+                extension = os.path.splitext(name)[1].lower()
+                if not name.startswith(".") and extension in self.FILE_CONTENT_TYPES:
+                    paths.append(os.path.join(root, name))
+            if not recursive:
+                break
+        return paths
+
+    def _read_file(self, path: str) -> Dict[str, Any]:
+        """Read a file and turn it into an import item"""
+        try:
+            with open(path, "rb") as f:
+                raw = f.read()
+            text = raw.decode("utf-8-sig")
+        except (OSError, UnicodeDecodeError) as e:
+            return {"source": path, "error": f"Could not read file: {e}"}
+
+        metadata, body = parse_front_matter(text)
+        content_type = self.FILE_CONTENT_TYPES[os.path.splitext(path)[1].lower()]
+
+        title = metadata.get("title")
+        if not title and content_type == "markdown":
+            for line in body.split("\n"):
+                if line.strip():
+                    if line.startswith("# "):
+                        title = line[2:].strip()
+                    break
+        if not title:
+            stem = os.path.splitext(os.path.basename(path))[0]
+            title = stem.replace("-", " ").replace("_", " ").strip().capitalize()
+
+        audience = metadata.get("audience")
+        if audience is not None and audience not in self.VALID_AUDIENCES:
+            return {
+                "source": path,
+                "error": f"audience must be one of: {', '.join(self.VALID_AUDIENCES)}",
+            }
+
+        if not body.strip():
+            return {"source": path, "error": "File has no content"}
+
+        return {
+            "key": hashlib.sha256(raw).hexdigest(),
+            "source": path,
+            "title": str(title)[:280],
+            "subtitle": str(metadata.get("subtitle") or "")[:280],
+            "audience": audience,
+            "content": body,
+            "content_type": content_type,
+        }
+
+    def _load_journal(self, journal_path: str) -> Dict[str, Optional[str]]:
+        """Load the journal of previously imported items keyed by content hash"""
+        journal: Dict[str, Optional[str]] = {}
+        if not os.path.exists(journal_path):
+            return journal
+        with open(journal_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json_codec.loads(line)
+                except ValueError:
+                    # A torn final line from an interrupted run
+                    continue
+                journal[entry["key"]] = entry.get("id")
+        return journal
@@ -1,15 +1,21 @@
 # ABOUTME: PostHandler class for managing Substack post operations
 # ABOUTME: Handles creating, updating, publishing, and listing posts with formatting
 
+import io
 import logging
-from typing import Any, Dict, List, Optional
-
-from substack.post import Post
+from collections.abc import Mapping
+from typing import Any, Dict, List, Optional, TextIO, Tuple
 
 from src.converters.block_builder import BlockBuilder
+from src.converters.document_cache import DocumentCache
+from src.converters.draft_body import DraftBodySerializer, plain_paragraphs
 from src.converters.html_converter import HTMLConverter
 from src.converters.markdown_converter import MarkdownConverter
+from src.converters.markdown_renderer import MarkdownRenderer
+from src.utils import json_codec
 from src.utils.api_wrapper import SubstackAPIError
+from src.utils.block_diff import body_blocks, diff_blocks, summarize_diff
+from src.utils.post_index import PostIndex
 
 logger = logging.getLogger(__name__)
 
@@ -17,16 +23,31 @@ logger = logging.getLogger(__name__)
 class PostHandler:
     """Handles post operations for Substack"""
 
-    def __init__(self, client):
+    # Listing pages scanned when resolving a title or slug missing from the index
+    MAX_RESOLVE_PAGES = 40
+    LISTING_PAGE_SIZE = 25
+
+    def __init__(
+        self,
+        client,
+        post_index: Optional[PostIndex] = None,
+        document_cache: Optional[DocumentCache] = None,
+    ):
         """Initialize the post handler with an authenticated client
 
         Args:
             client: An authenticated Substack API client
+            post_index: Optional shared title/slug index kept current by this handler
+            document_cache: Optional shared cache of converted posts, so
+                updates to a post only reconvert the parts that changed
         """
         self.client = client
-        self.markdown_converter = MarkdownConverter()
+        self.post_index = post_index if post_index is not None else PostIndex()
+        self.markdown_converter = MarkdownConverter(document_cache=document_cache)
         self.html_converter = HTMLConverter()
         self.block_builder = BlockBuilder()
+        self.draft_serializer = DraftBodySerializer()
+        self.markdown_renderer = MarkdownRenderer()
 
         # Debug: Log client type and attributes
         logger.debug(f"PostHandler initialized with client type: {type(client)}")
@@ -80,60 +101,76 @@ class PostHandler:
             raise ValueError(
                 f"content_type must be one of: {', '.join(valid_content_types)}"
             )
-        # Convert content to blocks based on type
-        blocks = self._convert_content_to_blocks(content, content_type)
+        draft = self.build_draft(
+            title, content, subtitle=subtitle, content_type=content_type
+        )
+        return self.send_draft(draft)
 
-        # Handle paywall markers in content
-        blocks = self._process_paywall_markers(content, blocks, content_type)
+    def build_draft(
+        self,
+        title: str,
+        content: str,
+        subtitle: Optional[str] = None,
+        content_type: str = "markdown",
+        audience: Optional[str] = None,
+        user_id=None,
+        blocks: Optional[List[Dict[str, Any]]] = None,
+    ) -> Dict[str, Any]:
+        """Build the payload for a new draft without creating it
 
-        # Remove duplicate title if the first block is a heading matching the post title
-        if blocks and blocks[0].get("type") in [
-            "heading-one",
-            "heading-two",
-            "heading-three",
-            "heading-four",
-            "heading-five",
-            "heading-six",
-        ]:
-            # Extract text from the first block's content
-            first_block_text = self._extract_text_from_content(
-                blocks[0].get("content", [])
-            )
-            # Compare case-insensitively
-            if first_block_text.strip().lower() == title.strip().lower():
-                logger.info(
-                    f"Removing duplicate title from content: {first_block_text}"
-                )
-                blocks = blocks[1:]  # Skip the first block
+        Does no input validation; ``create_draft`` validates and then
+        builds and sends the payload.
 
-        # Create a Post object as required by python-substack
-        # Get user_id from the client
-        user_id = self.client.get_user_id()
-
-        # Check if content has paywall markers - if so, set audience to paid subscribers
-        audience = "everyone"  # default
-        paywall_markers = [
-            "<!-- PAYWALL -->",
-            "<!--PAYWALL-->",
-            "<!--paywall-->",
-            "<!-- paywall -->",
-        ]
-        if content_type == "markdown":
-            for marker in paywall_markers:
-                if marker in content:
-                    audience = "only_paid"
-                    break
+        Args:
+            title: The post title
+            content: The post content
+            subtitle: Optional subtitle
+            content_type: Type of content ("markdown", "html", or "plain")
+            audience: Post audience, instead of the one the content implies
+            user_id: The author's user ID, fetched from the client if not given
+            blocks: The content already converted, e.g. by a ConversionService
+
+        Returns:
+            The draft payload, for ``send_draft``
+
+        Raises:
+            ValueError: If content_type is not supported
+        """
+        if content_type == "plain" and blocks is None:
+            # Plain text is only paragraphs, with no heading to drop and no
+            # paywall, so it is written straight to the draft body
+            body = self.draft_serializer.dumps_plain_text(content)
+            blocks, content_audience = [], "everyone"
+        else:
+            body = None
+            blocks, content_audience = self._prepare_draft_blocks(
+                title, content, content_type, blocks=blocks
+            )
 
-        # Create Post object
-        post = Post(
-            title=title, subtitle=subtitle or "", user_id=user_id, audience=audience
+        # Get user_id from the client for the byline
+        if user_id is None:
+            user_id = self.client.get_user_id()
+        return self._build_draft(
+            title,
+            subtitle,
+            blocks,
+            audience or content_audience,
+            user_id,
+            draft_body=body,
         )
 
-        # Add content blocks using the Post object's methods
-        self._add_blocks_to_post(post, blocks)
+    def send_draft(self, draft: Dict[str, Any]) -> Dict[str, Any]:
+        """Create a draft from a payload made by ``build_draft``
 
-        # Create the draft
-        return self.client.post_draft(post.get_draft())
+        Args:
+            draft: The draft payload
+
+        Returns:
+            The created post data from Substack
+        """
+        result = self.client.post_draft(draft)
+        self._index_post(result, draft["draft_title"])
+        return result
 
     async def update_draft(
         self,
@@ -145,6 +182,9 @@ class PostHandler:
     ) -> Dict[str, Any]:
         """Update an existing draft post
 
+        Fields that already hold the new value are left out of the update,
+        and nothing is sent when none of them changed.
+
         Args:
             post_id: The ID of the post to update
             title: New title (optional)
@@ -153,7 +193,41 @@ class PostHandler:
             content_type: Type of content if content is provided
 
         Returns:
-            The updated post data from Substack
+            The updated post data from Substack, or the current post when
+            nothing changed
+
+        Raises:
+            ValueError: If invalid input provided
+        """
+        plan = await self.plan_update(post_id, title, content, subtitle, content_type)
+        return await self.apply_update(plan)
+
+    async def plan_update(
+        self,
+        post_id: str,
+        title: Optional[str] = None,
+        content: Optional[str] = None,
+        subtitle: Optional[str] = None,
+        content_type: str = "markdown",
+    ) -> Dict[str, Any]:
+        """Work out what an update would change, without sending it
+
+        The new content is converted and its blocks are compared with the
+        body the post holds now, so an unchanged body is not uploaded again
+        and a changed one comes with a block-level diff.
+
+        Args:
+            post_id: The ID of the post to update
+            title: New title (optional)
+            content: New content (optional)
+            subtitle: New subtitle (optional)
+            content_type: Type of content if content is provided
+
+        Returns:
+            Dictionary with the post_id, the fields to send ("update_data",
+            empty when nothing changed), the block "diff" of the content
+            (None when no content was given or the current body cannot be
+            read, see block_diff.diff_blocks) and the "current" post
 
         Raises:
             ValueError: If invalid input provided
@@ -188,33 +262,37 @@ class PostHandler:
         is_draft = not current_draft.get("post_date")
 
         update_data = {}
+        diff = None
 
         if title is not None:
             # Use draft_title for drafts, title for published
-            if is_draft:
-                update_data["draft_title"] = title
-            else:
-                update_data["title"] = title
+            key = "draft_title" if is_draft else "title"
+            if current_draft.get(key) != title:
+                update_data[key] = title
 
         if subtitle is not None:
             # Use draft_subtitle for drafts, subtitle for published
-            if is_draft:
-                update_data["draft_subtitle"] = subtitle
-            else:
-                update_data["subtitle"] = subtitle
-
-        if content is not None:
-            # For content updates, we need to use the same format as Post.get_draft()
-            # Create a temporary Post object to format the content properly
-            temp_post = Post(
-                title=title or "Temp",
-                subtitle=subtitle or "",
-                user_id=self.client.get_user_id(),
-            )
+            key = "draft_subtitle" if is_draft else "subtitle"
+            if current_draft.get(key) != subtitle:
+                update_data[key] = subtitle
+
+        if content is not None and content_type == "plain":
+            # Plain text is written straight to the body; it is only decoded
+            # again when there is a current body to compare it with
+            key = "draft_body" if is_draft else "body"
+            new_json = self.draft_serializer.dumps_plain_text(content)
+            current_blocks = self._current_body_blocks(current_draft.get(key))
+            if current_blocks is not None:
+                diff = diff_blocks(
+                    current_blocks, json_codec.loads(new_json)["content"]
+                )
+            if diff is None or not diff["identical"]:
+                update_data[key] = new_json
 
-            # Convert and add blocks
-            blocks = self._convert_content_to_blocks(content, content_type)
-            blocks = self._process_paywall_markers(content, blocks, content_type)
+        elif content is not None:
+            # Convert blocks, reusing those of the post's last conversion
+            blocks = self._convert_content_to_blocks(content, content_type, post_id)
+            blocks = self._single_paywall(blocks)
 
             # Remove duplicate title if updating with a title and first block matches
             if (
@@ -239,19 +317,63 @@ class PostHandler:
                     )
                     blocks = blocks[1:]
 
-            # Add blocks to Post object
-            self._add_blocks_to_post(temp_post, blocks)
+            # Use draft_body for drafts, body for published (same format for both)
+            key = "draft_body" if is_draft else "body"
+            new_body = self.draft_serializer.serialize(blocks)
+            current_blocks = self._current_body_blocks(current_draft.get(key))
+            if current_blocks is not None:
+                diff = diff_blocks(current_blocks, new_body["content"])
+            if diff is None or not diff["identical"]:
+                update_data[key] = json_codec.dumps(new_body)
+
+        return {
+            "post_id": post_id,
+            "update_data": update_data,
+            "diff": diff,
+            "current": current_draft,
+        }
+
+    async def apply_update(self, plan: Dict[str, Any]) -> Dict[str, Any]:
+        """Send an update worked out by plan_update
 
-            # Get the properly formatted draft data
-            temp_draft = temp_post.get_draft()
+        Args:
+            plan: The dictionary returned by plan_update
 
-            # Use draft_body for drafts, body for published
-            if is_draft:
-                update_data["draft_body"] = temp_draft["draft_body"]
-            else:
-                update_data["body"] = temp_draft["draft_body"]  # Same format for both
+        Returns:
+            The updated post data from Substack, or the current post when
+            the plan has nothing to send
+        """
+        post_id = plan["post_id"]
+        update_data = plan["update_data"]
+        diff = plan["diff"]
+        if diff is not None:
+            logger.info(f"update_draft {post_id}: body {summarize_diff(diff)}")
+
+        if not update_data:
+            logger.info(f"update_draft {post_id}: nothing changed, skipping upload")
+            return plan["current"]
+
+        result = self.client.put_draft(post_id, **update_data)
+        self._index_post(
+            result, update_data.get("draft_title") or update_data.get("title")
+        )
+        return result
+
+    def _current_body_blocks(self, body: Any) -> Optional[List[Any]]:
+        """Decode a post's current body and return its top-level blocks
+
+        Args:
+            body: The body as returned by the API, a JSON string or a dict
 
-        return self.client.put_draft(post_id, **update_data)
+        Returns:
+            The blocks, or None if the body is missing or not a document
+        """
+        if isinstance(body, str):
+            try:
+                body = json_codec.loads(body)
+            except ValueError:
+                return None
+        return body_blocks(body)
 
     async def publish_draft(self, post_id: str) -> Dict[str, Any]:
         """Publish a draft post immediately
@@ -269,7 +391,128 @@ class PostHandler:
         if not post_id or not isinstance(post_id, str):
             raise ValueError("post_id must be a non-empty string")
 
-        return self.client.publish_draft(post_id)
+        result = self.client.publish_draft(post_id)
+        self._index_post(result)
+        return result
+
+    async def delete_draft(self, post_id: str) -> bool:
+        """Delete a draft post
+
+        Args:
+            post_id: The ID of the draft to delete
+
+        Returns:
+            True if the draft was deleted
+
+        Raises:
+            ValueError: If invalid input provided
+        """
+        if not post_id or not isinstance(post_id, str):
+            raise ValueError("post_id must be a non-empty string")
+
+        self.client.delete_draft(post_id)
+        self.post_index.remove(post_id)
+        self.markdown_converter.document_cache.discard(post_id)
+        return True
+
+    async def resolve_post_id(self, identifier: str) -> str:
+        """Resolve a post ID, slug, post URL or title to a post ID
+
+        Numeric identifiers are returned unchanged. Anything else is looked
+        up in the title/slug index; on a miss the drafts listing is paged
+        through (refreshing the index) until the post is found. Identifiers
+        that match nothing are returned unchanged so the API can report
+        them.
+
+        Args:
+            identifier: The post ID, slug, URL or title
+
+        Returns:
+            The post ID
+
+        Raises:
+            ValueError: If the identifier is empty or matches several posts
+        """
+        if not identifier or not isinstance(identifier, str):
+            raise ValueError("post_id must be a non-empty string")
+
+        identifier = identifier.strip()
+        if identifier.isdigit():
+            return identifier
+
+        matches = self.post_index.lookup(identifier)
+        if not matches:
+            matches = await self._scan_listing_for(identifier)
+
+        if not matches:
+            return identifier
+
+        if len(matches) > 1:
+            candidates = ", ".join(
+                f'"{self.post_index.title_of(m)}" (ID: {m})' for m in matches
+            )
+            raise ValueError(
+                f"Multiple posts match '{identifier}': {candidates}. "
+                "Use the post ID instead."
+            )
+
+        return matches[0]
+
+    async def find_posts(self, query: str) -> List[Dict[str, Any]]:
+        """Find posts by slug, post URL or title
+
+        Exact (normalized) slug and title matches are returned when there
+        are any; otherwise posts whose title contains the query.
+
+        Args:
+            query: The slug, URL, title or part of a title to search for
+
+        Returns:
+            List of matching posts with their ID and title
+
+        Raises:
+            ValueError: If query is empty
+        """
+        if not query or not isinstance(query, str):
+            raise ValueError("query must be a non-empty string")
+
+        matches = self.post_index.lookup(query)
+        if not matches:
+            matches = await self._scan_listing_for(query)
+        if not matches:
+            matches = self.post_index.search(query)
+
+        return [{"id": m, "title": self.post_index.title_of(m)} for m in matches]
+
+    async def _scan_listing_for(self, identifier: str) -> List[str]:
+        """Page through the drafts listing until the identifier is indexed"""
+        for page_number in range(self.MAX_RESOLVE_PAGES):
+            offset = page_number * self.LISTING_PAGE_SIZE
+            try:
+                if offset:
+                    page = self.client.get_drafts(
+                        limit=self.LISTING_PAGE_SIZE, offset=offset
+                    )
+                else:
+                    page = self.client.get_drafts(limit=self.LISTING_PAGE_SIZE)
+                page = list(page or [])
+            except Exception as e:
+                logger.warning(f"Listing scan failed at offset {offset}: {e}")
+                return []
+
+            self.post_index.update_many(page)
+            matches = self.post_index.lookup(identifier)
+            if matches or len(page) < self.LISTING_PAGE_SIZE:
+                return matches
+
+        return []
+
+    def _index_post(self, post: Any, title: Optional[str] = None):
+        """Record a post returned by a write call in the title/slug index"""
+        if isinstance(post, dict):
+            if title and not (post.get("draft_title") or post.get("title")):
+                post = {**post, "draft_title": title}
+            self.post_index.update(post)
 
     async def list_drafts(self, limit: int = 10) -> List[Dict[str, Any]]:
         """List recent draft posts
@@ -313,6 +556,7 @@ class PostHandler:
 
             all_posts = list(raw_result)
             logger.info(f"Retrieved {len(all_posts)} posts from API")
+            self.post_index.update_many(p for p in all_posts if isinstance(p, dict))
 
             # If empty, let's try a different approach
             if len(all_posts) == 0:
@@ -370,7 +614,8 @@ class PostHandler:
             raise ValueError("limit must be between 1 and 25")
 
         # Get all posts and filter for published only
-        all_posts = self.client.get_drafts(limit=min(limit, 25))
+        all_posts = list(self.client.get_drafts(limit=min(limit, 25)))
+        self.post_index.update_many(p for p in all_posts if isinstance(p, dict))
         published = []
 
         for post in all_posts:
@@ -426,6 +671,8 @@ class PostHandler:
                     f"Invalid response from Substack API - expected dict, got {type(post)}"
                 )
 
+            self.post_index.update(post)
+
             # Debug: Log the structure of the response
             logger.debug(f"Post keys: {list(post.keys())[:20]}")
             logger.debug(
@@ -490,6 +737,11 @@ class PostHandler:
     ) -> Dict[str, Any]:
         """Create a copy of an existing post as a new draft
 
+        The body is copied exactly as the API returns it, without decoding
+        it and converting it again, so the copy keeps everything the
+        original has (lists, images, marks, embeds). Only the title,
+        subtitle and audience are set.
+
         Args:
             post_id: The ID of the post to duplicate
             new_title: Optional title for the new draft (defaults to "Copy of [original]")
@@ -526,58 +778,49 @@ class PostHandler:
             title = new_title or f"Copy of {original_title}"
             subtitle = original.get("subtitle") or original.get("draft_subtitle", "")
 
-            # Extract content blocks
-            # Safely get body - it could be a dict OR a JSON string
+            # The body is copied as the API returned it; only the title,
+            # subtitle and audience around it are new
             body = original.get("body") or original.get("draft_body")
-
-            if isinstance(body, str):
-                # Try to parse JSON string
-                try:
-                    import json
-
-                    parsed_body = json.loads(body)
-                    if isinstance(parsed_body, dict) and "blocks" in parsed_body:
-                        body = parsed_body
+            blocks: List[Any] = []
+            draft_body = None
+            # get_draft marks JSON bodies; only a document is copied as it is
+            is_document = isinstance(body, json_codec.LazyJSON) and (
+                json_codec.looks_like_document(body)
+            )
+            if is_document:
+                # Serialized document, copied without decoding it
+                draft_body = body
+            else:
+                if isinstance(body, str) and body.lstrip().startswith("{"):
+                    # Not known to be a document; decode it to find out
+                    try:
+                        decoded = json_codec.loads(body)
+                    except ValueError:
+                        decoded = None
+                    if isinstance(decoded, dict):
+                        body = decoded
+
+                if isinstance(body, str):
+                    blocks = [self.block_builder.paragraph(body)]
+                elif isinstance(body, dict):
+                    if "blocks" in body:
+                        blocks = body["blocks"]
                     else:
-                        # Not the expected format, create a text block
-                        body = {
-                            "blocks": [
-                                {
-                                    "type": "paragraph",
-                                    "content": [{"type": "text", "content": body}],
-                                }
-                            ]
-                        }
-                except (json.JSONDecodeError, ValueError):
-                    # Not JSON, create a text block
-                    body = {
-                        "blocks": [
-                            {
-                                "type": "paragraph",
-                                "content": [{"type": "text", "content": body}],
-                            }
-                        ]
-                    }
-            elif not isinstance(body, dict):
-                logger.warning(f"Original post body is not a dict: {type(body)}")
-                body = {}
-
-            blocks = body.get("blocks", [])
-
-            # Create new post with same content
+                        draft_body = json_codec.dumps(body)
+                else:
+                    logger.warning(f"Original post body is not a dict: {type(body)}")
+
             user_id = self.client.get_user_id()
-            post = Post(
-                title=title,
-                subtitle=subtitle,
-                user_id=user_id,
-                audience=original.get("audience", "everyone"),
+            draft = self._build_draft(
+                title,
+                subtitle,
+                blocks,
+                original.get("audience", "everyone"),
+                user_id,
+                draft_body=draft_body,
             )
-
-            # Add all blocks to the new post
-            self._add_blocks_to_post(post, blocks)
-
-            # Create the draft
-            result = self.client.post_draft(post.get_draft())
+            result = self.client.post_draft(draft)
+            self._index_post(result, title)
             return result
 
         except SubstackAPIError as e:
@@ -805,391 +1048,147 @@ class PostHandler:
             raise ValueError(f"Failed to generate preview for post {post_id}: {str(e)}")
 
     def _extract_readable_content(self, post: Dict[str, Any]) -> str:
-        """Extract content from a post in a readable text format
+        """Extract content from a post as Markdown
 
         Args:
             post: The post data
 
         Returns:
-            Readable text content
+            Markdown that MarkdownConverter reads back as the same blocks
+        """
+        out = io.StringIO()
+        self.write_readable_content(post, out)
+        return out.getvalue().strip()
+
+    def write_readable_content(self, post: Dict[str, Any], out: TextIO):
+        """Write the content of a post as Markdown to a text stream
+
+        Bodies stored as JSON are rendered block by block, so a large post
+        can be written to a file without building the whole string. A body
+        that is not JSON is written as it is.
+
+        Args:
+            post: The post data
+            out: Any writable text stream
         """
         # Safely get body - it could be a dict OR a string
         body = post.get("body") or post.get("draft_body")
-        logger.debug(f"_extract_readable_content - body type: {type(body)}")
+        logger.debug(f"write_readable_content - body type: {type(body)}")
+        self.markdown_renderer.write_body(body, out)
 
-        # If body is a string, it might be JSON
-        if isinstance(body, str):
-            logger.info(f"Body is a string. Length: {len(body)}")
+    def _prepare_draft_blocks(
+        self,
+        title: str,
+        content: str,
+        content_type: str,
+        blocks: Optional[List[Dict[str, Any]]] = None,
+    ) -> Tuple[List[Dict[str, Any]], str]:
+        """Convert content to blocks ready for a new draft
 
-            # Try to parse it as JSON
-            try:
-                import json
-
-                parsed_body = json.loads(body)
-
-                # Check for different JSON structures
-                if isinstance(parsed_body, dict):
-                    if "blocks" in parsed_body:
-                        logger.info("Found blocks structure")
-                        body = parsed_body
-                        # Continue to process blocks below
-                    elif parsed_body.get("type") == "doc" and "content" in parsed_body:
-                        logger.info("Found doc/content structure, converting to blocks")
-                        # This is a different format - convert content array to blocks
-                        body = {"blocks": parsed_body["content"]}
-                        # Continue to process blocks below
-                    else:
-                        # Unknown structure, return as-is
-                        logger.warning(
-                            f"Unknown JSON structure: {list(parsed_body.keys())[:5]}"
-                        )
-                        return body
-                else:
-                    # Not the expected format, return as-is
-                    return body
-            except (json.JSONDecodeError, ValueError):
-                # Not JSON, return the string as-is
-                logger.debug("Body string is not JSON, returning as plain text")
-                return body
-
-        # If body is not a dict, we can't extract blocks
-        if not isinstance(body, dict):
-            logger.warning(f"Post body is neither string nor dict: {type(body)}")
-            return ""
-
-        # Body is a dict, proceed with block extraction
-        logger.debug(f"Body keys: {list(body.keys())[:10]}")
-
-        blocks = body.get("blocks", [])
-        logger.debug(f"Number of blocks: {len(blocks)}")
-        if blocks:
-            logger.debug(
-                f"First block type: {blocks[0].get('type') if isinstance(blocks[0], dict) else 'not a dict'}"
-            )
+        Args:
+            title: The post title, used to drop a duplicate leading heading
+            content: The post content
+            content_type: Type of content ("markdown", "html", or "plain")
+            blocks: The content already converted, e.g. by a ConversionService
 
-        content_parts = []
-        for block in blocks:
-            block_type = block.get("type")
+        Returns:
+            A tuple of (blocks, audience). Audience is "only_paid" when the
+            content has a paywall, otherwise "everyone".
+        """
+        # Convert content to blocks based on type
+        if blocks is None:
+            blocks = self._convert_content_to_blocks(content, content_type)
 
-            if block_type == "paragraph":
-                text = self._extract_text_from_content(block.get("content", []))
-                if text:
-                    content_parts.append(text)
+        # Paywall markers were converted to paywall blocks in the same pass
+        blocks = self._single_paywall(blocks)
 
-            elif (
-                block_type in ["heading-one", "heading-two", "heading-three"]
-                or block_type == "heading"
-            ):
-                text = self._extract_text_from_content(block.get("content", []))
-                if text:
-                    # Check if attrs contains level for new format
-                    if block_type == "heading" and "attrs" in block:
-                        level_num = block["attrs"].get("level", 1)
-                        level = "#" * level_num
-                    else:
-                        level = {
-                            "heading-one": "#",
-                            "heading-two": "##",
-                            "heading-three": "###",
-                        }.get(block_type, "#")
-                    content_parts.append(f"{level} {text}")
-
-            elif block_type == "bulleted-list" or block_type == "bullet_list":
-                items = block.get("content", [])
-                for item in items:
-                    if isinstance(item, dict):
-                        item_text = ""
-
-                        # Check if this is a list_item type
-                        if item.get("type") == "list_item" and "content" in item:
-                            # This is the structure from the real post
-                            item_content = item["content"]
-                            if isinstance(item_content, list) and item_content:
-                                # Check if first element is a paragraph
-                                first_elem = item_content[0]
-                                if (
-                                    isinstance(first_elem, dict)
-                                    and first_elem.get("type") == "paragraph"
-                                ):
-                                    if "content" in first_elem:
-                                        item_text = self._extract_text_from_content(
-                                            first_elem["content"]
-                                        )
-                                else:
-                                    item_text = self._extract_text_from_content(
-                                        item_content
-                                    )
-                            else:
-                                item_text = self._extract_text_from_content(
-                                    item_content
-                                )
-                        # Check various possible fields
-                        elif "text" in item and "content" not in item:
-                            item_text = item["text"]
-                        elif "paragraph" in item and "content" not in item:
-                            # Some items have paragraph field instead of content
-                            para = item["paragraph"]
-                            if isinstance(para, dict) and "content" in para:
-                                item_text = self._extract_text_from_content(
-                                    para["content"]
-                                )
-                            else:
-                                item_text = str(para)
-                        elif "content" in item:
-                            # List items can have nested structure - extract all content
-                            item_content = item["content"]
-
-                            if isinstance(item_content, str):
-                                # Content is directly a string
-                                item_text = item_content
-                            elif isinstance(item_content, list):
-                                # Try to extract text from all elements
-                                text_parts = []
-                                for elem in item_content:
-                                    if isinstance(elem, dict):
-                                        if (
-                                            elem.get("type") == "paragraph"
-                                            and "content" in elem
-                                        ):
-                                            extracted = self._extract_text_from_content(
-                                                elem["content"]
-                                            )
-                                            if extracted:
-                                                text_parts.append(extracted)
-                                        elif (
-                                            elem.get("type") == "text"
-                                            and "text" in elem
-                                        ):
-                                            # Direct text node
-                                            text_parts.append(elem["text"])
-                                        else:
-                                            # Try generic extraction
-                                            extracted = self._extract_text_from_content(
-                                                elem
-                                            )
-                                            if extracted:
-                                                text_parts.append(extracted)
-
-                                item_text = (
-                                    " ".join(text_parts)
-                                    if text_parts
-                                    else "[empty bullet]"
-                                )
-                            else:
-                                # Not a list, extract directly
-                                item_text = (
-                                    self._extract_text_from_content(item_content)
-                                    or "[empty bullet]"
-                                )
-
-                        # Always add the bullet point, even if empty
-                        content_parts.append(f"• {item_text}")
-
-            elif block_type == "ordered-list":
-                items = block.get("content", [])
-                for i, item in enumerate(items, 1):
-                    if isinstance(item, dict):
-                        item_text = ""
-
-                        # Check if this is a list_item type
-                        if item.get("type") == "list_item" and "content" in item:
-                            # This is the structure from the real post
-                            item_content = item["content"]
-                            if isinstance(item_content, list) and item_content:
-                                # Check if first element is a paragraph
-                                first_elem = item_content[0]
-                                if (
-                                    isinstance(first_elem, dict)
-                                    and first_elem.get("type") == "paragraph"
-                                ):
-                                    if "content" in first_elem:
-                                        item_text = self._extract_text_from_content(
-                                            first_elem["content"]
-                                        )
-                                else:
-                                    item_text = self._extract_text_from_content(
-                                        item_content
-                                    )
-                            else:
-                                item_text = self._extract_text_from_content(
-                                    item_content
-                                )
-                        # Check various possible fields
-                        elif "text" in item and "content" not in item:
-                            item_text = item["text"]
-                        elif "paragraph" in item and "content" not in item:
-                            # Some items have paragraph field instead of content
-                            para = item["paragraph"]
-                            if isinstance(para, dict) and "content" in para:
-                                item_text = self._extract_text_from_content(
-                                    para["content"]
-                                )
-                            else:
-                                item_text = str(para)
-                        elif "content" in item:
-                            # List items can have nested structure - extract all content
-                            item_content = item["content"]
-
-                            if isinstance(item_content, str):
-                                # Content is directly a string
-                                item_text = item_content
-                            elif isinstance(item_content, list):
-                                # Try to extract text from all elements
-                                text_parts = []
-                                for elem in item_content:
-                                    if isinstance(elem, dict):
-                                        if (
-                                            elem.get("type") == "paragraph"
-                                            and "content" in elem
-                                        ):
-                                            extracted = self._extract_text_from_content(
-                                                elem["content"]
-                                            )
-                                            if extracted:
-                                                text_parts.append(extracted)
-                                        elif (
-                                            elem.get("type") == "text"
-                                            and "text" in elem
-                                        ):
-                                            # Direct text node
-                                            text_parts.append(elem["text"])
-                                        else:
-                                            # Try generic extraction
-                                            extracted = self._extract_text_from_content(
-                                                elem
-                                            )
-                                            if extracted:
-                                                text_parts.append(extracted)
-
-                                item_text = (
-                                    " ".join(text_parts)
-                                    if text_parts
-                                    else "[empty item]"
-                                )
-                            else:
-                                # Not a list, extract directly
-                                item_text = (
-                                    self._extract_text_from_content(item_content)
-                                    or "[empty item]"
-                                )
-
-                        # Always add the list item, even if empty
-                        content_parts.append(f"{i}. {item_text}")
-
-            elif block_type == "blockquote":
-                text = self._extract_text_from_content(block.get("content", []))
-                if text:
-                    content_parts.append(f"> {text}")
-
-            elif block_type == "code":
-                code = block.get("content", "")
-                if code:
-                    content_parts.append(f"```\n{code}\n```")
-
-            elif block_type == "hr":
-                content_parts.append("---")
-
-            elif block_type == "paywall":
-                content_parts.append("<!-- PAYWALL -->")
-
-            elif block_type in ["captioned-image", "captionedImage", "image", "image2"]:
-                # Handle captioned-image, captionedImage, and plain image
-
-                # Initialize defaults
-                src = ""
-                alt = "Image"
-                caption_text = ""
-
-                # Check multiple possible locations for image data
-                if "attrs" in block:
-                    # attrs on block level
-                    attrs = block["attrs"]
-                    # Check multiple possible URL field names in attrs
-                    src = attrs.get("src") or attrs.get("url") or attrs.get("href", "")
-                    alt = attrs.get("alt", "Image")
-                elif "src" in block:
-                    # Direct src/alt on block
-                    src = block.get("src", "")
-                    alt = block.get("alt", "Image")
-                    caption_text = block.get("caption", "")
-                elif "url" in block:
-                    # Some images use 'url' instead of 'src'
-                    src = block.get("url", "")
-                    alt = block.get("alt", "Image")
-                    caption_text = block.get("caption", "")
-                elif "href" in block:
-                    # Some images use 'href'
-                    src = block.get("href", "")
-                    alt = block.get("alt", "Image")
-                    caption_text = block.get("caption", "")
-                else:
-                    # Check content block
-                    content_block = block.get("content")
-
-                    # Handle captionedImage with content array
-                    if isinstance(content_block, list) and content_block:
-                        # Look for image2 in content array
-                        for elem in content_block:
-                            if isinstance(elem, dict) and elem.get("type") == "image2":
-                                attrs = elem.get("attrs", {})
-                                src = attrs.get("src", "")
-                                alt = attrs.get("alt", "Image")
-                                break
-                    elif isinstance(content_block, dict):
-                        # New format: content is an object with type and attrs
-                        attrs = content_block.get("attrs", {})
-                        src = attrs.get("src", "")
-                        alt = attrs.get("alt", "Image")
-                        caption_blocks = block.get("content", [])
-                        if isinstance(caption_blocks, list) and len(caption_blocks) > 1:
-                            # Second item might be caption
-                            caption_text = ""
-                            for cap_block in caption_blocks[1:]:
-                                if (
-                                    isinstance(cap_block, dict)
-                                    and cap_block.get("type") == "caption"
-                                ):
-                                    caption_text = self._extract_text_from_content(
-                                        cap_block.get("content", [])
-                                    )
-                        else:
-                            caption_text = ""
-                    else:
-                        # Old format
-                        alt = block.get("alt", "Image")
-                        src = block.get("src", "")
-                        caption_text = block.get("caption", "")
+        # Remove duplicate title if the first block is a heading matching the post title
+        if blocks and blocks[0].get("type") in [
+            "heading-one",
+            "heading-two",
+            "heading-three",
+            "heading-four",
+            "heading-five",
+            "heading-six",
+        ]:
+            # Extract text from the first block's content
+            first_block_text = self._extract_text_from_content(
+                blocks[0].get("content", [])
+            )
+            # Compare case-insensitively
+            if first_block_text.strip().lower() == title.strip().lower():
+                logger.info(
+                    f"Removing duplicate title from content: {first_block_text}"
+                )
+                blocks = blocks[1:]  # Skip the first block
 
-                # Always add image, even without src
-                content_parts.append(f"![{alt}]({src})")
-                if caption_text:
-                    content_parts.append(f"*{caption_text}*")
+        # Content behind a paywall is for paid subscribers
+        audience = "everyone"
+        if any(block.get("type") == "paywall" for block in blocks):
+            audience = "only_paid"
 
-            # Add spacing between blocks
-            if content_parts and block_type != "paywall":
-                content_parts.append("")
+        return blocks, audience
 
-        return "\n".join(content_parts).strip()
+    def _build_draft(
+        self,
+        title: str,
+        subtitle: Optional[str],
+        blocks: List[Dict[str, Any]],
+        audience: str,
+        user_id,
+        draft_body: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Build the draft payload accepted by post_draft
+
+        Args:
+            title: The post title
+            subtitle: Optional subtitle
+            blocks: Content blocks
+            audience: Post audience
+            user_id: The author's user ID
+            draft_body: The body already serialized, used instead of blocks
+
+        Returns:
+            The draft data dictionary, with the same fields as
+            python-substack's Post.get_draft()
+        """
+        return {
+            "draft_title": title,
+            "draft_subtitle": subtitle or "",
+            "draft_body": (
+                draft_body
+                if draft_body is not None
+                else self.draft_serializer.dumps(blocks)
+            ),
+            "draft_bylines": [{"id": int(user_id), "is_guest": False}],
+            "audience": audience,
+            "draft_section_id": None,
+            "section_chosen": True,
+            "write_comment_permissions": audience,
+        }
 
     def _convert_content_to_blocks(
-        self, content: str, content_type: str
+        self, content: str, content_type: str, document_id: Optional[str] = None
     ) -> List[Dict[str, Any]]:
         """Convert content to Substack blocks based on content type
 
         Args:
             content: The content to convert
             content_type: Type of content ("markdown", "html", or "plain")
+            document_id: The post the content is for, if it exists; Markdown
+                converted for the same post before is only partly reconverted
 
         Returns:
-            List of Substack blocks
+            List of Substack blocks, as immutable block nodes that read
+            like the JSON dicts
 
         Raises:
             ValueError: If content_type is not supported
         """
         if content_type == "markdown":
-            return self.markdown_converter.convert(content)
+            return self.markdown_converter.convert_nodes(content, document_id)
         elif content_type == "html":
-            return self.html_converter.convert(content)
+            return self.html_converter.convert_nodes(content)
         elif content_type == "plain":
             return self._plain_text_to_blocks(content)
         else:
@@ -1204,65 +1203,32 @@ class PostHandler:
         Returns:
             List of paragraph blocks
         """
-        blocks = []
-        paragraphs = content.split("\n\n")
-
-        for paragraph in paragraphs:
-            if paragraph.strip():
-                blocks.append(self.block_builder.paragraph(paragraph.strip()))
+        return [
+            self.block_builder.paragraph(paragraph)
+            for paragraph in plain_paragraphs(content)
+        ]
 
-        return blocks
+    def _single_paywall(self, blocks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Keep only the first paywall block, as a post has a single paywall
 
-    def _process_paywall_markers(
-        self, content: str, blocks: List[Dict[str, Any]], content_type: str
-    ) -> List[Dict[str, Any]]:
-        """Process paywall markers in content
+        The converter turns every ``<!-- PAYWALL -->`` line into a paywall
+        block; content after any later marker stays where it is.
 
         Args:
-            content: Original content string
             blocks: Converted blocks
-            content_type: Type of content
 
         Returns:
-            Blocks with paywall markers inserted
+            The blocks without repeated paywalls
         """
-        # Check for paywall markers (support multiple formats)
-        paywall_markers = [
-            "<!-- PAYWALL -->",
-            "<!--PAYWALL-->",
-            "<!--paywall-->",
-            "<!-- paywall -->",
-        ]
-        paywall_marker = None
-
-        for marker in paywall_markers:
-            if content_type == "markdown" and marker in content:
-                paywall_marker = marker
-                break
-
-        if paywall_marker:
-            # Find where to insert paywall block
-            new_blocks = []
-
-            # Split content by paywall marker to determine position
-            parts = content.split(paywall_marker)
-            if len(parts) > 1:
-                # Convert first part to blocks
-                first_part_blocks = self.markdown_converter.convert(parts[0])
-                new_blocks.extend(first_part_blocks)
-
-                # Add paywall block
-                new_blocks.append(self.block_builder.paywall())
-
-                # Convert remaining parts
-                for part in parts[1:]:
-                    if part.strip():
-                        part_blocks = self.markdown_converter.convert(part)
-                        new_blocks.extend(part_blocks)
-
-                return new_blocks
-
-        return blocks
+        seen = False
+        kept = []
+        for block in blocks:
+            if block.get("type") == "paywall":
+                if seen:
+                    continue
+                seen = True
+            kept.append(block)
+        return kept if seen else blocks
 
     def _format_blocks_for_api(self, blocks: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Format blocks for Substack API
@@ -1275,108 +1241,6 @@ class PostHandler:
         """
         return {"blocks": blocks}
 
-    def _add_blocks_to_post(self, post: Post, blocks: List[Dict[str, Any]]):
-        """Add blocks to a Post object using the correct python-substack methods
-
-        Args:
-            post: The Post object to add content to
-            blocks: List of block dictionaries to add
-        """
-        for block in blocks:
-            block_type = block.get("type")
-            content = block.get("content")
-
-            if block_type == "paragraph":
-                # Pass content list directly to preserve inline formatting (bold, italic, links)
-                post.paragraph(content)
-
-            elif block_type in [
-                "heading-one",
-                "heading-two",
-                "heading-three",
-                "heading-four",
-                "heading-five",
-                "heading-six",
-            ]:
-                level_map = {
-                    "one": 1,
-                    "two": 2,
-                    "three": 3,
-                    "four": 4,
-                    "five": 5,
-                    "six": 6,
-                }
-                level_text = block_type.split("-")[1]
-                actual_level = level_map.get(level_text, 1)
-                # Extract text from AST structure
-                text_content = self._extract_text_from_content(content)
-                post.heading(text_content, actual_level)
-
-            elif block_type == "hr":
-                post.horizontal_rule()
-
-            elif block_type == "paywall":
-                # Add paywall block - the library doesn't have a direct method, so use add()
-                post.add({"type": "paywall"})
-
-            elif block_type == "captioned-image":
-                image_src = block.get("src", "")
-                image_alt = block.get("alt", "")
-                post.add({"type": "captionedImage", "src": image_src, "alt": image_alt})
-
-            elif block_type == "code":
-                # Code blocks - add as proper code_block type
-                code_content = block.get("content", "")
-                language = block.get("language", "")
-
-                # Enhance readability by adding language comment at the top
-                enhanced_content = code_content
-                if language:
-                    # Add language identifier as a comment for clarity
-                    language_upper = language.upper()
-                    comment_char = self._get_comment_char(language)
-                    if comment_char:
-                        separator = "=" * 20
-                        header = f"{comment_char} {separator} {language_upper} CODE {separator}"
-                        # Only add header if it's not already present
-                        if not code_content.startswith(header):
-                            enhanced_content = f"{header}\n{code_content}"
-
-                # The python-substack library expects the content as a raw string
-                code_block = {"type": "code_block", "content": enhanced_content}
-
-                # Include language attrs for future compatibility
-                if language:
-                    code_block["attrs"] = {"language": language}
-
-                post.add(code_block)
-
-            elif block_type in ["bulleted-list", "ordered-list"]:
-                # Lists - convert to formatted paragraphs
-                list_items = block.get("content", [])
-                for i, item in enumerate(list_items, 1):
-                    if isinstance(item, dict) and "content" in item:
-                        item_content = item["content"]
-                        if isinstance(item_content, list) and len(item_content) > 0:
-                            # Extract text from the paragraph content
-                            para_content = self._extract_text_from_content(
-                                item_content[0].get("content", [])
-                            )
-                            prefix = "• " if block_type == "bulleted-list" else f"{i}. "
-                            post.paragraph(f"{prefix}{para_content}")
-
-            elif block_type == "blockquote":
-                # Extract text from blockquote content
-                quote_text = self._extract_text_from_content(content)
-                post.paragraph(f"> {quote_text}")
-
-            else:
-                # Fallback: extract text and add as paragraph
-                if content:
-                    text_content = self._extract_text_from_content(content)
-                    if text_content:
-                        post.paragraph(text_content)
-
     def _extract_text_from_content(self, content) -> str:
         """Extract plain text from AST content structure
 
@@ -1392,7 +1256,7 @@ class PostHandler:
         elif isinstance(content, list):
             text_parts = []
             for item in content:
-                if isinstance(item, dict):
+                if isinstance(item, Mapping):
                     item_type = item.get("type")
                     item_content = item.get("content", "")
 
@@ -1438,134 +1302,8 @@ class PostHandler:
 
             return "".join(text_parts)
 
-        elif isinstance(content, dict):
+        elif isinstance(content, Mapping):
             # Handle dict content recursively
             return self._extract_text_from_content(content.get("content", ""))
 
         return str(content)
-
-    def _add_formatted_content_to_paragraph(self, para, content):
-        """Add formatted content to a paragraph object
-
-        Args:
-            para: The paragraph object from Post
-            content: The content list from the AST
-        """
-        if isinstance(content, list):
-            for item in content:
-                if isinstance(item, dict) and item.get("type") == "text":
-                    text = item.get(
-                        "content", item.get("text", "")
-                    )  # Check both 'content' and 'text'
-                    marks = item.get("marks", [])
-
-                    # Add text first
-                    para.text(text)
-
-                    # Then apply marks if any
-                    if (
-                        marks and len(marks) > 0
-                    ):  # Only call marks() if we have actual marks
-                        para.marks(marks)
-
-        elif isinstance(content, str):
-            para.text(content)
-
-    def _convert_content_to_text_nodes(self, content):
-        """Convert AST content to proper text nodes with marks
-
-        Args:
-            content: Content from AST
-
-        Returns:
-            List of text nodes with proper marks
-        """
-        if isinstance(content, list):
-            nodes = []
-            for item in content:
-                if isinstance(item, dict) and item.get("type") == "text":
-                    node = {"type": "text", "text": item.get("content", "")}
-                    if "marks" in item and item["marks"]:
-                        node["marks"] = item["marks"]
-                    nodes.append(node)
-            return nodes
-        return []
-
-    def _get_comment_char(self, language: str) -> str:
-        """Get the appropriate comment character for a language
-
-        Args:
-            language: Programming language name
-
-        Returns:
-            Comment character(s) for that language
-        """
-        comment_chars = {
-            "python": "#",
-            "python3": "#",
-            "py": "#",
-            "ruby": "#",
-            "rb": "#",
-            "perl": "#",
-            "bash": "#",
-            "sh": "#",
-            "shell": "#",
-            "yaml": "#",
-            "yml": "#",
-            "makefile": "#",
-            "r": "#",
-            "julia": "#",
-            "elixir": "#",
-            "javascript": "//",
-            "js": "//",
-            "typescript": "//",
-            "ts": "//",
-            "java": "//",
-            "c": "//",
-            "cpp": "//",
-            "c++": "//",
-            "csharp": "//",
-            "cs": "//",
-            "go": "//",
-            "golang": "//",
-            "rust": "//",
-            "rs": "//",
-            "swift": "//",
-            "kotlin": "//",
-            "php": "//",
-            "dart": "//",
-            "scala": "//",
-            "groovy": "//",
-            "sql": "--",
-            "postgresql": "--",
-            "mysql": "--",
-            "lua": "--",
-            "haskell": "--",
-            "elm": "--",
-            "html": "<!--",
-            "xml": "<!--",
-            "css": "/*",
-            "scss": "/*",
-            "sass": "//",
-            "less": "//",
-            "lisp": ";",
-            "clojure": ";",
-            "scheme": ";",
-            "asm": ";",
-            "assembly": ";",
-            "vb": "'",
-            "vbnet": "'",
-            "basic": "'",
-            "matlab": "%",
-            "octave": "%",
-            "latex": "%",
-            "tex": "%",
-            "fortran": "!",
-            "f90": "!",
-            "ada": "--",
-            "pascal": "//",
-            "delphi": "//",
-        }
-
-        # Return the comment character for the language, default to #
-        return comment_chars.get(language.lower(), "#")
@@ -11,9 +11,15 @@ from mcp.server.models import InitializationOptions
 from mcp.server.stdio import stdio_server
 from mcp.types import EmbeddedResource, ImageContent, TextContent, Tool
 
+from src.converters.document_cache import DocumentCache
+from src.handlers.archive_handler import ArchiveHandler
 from src.handlers.auth_handler import AuthHandler
 from src.handlers.image_handler import ImageHandler
+from src.handlers.import_handler import ImportHandler
 from src.handlers.post_handler import PostHandler
+from src.utils.block_diff import describe_diff, summarize_diff
+from src.utils.change_feed import ChangeFeed
+from src.utils.post_index import PostIndex
 
 # Set up logging - use stderr for MCP servers
 logging.basicConfig(
@@ -23,6 +29,16 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Tools whose post_id argument may also be a post title, slug or URL
+POST_ID_TOOLS = {
+    "update_post",
+    "publish_post",
+    "delete_draft",
+    "get_post_content",
+    "duplicate_post",
+    "preview_draft",
+}
+
 
 class SubstackMCPServer:
     """MCP server for Substack operations"""
@@ -38,6 +54,12 @@ class SubstackMCPServer:
         try:
             self.auth_handler = AuthHandler()
             logger.info("Authentication handler initialized")
+            # Shared across tool calls so title/slug lookups stay warm
+            self.post_index = PostIndex()
+            # Shared so repeated updates of a post only reconvert what changed
+            self.document_cache = DocumentCache()
+            # Created on first use, once there is an authenticated client
+            self.change_feed = None
         except Exception as e:
             logger.error(f"Failed to initialize handlers: {e}")
             raise
@@ -84,7 +106,7 @@ class SubstackMCPServer:
                         "properties": {
                             "post_id": {
                                 "type": "string",
-                                "description": "The unique ID of the draft post to update. Get this from list_drafts output.",
+                                "description": "The unique ID of the draft post to update (a title or slug also works). Get this from list_drafts output.",
                             },
                             "title": {
                                 "type": "string",
@@ -115,7 +137,7 @@ class SubstackMCPServer:
                         "properties": {
                             "post_id": {
                                 "type": "string",
-                                "description": "The unique ID of the draft post to publish. Get this from list_drafts output.",
+                                "description": "The unique ID of the draft post to publish (a title or slug also works). Get this from list_drafts output.",
                             },
                             "confirm_publish": {
                                 "type": "boolean",
@@ -162,7 +184,7 @@ class SubstackMCPServer:
                         "properties": {
                             "post_id": {
                                 "type": "string",
-                                "description": "The unique ID of the draft to delete. Get this from list_drafts output.",
+                                "description": "The unique ID of the draft to delete (a title or slug also works). Get this from list_drafts output.",
                             },
                             "confirm_delete": {
                                 "type": "boolean",
@@ -195,7 +217,7 @@ class SubstackMCPServer:
                         "properties": {
                             "post_id": {
                                 "type": "string",
-                                "description": "The ID of the post to read. Get this from list_drafts or list_published.",
+                                "description": "The ID of the post to read (a title or slug also works). Get this from list_drafts or list_published.",
                             }
                         },
                         "required": ["post_id"],
@@ -209,7 +231,7 @@ class SubstackMCPServer:
                         "properties": {
                             "post_id": {
                                 "type": "string",
-                                "description": "The ID of the post to duplicate.",
+                                "description": "The ID of the post to duplicate (a title or slug also works).",
                             },
                             "new_title": {
                                 "type": "string",
@@ -242,12 +264,127 @@ class SubstackMCPServer:
                         "properties": {
                             "post_id": {
                                 "type": "string",
-                                "description": "The ID of the draft to preview.",
+                                "description": "The ID of the draft to preview (a title or slug also works).",
                             }
                         },
                         "required": ["post_id"],
                     },
                 ),
+                Tool(
+                    name="export_archive",
+                    description="Back up every post (drafts and published) to a local directory. Writes posts.ndjson with metadata and the raw draft_body, and/or one Markdown file per post with front matter. Posts are written as they are fetched, and re-running with the same directory resumes where a previous export stopped.",
+                    inputSchema={
+                        "type": "object",
+                        "properties": {
+                            "output_dir": {
+                                "type": "string",
+                                "description": "Local directory to write the archive into. Created if it does not exist.",
+                            },
+                            "format": {
+                                "type": "string",
+                                "enum": ["ndjson", "markdown", "both"],
+                                "description": "Which files to write. Default is both.",
+                                "default": "both",
+                            },
+                            "include_markdown": {
+                                "type": "boolean",
+                                "description": "Also store rendered markdown in each NDJSON record. Default is true.",
+                                "default": True,
+                            },
+                            "concurrency": {
+                                "type": "integer",
+                                "description": "Number of posts fetched in parallel (1-16). Default is 4.",
+                                "default": 4,
+                            },
+                        },
+                        "required": ["output_dir"],
+                    },
+                ),
+                Tool(
+                    name="import_directory",
+                    description="Create drafts from every Markdown (.md) and HTML (.html) file in a local directory. Files may start with front matter (title, subtitle, audience). Draft creation is throttled, and a journal keyed by file content means re-running skips files that were already imported. IMPORTANT: You MUST ALWAYS ask the user to confirm the import in a follow-up message BEFORE calling this tool with confirm_import=true. The first call only lists what would be imported.",
+                    inputSchema={
+                        "type": "object",
+                        "properties": {
+                            "directory": {
+                                "type": "string",
+                                "description": "Local directory containing the files to import.",
+                            },
+                            "recursive": {
+                                "type": "boolean",
+                                "description": "Also import files from subdirectories. Default is true.",
+                                "default": True,
+                            },
+                            "confirm_import": {
+                                "type": "boolean",
+                                "description": "NEVER set to true without explicit user confirmation in a follow-up message. Always false on first call.",
+                                "default": False,
+                            },
+                        },
+                        "required": ["directory"],
+                    },
+                ),
+                Tool(
+                    name="import_export",
+                    description="Create drafts from a WordPress export (WXR .xml) or Ghost export (.json). Large exports are streamed, post HTML is converted to Substack formatting and inline images are re-uploaded to Substack. Draft creation is throttled, and re-running resumes an interrupted import. IMPORTANT: You MUST ALWAYS ask the user to confirm the import in a follow-up message BEFORE calling this tool with confirm_import=true. The first call only lists what would be imported.",
+                    inputSchema={
+                        "type": "object",
+                        "properties": {
+                            "file": {
+                                "type": "string",
+                                "description": "Path to the WordPress .xml or Ghost .json export file.",
+                            },
+                            "site_url": {
+                                "type": "string",
+                                "description": "The old site's URL, used to resolve relative image paths (required for Ghost images).",
+                            },
+                            "rehost_images": {
+                                "type": "boolean",
+                                "description": "Upload inline images to Substack's CDN. Default is true.",
+                                "default": True,
+                            },
+                            "include_pages": {
+                                "type": "boolean",
+                                "description": "Also import pages, not just posts. Default is false.",
+                                "default": False,
+                            },
+                            "confirm_import": {
+                                "type": "boolean",
+                                "description": "NEVER set to true without explicit user confirmation in a follow-up message. Always false on first call.",
+                                "default": False,
+                            },
+                        },
+                        "required": ["file"],
+                    },
+                ),
+                Tool(
+                    name="find_post",
+                    description="Find a post by its title, slug or URL and return its ID. Matching ignores case and punctuation. If there is no exact match, posts whose title contains the query are returned. Tools that take a post_id also accept a title or slug directly.",
+                    inputSchema={
+                        "type": "object",
+                        "properties": {
+                            "query": {
+                                "type": "string",
+                                "description": "The post title, slug or URL to look for.",
+                            }
+                        },
+                        "required": ["query"],
+                    },
+                ),
+                Tool(
+                    name="get_changes",
+                    description="List posts created, updated, published or deleted since the last time this tool was called. Only the drafts listing is read, and the last seen state is saved between sessions. The first call reports every post as created.",
+                    inputSchema={
+                        "type": "object",
+                        "properties": {
+                            "reset": {
+                                "type": "boolean",
+                                "description": "Forget the saved state first, so every post is reported as created. Default is false.",
+                                "default": False,
+                            }
+                        },
+                    },
+                ),
             ]
 
         @self.server.call_tool()
@@ -267,6 +404,13 @@ class SubstackMCPServer:
                 )
                 logger.debug(f"Client has get_draft: {hasattr(client, 'get_draft')}")
 
+                # Let post-taking tools accept a title or slug in place of the ID
+                if name in POST_ID_TOOLS and arguments and arguments.get("post_id"):
+                    post_handler = PostHandler(client, post_index=self.post_index)
+                    arguments["post_id"] = await post_handler.resolve_post_id(
+                        arguments["post_id"]
+                    )
+
                 if name == "create_formatted_post":
                     confirm = arguments.get("confirm_create", False)
 
@@ -294,7 +438,7 @@ class SubstackMCPServer:
                         ]
 
                     # Proceed with creation
-                    post_handler = PostHandler(client)
+                    post_handler = PostHandler(client, post_index=self.post_index)
                     result = await post_handler.create_draft(
                         title=arguments["title"],
                         content=arguments["content"],
@@ -311,10 +455,23 @@ class SubstackMCPServer:
                 elif name == "update_post":
                     confirm = arguments.get("confirm_update", False)
 
+                    post_handler = PostHandler(
+                        client,
+                        post_index=self.post_index,
+                        document_cache=self.document_cache,
+                    )
+
                     if not confirm:
                         # Get the draft details to show what will be updated
                         try:
-                            draft = client.get_draft(arguments["post_id"])
+                            plan = await post_handler.plan_update(
+                                post_id=arguments["post_id"],
+                                title=arguments.get("title"),
+                                content=arguments.get("content"),
+                                subtitle=arguments.get("subtitle"),
+                                content_type="markdown",
+                            )
+                            draft = plan["current"]
 
                             # Check if API returned a string error
                             if isinstance(draft, str):
@@ -336,7 +493,18 @@ class SubstackMCPServer:
                                     f"- Subtitle: \"{arguments['subtitle']}\""
                                 )
                             if arguments.get("content"):
-                                changes.append("- Content: [new content provided]")
+                                diff = plan["diff"]
+                                if diff is None:
+                                    changes.append("- Content: [new content provided]")
+                                elif diff["identical"]:
+                                    changes.append(
+                                        "- Content: unchanged (will not be uploaded)"
+                                    )
+                                else:
+                                    changes.append(f"- Content: {summarize_diff(diff)}")
+                                    changes.extend(
+                                        f"    {line}" for line in describe_diff(diff)
+                                    )
 
                             changes_text = (
                                 "\n".join(changes)
@@ -368,18 +536,28 @@ class SubstackMCPServer:
                             ]
 
                     # Proceed with update
-                    post_handler = PostHandler(client)
-                    result = await post_handler.update_draft(
+                    plan = await post_handler.plan_update(
                         post_id=arguments["post_id"],
                         title=arguments.get("title"),
                         content=arguments.get("content"),
                         subtitle=arguments.get("subtitle"),
                         content_type="markdown",
                     )
+                    await post_handler.apply_update(plan)
+                    if not plan["update_data"]:
+                        return [
+                            TextContent(
+                                type="text",
+                                text=f"✅ Post already up to date, nothing was changed.\nID: {arguments['post_id']}",
+                            )
+                        ]
+                    summary = ""
+                    if plan["diff"] is not None:
+                        summary = f"\nContent: {summarize_diff(plan['diff'])}"
                     return [
                         TextContent(
                             type="text",
-                            text=f"✅ Post updated successfully!\nID: {arguments['post_id']}",
+                            text=f"✅ Post updated successfully!\nID: {arguments['post_id']}{summary}",
                         )
                     ]
 
@@ -434,7 +612,7 @@ class SubstackMCPServer:
                             ]
 
                     # Proceed with publishing
-                    post_handler = PostHandler(client)
+                    post_handler = PostHandler(client, post_index=self.post_index)
                     result = await post_handler.publish_draft(
                         post_id=arguments["post_id"]
                     )
@@ -447,7 +625,7 @@ class SubstackMCPServer:
 
                 elif name == "list_drafts":
                     logger.info(f"list_drafts called with arguments: {arguments}")
-                    post_handler = PostHandler(client)
+                    post_handler = PostHandler(client, post_index=self.post_index)
                     drafts = await post_handler.list_drafts(
                         limit=arguments.get("limit", 10)
                     )
@@ -524,7 +702,8 @@ class SubstackMCPServer:
                         )
 
                         # Delete the draft
-                        client.delete_draft(post_id)
+                        post_handler = PostHandler(client, post_index=self.post_index)
+                        await post_handler.delete_draft(post_id)
 
                         return [
                             TextContent(
@@ -543,7 +722,7 @@ class SubstackMCPServer:
                         ]
 
                 elif name == "list_published":
-                    post_handler = PostHandler(client)
+                    post_handler = PostHandler(client, post_index=self.post_index)
                     published = await post_handler.list_published(
                         limit=arguments.get("limit", 10)
                     )
@@ -574,7 +753,7 @@ class SubstackMCPServer:
                     logger.debug(
                         f"Creating PostHandler for get_post_content with client type: {type(client)}"
                     )
-                    post_handler = PostHandler(client)
+                    post_handler = PostHandler(client, post_index=self.post_index)
                     result = await post_handler.get_post_content(arguments["post_id"])
 
                     content_text = []
@@ -636,7 +815,7 @@ class SubstackMCPServer:
                             ]
 
                     # Proceed with duplication
-                    post_handler = PostHandler(client)
+                    post_handler = PostHandler(client, post_index=self.post_index)
                     result = await post_handler.duplicate_post(
                         post_id=arguments["post_id"],
                         new_title=arguments.get("new_title"),
@@ -652,7 +831,7 @@ class SubstackMCPServer:
                     ]
 
                 elif name == "get_sections":
-                    post_handler = PostHandler(client)
+                    post_handler = PostHandler(client, post_index=self.post_index)
                     sections = await post_handler.get_sections()
 
                     if not sections:
@@ -680,7 +859,7 @@ class SubstackMCPServer:
 
                 elif name == "get_subscriber_count":
                     try:
-                        post_handler = PostHandler(client)
+                        post_handler = PostHandler(client, post_index=self.post_index)
                         result = await post_handler.get_subscriber_count()
 
                         return [
@@ -709,7 +888,7 @@ class SubstackMCPServer:
                     # Temporary debug tool
                     from src.tools.debug_post_structure import debug_post_structure
 
-                    post_handler = PostHandler(client)
+                    post_handler = PostHandler(client, post_index=self.post_index)
                     result = await debug_post_structure(
                         post_handler, arguments["post_id"]
                     )
@@ -720,7 +899,7 @@ class SubstackMCPServer:
 
                 elif name == "preview_draft":
                     try:
-                        post_handler = PostHandler(client)
+                        post_handler = PostHandler(client, post_index=self.post_index)
                         result = await post_handler.preview_draft(arguments["post_id"])
 
                         preview_text = []
@@ -800,6 +979,130 @@ class SubstackMCPServer:
                             )
                         ]
 
+                elif name == "export_archive":
+                    export_format = arguments.get("format", "both")
+                    formats = (
+                        ["ndjson", "markdown"]
+                        if export_format == "both"
+                        else [export_format]
+                    )
+                    archive_handler = ArchiveHandler(
+                        client,
+                        concurrency=arguments.get("concurrency", 4),
+                        post_index=self.post_index,
+                    )
+                    result = await archive_handler.export_archive(
+                        output_dir=arguments["output_dir"],
+                        formats=formats,
+                        include_markdown=arguments.get("include_markdown", True),
+                    )
+
+                    export_text = []
+                    export_text.append("📦 Archive Export")
+                    export_text.append("=" * 50)
+                    export_text.append(f"Directory: {result['output_dir']}")
+                    export_text.append(f"Exported: {result['exported']}")
+                    export_text.append(
+                        f"Skipped (already exported): {result['skipped']}"
+                    )
+                    if result["failed"]:
+                        export_text.append(f"Failed: {len(result['failed'])}")
+                        for failure in result["failed"][:10]:
+                            export_text.append(
+                                f"  - {failure['id']}: {failure['error']}"
+                            )
+                    if not result["complete"]:
+                        export_text.append(
+                            f"❌ Export incomplete: listing posts failed "
+                            f"({result['listing_error']}). Run the export again "
+                            "with the same directory to resume."
+                        )
+
+                    return [TextContent(type="text", text="\n".join(export_text))]
+
+                elif name == "import_directory":
+                    confirm = arguments.get("confirm_import", False)
+                    import_handler = ImportHandler(client, post_index=self.post_index)
+                    result = await import_handler.import_directory(
+                        directory=arguments["directory"],
+                        recursive=arguments.get("recursive", True),
+                        dry_run=not confirm,
+                    )
+
+                    return self._format_import_result(result, confirm)
+
+                elif name == "import_export":
+                    confirm = arguments.get("confirm_import", False)
+                    import_handler = ImportHandler(client, post_index=self.post_index)
+
+                    def log_progress(summary):
+                        created = len(summary["imported"])
+                        if created and created % 25 == 0:
+                            logger.info(f"Import progress: {created} draft(s) created")
+
+                    result = await import_handler.import_export_file(
+                        path=arguments["file"],
+                        include_pages=arguments.get("include_pages", False),
+                        rehost_images=arguments.get("rehost_images", True),
+                        site_url=arguments.get("site_url"),
+                        dry_run=not confirm,
+                        progress=log_progress,
+                    )
+                    return self._format_import_result(result, confirm)
+
+                elif name == "find_post":
+                    post_handler = PostHandler(client, post_index=self.post_index)
+                    matches = await post_handler.find_posts(arguments["query"])
+
+                    if not matches:
+                        return [
+                            TextContent(
+                                type="text",
+                                text=f"No posts found matching \"{arguments['query']}\".",
+                            )
+                        ]
+
+                    match_list = [f"Found {len(matches)} matching post(s):"]
+                    for match in matches:
+                        match_list.append(f"- {match['title']} (ID: {match['id']})")
+                    return [TextContent(type="text", text="\n".join(match_list))]
+
+                elif name == "get_changes":
+                    if self.change_feed is None:
+                        self.change_feed = ChangeFeed(client)
+                        self.change_feed.subscribe(self.post_index.apply_changes)
+                    if arguments and arguments.get("reset"):
+                        self.change_feed.reset()
+
+                    since = self.change_feed.polled_at
+                    events = await self.change_feed.poll()
+
+                    if not events:
+                        return [
+                            TextContent(
+                                type="text",
+                                text=f"No changes since {since or 'the last check'}.",
+                            )
+                        ]
+
+                    icons = {
+                        "created": "🆕",
+                        "updated": "✏️",
+                        "published": "📢",
+                        "deleted": "🗑️",
+                    }
+                    change_list = [
+                        f"{len(events)} change(s) since {since or 'the beginning'}:"
+                    ]
+                    for event in events[:50]:
+                        change_list.append(
+                            f"{icons[event['type']]} {event['type']}: "
+                            f"{event['title'] or 'Untitled'} (ID: {event['id']})"
+                        )
+                    if len(events) > 50:
+                        change_list.append(f"... and {len(events) - 50} more")
+                    return [TextContent(type="text", text="\n".join(change_list))]
+
                 else:
                     return [TextContent(type="text", text=f"Unknown tool: {name}")]
 
@@ -807,7 +1110,40 @@ class SubstackMCPServer:
                 logger.error(f"Error executing tool {name}: {e}")
                 return [TextContent(type="text", text=f"Error: {str(e)}")]
 
-        logger.info("Registered 12 tools")
+        logger.info("Registered 17 tools")
+
+    def _format_import_result(
+        self, result: Dict[str, Any], confirm: bool
+    ) -> List[TextContent]:
+        """Format an import summary, asking for confirmation after a dry run"""
+        import_text = []
+        if not confirm:
+            import_text.append("⚠️ CONFIRMATION REQUIRED ⚠️")
+            import_text.append("")
+            import_text.append(
+                f"You are about to CREATE {len(result['imported'])} draft(s):"
+            )
+        else:
+            import_text.append("📥 Import Complete")
+            import_text.append("=" * 50)
+        for entry in result["imported"][:25]:
+            post_id = f" (ID: {entry['id']})" if entry["id"] else ""
+            import_text.append(f"- {entry['title']}{post_id}")
+        if len(result["imported"]) > 25:
+            import_text.append(f"- ... and {len(result['imported']) - 25} more")
+        if result["skipped"]:
+            import_text.append(f"Skipped (already imported): {len(result['skipped'])}")
+        for failure in result["failed"][:10]:
+            import_text.append(f"❌ {failure['source']}: {failure['error']}")
+        if not confirm:
+            import_text.append("")
+            import_text.append(
+                "Are you sure you want to create these drafts?\n\n"
+                'To confirm, simply say "yes" or tell me to proceed.\n'
+                'To cancel, say "no" or tell me to stop.'
+            )
+
+        return [TextContent(type="text", text="\n".join(import_text))]
 
     async def run(self):
         """Run the MCP server using stdio transport"""
@@ -4,6 +4,8 @@
 import logging
 from typing import Any, Dict, List
 
+from src.utils.json_codec import LazyJSON
+
 logger = logging.getLogger(__name__)
 
 
@@ -130,6 +132,17 @@ class APIWrapper:
                     f"Draft response missing expected fields. Keys: {list(checked_result.keys())[:10]}"
                 )
 
+            # Bodies are JSON strings; only decode them when a caller reads them.
+            # Anything not shaped like a JSON object is left as plain text
+            for key in ("body", "draft_body"):
+                body = checked_result.get(key)
+                if (
+                    isinstance(body, str)
+                    and not isinstance(body, LazyJSON)
+                    and body.lstrip().startswith("{")
+                ):
+                    checked_result[key] = LazyJSON(body)
+
             return checked_result
 
         except SubstackAPIError:
@@ -152,14 +165,33 @@ class APIWrapper:
             )
             raise SubstackAPIError(f"Failed to get post {post_id}: {str(e)}")
 
-    def get_drafts(self, limit: int = 10) -> List[Dict[str, Any]]:
-        """Get drafts with error handling"""
+    def get_drafts(
+        self, limit: int = 10, offset: int = 0, raise_errors: bool = False
+    ) -> List[Dict[str, Any]]:
+        """Get drafts with error handling
+
+        Args:
+            limit: Posts per page
+            offset: Posts to skip
+            raise_errors: Raise SubstackAPIError when the listing fails
+                instead of returning an empty page. Callers that page
+                through the whole listing need this to tell the end of the
+                listing from a failed request
+
+        Raises:
+            SubstackAPIError: If the listing fails and raise_errors is set
+        """
         try:
-            logger.info(f"APIWrapper.get_drafts called with limit={limit}")
+            logger.info(
+                f"APIWrapper.get_drafts called with limit={limit}, offset={offset}"
+            )
             logger.info(f"Client type: {type(self.client)}")
             logger.info(f"Client has get_drafts: {hasattr(self.client, 'get_drafts')}")
 
-            result = self.client.get_drafts(limit=limit)
+            if offset:
+                result = self.client.get_drafts(limit=limit, offset=offset)
+            else:
+                result = self.client.get_drafts(limit=limit)
             logger.info(f"get_drafts returned type: {type(result)}")
 
             # Convert generator to list and check each item
@@ -174,6 +206,10 @@ class APIWrapper:
             return drafts
         except Exception as e:
             logger.error(f"get_drafts error: {type(e).__name__}: {str(e)}")
+            if raise_errors:
+                if isinstance(e, SubstackAPIError):
+                    raise
+                raise SubstackAPIError(f"Failed to list posts: {str(e)}") from e
             import traceback
 
             logger.error(f"Traceback: {traceback.format_exc()}")
@@ -0,0 +1,170 @@
+# ABOUTME: Block-level diff between two ProseMirror draft bodies
+# ABOUTME: Fingerprints top-level blocks to find inserted, removed and changed ones
+
+import difflib
+import hashlib
+import json
+from typing import Any, Dict, List, Optional
+
+# Characters of block text shown for each entry in a diff
+PREVIEW_LENGTH = 60
+
+
+def block_fingerprint(node: Any) -> str:
+    """Hash a block so equal blocks match whatever their key order
+
+    Args:
+        node: A ProseMirror node
+
+    Returns:
+        A hex digest of the block's canonical JSON
+    """
+    canonical = json.dumps(
+        node, sort_keys=True, ensure_ascii=False, separators=(",", ":")
+    )
+    return hashlib.blake2b(canonical.encode(), digest_size=16).hexdigest()
+
+
+def body_blocks(body: Any) -> Optional[List[Any]]:
+    """Return the top-level blocks of a decoded draft body
+
+    Args:
+        body: A decoded ProseMirror document
+
+    Returns:
+        The document's blocks, or None if it is not a ProseMirror document
+    """
+    if isinstance(body, dict) and body.get("type") == "doc":
+        content = body.get("content", [])
+        if isinstance(content, list):
+            return content
+    return None
+
+
+def diff_blocks(old: List[Any], new: List[Any]) -> Dict[str, Any]:
+    """Compare two lists of top-level blocks
+
+    Blocks are matched by fingerprint. Where a run of old blocks is
+    replaced by a run of new ones, blocks are paired up in order as
+    changed and the rest count as removed or inserted.
+
+    Args:
+        old: Blocks of the current body
+        new: Blocks of the new body
+
+    Returns:
+        Dictionary with "inserted", "removed" and "changed" entries (block
+        index, type and a text preview; indexes of removed blocks refer to
+        the old body, others to the new one), the "unchanged" count and
+        "identical", which is True when nothing differs
+    """
+    old_keys = [block_fingerprint(block) for block in old]
+    new_keys = [block_fingerprint(block) for block in new]
+    diff: Dict[str, Any] = {
+        "inserted": [],
+        "removed": [],
+        "changed": [],
+        "unchanged": 0,
+        "identical": old_keys == new_keys,
+    }
+    if diff["identical"]:
+        diff["unchanged"] = len(new)
+        return diff
+
+    matcher = difflib.SequenceMatcher(None, old_keys, new_keys, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            diff["unchanged"] += i2 - i1
+            continue
+        paired = min(i2 - i1, j2 - j1) if tag == "replace" else 0
+        for offset in range(paired):
+            diff["changed"].append(
+                {
+                    "index": j1 + offset,
+                    "type": _block_type(new[j1 + offset]),
+                    "before": _preview(old[i1 + offset]),
+                    "after": _preview(new[j1 + offset]),
+                }
+            )
+        for index in range(i1 + paired, i2):
+            diff["removed"].append(_entry(index, old[index]))
+        for index in range(j1 + paired, j2):
+            diff["inserted"].append(_entry(index, new[index]))
+    return diff
+
+
+def summarize_diff(diff: Dict[str, Any]) -> str:
+    """Describe a block diff in one line, e.g. "2 changed, 1 inserted"
+
+    Args:
+        diff: A diff from diff_blocks
+
+    Returns:
+        A short human-readable summary
+    """
+    if diff["identical"]:
+        return "no changes"
+    parts = [
+        f"{len(diff[key])} {key}"
+        for key in ("changed", "inserted", "removed")
+        if diff[key]
+    ]
+    parts.append(f"{diff['unchanged']} unchanged")
+    return ", ".join(parts)
+
+
+def describe_diff(diff: Dict[str, Any], limit: int = 10) -> List[str]:
+    """List the changed blocks of a diff, one line each, for a preview
+
+    Args:
+        diff: A diff from diff_blocks
+        limit: Most lines to list; the rest are counted in a final line
+
+    Returns:
+        Lines such as 'changed paragraph 3: "old" -> "new"'
+    """
+    lines = [
+        f'changed {entry["type"]} {entry["index"] + 1}: '
+        f'"{entry["before"]}" -> "{entry["after"]}"'
+        for entry in diff["changed"]
+    ]
+    for key in ("inserted", "removed"):
+        lines.extend(
+            f'{key} {entry["type"]} {entry["index"] + 1}: "{entry["text"]}"'
+            for entry in diff[key]
+        )
+    if len(lines) > limit:
+        lines = lines[:limit] + [f"... and {len(lines) - limit} more"]
+    return lines
+
+
+def _entry(index: int, block: Any) -> Dict[str, Any]:
+    """Describe one inserted or removed block"""
+    return {"index": index, "type": _block_type(block), "text": _preview(block)}
+
+
+def _block_type(block: Any) -> str:
+    return block.get("type", "") if isinstance(block, dict) else ""
+
+
+def _preview(block: Any) -> str:
+    """Return the start of a block's text"""
+    text = " ".join(_text(block).split())
+    if len(text) > PREVIEW_LENGTH:
+        return text[: PREVIEW_LENGTH - 3] + "..."
+    return text
+
+
+def _text(node: Any) -> str:
+    """Join the text inside a ProseMirror node"""
+    if isinstance(node, dict):
+        if node.get("type") == "text":
+            return node.get("text", "")
+        children = node.get("content") or []
+        # Text runs join directly, blocks are separated by a space
+        inline = all(
+            isinstance(child, dict) and child.get("type") == "text"
+            for child in children
+        )
+        return ("" if inline else " ").join(filter(None, map(_text, children)))
+    return ""
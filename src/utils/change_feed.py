@@ -0,0 +1,248 @@
+# ABOUTME: Change feed that diffs the drafts listing against a persisted watermark
+# ABOUTME: Emits created/updated/published/deleted events to subscribers
+
+import asyncio
+import json
+import logging
+import os
+import re
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+# {publication} is replaced by the publication's host, so each publication
+# keeps its own watermark
+DEFAULT_STATE_PATH = os.path.join(
+    os.path.expanduser("~"), ".substack-mcp-plus", "change_feed", "{publication}.json"
+)
+
+
+class ChangeFeed:
+    """Detects post changes by polling the drafts listing
+
+    Only the listing is read - IDs, update timestamps and publish dates -
+    never post bodies. The result of the last poll is kept as a watermark
+    on disk, so each poll reports what changed since the previous one,
+    even across restarts. Several consumers can share one feed by
+    subscribing to it instead of each polling the listing themselves.
+    """
+
+    PAGE_SIZE = 25
+    MAX_PAGES = 200
+    STATE_VERSION = 1
+
+    def __init__(self, client, state_path: Optional[str] = DEFAULT_STATE_PATH):
+        """Initialize the feed
+
+        Args:
+            client: An authenticated Substack API client
+            state_path: Where to persist the watermark (None keeps it in memory).
+                ``{publication}`` in the path is replaced by the publication's host
+        """
+        self.client = client
+        if state_path and "{publication}" in state_path:
+            state_path = state_path.replace("{publication}", self._publication_key())
+        self.state_path = (
+            os.path.abspath(os.path.expanduser(state_path)) if state_path else None
+        )
+        self._subscribers: List[Callable[[List[Dict[str, Any]]], None]] = []
+        self._lock = asyncio.Lock()
+        self._state = self._load_state()
+
+    @property
+    def polled_at(self) -> Optional[str]:
+        """When the watermark was last advanced (ISO 8601), if ever"""
+        return self._state.get("polled_at")
+
+    def subscribe(
+        self, callback: Callable[[List[Dict[str, Any]]], None]
+    ) -> Callable[[], None]:
+        """Register a callback invoked with the events of every poll
+
+        Args:
+            callback: Called with a non-empty list of events
+
+        Returns:
+            A function that removes the subscription
+        """
+        self._subscribers.append(callback)
+
+        def unsubscribe():
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+        return unsubscribe
+
+    async def poll(self) -> List[Dict[str, Any]]:
+        """Compare the current listing with the watermark and advance it
+
+        Each event is a dict with ``type`` (one of created, updated,
+        published, deleted), ``id``, ``title``, ``slug`` and
+        ``updated_at``. Subscribers are notified before this returns.
+
+        Deletions are only reported, and the watermark only advanced, when
+        the whole listing was read. If paging stops at MAX_PAGES the posts
+        seen are still reported and recorded, but unseen posts are kept and
+        ``polled_at`` does not move.
+
+        Returns:
+            The events since the previous poll, in listing order
+
+        Raises:
+            SubstackAPIError: If a page of the listing fails; nothing is
+                reported and the watermark is left as it was
+        """
+        async with self._lock:
+            snapshot, complete = await self._fetch_snapshot()
+            previous = self._state["posts"]
+
+            if not snapshot and previous:
+                # Never read an empty listing as every post having been deleted
+                logger.warning("Empty drafts listing; keeping the current watermark")
+                return []
+
+            if complete:
+                events = self._diff(previous, snapshot)
+                self._state = {
+                    "version": self.STATE_VERSION,
+                    "polled_at": datetime.now(timezone.utc).isoformat(),
+                    "posts": snapshot,
+                }
+            else:
+                logger.warning(
+                    f"Drafts listing truncated at {self.MAX_PAGES} pages; "
+                    "not reporting deletions"
+                )
+                events = [
+                    event
+                    for event in self._diff(previous, snapshot)
+                    if event["type"] != "deleted"
+                ]
+                self._state = {
+                    **self._state,
+                    "posts": {**previous, **snapshot},
+                }
+            self._save_state()
+
+        if events:
+            logger.info(f"Change feed: {len(events)} event(s)")
+            self._notify(events)
+        return events
+
+    def reset(self):
+        """Forget the watermark so the next poll reports every post as created"""
+        self._state = self._empty_state()
+        self._save_state()
+
+    def _publication_key(self) -> str:
+        """Name the state file after the client's publication host"""
+        url = getattr(self.client, "publication_url", None)
+        host = urlparse(url).netloc if isinstance(url, str) else ""
+        return re.sub(r"[^A-Za-z0-9._-]", "_", host.lower()) or "default"
+
+    async def _fetch_snapshot(self) -> Tuple[Dict[str, Dict[str, Any]], bool]:
+        """Read the listing into {id: {updated_at, published, title, slug}}
+
+        Returns:
+            The snapshot, and whether the listing was read to its end
+        """
+        snapshot: Dict[str, Dict[str, Any]] = {}
+        offset = 0
+        for _ in range(self.MAX_PAGES):
+            page = await asyncio.to_thread(
+                self.client.get_drafts,
+                limit=self.PAGE_SIZE,
+                offset=offset,
+                raise_errors=True,
+            )
+            page = list(page or [])
+            for post in page:
+                if not isinstance(post, dict) or post.get("id") is None:
+                    continue
+                snapshot[str(post["id"])] = {
+                    "updated_at": post.get("draft_updated_at")
+                    or post.get("updated_at"),
+                    "published": bool(post.get("post_date")),
+                    "title": post.get("draft_title") or post.get("title") or "",
+                    "slug": post.get("slug") or post.get("draft_slug") or "",
+                }
+            if len(page) < self.PAGE_SIZE:
+                return snapshot, True
+            offset += len(page)
+        return snapshot, False
+
+    def _diff(
+        self,
+        previous: Dict[str, Dict[str, Any]],
+        current: Dict[str, Dict[str, Any]],
+    ) -> List[Dict[str, Any]]:
+        """Build the events that turn one snapshot into the other"""
+        events = []
+        for post_id, entry in current.items():
+            before = previous.get(post_id)
+            if before is None:
+                event_type = "created"
+            elif entry["published"] and not before.get("published"):
+                event_type = "published"
+            elif entry["updated_at"] != before.get("updated_at"):
+                event_type = "updated"
+            else:
+                continue
+            events.append(self._event(event_type, post_id, entry))
+
+        for post_id, entry in previous.items():
+            if post_id not in current:
+                events.append(self._event("deleted", post_id, entry))
+        return events
+
+    def _event(
+        self, event_type: str, post_id: str, entry: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Build a single event"""
+        return {
+            "type": event_type,
+            "id": post_id,
+            "title": entry.get("title", ""),
+            "slug": entry.get("slug", ""),
+            "updated_at": entry.get("updated_at"),
+        }
+
+    def _notify(self, events: List[Dict[str, Any]]):
+        """Deliver events to every subscriber, isolating their failures"""
+        for callback in list(self._subscribers):
+            try:
+                callback(events)
+            except Exception as e:
+                logger.error(f"Change feed subscriber failed: {e}")
+
+    def _empty_state(self) -> Dict[str, Any]:
+        """Build a watermark with no known posts"""
+        return {"version": self.STATE_VERSION, "polled_at": None, "posts": {}}
+
+    def _load_state(self) -> Dict[str, Any]:
+        """Load the watermark, starting fresh if it is missing or unreadable"""
+        if not self.state_path or not os.path.exists(self.state_path):
+            return self._empty_state()
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable change feed state: {e}")
+            return self._empty_state()
+        if state.get("version") != self.STATE_VERSION or not isinstance(
+            state.get("posts"), dict
+        ):
+            return self._empty_state()
+        return state
+
+    def _save_state(self):
+        """Persist the watermark atomically"""
+        if not self.state_path:
+            return
+        os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+        temp_path = self.state_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self._state, f)
+        os.replace(temp_path, self.state_path)
@@ -0,0 +1,213 @@
+# ABOUTME: Streaming readers for WordPress WXR and Ghost JSON export files
+# ABOUTME: Yield one post at a time so memory stays flat for very large exports
+
+import json
+import re
+import xml.etree.ElementTree as ET
+from typing import Any, Dict, Iterator, Optional
+
+# WXR files declare one of several wp namespace versions (1.0, 1.1, 1.2)
+WP_NAMESPACE_PREFIX = "{http://wordpress.org/export/"
+CONTENT_TAG = "{http://purl.org/rss/1.0/modules/content/}encoded"
+
+HTML_COMMENT = re.compile(r"<!--.*?-->", re.DOTALL)
+# Images WordPress wraps in a paragraph of their own, optionally inside a link
+WRAPPED_IMAGE = re.compile(
+    r"<p[^>]*>\s*((?:<a\b[^>]*>\s*)?<img\b[^>]*>(?:\s*</a>)?)\s*</p>",
+    re.IGNORECASE,
+)
+BLOCK_TAG = re.compile(
+    r"<(p|h[1-6]|ul|ol|blockquote|pre|figure|div|table|hr|img)\b", re.IGNORECASE
+)
+
+GHOST_AUDIENCES = {
+    "public": "everyone",
+    "members": "only_free",
+    "paid": "only_paid",
+    "tiers": "only_paid",
+}
+
+
+def _local_name(tag: str) -> str:
+    """Strip the namespace from an ElementTree tag"""
+    return tag.rsplit("}", 1)[-1]
+
+
+def _wp_field(item: ET.Element, name: str) -> Optional[str]:
+    """Read a wp:* child of an item regardless of the export version"""
+    for child in item:
+        if child.tag.startswith(WP_NAMESPACE_PREFIX) and child.tag.endswith("}" + name):
+            return child.text
+    return None
+
+
+def clean_wordpress_html(html: str) -> str:
+    """Prepare WordPress post content for the HTML converter
+
+    Block editor comments are removed, images alone in a paragraph are
+    lifted out so they become image blocks, and content written without
+    block tags (WordPress adds paragraphs on display) is split into
+    paragraphs on blank lines.
+    """
+    html = HTML_COMMENT.sub("", html or "").strip()
+    html = WRAPPED_IMAGE.sub(r"\1", html)
+    if html and not BLOCK_TAG.search(html):
+        paragraphs = [p.strip() for p in re.split(r"\n\s*\n", html) if p.strip()]
+        html = "".join(f"<p>{p.replace(chr(10), '<br>')}</p>" for p in paragraphs)
+    return html
+
+
+def iter_wxr_posts(path: str, include_pages: bool = False) -> Iterator[Dict[str, Any]]:
+    """Stream the posts of a WordPress WXR export
+
+    Each ``<item>`` is cleared and detached from the tree once read, so
+    memory use does not grow with the size of the export. Attachments,
+    menu items and trashed posts are skipped.
+
+    Args:
+        path: Path to the WXR (.xml) file
+        include_pages: Also yield pages, not just posts
+
+    Yields:
+        Dicts with id, title, subtitle, slug, html, status, audience,
+        type and site_url
+    """
+    post_types = ("post", "page") if include_pages else ("post",)
+    channel = None
+    site_url = None
+    depth = 0
+
+    for event, elem in ET.iterparse(path, events=("start", "end")):
+        if event == "start":
+            depth += 1
+            if depth == 2 and _local_name(elem.tag) == "channel":
+                channel = elem
+            continue
+
+        depth -= 1
+        name = _local_name(elem.tag)
+
+        # The channel's own <link> is the site URL, used for relative images
+        if depth == 2 and name == "link" and site_url is None:
+            site_url = (elem.text or "").strip() or None
+            continue
+
+        if name != "item":
+            continue
+
+        post_type = _wp_field(elem, "post_type")
+        status = _wp_field(elem, "status")
+        if post_type in post_types and status != "trash":
+            excerpt = _wp_field(elem, "encoded") or ""
+            yield {
+                "id": _wp_field(elem, "post_id"),
+                "title": (elem.findtext("title") or "").strip(),
+                "subtitle": HTML_COMMENT.sub("", excerpt).strip(),
+                "slug": _wp_field(elem, "post_name"),
+                "html": clean_wordpress_html(elem.findtext(CONTENT_TAG) or ""),
+                "status": status,
+                "audience": "everyone",
+                "type": post_type,
+                "site_url": site_url,
+            }
+
+        elem.clear()
+        if channel is not None:
+            channel.remove(elem)
+
+
+def iter_ghost_posts(
+    path: str, include_pages: bool = False, chunk_size: int = 1 << 20
+) -> Iterator[Dict[str, Any]]:
+    """Stream the posts of a Ghost JSON export
+
+    The file is read in chunks. Once the ``"posts"`` array is found its
+    elements are decoded one at a time, so only a single post and one
+    chunk are held in memory.
+
+    Args:
+        path: Path to the Ghost export (.json) file
+        include_pages: Also yield pages, not just posts
+        chunk_size: Number of characters read at a time
+
+    Yields:
+        Dicts with id, title, subtitle, slug, html, status, audience,
+        type and site_url
+
+    Raises:
+        ValueError: If the file is not a Ghost export
+    """
+    for post in _iter_json_array(path, "posts", chunk_size):
+        if not isinstance(post, dict):
+            continue
+        post_type = post.get("type") or ("page" if post.get("page") else "post")
+        if post_type == "page" and not include_pages:
+            continue
+        yield {
+            "id": post.get("id"),
+            "title": (post.get("title") or "").strip(),
+            "subtitle": (post.get("custom_excerpt") or "").strip(),
+            "slug": post.get("slug"),
+            "html": post.get("html") or "",
+            "status": post.get("status"),
+            "audience": GHOST_AUDIENCES.get(post.get("visibility"), "everyone"),
+            "type": post_type,
+            "site_url": None,
+        }
+
+
+def _iter_json_array(path: str, key: str, chunk_size: int) -> Iterator[Any]:
+    """Decode the elements of the first array stored under ``key`` one by one"""
+    decoder = json.JSONDecoder()
+    key_pattern = re.compile(r'"%s"\s*:\s*\[' % re.escape(key))
+    whitespace = re.compile(r"[\s,]*")
+
+    with open(path, "r", encoding="utf-8-sig") as f:
+        buffer = ""
+
+        def read_more() -> bool:
+            nonlocal buffer
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return False
+            buffer += chunk
+            return True
+
+        # Find the array, keeping only enough of the buffer to match across chunks
+        start = None
+        while start is None:
+            for match in key_pattern.finditer(buffer):
+                if _is_unescaped(buffer, match.start()):
+                    start = match.end()
+                    break
+            else:
+                buffer = buffer[-64:]
+                if not read_more():
+                    raise ValueError(f'No "{key}" array found in {path}')
+        buffer = buffer[start:]
+
+        while True:
+            pos = whitespace.match(buffer).end()
+            if pos == len(buffer):
+                buffer = ""
+                if not read_more():
+                    raise ValueError(f"Unexpected end of file in {path}")
+                continue
+            if buffer[pos] == "]":
+                return
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if not read_more():
+                    raise ValueError(f"Invalid JSON in {path}")
+                continue
+            buffer = buffer[end:]
+            yield value
+
+
+def _is_unescaped(text: str, index: int) -> bool:
+    """Check the quote at ``index`` is not escaped by preceding backslashes"""
+    backslashes = 0
+    while index - backslashes - 1 >= 0 and text[index - backslashes - 1] == "\\":
+        backslashes += 1
+    return backslashes % 2 == 0
@@ -0,0 +1,78 @@
+# ABOUTME: Helpers for reading and writing simple YAML-style front matter blocks
+# ABOUTME: Used by archive export and bulk import so exported files can be re-imported
+
+import json
+from typing import Any, Dict, Tuple
+
+FRONT_MATTER_DELIMITER = "---"
+
+
+def dump_front_matter(metadata: Dict[str, Any]) -> str:
+    """Render metadata as a front matter block
+
+    String values are written as JSON strings, which are valid YAML
+    double-quoted scalars, so titles with colons or quotes survive.
+
+    Args:
+        metadata: Flat mapping of field names to scalar values
+
+    Returns:
+        The front matter block including both delimiter lines
+    """
+    lines = [FRONT_MATTER_DELIMITER]
+    for key, value in metadata.items():
+        if value is None:
+            continue
+        lines.append(f"{key}: {json.dumps(value, ensure_ascii=False)}")
+    lines.append(FRONT_MATTER_DELIMITER)
+    return "\n".join(lines) + "\n"
+
+
+def parse_front_matter(text: str) -> Tuple[Dict[str, Any], str]:
+    """Split a document into its front matter and body
+
+    Only flat ``key: value`` pairs are supported. Values may be bare,
+    single-quoted or double-quoted.
+
+    Args:
+        text: The full document text
+
+    Returns:
+        A tuple of (metadata, body). Metadata is empty when the document
+        has no front matter block.
+    """
+    if not text.startswith(FRONT_MATTER_DELIMITER):
+        return {}, text
+
+    lines = text.split("\n")
+    if lines[0].strip() != FRONT_MATTER_DELIMITER:
+        return {}, text
+
+    metadata: Dict[str, Any] = {}
+    for index in range(1, len(lines)):
+        line = lines[index]
+        if line.strip() == FRONT_MATTER_DELIMITER:
+            return metadata, "\n".join(lines[index + 1 :])
+
+        if not line.strip() or line.lstrip().startswith("#") or ":" not in line:
+            continue
+
+        key, _, raw_value = line.partition(":")
+        metadata[key.strip()] = _parse_scalar(raw_value.strip())
+
+    # No closing delimiter - treat the whole thing as body
+    return {}, text
+
+
+def _parse_scalar(value: str) -> Any:
+    """Parse a single front matter value"""
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        try:
+            return json.loads(value)
+        except ValueError:
+            return value[1:-1]
+    if len(value) >= 2 and value[0] == value[-1] == "'":
+        return value[1:-1].replace("''", "'")
+    if value.lower() in ("true", "false"):
+        return value.lower() == "true"
+    return value
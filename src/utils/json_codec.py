@@ -0,0 +1,218 @@
+# ABOUTME: JSON codec for draft bodies, using orjson or msgspec when installed
+# ABOUTME: Falls back to the standard json module and decodes API bodies lazily
+
+import json
+import logging
+import re
+from abc import ABC, abstractmethod
+from collections.abc import Mapping
+from typing import Any, List, Union
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover - depends on the environment
+    msgspec = None
+
+logger = logging.getLogger(__name__)
+
+
+def _encode_default(obj: Any) -> Any:
+    """Encode values the JSON libraries do not handle themselves
+
+    Block nodes are Mappings rather than dicts, tuples of child nodes
+    only come through msgspec hooks, and str subclasses such as LazyJSON
+    are written as plain strings.
+    """
+    if isinstance(obj, Mapping):
+        return dict(obj)
+    if isinstance(obj, tuple):
+        return list(obj)
+    if isinstance(obj, str):
+        return str(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class JSONCodec(ABC):
+    """Encodes and decodes JSON with one of the available libraries
+
+    Every codec writes compact UTF-8 JSON (no spaces after separators, no
+    ASCII escaping), so output is the same whichever library is used, and
+    raises ValueError for invalid input when decoding.
+    """
+
+    name = ""
+    available = False
+
+    @abstractmethod
+    def dumps(self, obj: Any) -> str:
+        """Encode an object to a JSON string"""
+
+    @abstractmethod
+    def loads(self, data: Union[str, bytes]) -> Any:
+        """Decode a JSON string
+
+        Raises:
+            ValueError: If the data is not valid JSON
+        """
+
+
+class OrjsonCodec(JSONCodec):
+    """Rust-backed codec using orjson"""
+
+    name = "orjson"
+    available = orjson is not None
+
+    def dumps(self, obj: Any) -> str:
+        return orjson.dumps(obj, default=_encode_default).decode()
+
+    def loads(self, data: Union[str, bytes]) -> Any:
+        # orjson.JSONDecodeError is a ValueError
+        return orjson.loads(data)
+
+
+class MsgspecCodec(JSONCodec):
+    """C codec using msgspec's JSON encoder and decoder"""
+
+    name = "msgspec"
+    available = msgspec is not None
+
+    def __init__(self):
+        self._encoder = msgspec.json.Encoder(enc_hook=_encode_default)
+        self._decoder = msgspec.json.Decoder()
+
+    def dumps(self, obj: Any) -> str:
+        return self._encoder.encode(obj).decode()
+
+    def loads(self, data: Union[str, bytes]) -> Any:
+        try:
+            return self._decoder.decode(data)
+        except msgspec.DecodeError as e:
+            raise ValueError(str(e)) from e
+
+
+class StdlibCodec(JSONCodec):
+    """Pure-Python fallback using the json module"""
+
+    name = "json"
+    available = True
+
+    def dumps(self, obj: Any) -> str:
+        return json.dumps(
+            obj, default=_encode_default, ensure_ascii=False, separators=(",", ":")
+        )
+
+    def loads(self, data: Union[str, bytes]) -> Any:
+        return json.loads(data)
+
+
+# Fastest first; "auto" picks the first one that is installed
+CODECS = {codec.name: codec for codec in (OrjsonCodec, MsgspecCodec, StdlibCodec)}
+
+
+def available_codecs() -> List[str]:
+    """Return the names of the installed codecs, fastest first"""
+    return [name for name, codec in CODECS.items() if codec.available]
+
+
+def get_codec(name: str = "auto") -> JSONCodec:
+    """Create a JSON codec
+
+    Args:
+        name: "orjson", "msgspec", "json", or "auto" for the fastest one
+            that is installed
+
+    Returns:
+        A JSONCodec instance
+
+    Raises:
+        ValueError: If the codec is unknown or its package is not installed
+    """
+    if name == "auto":
+        name = available_codecs()[0]
+    if name not in CODECS:
+        raise ValueError(
+            f"Unknown JSON codec: {name}. Choose from auto, {', '.join(CODECS)}"
+        )
+    if not CODECS[name].available:
+        raise ValueError(f"The {name} JSON codec requires the {name} package")
+    return CODECS[name]()
+
+
+codec = get_codec()
+logger.debug(f"Using the {codec.name} JSON codec")
+
+
+# Start of a serialized ProseMirror document, the form of Substack draft bodies
+DOCUMENT_PREFIX = re.compile(r'\s*\{\s*"type"\s*:\s*"doc"\s*[,}]')
+
+
+def looks_like_document(text: str) -> bool:
+    """Check cheaply whether text starts like a serialized ProseMirror document
+
+    Does not decode the text, so a match can still be invalid JSON further on.
+    """
+    return DOCUMENT_PREFIX.match(text) is not None
+
+
+class LazyJSON(str):
+    """JSON text that is decoded the first time its value is needed
+
+    The API returns draft bodies as JSON strings. Wrapping them keeps them
+    usable as the strings they are, while loads() decodes each one at
+    most once and never for callers that only read other fields.
+
+    The text is only known to start like a JSON object: reading ``value``
+    raises ValueError if it is not valid JSON, and callers that pass the
+    text on without decoding it should check it first, e.g. with
+    looks_like_document().
+    """
+
+    _NOT_DECODED = object()
+
+    def __init__(self, text: str):
+        self._value = self._NOT_DECODED
+
+    def __reduce__(self):
+        # Pickle as the text only, e.g. when sent to a conversion worker
+        return LazyJSON, (str(self),)
+
+    @property
+    def value(self) -> Any:
+        """The decoded JSON value"""
+        if self._value is self._NOT_DECODED:
+            self._value = codec.loads(str(self))
+        return self._value
+
+
+def dumps(obj: Any) -> str:
+    """Encode an object to compact JSON with the fastest installed codec
+
+    Args:
+        obj: The object to encode; block nodes are encoded as dicts
+
+    Returns:
+        The JSON string
+    """
+    return codec.dumps(obj)
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    """Decode JSON with the fastest installed codec
+
+    Args:
+        data: JSON text; a LazyJSON is only decoded the first time
+
+    Returns:
+        The decoded value
+
+    Raises:
+        ValueError: If the data is not valid JSON
+    """
+    if isinstance(data, LazyJSON):
+        return data.value
+    return codec.loads(data)
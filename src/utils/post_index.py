@@ -0,0 +1,153 @@
+# ABOUTME: In-memory index from post titles and slugs to post IDs
+# ABOUTME: Lets tools resolve "the post called X" without rescanning the drafts listing
+
+import re
+import unicodedata
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+
+def normalize_title(title: str) -> str:
+    """Normalize a title for lookup
+
+    Case, accents, punctuation and repeated whitespace are ignored, so
+    "Hello, World!" and "hello world" map to the same key.
+    """
+    text = unicodedata.normalize("NFKD", title)
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return " ".join(re.sub(r"[^\w]+", " ", text.casefold()).split())
+
+
+def normalize_slug(slug: str) -> str:
+    """Normalize a slug or post URL for lookup"""
+    slug = slug.strip().lower()
+    if "/p/" in slug:
+        slug = slug.split("/p/", 1)[1]
+    return slug.split("?", 1)[0].split("#", 1)[0].strip("/")
+
+
+class PostIndex:
+    """Maps normalized titles and slugs to post IDs
+
+    The index is filled from listing results as they pass through the
+    post handler and kept current on create, update and delete, so lookups
+    are a dictionary access instead of a scan of the drafts listing.
+    """
+
+    def __init__(self):
+        """Initialize an empty index"""
+        self._entries: Dict[str, Tuple[str, str, str]] = {}
+        self._by_title: Dict[str, Set[str]] = {}
+        self._by_slug: Dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, post_id: Any) -> bool:
+        return str(post_id) in self._entries
+
+    def update(self, post: Dict[str, Any]):
+        """Add or refresh a single post
+
+        Args:
+            post: Post data from the API (listing item, get_draft or write result)
+        """
+        if not isinstance(post, dict) or post.get("id") is None:
+            return
+
+        post_id = str(post["id"])
+        title = post.get("draft_title") or post.get("title") or ""
+        slug = post.get("slug") or post.get("draft_slug") or ""
+        title_key = normalize_title(title) if title else ""
+        slug_key = normalize_slug(slug) if slug else ""
+
+        previous = self._entries.get(post_id)
+        if previous is not None:
+            # Write results may omit fields - keep what is already known
+            if not title_key:
+                title_key, title = previous[0], previous[2]
+            if not slug_key:
+                slug_key = previous[1]
+            if previous == (title_key, slug_key, title):
+                return
+            self._unlink(post_id, previous)
+
+        self._entries[post_id] = (title_key, slug_key, title)
+        if title_key:
+            self._by_title.setdefault(title_key, set()).add(post_id)
+        if slug_key:
+            self._by_slug[slug_key] = post_id
+
+    def update_many(self, posts: Iterable[Dict[str, Any]]):
+        """Add or refresh every post in a listing result"""
+        for post in posts:
+            self.update(post)
+
+    def remove(self, post_id: Any):
+        """Drop a post from the index"""
+        post_id = str(post_id)
+        previous = self._entries.pop(post_id, None)
+        if previous is not None:
+            self._unlink(post_id, previous)
+
+    def apply_changes(self, events: Iterable[Dict[str, Any]]):
+        """Apply change feed events, so the index can subscribe to a ChangeFeed"""
+        for event in events:
+            if event.get("type") == "deleted":
+                self.remove(event["id"])
+            else:
+                self.update(
+                    {
+                        "id": event["id"],
+                        "draft_title": event.get("title"),
+                        "slug": event.get("slug"),
+                    }
+                )
+
+    def lookup(self, identifier: str) -> List[str]:
+        """Find the IDs of posts matching a slug or title
+
+        Args:
+            identifier: A slug, post URL or title
+
+        Returns:
+            Matching post IDs. A slug match wins over title matches.
+        """
+        if not identifier:
+            return []
+
+        slug_match = self._by_slug.get(normalize_slug(identifier))
+        if slug_match is not None:
+            return [slug_match]
+
+        return sorted(self._by_title.get(normalize_title(identifier), ()))
+
+    def search(self, text: str) -> List[str]:
+        """Find posts whose normalized title contains the given text
+
+        This is a linear scan of the index and is only meant as a fallback
+        when no exact match exists.
+        """
+        needle = normalize_title(text)
+        if not needle:
+            return []
+        return sorted(
+            post_id
+            for post_id, (title_key, _, _) in self._entries.items()
+            if needle in title_key
+        )
+
+    def title_of(self, post_id: Any) -> Optional[str]:
+        """Return the title recorded for a post"""
+        entry = self._entries.get(str(post_id))
+        return entry[2] if entry else None
+
+    def _unlink(self, post_id: str, entry: Tuple[str, str, str]):
+        """Remove a post's title and slug keys"""
+        title_key, slug_key, _ = entry
+        ids = self._by_title.get(title_key)
+        if ids is not None:
+            ids.discard(post_id)
+            if not ids:
+                del self._by_title[title_key]
+        if slug_key and self._by_slug.get(slug_key) == post_id:
+            del self._by_slug[slug_key]
@@ -0,0 +1,37 @@
+# ABOUTME: Async rate limiter for spacing out Substack API write requests
+# ABOUTME: Used by bulk operations so imports do not trip the API rate limit
+
+import asyncio
+import time
+
+
+class RateLimiter:
+    """Spaces calls out so no more than a fixed number start per minute"""
+
+    def __init__(self, requests_per_minute: float):
+        """Initialize the limiter
+
+        Args:
+            requests_per_minute: Maximum number of requests allowed per minute
+
+        Raises:
+            ValueError: If requests_per_minute is not positive
+        """
+        if not isinstance(requests_per_minute, (int, float)) or (
+            requests_per_minute <= 0
+        ):
+            raise ValueError("requests_per_minute must be a positive number")
+
+        self.interval = 60.0 / requests_per_minute
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Wait until the next request is allowed to start"""
+        async with self._lock:
+            now = time.monotonic()
+            wait = self._next_slot - now
+            if wait > 0:
+                await asyncio.sleep(wait)
+                now = time.monotonic()
+            self._next_slot = max(now, self._next_slot) + self.interval
@@ -7,11 +7,13 @@ import pytest
 import sys
 import os
 import asyncio
+from unittest.mock import Mock
 from dotenv import load_dotenv
 
 load_dotenv()
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+from src.converters.draft_body import DraftBodySerializer
 from src.handlers.auth_handler import AuthHandler
 from src.handlers.post_handler import PostHandler
 
@@ -21,16 +23,10 @@ from src.handlers.post_handler import PostHandler
 async def test_fixed_paywall():
     print("🧪 Testing FIXED paywall integration...")
 
-    try:
-        # Authenticate and create handlers
-        auth = AuthHandler()
-        client = await auth.authenticate()
-        post_handler = PostHandler(client)
-
-        # Test fixed paywall processing
-        print("\n📝 Testing fixed paywall marker processing...")
+    # Test fixed paywall processing
+    print("\n📝 Testing fixed paywall marker processing...")
 
-        paywall_content = """# Fixed Paywall Test
+    paywall_content = """# Fixed Paywall Test
 
 This is **free content** available to all readers.
 
@@ -60,36 +56,39 @@ def premium_function():
 
 Thank you for subscribing!"""
 
-        # Debug: Test the processing directly
-        print("🔍 Debugging paywall marker processing...")
+    # Debug: Test the processing directly, which needs no authentication
+    print("🔍 Debugging paywall marker processing...")
+    post_handler = PostHandler(Mock())
 
-        from src.converters.markdown_converter import MarkdownConverter
+    # Markers become paywall blocks while the content is converted
+    processed_blocks, audience = post_handler._prepare_draft_blocks(
+        "🔧 FIXED Paywall Test", paywall_content, "markdown"
+    )
 
-        converter = MarkdownConverter()
+    print(f"   Blocks after paywall processing: {len(processed_blocks)}")
+    print(f"   Audience: {audience}")
 
-        # First, test blocks without paywall processing
-        blocks_no_paywall = converter.convert(paywall_content)
-        print(f"   Blocks without paywall processing: {len(blocks_no_paywall)}")
+    # Look for paywall block
+    paywall_found = False
+    for i, block in enumerate(processed_blocks):
+        print(f"   Block {i}: type={block.get('type')}")
+        if block.get("type") == "paywall":
+            paywall_found = True
+            print(f"   ✅ Paywall block found at position {i}")
 
-        # Test paywall processing
-        processed_blocks = post_handler._process_paywall_markers(
-            paywall_content, blocks_no_paywall, "markdown"
-        )
+    assert paywall_found, "Paywall block not found - marker was not processed"
+    assert audience == "only_paid"
 
-        print(f"   Blocks after paywall processing: {len(processed_blocks)}")
+    # The paywall survives serialization to the draft body
+    body = DraftBodySerializer().serialize(processed_blocks)
+    assert "paywall" in [node["type"] for node in body["content"]]
+    print("✅ Paywall processing is working correctly!")
 
-        # Look for paywall block
-        paywall_found = False
-        for i, block in enumerate(processed_blocks):
-            print(f"   Block {i}: type={block.get('type')}")
-            if block.get("type") == "paywall":
-                paywall_found = True
-                print(f"   ✅ Paywall block found at position {i}")
-
-        if paywall_found:
-            print(f"✅ Paywall processing is working correctly!")
-        else:
-            print(f"❌ Paywall block not found - marker may not be processed")
+    try:
+        # Authenticate and create handlers
+        auth = AuthHandler()
+        client = await auth.authenticate()
+        post_handler = PostHandler(client)
 
         # Create the post
         print(f"\n📝 Creating post with fixed paywall processing...")
@@ -13,9 +13,9 @@ from dotenv import load_dotenv
 load_dotenv()
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+from src.converters.draft_body import DraftBodySerializer
 from src.handlers.auth_handler import AuthHandler
 from src.handlers.post_handler import PostHandler
-from substack.post import Post
 
 
 async def debug_posthandler():
@@ -46,21 +46,21 @@ Another paragraph here."""
             print(f"  Type: {block.get('type')}")
             print(f"  Content: {block.get('content')}")
 
-        # Now test creating a post manually
-        print("\n2️⃣ Creating post manually...")
+        # Now test building the draft manually
+        print("\n2️⃣ Building draft manually...")
         user_id = client.get_user_id()
-        post = Post(
-            title="Manual Debug Test",
-            subtitle="Testing manual creation",
-            user_id=user_id,
-        )
-
-        # Add blocks manually
-        print("\n3️⃣ Adding blocks to post...")
-        post_handler._add_blocks_to_post(post, blocks)
 
-        # Get draft data
-        draft_data = post.get_draft()
+        # Serialize blocks manually
+        print("\n3️⃣ Serializing blocks to the draft body...")
+        draft_body = DraftBodySerializer().dumps(blocks)
+        draft_data = post_handler._build_draft(
+            "Manual Debug Test",
+            "Testing manual creation",
+            blocks,
+            "everyone",
+            user_id,
+            draft_body=draft_body,
+        )
         print(f"\n4️⃣ Draft data body length: {len(draft_data.get('draft_body', ''))}")
 
         # Parse and check
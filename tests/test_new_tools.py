@@ -209,14 +209,16 @@ class TestNewTools:
 
         # Verify all formatting is preserved
         assert "## Section Header" in result["content"]
-        assert "• First item" in result["content"]
-        assert "• Second item" in result["content"]
+        assert "- First item" in result["content"]
+        assert "- Second item" in result["content"]
         assert "1. Step one" in result["content"]
         assert "2. Step two" in result["content"]
         assert "> Important quote" in result["content"]
         assert "---" in result["content"]
-        assert "![Test image](https://example.com/image.jpg)" in result["content"]
-        assert "*Image caption*" in result["content"]
+        assert (
+            '![Test image](https://example.com/image.jpg "Image caption")'
+            in result["content"]
+        )
 
     @pytest.mark.asyncio
     async def test_duplicate_post_default_title(self, post_handler, mock_client):
@@ -0,0 +1,237 @@
+# ABOUTME: Unit tests for ArchiveHandler which exports posts to local files
+# ABOUTME: Tests NDJSON and Markdown output, paging, checkpoint resume and failures
+
+import json
+import os
+from unittest.mock import Mock
+
+import pytest
+
+from src.handlers.archive_handler import ArchiveHandler
+from src.utils.api_wrapper import SubstackAPIError
+from src.utils.front_matter import parse_front_matter
+
+
+def make_post(post_id, title, text):
+    """Build a post as returned by get_draft"""
+    return {
+        "id": post_id,
+        "draft_title": title,
+        "draft_subtitle": f"{title} subtitle",
+        "slug": title.lower().replace(" ", "-"),
+        "audience": "everyone",
+        "draft_body": json.dumps(
+            {
+                "type": "doc",
+                "content": [
+                    {
+                        "type": "paragraph",
+                        "content": [{"type": "text", "text": text}],
+                    }
+                ],
+            }
+        ),
+    }
+
+
+class TestArchiveHandler:
+    """Test suite for ArchiveHandler class"""
+
+    def setup_method(self):
+        """Set up test fixtures"""
+        self.posts = {
+            str(i): make_post(i, f"Post {i}", f"Body of post {i}") for i in range(1, 31)
+        }
+        self.mock_client = Mock()
+        self.mock_client.get_user_id.return_value = 123456
+
+        def get_drafts(limit=10, offset=0, raise_errors=False):
+            listing = [{"id": int(k)} for k in self.posts]
+            return listing[offset : offset + limit]
+
+        self.mock_client.get_drafts = Mock(side_effect=get_drafts)
+        self.mock_client.get_draft = Mock(side_effect=lambda pid: self.posts[pid])
+
+    @pytest.mark.asyncio
+    async def test_export_ndjson_pages_through_listing(self, tmp_path):
+        """Test every post across several listing pages lands in the NDJSON file"""
+        handler = ArchiveHandler(self.mock_client)
+
+        result = await handler.export_archive(str(tmp_path), formats=["ndjson"])
+
+        assert result["exported"] == 30
+        assert result["failed"] == []
+        # 25 + 5 posts means two listing calls
+        assert self.mock_client.get_drafts.call_count == 2
+
+        with open(tmp_path / "posts.ndjson", encoding="utf-8") as f:
+            records = [json.loads(line) for line in f]
+
+        assert sorted(r["id"] for r in records) == list(range(1, 31))
+        first = next(r for r in records if r["id"] == 1)
+        assert first["title"] == "Post 1"
+        assert json.loads(first["draft_body"])["type"] == "doc"
+        assert first["markdown"] == "Body of post 1"
+
+    @pytest.mark.asyncio
+    async def test_export_markdown_files_with_front_matter(self, tmp_path):
+        """Test one markdown file is written per post with re-importable metadata"""
+        handler = ArchiveHandler(self.mock_client, concurrency=2)
+
+        await handler.export_archive(str(tmp_path), formats=["markdown"])
+
+        files = sorted(p for p in os.listdir(tmp_path) if p.endswith(".md"))
+        assert len(files) == 30
+        assert "1-post-1.md" in files
+        assert not (tmp_path / "posts.ndjson").exists()
+
+        with open(tmp_path / "1-post-1.md", encoding="utf-8") as f:
+            metadata, body = parse_front_matter(f.read())
+
+        assert metadata["title"] == "Post 1"
+        assert metadata["subtitle"] == "Post 1 subtitle"
+        assert metadata["audience"] == "everyone"
+        assert body.strip() == "Body of post 1"
+
+    @pytest.mark.asyncio
+    async def test_resume_skips_checkpointed_posts(self, tmp_path):
+        """Test a second run only exports posts missing from the checkpoint"""
+        (tmp_path / ".export_checkpoint").write_text(
+            "ndjson 1\nndjson 2\nndjson 3\n", encoding="utf-8"
+        )
+        handler = ArchiveHandler(self.mock_client)
+
+        result = await handler.export_archive(str(tmp_path), formats=["ndjson"])
+
+        assert result["exported"] == 27
+        assert result["skipped"] == 3
+        fetched = {call.args[0] for call in self.mock_client.get_draft.call_args_list}
+        assert not fetched & {"1", "2", "3"}
+
+        # Running again exports nothing new
+        result = await handler.export_archive(str(tmp_path), formats=["ndjson"])
+        assert result["exported"] == 0
+        assert result["skipped"] == 30
+
+    @pytest.mark.asyncio
+    async def test_resume_with_another_format_writes_that_format(self, tmp_path):
+        """Test posts checkpointed for NDJSON are still written as Markdown"""
+        handler = ArchiveHandler(self.mock_client)
+        await handler.export_archive(str(tmp_path), formats=["ndjson"])
+
+        result = await handler.export_archive(str(tmp_path), formats=["markdown"])
+
+        assert result["exported"] == 30
+        assert len(list(tmp_path.glob("*.md"))) == 30
+        with open(tmp_path / "posts.ndjson", encoding="utf-8") as f:
+            assert len(f.readlines()) == 30
+
+        result = await handler.export_archive(str(tmp_path))
+        assert result["exported"] == 0
+        assert result["skipped"] == 30
+
+    @pytest.mark.asyncio
+    async def test_failed_posts_are_reported_and_retried(self, tmp_path):
+        """Test a failing post is reported, left out of the checkpoint and retried"""
+        original = self.mock_client.get_draft.side_effect
+
+        def flaky(pid):
+            if pid == "7":
+                raise Exception("boom")
+            return original(pid)
+
+        self.mock_client.get_draft.side_effect = flaky
+        handler = ArchiveHandler(self.mock_client)
+
+        result = await handler.export_archive(str(tmp_path), formats=["ndjson"])
+
+        assert result["exported"] == 29
+        assert result["failed"] == [{"id": "7", "error": "boom"}]
+
+        self.mock_client.get_draft.side_effect = original
+        result = await handler.export_archive(str(tmp_path), formats=["ndjson"])
+        assert result["exported"] == 1
+
+    @pytest.mark.asyncio
+    async def test_listing_error_marks_the_export_incomplete(self, tmp_path):
+        """Test a failed listing page is reported instead of ending the export"""
+        listing = self.mock_client.get_drafts.side_effect
+
+        def failing(limit=10, offset=0, raise_errors=False):
+            if offset:
+                raise SubstackAPIError("Failed to list posts: timeout")
+            return listing(limit, offset)
+
+        self.mock_client.get_drafts.side_effect = failing
+        handler = ArchiveHandler(self.mock_client)
+
+        result = await handler.export_archive(str(tmp_path), formats=["ndjson"])
+
+        assert self.mock_client.get_drafts.call_args.kwargs["raise_errors"] is True
+        assert result["complete"] is False
+        assert "timeout" in result["listing_error"]
+        assert result["exported"] == 25
+        assert "incomplete" in result["message"]
+
+        self.mock_client.get_drafts.side_effect = listing
+        result = await handler.export_archive(str(tmp_path), formats=["ndjson"])
+        assert result["complete"] is True
+        assert result["exported"] == 5
+
+    @pytest.mark.asyncio
+    async def test_record_and_markdown_use_the_same_body(self, tmp_path):
+        """Test a published post with unpublished edits is archived one way"""
+        published = make_post(1, "Post 1", "Published text")
+        self.posts["1"]["body"] = published["draft_body"]
+        self.posts["1"]["post_date"] = "2024-01-01T00:00:00Z"
+        handler = ArchiveHandler(self.mock_client)
+
+        await handler.export_archive(str(tmp_path))
+
+        with open(tmp_path / "posts.ndjson", encoding="utf-8") as f:
+            record = next(r for r in map(json.loads, f) if r["id"] == 1)
+        assert record["draft_body"] == published["draft_body"]
+        assert record["markdown"] == "Published text"
+        with open(tmp_path / "1-post-1.md", encoding="utf-8") as f:
+            assert parse_front_matter(f.read())[1].strip() == "Published text"
+
+    @pytest.mark.asyncio
+    async def test_resume_drops_records_missing_from_the_checkpoint(self, tmp_path):
+        """Test a record written just before an interruption is not duplicated"""
+        handler = ArchiveHandler(self.mock_client)
+        await handler.export_archive(str(tmp_path), formats=["ndjson"])
+        # Interrupted after writing post 30's record but before its checkpoint,
+        # and part way through the next record
+        checkpoint = tmp_path / ".export_checkpoint"
+        lines = checkpoint.read_text(encoding="utf-8").splitlines()
+        checkpoint.write_text(
+            "".join(f"{line}\n" for line in lines if line != "ndjson 30"),
+            encoding="utf-8",
+        )
+        with open(tmp_path / "posts.ndjson", "a", encoding="utf-8") as f:
+            f.write('{"id": 31, "title"')
+
+        result = await handler.export_archive(str(tmp_path), formats=["ndjson"])
+
+        assert result["exported"] == 1
+        with open(tmp_path / "posts.ndjson", encoding="utf-8") as f:
+            ids = [json.loads(line)["id"] for line in f]
+        assert sorted(ids) == list(range(1, 31))
+
+        # Nothing to drop: the file is left alone and no temporary file stays
+        before = (tmp_path / "posts.ndjson").read_text(encoding="utf-8")
+        await handler.export_archive(str(tmp_path), formats=["ndjson"])
+        assert (tmp_path / "posts.ndjson").read_text(encoding="utf-8") == before
+        assert not (tmp_path / "posts.ndjson.tmp").exists()
+
+    @pytest.mark.asyncio
+    async def test_invalid_arguments(self, tmp_path):
+        """Test input validation"""
+        with pytest.raises(ValueError, match="concurrency"):
+            ArchiveHandler(self.mock_client, concurrency=0)
+
+        handler = ArchiveHandler(self.mock_client)
+        with pytest.raises(ValueError, match="output_dir"):
+            await handler.export_archive("")
+        with pytest.raises(ValueError, match="formats"):
+            await handler.export_archive(str(tmp_path), formats=["pdf"])
@@ -0,0 +1,81 @@
+# ABOUTME: Unit tests for the block-level diff of draft bodies
+# ABOUTME: Tests matching by fingerprint, change pairing and the summaries
+
+from src.utils.block_diff import (
+    block_fingerprint,
+    body_blocks,
+    describe_diff,
+    diff_blocks,
+    summarize_diff,
+)
+
+
+def paragraph(*texts):
+    """Build a ProseMirror paragraph with one text node per string"""
+    return {
+        "type": "paragraph",
+        "content": [{"type": "text", "text": t} for t in texts],
+    }
+
+
+class TestBlockDiff:
+    """Test suite for diff_blocks and its helpers"""
+
+    def test_fingerprint_ignores_key_order(self):
+        """Test equal blocks match however their keys are ordered"""
+        heading = {"type": "heading", "attrs": {"level": 2}, "content": []}
+        reordered = {"content": [], "attrs": {"level": 2}, "type": "heading"}
+
+        assert block_fingerprint(heading) == block_fingerprint(reordered)
+        assert block_fingerprint(heading) != block_fingerprint(paragraph("x"))
+
+    def test_identical_bodies(self):
+        """Test identical block lists report no changes"""
+        blocks = [paragraph("a"), {"type": "horizontal_rule"}]
+
+        diff = diff_blocks(blocks, [dict(block) for block in blocks])
+
+        assert diff["identical"] is True
+        assert diff["unchanged"] == 2
+        assert summarize_diff(diff) == "no changes"
+
+    def test_changed_inserted_and_removed_blocks(self):
+        """Test replaced runs pair up as changes and the rest are counted"""
+        old = [paragraph("intro"), paragraph("old ", "text"), paragraph("gone")]
+        new = [
+            paragraph("intro"),
+            paragraph("new ", "text"),
+            {"type": "horizontal_rule"},
+            paragraph("gone"),
+            paragraph("added"),
+        ]
+
+        diff = diff_blocks(old, new)
+
+        assert diff["identical"] is False
+        assert diff["changed"] == [
+            {"index": 1, "type": "paragraph", "before": "old text", "after": "new text"}
+        ]
+        assert [entry["index"] for entry in diff["inserted"]] == [2, 4]
+        assert diff["removed"] == []
+        assert diff["unchanged"] == 2
+        assert summarize_diff(diff) == "1 changed, 2 inserted, 2 unchanged"
+        assert describe_diff(diff, limit=2) == [
+            'changed paragraph 2: "old text" -> "new text"',
+            'inserted horizontal_rule 3: ""',
+            "... and 1 more",
+        ]
+
+    def test_removed_blocks_use_old_indexes(self):
+        """Test removed blocks are reported with their place in the old body"""
+        diff = diff_blocks([paragraph("a"), paragraph("b")], [paragraph("a")])
+
+        assert diff["removed"] == [{"index": 1, "type": "paragraph", "text": "b"}]
+
+    def test_body_blocks_only_reads_documents(self):
+        """Test body_blocks returns None for anything but a ProseMirror doc"""
+        assert body_blocks({"type": "doc", "content": [paragraph("a")]}) == [
+            paragraph("a")
+        ]
+        assert body_blocks({"blocks": []}) is None
+        assert body_blocks("text") is None
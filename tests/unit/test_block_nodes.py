@@ -0,0 +1,169 @@
+# ABOUTME: Unit tests for the immutable block nodes built by BlockBuilder
+# ABOUTME: Tests dict compatibility, immutability, interning and serialization
+
+import json
+import pickle
+
+import pytest
+
+from src.converters.block_builder import BlockBuilder
+from src.converters.block_nodes import (
+    Block,
+    Node,
+    Text,
+    coalesce,
+    link_marks,
+    marks_for,
+    to_dicts,
+)
+from src.converters.draft_body import DraftBodySerializer
+from src.converters.markdown_converter import MarkdownConverter
+
+MARKDOWN = """# Title
+
+Some **bold**, *em*, `code` and a [link](https://example.com).
+
+1. One
+2. Two
+   - Nested
+
+> Quote
+
+```python
+print("hi")
+```
+
+![Alt](https://example.com/a.png "Caption")
+
+---
+"""
+
+
+class TestBlockNodes:
+    """Test suite for the block node model"""
+
+    def setup_method(self):
+        """Set up test fixtures"""
+        self.builder = BlockBuilder()
+        self.converter = MarkdownConverter()
+
+    def test_nodes_read_and_compare_like_dicts(self):
+        """Test keys, get, membership and equality match the dict form"""
+        text = self.builder.text("bold", ["strong"])
+
+        assert text["content"] == "bold"
+        assert text.get("marks") == [{"type": "strong"}]
+        assert "marks" in text
+        assert "marks" not in self.builder.text("plain")
+        assert list(self.builder.ordered_list(["a"], start=3)) == [
+            "type",
+            "start",
+            "content",
+        ]
+        assert self.builder.link("x", "https://x.com") == {
+            "type": "text",
+            "content": "x",
+            "marks": [{"type": "link", "href": "https://x.com"}],
+        }
+
+    def test_nodes_are_immutable(self):
+        """Test attributes cannot be set or deleted"""
+        block = self.builder.paragraph("text")
+
+        with pytest.raises(AttributeError):
+            block.type = "heading-one"
+        with pytest.raises(AttributeError):
+            del block.content[0].content
+        with pytest.raises(TypeError):
+            block["type"] = "heading-one"
+
+    def test_node_without_to_dict_cannot_be_created(self):
+        """Test a node type missing to_dict fails when created"""
+
+        class Bare(Node):
+            __slots__ = ()
+
+            def __getitem__(self, key):
+                raise KeyError(key)
+
+            def __iter__(self):
+                return iter(())
+
+        with pytest.raises(TypeError, match="to_dict"):
+            Bare()
+
+    def test_marks_are_interned(self):
+        """Test text with the same marks shares one marks tuple"""
+        first = self.builder.text("a", ["strong", "em"])
+        second = self.builder.text("b", ("strong", "em"))
+
+        assert first.marks is second.marks
+        assert marks_for(["code"]) is marks_for(("code",))
+        assert self.builder.horizontal_rule() is self.builder.horizontal_rule()
+
+    def test_links_to_one_url_share_marks(self):
+        """Test link marks are interned per href"""
+        first = self.builder.link("a", "https://example.com")
+        second = self.builder.link("b", "https://example.com")
+
+        assert first.marks is second.marks
+        assert link_marks("https://other.com") != first.marks
+
+    def test_coalesce_merges_runs_with_the_same_marks(self):
+        """Test adjacent same-mark runs join and empty runs disappear"""
+        bold = self.builder.text("b", ["strong"])
+        runs = [
+            Text("a"),
+            Text(""),
+            Text("b"),
+            bold,
+            self.builder.text("c", ("strong",)),
+            self.builder.text("", ["em"]),
+            Text("d", (marks_for(["strong"])[0],)),
+            self.builder.link("e", "https://x.com"),
+            self.builder.link("f", "https://x.com"),
+            Block("hr"),
+            Text("g"),
+        ]
+
+        merged = coalesce(runs)
+
+        assert merged == (
+            {"type": "text", "content": "ab"},
+            {"type": "text", "content": "bcd", "marks": [{"type": "strong"}]},
+            {
+                "type": "text",
+                "content": "ef",
+                "marks": [{"type": "link", "href": "https://x.com"}],
+            },
+            {"type": "hr"},
+            {"type": "text", "content": "g"},
+        )
+        assert merged[1].marks is bold.marks
+        assert coalesce([bold])[0] is bold
+        assert coalesce([Text("")]) == ()
+
+    def test_to_dict_matches_convert_output(self):
+        """Test convert returns plain dicts equal to the nodes"""
+        nodes = self.converter.convert_nodes(MARKDOWN)
+        blocks = self.converter.convert(MARKDOWN)
+
+        assert all(isinstance(node, Block) for node in nodes)
+        assert all(type(block) is dict for block in blocks)
+        assert nodes == blocks
+        assert json.loads(json.dumps(to_dicts(nodes))) == blocks
+
+    def test_nodes_pickle(self):
+        """Test nodes survive pickling, e.g. to a worker process"""
+        nodes = self.converter.convert_nodes(MARKDOWN)
+
+        assert pickle.loads(pickle.dumps(nodes)) == nodes
+
+    def test_nodes_and_dicts_serialize_the_same(self):
+        """Test the draft body is the same for nodes and their dicts"""
+        serializer = DraftBodySerializer()
+
+        from_nodes = serializer.dumps(self.converter.convert_nodes(MARKDOWN))
+        from_dicts = serializer.dumps(self.converter.convert(MARKDOWN))
+
+        assert from_nodes == from_dicts
@@ -0,0 +1,165 @@
+# ABOUTME: Unit tests for ChangeFeed which diffs the drafts listing against a watermark
+# ABOUTME: Tests event detection, persistence, subscribers and partial-listing safety
+
+from unittest.mock import Mock
+
+import pytest
+
+from src.utils.api_wrapper import SubstackAPIError
+from src.utils.change_feed import ChangeFeed
+from src.utils.post_index import PostIndex
+
+
+class TestChangeFeed:
+    """Test suite for ChangeFeed class"""
+
+    def setup_method(self):
+        """Set up test fixtures"""
+        self.posts = [
+            {"id": 1, "draft_title": "One", "draft_updated_at": "t1"},
+            {"id": 2, "draft_title": "Two", "draft_updated_at": "t1"},
+        ]
+        self.failing_offset = None
+        self.mock_client = Mock()
+        self.mock_client.publication_url = "https://test.substack.com"
+        self.mock_client.get_drafts.side_effect = self._get_drafts
+
+    def _get_drafts(self, limit, offset=0, raise_errors=False):
+        """Serve self.posts, failing at self.failing_offset if set"""
+        if offset == self.failing_offset:
+            raise SubstackAPIError("Failed to list posts: boom")
+        return [dict(post) for post in self.posts[offset : offset + limit]]
+
+    @pytest.mark.asyncio
+    async def test_detects_each_kind_of_change(self, tmp_path):
+        """Test created, updated, published and deleted events"""
+        feed = ChangeFeed(self.mock_client, state_path=str(tmp_path / "state.json"))
+
+        first = await feed.poll()
+        assert [(e["type"], e["id"]) for e in first] == [
+            ("created", "1"),
+            ("created", "2"),
+        ]
+        assert await feed.poll() == []
+
+        self.posts[0]["draft_updated_at"] = "t2"
+        self.posts[1]["post_date"] = "2025-01-01"
+        self.posts.append({"id": 3, "draft_title": "Three"})
+        del self.posts[0]
+        self.posts.insert(0, {"id": 4, "draft_title": "Four"})
+
+        events = await feed.poll()
+        assert sorted((e["type"], e["id"]) for e in events) == [
+            ("created", "3"),
+            ("created", "4"),
+            ("deleted", "1"),
+            ("published", "2"),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_watermark_persists_across_instances(self, tmp_path):
+        """Test a new feed with the same state file continues where it left off"""
+        state_path = str(tmp_path / "nested" / "state.json")
+        await ChangeFeed(self.mock_client, state_path=state_path).poll()
+
+        self.posts[1]["draft_updated_at"] = "t2"
+        feed = ChangeFeed(self.mock_client, state_path=state_path)
+
+        assert feed.polled_at is not None
+        events = await feed.poll()
+        assert [(e["type"], e["id"]) for e in events] == [("updated", "2")]
+
+        feed.reset()
+        assert len(await feed.poll()) == 2
+
+    @pytest.mark.asyncio
+    async def test_pages_through_listing(self):
+        """Test posts beyond the first page are included"""
+        self.posts = [{"id": i, "draft_updated_at": "t"} for i in range(60)]
+        feed = ChangeFeed(self.mock_client, state_path=None)
+
+        events = await feed.poll()
+
+        assert len(events) == 60
+        assert self.mock_client.get_drafts.call_count == 3
+
+    @pytest.mark.asyncio
+    async def test_empty_listing_keeps_watermark(self):
+        """Test a failed (empty) listing is not reported as mass deletion"""
+        feed = ChangeFeed(self.mock_client, state_path=None)
+        await feed.poll()
+
+        saved = self.posts
+        self.posts = []
+        assert await feed.poll() == []
+
+        self.posts = saved
+        assert await feed.poll() == []
+
+    @pytest.mark.asyncio
+    async def test_subscribers_receive_events(self):
+        """Test subscribers are notified and isolated from each other"""
+        feed = ChangeFeed(self.mock_client, state_path=None)
+        index = PostIndex()
+        received = []
+
+        feed.subscribe(Mock(side_effect=Exception("broken subscriber")))
+        unsubscribe = feed.subscribe(received.append)
+        feed.subscribe(index.apply_changes)
+
+        await feed.poll()
+        assert index.lookup("two") == ["2"]
+        assert len(received) == 1
+
+        unsubscribe()
+        del self.posts[1]
+        await feed.poll()
+
+        assert len(received) == 1
+        assert index.lookup("two") == []
+
+    @pytest.mark.asyncio
+    async def test_failed_page_reports_nothing(self, tmp_path):
+        """Test a page failing mid-listing leaves events and watermark untouched"""
+        self.posts = [{"id": i, "draft_updated_at": "t"} for i in range(60)]
+        state_path = str(tmp_path / "state.json")
+        feed = ChangeFeed(self.mock_client, state_path=state_path)
+        await feed.poll()
+        polled_at = feed.polled_at
+
+        self.failing_offset = 25
+        with pytest.raises(SubstackAPIError):
+            await feed.poll()
+        assert feed.polled_at == polled_at
+
+        self.failing_offset = None
+        assert await ChangeFeed(self.mock_client, state_path=state_path).poll() == []
+
+    @pytest.mark.asyncio
+    async def test_truncated_listing_reports_no_deletions(self, monkeypatch):
+        """Test posts beyond MAX_PAGES are not reported as deleted"""
+        self.posts = [{"id": i, "draft_updated_at": "t"} for i in range(60)]
+        feed = ChangeFeed(self.mock_client, state_path=None)
+        await feed.poll()
+        polled_at = feed.polled_at
+
+        monkeypatch.setattr(ChangeFeed, "MAX_PAGES", 1)
+        self.posts[0]["draft_updated_at"] = "t2"
+        events = await feed.poll()
+
+        assert [(e["type"], e["id"]) for e in events] == [("updated", "0")]
+        assert feed.polled_at == polled_at
+
+        monkeypatch.setattr(ChangeFeed, "MAX_PAGES", 200)
+        assert await feed.poll() == []
+
+    def test_state_path_is_keyed_by_publication(self, tmp_path):
+        """Test each publication gets its own watermark file"""
+        template = str(tmp_path / "{publication}.json")
+        other_client = Mock(publication_url="https://other.substack.com/")
+
+        first = ChangeFeed(self.mock_client, state_path=template)
+        second = ChangeFeed(other_client, state_path=template)
+
+        assert first.state_path == str(tmp_path / "test.substack.com.json")
+        assert second.state_path == str(tmp_path / "other.substack.com.json")
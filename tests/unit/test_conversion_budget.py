@@ -0,0 +1,203 @@
+# ABOUTME: Tests for ConversionBudget and the size, nesting and time limits of the converters
+# ABOUTME: Fuzzes both converters with seeded degenerate input and checks they stay linear
+
+import pickle
+import random
+import sys
+import time
+
+import pytest
+
+from src.converters.conversion_budget import (
+    MAX_NESTING_DEPTH,
+    ConversionBudget,
+    ConversionLimitError,
+)
+from src.converters.draft_body import DraftBodySerializer
+from src.converters.html_converter import HTMLConverter
+from src.converters.markdown_converter import MarkdownConverter
+from src.converters.markdown_renderer import MarkdownRenderer
+
+MARKDOWN_FRAGMENTS = [
+    "*", "**", "***", "_", "[", "]", "](", ")", "`", "```", "\\", "\\*", "![",
+    "> ", "- ", "1. ", "# ", "---", "<!--", "-->", "    ", "\t", "\n", "\n\n",
+    "a", "word ",
+]  # fmt: skip
+HTML_FRAGMENTS = [
+    "<p>", "</p>", "<b>", "<i>", "</i>", "<div>", "</div>", "<ul>", "<li>",
+    "<pre><code>", "<blockquote>", "<a href='x'>", "</a>", "<img src='x.png'>",
+    "<hr>", "<!--", "-->", "&amp;", "<", ">", "'", "text ",
+]  # fmt: skip
+
+
+def degenerate(rng: random.Random, fragments, size: int) -> str:
+    """Random soup of markup fragments, some of them repeated many times"""
+    parts = []
+    length = 0
+    while length < size:
+        part = rng.choice(fragments) * rng.choice([1, 1, 2, 10, 100])
+        parts.append(part)
+        length += len(part)
+    return "".join(parts)
+
+
+def count_calls(call) -> int:
+    """Number of Python and builtin function calls made while running ``call``"""
+    calls = 0
+
+    def profile(frame, event, arg):
+        nonlocal calls
+        if event in ("call", "c_call"):
+            calls += 1
+
+    sys.setprofile(profile)
+    try:
+        call()
+    finally:
+        sys.setprofile(None)
+    return calls
+
+
+class TestConversionBudget:
+    """Test suite for conversion budgets"""
+
+    def setup_method(self):
+        """Set up test fixtures"""
+        self.markdown = MarkdownConverter()
+        self.html = HTMLConverter()
+
+    def test_rejects_limits_that_are_not_positive(self):
+        """Test a budget needs positive limits or None"""
+        with pytest.raises(ValueError, match="max_chars"):
+            ConversionBudget(max_chars=0)
+        with pytest.raises(ValueError, match="time_limit"):
+            ConversionBudget(time_limit=-1)
+
+        assert ConversionBudget(None, None, None).max_depth is None
+
+    def test_limit_error_is_a_value_error_that_pickles(self):
+        """Test limit errors read as input errors and cross to worker processes"""
+        error = pickle.loads(pickle.dumps(ConversionLimitError("too long")))
+
+        assert isinstance(error, ValueError)
+        assert str(error) == "too long"
+
+    def test_markdown_longer_than_limit_is_rejected(self):
+        """Test text over max_chars fails before it is parsed"""
+        converter = MarkdownConverter(ConversionBudget(max_chars=100))
+
+        assert converter.convert("a" * 100)
+        with pytest.raises(ConversionLimitError, match="100 character limit"):
+            converter.convert("a" * 101)
+
+    def test_streamed_markdown_counts_characters_read(self):
+        """Test a stream of lines stops once it has read too much"""
+        converter = MarkdownConverter(ConversionBudget(max_chars=100))
+        lines = (line for number in range(1000) for line in (f"line {number}\n", "\n"))
+        blocks = converter.iter_blocks(lines)
+
+        assert next(blocks)["type"] == "paragraph"
+        with pytest.raises(ConversionLimitError):
+            list(blocks)
+
+    def test_markdown_nesting_limit(self):
+        """Test quotes and lists nest up to the limit and no further"""
+        serializer = DraftBodySerializer()
+        renderer = MarkdownRenderer()
+
+        for unit in ["> ", "- ", "> 1. "]:
+            levels = len(unit.split())
+            deepest = unit * (MAX_NESTING_DEPTH // levels) + "text"
+            blocks = self.markdown.convert_nodes(deepest)
+            # Everything downstream handles the deepest allowed tree
+            renderer.render_body(serializer.dumps(blocks))
+
+            with pytest.raises(ConversionLimitError, match="nested more than"):
+                self.markdown.convert(unit * (MAX_NESTING_DEPTH + 1) + "text")
+
+    def test_markdown_time_limit(self):
+        """Test a slow conversion stops soon after its time runs out"""
+        converter = MarkdownConverter(ConversionBudget(time_limit=0.05))
+
+        start = time.perf_counter()
+        with pytest.raises(ConversionLimitError, match="0.05 second limit"):
+            converter.convert("- a\n" * 200_000)
+        assert time.perf_counter() - start < 1
+
+    def test_time_between_streamed_blocks_is_not_counted(self):
+        """Test a slow consumer of iter_blocks does not use up the time limit"""
+        converter = MarkdownConverter(ConversionBudget(time_limit=0.05))
+        blocks = []
+
+        for block in converter.iter_blocks("one\n\ntwo\n\nthree\n\nfour"):
+            time.sleep(0.03)
+            blocks.append(block)
+
+        assert len(blocks) == 4
+
+    def test_html_longer_than_limit_is_rejected(self):
+        """Test HTML over max_chars fails before it is parsed"""
+        converter = HTMLConverter(budget=ConversionBudget(max_chars=100))
+
+        with pytest.raises(ConversionLimitError, match="100 character limit"):
+            converter.convert("<p>" + "a" * 100 + "</p>")
+
+    def test_deeply_nested_html_converts(self):
+        """Test thousands of nested elements do not hit the recursion limit"""
+        html = "<div>" * 5000 + "<p>deep</p>" + "</div>" * 5000
+
+        blocks = self.html.convert(html)
+
+        assert blocks == [
+            {"type": "paragraph", "content": [{"type": "text", "content": "deep"}]}
+        ]
+
+    def test_html_time_limit_stops_the_parse(self):
+        """Test malformed markup the parser is slow on stops at the time limit"""
+        # Only the bs4 parse is metered as it runs
+        converter = HTMLConverter(
+            backend="bs4", budget=ConversionBudget(time_limit=0.1)
+        )
+
+        start = time.perf_counter()
+        with pytest.raises(ConversionLimitError, match="second limit"):
+            converter.convert("<!--" * 200_000)
+        assert time.perf_counter() - start < 2
+
+    def test_degenerate_markdown_scales_linearly(self):
+        """Test runs of unmatched markers cost work in proportion to their length"""
+        for unit in ["*", "[", "[a](", "*a ", "`a ", "*[`", "![", "\\*", "**a\n"]:
+            small = unit * (10_000 // len(unit))
+            large = unit * (40_000 // len(unit))
+
+            ratio = count_calls(
+                lambda text=large: self.markdown.convert_nodes(text)
+            ) / count_calls(lambda text=small: self.markdown.convert_nodes(text))
+
+            # Four times the input; quadratic work would make about 16 times
+            # the calls
+            assert ratio < 5, (unit, ratio)
+
+    def test_random_degenerate_markdown_converts_or_hits_a_limit(self):
+        """Test random marker soup never crashes the converter or the writers"""
+        serializer = DraftBodySerializer()
+        renderer = MarkdownRenderer()
+
+        for seed in range(200):
+            rng = random.Random(seed)
+            markdown = degenerate(rng, MARKDOWN_FRAGMENTS, rng.randint(1, 5000))
+            try:
+                blocks = self.markdown.convert_nodes(markdown)
+            except ConversionLimitError:
+                continue
+            renderer.render_body(serializer.dumps(blocks))
+
+    def test_random_degenerate_html_converts_or_hits_a_limit(self):
+        """Test random tag soup never crashes the converter"""
+        for seed in range(200):
+            rng = random.Random(seed)
+            html = degenerate(rng, HTML_FRAGMENTS, rng.randint(1, 5000))
+            try:
+                self.html.convert_nodes(html)
+            except ConversionLimitError:
+                pass
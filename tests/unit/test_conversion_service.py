@@ -0,0 +1,119 @@
+# ABOUTME: Tests for ConversionService, the process-pool conversion engine
+# ABOUTME: Checks ordered batch results, the in-process fallback and async jobs
+
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from src.converters import conversion_service
+from src.converters.conversion_service import ConversionService
+from src.converters.draft_body import DraftBodySerializer
+from src.converters.html_converter import HTMLConverter
+from src.converters.markdown_converter import MarkdownConverter
+from src.utils import json_codec
+
+DOCUMENTS = [
+    ("# One\n\nFirst **post**", "markdown"),
+    ("<h2>Two</h2><p>Second <em>post</em></p>", "html"),
+    ("- three\n- items\n\n> quoted", "markdown"),
+    ("<ul><li>four</li></ul>", "html"),
+    ("Fifth post", "markdown"),
+]
+
+
+def expected_blocks():
+    converters = {"markdown": MarkdownConverter(), "html": HTMLConverter()}
+    return [
+        converters[content_type].convert_nodes(content)
+        for content, content_type in DOCUMENTS
+    ]
+
+
+class TestConversionService:
+    """Test suite for ConversionService"""
+
+    def test_small_batch_converts_in_process(self):
+        """Test a batch below the threshold never starts worker processes"""
+        service = ConversionService(max_workers=2)
+
+        results = service.convert_many(DOCUMENTS)
+
+        assert results == expected_blocks()
+        assert service._pool is None
+
+    def test_pool_returns_results_in_order(self):
+        """Test worker results match in-process conversion, in input order"""
+        body = json_codec.dumps(DraftBodySerializer().serialize(expected_blocks()[2]))
+        with ConversionService(
+            max_workers=2, chunk_size=2, serial_threshold=0
+        ) as service:
+            results = service.convert_many(DOCUMENTS)
+            rendered = service.render_many([body, "plain text"])
+            assert service._pool is not None
+
+        assert results == expected_blocks()
+        assert rendered == ["- three\n- items\n\n> quoted", "plain text"]
+
+    def test_falls_back_when_workers_cannot_start(self):
+        """Test conversion still works when no process pool is available"""
+        service = ConversionService(max_workers=2, serial_threshold=0)
+
+        with patch.object(
+            conversion_service, "ProcessPoolExecutor", side_effect=OSError("denied")
+        ) as executor:
+            assert service.convert_many(DOCUMENTS) == expected_blocks()
+            assert service.convert_many(DOCUMENTS) == expected_blocks()
+
+        assert executor.call_count == 1
+        assert service._pool is None
+
+    def test_workers_are_not_forked(self):
+        """Test the pool starts workers without forking the threaded server"""
+        service = ConversionService(max_workers=2, serial_threshold=0)
+
+        with patch.object(conversion_service, "ProcessPoolExecutor") as executor:
+            service._get_pool()
+
+        start_method = executor.call_args.kwargs["mp_context"].get_start_method()
+        assert start_method in ("forkserver", "spawn")
+
+    def test_threads_do_not_share_converters(self):
+        """Test jobs run in different threads get converters of their own"""
+        converters = []
+
+        def convert():
+            conversion_service._run_job("html", "<p>x</p>")
+            converters.append(conversion_service._local.tools["html"])
+
+        threads = [threading.Thread(target=convert) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert converters[0] is not converters[1]
+
+    def test_rejects_unsupported_content(self):
+        """Test invalid settings and content types raise ValueError"""
+        service = ConversionService(max_workers=1)
+
+        with pytest.raises(ValueError, match="Unsupported content type"):
+            service.convert_many([("text", "plain")])
+        with pytest.raises(ValueError, match="Unsupported conversion job"):
+            service.run_many([("pdf", "data")])
+        with pytest.raises(ValueError, match="max_workers"):
+            ConversionService(max_workers=0)
+
+    @pytest.mark.asyncio
+    async def test_async_jobs_match_in_process_results(self):
+        """Test single jobs convert the same in a thread and in a worker"""
+        content, content_type = DOCUMENTS[0]
+        small = ConversionService(max_workers=2)
+        with ConversionService(max_workers=2, serial_threshold=0) as pooled:
+            for service in (small, pooled):
+                blocks = await service.convert(content, content_type)
+                assert blocks == expected_blocks()[0]
+                assert await service.render({"blocks": []}) == ""
+
+        assert small._pool is None
@@ -0,0 +1,45 @@
+# ABOUTME: Unit tests for DocumentCache, the per-document store used for reconversion
+# ABOUTME: Tests lookups, eviction of the least recently converted document and discard
+
+import pytest
+
+from src.converters.document_cache import DocumentCache
+
+
+class TestDocumentCache:
+    """Test suite for DocumentCache"""
+
+    def setup_method(self):
+        """Set up test fixtures"""
+        self.cache = DocumentCache(max_documents=2)
+
+    def test_keeps_the_most_recently_used_documents(self):
+        """Test the document used longest ago is dropped when full"""
+        self.cache.put("a", 1)
+        self.cache.put("b", 2)
+        assert self.cache.get("a") == 1
+
+        self.cache.put("c", 3)
+
+        assert "b" not in self.cache
+        assert self.cache.get("a") == 1
+        assert self.cache.get("c") == 3
+        assert len(self.cache) == 2
+
+    def test_discard_and_clear(self):
+        """Test documents can be forgotten one at a time or all at once"""
+        self.cache.put("a", 1)
+        self.cache.put("b", 2)
+
+        self.cache.discard("a")
+        self.cache.discard("missing")
+        assert self.cache.get("a") is None
+        assert len(self.cache) == 1
+
+        self.cache.clear()
+        assert len(self.cache) == 0
+
+    def test_rejects_a_size_that_is_not_positive(self):
+        """Test the cache must hold at least one document"""
+        with pytest.raises(ValueError, match="max_documents"):
+            DocumentCache(max_documents=0)
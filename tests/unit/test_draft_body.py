@@ -0,0 +1,163 @@
+# ABOUTME: Unit tests for DraftBodySerializer, the blocks to draft_body writer
+# ABOUTME: Tests each block type, inline marks, nesting and empty content
+
+import json
+
+from src.converters.block_builder import BlockBuilder
+from src.converters.block_nodes import Block
+from src.converters.draft_body import DraftBodySerializer, plain_paragraphs
+
+
+class TestDraftBodySerializer:
+    """Test suite for DraftBodySerializer"""
+
+    def setup_method(self):
+        """Set up test fixtures"""
+        self.serializer = DraftBodySerializer()
+        self.builder = BlockBuilder()
+
+    def serialize(self, *blocks):
+        """Serialize blocks and return the document's content"""
+        return self.serializer.serialize(blocks)["content"]
+
+    def test_paragraph_and_heading_keep_marks(self):
+        """Test text runs become text nodes with marks and link attrs"""
+        runs = [
+            self.builder.text("Hi "),
+            self.builder.text("bold", ["strong", "em"]),
+            self.builder.link("site", "https://example.com"),
+            self.builder.text(""),
+        ]
+        heading = Block(
+            "heading-three", (self.builder.text("A "), self.builder.text("x", ["code"]))
+        )
+
+        paragraph, heading = self.serialize(self.builder.paragraph(runs), heading)
+
+        assert paragraph == {
+            "type": "paragraph",
+            "content": [
+                {"type": "text", "text": "Hi "},
+                {
+                    "type": "text",
+                    "text": "bold",
+                    "marks": [{"type": "strong"}, {"type": "em"}],
+                },
+                {
+                    "type": "text",
+                    "text": "site",
+                    "marks": [
+                        {"type": "link", "attrs": {"href": "https://example.com"}}
+                    ],
+                },
+            ],
+        }
+        assert heading == {
+            "type": "heading",
+            "attrs": {"level": 3},
+            "content": [
+                {"type": "text", "text": "A "},
+                {"type": "text", "text": "x", "marks": [{"type": "code"}]},
+            ],
+        }
+
+    def test_adjacent_runs_with_the_same_marks_are_one_node(self):
+        """Test runs split by the parsers are written as single text nodes"""
+        link = [{"type": "link", "href": "https://x.com"}]
+        runs = [
+            {"type": "text", "content": "a"},
+            {"type": "text", "content": "b", "marks": []},
+            {"type": "text", "content": ""},
+            {"type": "text", "content": "c"},
+            {"type": "text", "content": "d", "marks": link},
+            {"type": "text", "content": "e", "marks": list(link)},
+            self.builder.text("f", ["em"]),
+            self.builder.text("g", ["em"]),
+        ]
+
+        (paragraph,) = self.serialize({"type": "paragraph", "content": runs})
+
+        assert paragraph["content"] == [
+            {"type": "text", "text": "abc"},
+            {
+                "type": "text",
+                "text": "de",
+                "marks": [{"type": "link", "attrs": {"href": "https://x.com"}}],
+            },
+            {"type": "text", "text": "fg", "marks": [{"type": "em"}]},
+        ]
+
+    def test_lists_and_quotes_nest_natively(self):
+        """Test lists become list_item nodes holding their child blocks"""
+        nested = self.builder.unordered_list(["inner"])
+        ordered = self.builder.ordered_list(
+            [[self.builder.paragraph("one"), nested], []], start=4
+        )
+        quote = self.builder.blockquote([self.builder.blockquote("deep")])
+
+        lists, quotes = self.serialize(ordered, quote)
+
+        assert lists["type"] == "ordered_list"
+        assert lists["attrs"] == {"start": 4}
+        first, empty = lists["content"]
+        assert [node["type"] for node in first["content"]] == [
+            "paragraph",
+            "bullet_list",
+        ]
+        assert first["content"][1]["content"][0]["type"] == "list_item"
+        assert empty == {"type": "list_item", "content": [{"type": "paragraph"}]}
+        inner = quotes["content"][0]
+        assert inner["type"] == "blockquote"
+        assert inner["content"][0]["content"] == [{"type": "text", "text": "deep"}]
+
+    def test_code_image_rule_and_paywall(self):
+        """Test the non-text blocks keep the shapes Substack accepts"""
+        code, image, rule, paywall = self.serialize(
+            self.builder.code_block("print(1)", "python"),
+            self.builder.image("a.png", "Alt", "Caption"),
+            self.builder.horizontal_rule(),
+            self.builder.paywall(),
+        )
+
+        assert code["type"] == "code_block"
+        assert code["content"][0]["text"].splitlines() == [
+            "# ==================== PYTHON CODE ====================",
+            "print(1)",
+        ]
+        assert image["type"] == "captionedImage"
+        assert image["content"][0]["attrs"]["src"] == "a.png"
+        assert image["content"][0]["attrs"]["alt"] == "Alt"
+        assert image["content"][1]["content"][0]["text"] == "Caption"
+        assert rule == {"type": "horizontal_rule"}
+        assert paywall == {"type": "paywall"}
+
+    def test_plain_text_is_written_like_its_paragraph_blocks(self):
+        """Test the plain text fast path gives the same body as the blocks"""
+        texts = [
+            "",
+            "\n\n  \n\n",
+            "One paragraph",
+            "  First\nline two\n\n\n\tSecond \u00a0\n\nThird",
+            'Quotes " and \\ backslashes \\n and \x00\x1f\x7f controls',
+            "Unicode: caf\u00e9 \u2028 \U0001f600",
+        ]
+        for text in texts:
+            blocks = [self.builder.paragraph(p) for p in plain_paragraphs(text)]
+
+            assert self.serializer.dumps_plain_text(text) == self.serializer.dumps(
+                blocks
+            )
+
+        assert list(plain_paragraphs("a\n\n\nb\n\n")) == ["a", "b"]
+
+    def test_dumps_returns_json_document(self):
+        """Test dumps gives the JSON string stored as draft_body"""
+        body = self.serializer.dumps([self.builder.paragraph("Hi")])
+
+        assert json.loads(body) == {
+            "type": "doc",
+            "content": [
+                {"type": "paragraph", "content": [{"type": "text", "text": "Hi"}]}
+            ],
+        }
+        assert self.serializer.dumps([]) == '{"type":"doc","content":[]}'
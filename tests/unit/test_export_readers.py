@@ -0,0 +1,208 @@
+# ABOUTME: Unit tests for the streaming WordPress WXR and Ghost JSON readers
+# ABOUTME: Tests field extraction, filtering, chunked JSON decoding and the import path
+
+import json
+from unittest.mock import Mock
+
+import pytest
+
+from src.handlers.import_handler import ImportHandler
+from src.utils.export_readers import (
+    clean_wordpress_html,
+    iter_ghost_posts,
+    iter_wxr_posts,
+)
+
+WXR = """<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0"
+    xmlns:excerpt="http://wordpress.org/export/1.2/excerpt/"
+    xmlns:content="http://purl.org/rss/1.0/modules/content/"
+    xmlns:wp="http://wordpress.org/export/1.2/">
+<channel>
+    <title>My Blog</title>
+    <link>https://blog.example.com</link>
+    <item>
+        <title>First Post</title>
+        <content:encoded><![CDATA[<!-- wp:paragraph --><p>Hello <strong>there</strong></p><!-- /wp:paragraph -->
+<p><img src="/wp-content/uploads/cat.jpg" alt="cat"></p>]]></content:encoded>
+        <excerpt:encoded><![CDATA[A short summary]]></excerpt:encoded>
+        <wp:post_id>11</wp:post_id>
+        <wp:post_name>first-post</wp:post_name>
+        <wp:status>publish</wp:status>
+        <wp:post_type>post</wp:post_type>
+    </item>
+    <item>
+        <title>cat.jpg</title>
+        <content:encoded><![CDATA[]]></content:encoded>
+        <wp:post_id>12</wp:post_id>
+        <wp:status>inherit</wp:status>
+        <wp:post_type>attachment</wp:post_type>
+    </item>
+    <item>
+        <title>About</title>
+        <content:encoded><![CDATA[Line one
+still line one
+
+Line two]]></content:encoded>
+        <wp:post_id>13</wp:post_id>
+        <wp:status>publish</wp:status>
+        <wp:post_type>page</wp:post_type>
+    </item>
+    <item>
+        <title>Binned</title>
+        <content:encoded><![CDATA[<p>Gone</p>]]></content:encoded>
+        <wp:post_id>14</wp:post_id>
+        <wp:status>trash</wp:status>
+        <wp:post_type>post</wp:post_type>
+    </item>
+</channel>
+</rss>
+"""
+
+
+def ghost_export():
+    """Build a Ghost export with tricky strings before and inside the posts"""
+    return {
+        "db": [
+            {
+                "meta": {"note": 'mentions "posts": [ in a string'},
+                "data": {
+                    "posts": [
+                        {
+                            "id": "abc",
+                            "title": "Members Only",
+                            "slug": "members-only",
+                            "html": '<p>Hi</p><img src="__GHOST_URL__/content/images/a.png">',
+                            "custom_excerpt": "Teaser",
+                            "visibility": "members",
+                            "status": "published",
+                            "type": "post",
+                        },
+                        {
+                            "id": "def",
+                            "title": "A Page",
+                            "html": "<p>x</p>",
+                            "type": "page",
+                        },
+                        {"id": "ghi", "title": "No Html", "html": None, "type": "post"},
+                    ],
+                    "tags": [{"id": "t1", "name": "posts"}],
+                },
+            }
+        ]
+    }
+
+
+class TestWXRReader:
+    """Test suite for iter_wxr_posts"""
+
+    def test_reads_posts_and_skips_other_items(self, tmp_path):
+        """Test posts are extracted and attachments, pages and trash skipped"""
+        path = tmp_path / "export.xml"
+        path.write_text(WXR, encoding="utf-8")
+
+        posts = list(iter_wxr_posts(str(path)))
+
+        assert [post["id"] for post in posts] == ["11"]
+        post = posts[0]
+        assert post["title"] == "First Post"
+        assert post["subtitle"] == "A short summary"
+        assert post["slug"] == "first-post"
+        assert post["site_url"] == "https://blog.example.com"
+        assert "wp:paragraph" not in post["html"]
+
+    def test_include_pages_and_autop(self, tmp_path):
+        """Test pages are optional and tag-less content is split into paragraphs"""
+        path = tmp_path / "export.xml"
+        path.write_text(WXR, encoding="utf-8")
+
+        posts = list(iter_wxr_posts(str(path), include_pages=True))
+
+        assert [post["id"] for post in posts] == ["11", "13"]
+        assert posts[1]["html"] == ("<p>Line one<br>still line one</p><p>Line two</p>")
+        assert clean_wordpress_html("<p>Kept</p>") == "<p>Kept</p>"
+
+
+class TestGhostReader:
+    """Test suite for iter_ghost_posts"""
+
+    def test_reads_posts_in_small_chunks(self, tmp_path):
+        """Test posts decode correctly even when chunks split every token"""
+        path = tmp_path / "export.json"
+        path.write_text(json.dumps(ghost_export()), encoding="utf-8")
+
+        posts = list(iter_ghost_posts(str(path), chunk_size=7))
+
+        assert [post["id"] for post in posts] == ["abc", "ghi"]
+        assert posts[0]["audience"] == "only_free"
+        assert posts[0]["subtitle"] == "Teaser"
+
+    def test_not_a_ghost_export(self, tmp_path):
+        """Test a JSON file without a posts array is rejected"""
+        path = tmp_path / "export.json"
+        path.write_text('{"items": []}', encoding="utf-8")
+
+        with pytest.raises(ValueError, match='No "posts" array'):
+            list(iter_ghost_posts(str(path)))
+
+
+class TestImportExportFile:
+    """Test suite for ImportHandler.import_export_file"""
+
+    def setup_method(self):
+        """Set up test fixtures"""
+        self.mock_client = Mock()
+        self.mock_client.get_user_id.return_value = 123456
+        self.mock_client.post_draft.side_effect = lambda draft: {"id": 7}
+        self.mock_client.get_image.side_effect = lambda url: {
+            "url": "https://substackcdn.com/image/" + url.rsplit("/", 1)[-1]
+        }
+        self.handler = ImportHandler(self.mock_client, requests_per_minute=6000)
+
+    @pytest.mark.asyncio
+    async def test_wordpress_import_rehosts_images(self, tmp_path):
+        """Test WordPress posts become drafts with images moved to the CDN"""
+        path = tmp_path / "export.xml"
+        path.write_text(WXR, encoding="utf-8")
+        updates = []
+
+        result = await self.handler.import_export_file(
+            str(path), progress=lambda summary: updates.append(1)
+        )
+
+        assert [entry["title"] for entry in result["imported"]] == ["First Post"]
+        assert updates == [1]
+        self.mock_client.get_image.assert_called_once_with(
+            "https://blog.example.com/wp-content/uploads/cat.jpg"
+        )
+        draft = self.mock_client.post_draft.call_args[0][0]
+        assert "https://substackcdn.com/image/cat.jpg" in draft["draft_body"]
+        assert draft["draft_subtitle"] == "A short summary"
+
+        # Resuming skips posts already created
+        result = await self.handler.import_export_file(str(path))
+        assert result["skipped"] == ["wordpress post 11 (first-post)"]
+
+    @pytest.mark.asyncio
+    async def test_ghost_import_dry_run(self, tmp_path):
+        """Test a Ghost dry run lists posts, reports empty ones and uploads nothing"""
+        path = tmp_path / "export.json"
+        path.write_text(json.dumps(ghost_export()), encoding="utf-8")
+
+        result = await self.handler.import_export_file(
+            str(path), site_url="https://ghost.example.com", dry_run=True
+        )
+
+        assert [entry["title"] for entry in result["imported"]] == ["Members Only"]
+        assert result["failed"][0]["error"] == "Post has no HTML content"
+        self.mock_client.get_image.assert_not_called()
+        self.mock_client.post_draft.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_unsupported_file(self, tmp_path):
+        """Test input validation"""
+        path = tmp_path / "export.csv"
+        path.write_text("a,b", encoding="utf-8")
+
+        with pytest.raises(ValueError, match="Unsupported export file"):
+            await self.handler.import_export_file(str(path))
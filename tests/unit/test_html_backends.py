@@ -0,0 +1,170 @@
+# ABOUTME: Tests for the interchangeable HTML parse backends behind HTMLConverter
+# ABOUTME: Checks every installed backend converts exactly like BeautifulSoup
+
+import pytest
+
+from src.converters import html_backends, html_converter
+from src.converters.conversion_budget import (
+    MAX_CONTENT_CHARS,
+    ConversionBudget,
+)
+from src.converters.html_backends import (
+    BACKENDS,
+    ParserLimitError,
+    SoupStream,
+    available_backends,
+    get_backend,
+)
+from src.converters.html_converter import BLOCK_TAGS, HTMLConverter
+
+FAST_BACKENDS = [
+    pytest.param(
+        name,
+        marks=pytest.mark.skipif(
+            not BACKENDS[name].available, reason=f"{name} is not installed"
+        ),
+    )
+    for name in ("selectolax", "lxml")
+]
+
+DOCUMENTS = [
+    "<p>Plain <strong>bold</strong> <em>em</em> <code>x</code> "
+    '<a href="https://example.com">link</a></p>',
+    "Loose text <p>then a paragraph</p> and a tail",
+    "<ul><li>One</li><li>Two <b>bold</b></li></ul><ol><li>Three</li></ol>",
+    '<pre><code class="x language-python y">def f():\n    return 1\n</code></pre>',
+    "<pre>\nleading newline <b>kept</b>\n</pre>",
+    '<figure><img src="a.png" alt="Alt" title="Title"><figcaption>C</figcaption>'
+    "</figure><hr>",
+    "<blockquote><p>Quoted</p>\n  <cite>Someone</cite></blockquote>",
+    "<h2>Title &amp; <i>more</i></h2><h6>&nbsp;</h6>",
+    "<!-- comment --><p>a<!-- inner -->b</p>",
+    "<p>text<script>s()</script><style>.x{}</style></p><div><script>t()</script>q</div>",
+    "<div>\n  <p><b>a</b>\n    <i>b</i>\t<u>c</u></p>\n</div>\r\n<p>x\r\ny</p>",
+    "<div><section><p>a</p>b<br>c</section>d &amp; e<p>f</p></div>tail",
+    "<body><pre>\n <b>x</b></pre><template><p>t</p></template>https://example.com"
+    "<div><script>a < b</script>readme.txt</div></body>",
+]
+
+
+class TestHTMLBackends:
+    """Test suite for the HTMLConverter parse backends"""
+
+    def setup_method(self):
+        """Set up test fixtures"""
+        self.reference = HTMLConverter("bs4")
+
+    @pytest.mark.parametrize("backend", FAST_BACKENDS)
+    @pytest.mark.parametrize("html", DOCUMENTS)
+    def test_fast_backend_matches_beautifulsoup(self, backend, html):
+        """Test a C-accelerated backend produces exactly the bs4 blocks"""
+        assert HTMLConverter(backend).convert(html) == self.reference.convert(html)
+
+    @pytest.mark.parametrize("html", DOCUMENTS)
+    def test_stream_matches_a_whole_parse(self, html, monkeypatch):
+        """Test HTML fed in pieces split anywhere converts like the whole"""
+        expected = self.reference.convert(html)
+        monkeypatch.setattr(html_converter, "STREAM_CHUNK_CHARS", 1)
+
+        for split in range(len(html) + 1):
+            pieces = [html[:split], html[split:]]
+            assert list(self.reference.iter_blocks(pieces)) == expected
+
+    def test_stream_hands_over_nodes_as_they_finish(self):
+        """Test finished nodes leave the tree, even inside an open wrapper"""
+        stream = SoupStream(ConversionBudget().meter(), BLOCK_TAGS)
+
+        nodes = stream.feed("<body><div><p>One</p><p>Tw")
+        assert [node.get_text() for node in nodes] == ["One"]
+        nodes = stream.feed("o</p>text<ul><li>")
+        assert [node.get_text() for node in nodes] == ["Two", "text"]
+        assert stream.feed("x</li>") == []
+        # Elements still open are closed, holding only what is left
+        nodes = stream.close()
+        assert [str(node) for node in nodes] == [
+            "<body><div><ul><li>x</li></ul></div></body>"
+        ]
+
+    def test_stream_keeps_what_is_left_of_closed_wrappers(self):
+        """Test a wrapper is handed over with the children it had left when closed"""
+        stream = SoupStream(ConversionBudget().meter(), BLOCK_TAGS)
+
+        nodes = stream.feed("<div><section><p>a</p>b")
+        assert [str(node) for node in nodes] == ["<p>a</p>"]
+        nodes = stream.feed("</section>c<p>d")
+        assert [str(node) for node in nodes] == ["<section>b</section>", "c"]
+        nodes = stream.close()
+        assert [str(node) for node in nodes] == ["<div><p>d</p></div>"]
+
+    def test_stream_parses_text_alone_without_warnings(self, recwarn):
+        """Test text that looks like a URL is not parsed as a document of its own"""
+        stream = SoupStream(ConversionBudget().meter(), BLOCK_TAGS)
+
+        nodes = stream.feed("<div>https://example.com<p>x</p>") + stream.close()
+
+        assert [str(node) for node in nodes] == [
+            "https://example.com",
+            "<p>x</p>",
+            "<div></div>",
+        ]
+        assert not recwarn.list
+
+    @pytest.mark.skipif(not BACKENDS["lxml"].available, reason="lxml is not installed")
+    def test_lxml_limits_fall_back_to_beautifulsoup(self):
+        """Test input past libxml2's limits is converted with bs4 instead"""
+        backend = get_backend("lxml")
+        deep = "<div>" * 3000 + "<p>deep</p>" + "</div>" * 3000
+
+        with pytest.raises(ParserLimitError, match="character limit"):
+            backend.parse("a" * (MAX_CONTENT_CHARS + 1))
+        with pytest.raises(ParserLimitError, match="nested too deeply"):
+            backend.parse(deep)
+        assert HTMLConverter("lxml").convert(deep) == self.reference.convert(deep)
+
+    def test_beautifulsoup_collapses_whitespace_only_strings(self):
+        """Test the whitespace handling the fast backends reproduce"""
+        blocks = self.reference.convert("<p><b>a</b>\n    <i>b</i>\t</p>")
+
+        assert [node["content"] for node in blocks[0]["content"]] == [
+            "a",
+            "\n",
+            "b",
+            " ",
+        ]
+
+    def test_auto_picks_fastest_installed_backend(self):
+        """Test auto uses the first available backend and bs4 is always there"""
+        assert available_backends()[-1] == "bs4"
+        assert HTMLConverter().backend.name == available_backends()[0]
+
+    def test_auto_falls_back_to_beautifulsoup(self, monkeypatch):
+        """Test auto uses bs4 when neither fast parser is installed"""
+        monkeypatch.setattr(html_backends.SelectolaxBackend, "available", False)
+        monkeypatch.setattr(html_backends.LxmlBackend, "available", False)
+
+        converter = HTMLConverter()
+
+        assert converter.backend.name == "bs4"
+        assert converter.convert("<p>Hi</p>")[0]["content"][0]["content"] == "Hi"
+
+    def test_missing_backend_raises(self, monkeypatch):
+        """Test asking for an uninstalled backend raises ValueError"""
+        monkeypatch.setattr(html_backends.LxmlBackend, "available", False)
+
+        with pytest.raises(ValueError, match="requires the lxml package"):
+            get_backend("lxml")
+
+    def test_incomplete_backend_cannot_be_created(self):
+        """Test a backend missing an operation fails when created"""
+
+        class ParseOnly(html_backends.HTMLBackend):
+            def parse(self, html, meter=None):
+                return None
+
+        with pytest.raises(TypeError, match="children"):
+            ParseOnly()
+
+    def test_unknown_backend_raises(self):
+        """Test an unknown backend name raises ValueError"""
+        with pytest.raises(ValueError, match="Unknown HTML backend"):
+            HTMLConverter("html5lib")
@@ -1,7 +1,10 @@
 # ABOUTME: Unit tests for HTMLConverter class that converts HTML to Substack JSON
 # ABOUTME: Tests all HTML elements: headers, paragraphs, lists, images, links, etc.
 
+import io
+
 import pytest
+from src.converters.conversion_budget import ConversionBudget, ConversionLimitError
 from src.converters.html_converter import HTMLConverter
 
 
@@ -252,3 +255,85 @@ class TestHTMLConverter:
         # Nested lists should be handled appropriately
         assert len(blocks) >= 1
         assert blocks[0]["type"] == "bulleted-list"
+
+    def test_inline_marks_accumulate_through_nesting(self):
+        """Test marks stack through nested tags without leaking to siblings"""
+        html = (
+            "<p><b>bold <i>both <span>still both</span></i> bold again</b>"
+            "<span> plain <em>em</em></span><a href='https://x.com'>"
+            "<b>link</b><!-- hidden --></a></p>"
+        )
+        blocks = self.converter.convert(html)
+
+        content = blocks[0]["content"]
+        assert [(node["content"], node.get("marks")) for node in content] == [
+            ("bold ", [{"type": "strong"}]),
+            ("both still both", [{"type": "strong"}, {"type": "em"}]),
+            (" bold again", [{"type": "strong"}]),
+            (" plain ", None),
+            ("em", [{"type": "em"}]),
+            ("link", [{"type": "link", "href": "https://x.com"}]),
+        ]
+
+    def test_editor_span_soup_becomes_few_runs(self):
+        """Test unformatted spans and split bold runs merge, empty ones drop"""
+        html = (
+            '<p><span style="a">Hello</span><span style="b"> </span>'
+            "<span>world</span><b>split</b><b> bold</b><span></span>"
+            "<a href='https://x.com'>one</a><a href='https://x.com'> link</a></p>"
+            "<p><span></span></p>"
+        )
+        blocks = self.converter.convert(html)
+
+        assert blocks[0]["content"] == [
+            {"type": "text", "content": "Hello world"},
+            {"type": "text", "content": "split bold", "marks": [{"type": "strong"}]},
+            {
+                "type": "text",
+                "content": "one link",
+                "marks": [{"type": "link", "href": "https://x.com"}],
+            },
+        ]
+        assert blocks[1] == {"type": "paragraph", "content": []}
+
+    def test_deeply_nested_inline_content_is_linear(self, monkeypatch):
+        """Test each inline node is visited once regardless of depth"""
+        depth = 2000
+        html = "<p>" + "<span><b>x" * depth + "</b></span>" * depth + "</p>"
+        backend = type(self.converter.backend)
+        children = backend.children
+        visits = []
+        monkeypatch.setattr(
+            backend,
+            "children",
+            lambda self, *args: visits.append(1) or children(self, *args),
+        )
+
+        blocks = self.converter.convert(html)
+
+        # Every run is bold, so they merge into one
+        assert blocks[0]["content"] == [
+            {"type": "text", "content": "x" * depth, "marks": [{"type": "strong"}]}
+        ]
+        # The <p>, its 2 * depth descendants and at most the document root
+        assert len(visits) <= 2 * depth + 2
+
+    def test_iter_blocks_reads_a_file_in_chunks(self):
+        """Test a file is converted block by block as it is read"""
+        html = "<html><body>" + "<p>Para <b>bold</b></p>\r\n<hr>" * 5000
+        source = io.StringIO(html + "</body></html>")
+
+        blocks = self.converter.iter_blocks(source)
+
+        assert next(blocks) == self.converter.convert("<p>Para <b>bold</b></p>")[0]
+        # Only the first chunk has been read
+        assert 0 < source.tell() < len(html)
+        assert len(list(blocks)) == 2 * 5000 - 1
+        assert source.tell() == len(html) + len("</body></html>")
+
+    def test_iter_blocks_budget_covers_every_chunk(self):
+        """Test the length limit applies to the whole source"""
+        converter = HTMLConverter(budget=ConversionBudget(max_chars=100))
+
+        with pytest.raises(ConversionLimitError, match="100 character"):
+            list(converter.iter_blocks(["<p>" + "x" * 40 + "</p>"] * 3))
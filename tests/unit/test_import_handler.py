@@ -0,0 +1,149 @@
+# ABOUTME: Unit tests for ImportHandler which bulk-creates drafts from local files
+# ABOUTME: Tests front matter, conversion, throttling, journal resume and dry runs
+
+import json
+import time
+from unittest.mock import Mock
+
+import pytest
+
+from src.handlers.import_handler import ImportHandler
+from src.utils.rate_limiter import RateLimiter
+
+
+class TestImportHandler:
+    """Test suite for ImportHandler class"""
+
+    def setup_method(self):
+        """Set up test fixtures"""
+        self.mock_client = Mock()
+        self.mock_client.get_user_id.return_value = 123456
+        self.created = []
+
+        def post_draft(draft):
+            self.created.append(draft)
+            return {"id": len(self.created)}
+
+        self.mock_client.post_draft = Mock(side_effect=post_draft)
+        self.handler = ImportHandler(self.mock_client, requests_per_minute=6000)
+
+    def write_files(self, tmp_path):
+        """Create a small directory of importable files"""
+        (tmp_path / "first.md").write_text(
+            '---\ntitle: "First: Post"\nsubtitle: A subtitle\naudience: only_paid\n---\n'
+            "Hello **world**.\n",
+            encoding="utf-8",
+        )
+        (tmp_path / "second-post.html").write_text(
+            "<p>From <em>HTML</em></p>", encoding="utf-8"
+        )
+        nested = tmp_path / "nested"
+        nested.mkdir()
+        (nested / "third.md").write_text("# Third Heading\n\nBody", encoding="utf-8")
+        (tmp_path / "notes.txt").write_text("ignored", encoding="utf-8")
+
+    @pytest.mark.asyncio
+    async def test_import_directory_creates_drafts(self, tmp_path):
+        """Test every supported file becomes a draft with its metadata"""
+        self.write_files(tmp_path)
+
+        result = await self.handler.import_directory(str(tmp_path))
+
+        assert len(result["imported"]) == 3
+        assert result["failed"] == []
+        titles = [draft["draft_title"] for draft in self.created]
+        assert titles == ["First: Post", "Second post", "Third Heading"]
+
+        first = self.created[0]
+        assert first["draft_subtitle"] == "A subtitle"
+        assert first["audience"] == "only_paid"
+        body = json.loads(first["draft_body"])
+        assert "world" in json.dumps(body)
+
+        # Leading heading used as the title is not repeated in the body
+        third_body = json.loads(self.created[2]["draft_body"])
+        assert "Third Heading" not in json.dumps(third_body)
+
+        # user_id is only fetched once for the whole batch
+        assert self.mock_client.get_user_id.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_rerun_skips_files_in_journal(self, tmp_path):
+        """Test files already imported are skipped by content hash"""
+        self.write_files(tmp_path)
+        await self.handler.import_directory(str(tmp_path))
+
+        # Renaming a file does not cause it to be imported again
+        (tmp_path / "first.md").rename(tmp_path / "renamed.md")
+        (tmp_path / "fourth.md").write_text("Brand new", encoding="utf-8")
+
+        result = await self.handler.import_directory(str(tmp_path))
+
+        assert len(result["skipped"]) == 3
+        assert [entry["title"] for entry in result["imported"]] == ["Fourth"]
+        assert self.mock_client.post_draft.call_count == 4
+
+    @pytest.mark.asyncio
+    async def test_dry_run_creates_nothing(self, tmp_path):
+        """Test a dry run lists files without creating drafts or a journal"""
+        self.write_files(tmp_path)
+
+        result = await self.handler.import_directory(str(tmp_path), dry_run=True)
+
+        assert len(result["imported"]) == 3
+        self.mock_client.post_draft.assert_not_called()
+        assert not (tmp_path / ".import_journal").exists()
+
+    @pytest.mark.asyncio
+    async def test_non_recursive_and_failures(self, tmp_path):
+        """Test recursion can be disabled and bad files are reported"""
+        self.write_files(tmp_path)
+        (tmp_path / "bad.md").write_text(
+            "---\naudience: vip\n---\nBody", encoding="utf-8"
+        )
+
+        result = await self.handler.import_directory(str(tmp_path), recursive=False)
+
+        assert len(result["imported"]) == 2
+        assert len(result["failed"]) == 1
+        assert "audience" in result["failed"][0]["error"]
+
+    @pytest.mark.asyncio
+    async def test_api_failure_is_not_journaled(self, tmp_path):
+        """Test a failed draft creation is retried on the next run"""
+        (tmp_path / "only.md").write_text("Content", encoding="utf-8")
+        self.mock_client.post_draft.side_effect = Exception("rate limited")
+
+        result = await self.handler.import_directory(str(tmp_path))
+        assert result["failed"][0]["error"] == "rate limited"
+
+        self.mock_client.post_draft.side_effect = lambda draft: {"id": 99}
+        result = await self.handler.import_directory(str(tmp_path))
+        assert result["imported"][0]["id"] == 99
+
+    @pytest.mark.asyncio
+    async def test_missing_directory(self, tmp_path):
+        """Test input validation"""
+        with pytest.raises(ValueError, match="Directory not found"):
+            await self.handler.import_directory(str(tmp_path / "missing"))
+
+
+class TestRateLimiter:
+    """Test suite for RateLimiter"""
+
+    @pytest.mark.asyncio
+    async def test_spaces_out_requests(self):
+        """Test consecutive acquisitions are at least one interval apart"""
+        limiter = RateLimiter(requests_per_minute=1200)  # 50ms apart
+
+        start = time.monotonic()
+        for _ in range(4):
+            await limiter.acquire()
+        elapsed = time.monotonic() - start
+
+        assert elapsed >= 0.14
+
+    def test_invalid_rate(self):
+        """Test input validation"""
+        with pytest.raises(ValueError):
+            RateLimiter(0)
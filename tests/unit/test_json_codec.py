@@ -0,0 +1,138 @@
+# ABOUTME: Tests for the JSON codec used for draft bodies
+# ABOUTME: Checks every installed codec agrees with json and bodies decode lazily
+
+import pickle
+from unittest.mock import Mock, patch
+
+import pytest
+
+from src.converters.block_builder import BlockBuilder
+from src.utils import json_codec
+from src.utils.api_wrapper import APIWrapper
+from src.utils.json_codec import CODECS, LazyJSON, available_codecs, get_codec
+
+ALL_CODECS = [
+    pytest.param(
+        name,
+        marks=pytest.mark.skipif(
+            not CODECS[name].available, reason=f"{name} is not installed"
+        ),
+    )
+    for name in CODECS
+]
+
+DOCUMENT = {
+    "type": "doc",
+    "content": [
+        {"type": "paragraph", "content": [{"type": "text", "text": "Café – “quoted”"}]},
+        {"type": "ordered_list", "attrs": {"start": 3}, "content": []},
+        {"type": "captionedImage", "attrs": {"alt": None, "fullscreen": False}},
+    ],
+}
+
+
+class TestJSONCodec:
+    """Test suite for the JSON codecs"""
+
+    @pytest.mark.parametrize("name", ALL_CODECS)
+    def test_codecs_write_identical_json(self, name):
+        """Test every codec writes the same compact UTF-8 JSON and reads it back"""
+        codec = get_codec(name)
+        reference = get_codec("json")
+
+        text = codec.dumps(DOCUMENT)
+
+        assert text == reference.dumps(DOCUMENT)
+        assert "Café" in text and ", " not in text
+        assert codec.loads(text) == DOCUMENT
+        assert codec.loads(text.encode()) == DOCUMENT
+
+    @pytest.mark.parametrize("name", ALL_CODECS)
+    def test_codecs_encode_block_nodes(self, name):
+        """Test nodes and LazyJSON strings encode like dicts and plain strings"""
+        builder = BlockBuilder()
+        block = builder.paragraph([builder.text("bold", ["strong"])])
+        codec = get_codec(name)
+
+        assert codec.loads(codec.dumps([block, LazyJSON("{}")])) == [
+            block.to_dict(),
+            "{}",
+        ]
+
+    @pytest.mark.parametrize("name", ALL_CODECS)
+    def test_invalid_json_raises_value_error(self, name):
+        """Test every codec reports invalid JSON as ValueError"""
+        with pytest.raises(ValueError):
+            get_codec(name).loads("{not json")
+
+    def test_auto_prefers_installed_fast_codec(self):
+        """Test auto picks the first installed codec and json is always there"""
+        assert available_codecs()[-1] == "json"
+        assert get_codec().name == available_codecs()[0]
+        with pytest.raises(ValueError, match="Unknown JSON codec"):
+            get_codec("simplejson")
+
+    def test_incomplete_codec_cannot_be_created(self):
+        """Test a codec missing loads fails when created, not when first used"""
+
+        class EncodeOnly(json_codec.JSONCodec):
+            def dumps(self, obj):
+                return "{}"
+
+        with pytest.raises(TypeError, match="loads"):
+            EncodeOnly()
+
+    def test_lazy_body_decodes_once_on_first_use(self):
+        """Test get_draft leaves bodies undecoded until something loads them"""
+        client = Mock()
+        client.get_draft.return_value = {
+            "id": 1,
+            "draft_title": "Title",
+            "draft_body": '{"type":"doc","content":[]}',
+        }
+        draft = APIWrapper(client).get_draft("1")
+        body = draft["draft_body"]
+
+        with patch.object(json_codec.codec, "loads", wraps=json_codec.codec.loads) as (
+            loads
+        ):
+            assert draft["draft_title"] == "Title"
+            assert body == '{"type":"doc","content":[]}'
+            assert loads.call_count == 0
+
+            assert json_codec.loads(body) == {"type": "doc", "content": []}
+            assert json_codec.loads(body) is json_codec.loads(body)
+            assert loads.call_count == 1
+
+    def test_only_object_bodies_are_marked_as_json(self):
+        """Test get_draft leaves a body that is not a JSON object as plain text"""
+        client = Mock()
+        client.get_draft.return_value = {
+            "id": 1,
+            "body": "Just some plain text body",
+            "draft_body": ' {"type": "doc", "content": []}',
+        }
+
+        draft = APIWrapper(client).get_draft("1")
+
+        assert not isinstance(draft["body"], LazyJSON)
+        assert isinstance(draft["draft_body"], LazyJSON)
+
+    def test_looks_like_document(self):
+        """Test the cheap document check only accepts a leading doc type"""
+        assert json_codec.looks_like_document('{"type":"doc","content":[]}')
+        assert json_codec.looks_like_document(' {\n  "type" : "doc" }')
+        assert not json_codec.looks_like_document('{"type":"docx"}')
+        assert not json_codec.looks_like_document('{"content":[],"type":"doc"}')
+        assert not json_codec.looks_like_document("Just some plain text body")
+
+    def test_lazy_body_pickles_as_text(self):
+        """Test a lazy body sent to another process still decodes"""
+        body = LazyJSON('{"type":"doc","content":[]}')
+        assert body.value == {"type": "doc", "content": []}
+
+        copy = pickle.loads(pickle.dumps(body))
+
+        assert isinstance(copy, LazyJSON)
+        assert copy == body
+        assert copy.value == {"type": "doc", "content": []}
@@ -1,7 +1,10 @@
 # ABOUTME: Unit tests for MarkdownConverter class that converts Markdown to Substack JSON
 # ABOUTME: Tests all markdown elements: headers, lists, code, images, links, etc.
 
+import random
+
 import pytest
+from src.converters import markdown_converter
 from src.converters.markdown_converter import MarkdownConverter
 
 
@@ -268,3 +271,263 @@ Check [this link](https://example.com) for more info."""
         content = blocks[0]["content"][0]["content"]
         assert "*escaped asterisks*" in content
         assert "[escaped brackets]" in content
+
+    def test_block_boundaries(self):
+        """Test where blocks start and end, following CommonMark"""
+        markdown = (
+            "Para line\n> quote interrupts the paragraph\nlazy continuation\n"
+            "#not a header\n\n"
+            "Setext heading\n---\n\n"
+            "- a\n\n- b\n1. switches type\n\n"
+            "```\nunclosed fence runs to the end\n\n- c"
+        )
+        blocks = self.converter.convert(markdown)
+
+        assert [block["type"] for block in blocks] == [
+            "paragraph",
+            "blockquote",
+            "heading-two",
+            "bulleted-list",
+            "ordered-list",
+            "code",
+        ]
+        assert blocks[0]["content"][0]["content"] == "Para line"
+        quote_text = blocks[1]["content"][0]["content"][0]["content"]
+        assert quote_text == (
+            "quote interrupts the paragraph lazy continuation #not a header"
+        )
+        assert len(blocks[3]["content"]) == 2
+        assert blocks[5]["content"] == "unclosed fence runs to the end\n\n- c"
+
+    def test_nested_and_mixed_lists(self):
+        """Test lists nest by indentation and keep their own type"""
+        markdown = "- Parent\n  1. First\n  2. Second\n     - Deep\n- Sibling"
+        blocks = self.converter.convert(markdown)
+
+        assert len(blocks) == 1
+        parent, sibling = blocks[0]["content"]
+        assert [child["type"] for child in parent["content"]] == [
+            "paragraph",
+            "ordered-list",
+        ]
+        nested = parent["content"][1]
+        assert len(nested["content"]) == 2
+        deep = nested["content"][1]["content"][1]
+        assert deep["type"] == "bulleted-list"
+        assert deep["content"][0]["content"][0]["content"][0]["content"] == "Deep"
+        assert sibling["content"][0]["content"][0]["content"] == "Sibling"
+
+    def test_multi_paragraph_items_and_lazy_lines(self):
+        """Test indented paragraphs stay in the item and lazy lines continue it"""
+        markdown = (
+            "3. First **item**\nlazy line\n\n   Second paragraph\n" "4. Next\n\nOutside"
+        )
+        blocks = self.converter.convert(markdown)
+
+        assert [block["type"] for block in blocks] == ["ordered-list", "paragraph"]
+        assert blocks[0]["start"] == 3
+        first, second = blocks[0]["content"]
+        assert len(first["content"]) == 2
+        assert first["content"][0]["content"] == [
+            {"type": "text", "content": "First "},
+            {"type": "text", "content": "item", "marks": [{"type": "strong"}]},
+            {"type": "text", "content": " lazy line"},
+        ]
+        assert first["content"][1]["content"][0]["content"] == "Second paragraph"
+        assert second["content"][0]["content"][0]["content"] == "Next"
+
+    def test_nested_blockquotes(self):
+        """Test quotes can hold paragraphs, nested quotes and lists"""
+        markdown = "> Outer\n>\n> > Inner\n> continues lazily\n\n> - item"
+        blocks = self.converter.convert(markdown)
+
+        assert [block["type"] for block in blocks] == ["blockquote", "blockquote"]
+        outer, inner = blocks[0]["content"]
+        assert outer["content"][0]["content"] == "Outer"
+        assert inner["type"] == "blockquote"
+        assert inner["content"][0]["content"][0]["content"] == (
+            "Inner continues lazily"
+        )
+        assert blocks[1]["content"][0]["type"] == "bulleted-list"
+
+    def test_conversion_is_linear(self, monkeypatch):
+        """Test container matching work grows with the document, not its square"""
+        nested = "".join("  " * depth + "- item\n" for depth in range(30))
+        calls = []
+        matches = markdown_converter._BlockParser._continue
+        monkeypatch.setattr(
+            markdown_converter._BlockParser,
+            "_continue",
+            lambda parser, container: calls.append(1) or matches(parser, container),
+        )
+
+        counts = []
+        for copies in (200, 400):
+            calls.clear()
+            blocks = self.converter.convert(
+                (nested + "\n> > quote\n> lazy\n\n") * copies
+            )
+            assert len(blocks) == 2 * copies
+            counts.append(len(calls))
+
+        assert counts[1] == 2 * counts[0]
+
+    def test_iter_blocks_matches_convert(self, tmp_path):
+        """Test iter_blocks gives the same blocks from a string, file or lines"""
+        markdown = (
+            "# Title\n\nA paragraph\nover two lines\n\n- a\n- b\n\n"
+            "```\ncode\n```\n\n> quote\n\n---\n"
+        )
+        expected = self.converter.convert(markdown)
+
+        path = tmp_path / "post.md"
+        path.write_text(markdown, encoding="utf-8")
+        with open(path, encoding="utf-8") as f:
+            from_file = list(self.converter.iter_blocks(f))
+
+        assert list(self.converter.iter_blocks(markdown)) == expected
+        assert from_file == expected
+        assert list(self.converter.iter_blocks(markdown.split("\n"))) == expected
+
+    def test_iter_blocks_is_lazy(self):
+        """Test blocks are yielded before the rest of the input is read"""
+        consumed = []
+
+        def lines():
+            for number in range(1000):
+                consumed.append(number)
+                yield f"Paragraph {number}"
+                yield ""
+
+        blocks = self.converter.iter_blocks(lines())
+        first = next(blocks)
+
+        assert first["content"][0]["content"] == "Paragraph 0"
+        assert len(consumed) <= 2
+
+    def test_paywall_markers_become_blocks(self):
+        """Test every marker variant on its own line is a top-level paywall"""
+        for marker in (
+            "<!-- PAYWALL -->",
+            "<!--PAYWALL-->",
+            "<!--paywall-->",
+            "<!-- paywall -->",
+        ):
+            result = self.converter.convert(f"Free\n{marker}\n- Paid")
+            assert [block["type"] for block in result] == [
+                "paragraph",
+                "paywall",
+                "bulleted-list",
+            ]
+            assert result[1] == {"type": "paywall"}
+
+        # A marker ends an open list, but stays text or code elsewhere
+        result = self.converter.convert("- a\n<!-- PAYWALL -->")
+        assert [block["type"] for block in result] == ["bulleted-list", "paywall"]
+        for markdown in (
+            "```\n<!-- PAYWALL -->\n```",
+            "> <!-- PAYWALL -->",
+            "> Quote <!-- PAYWALL --> more",
+            "- Item <!-- PAYWALL --> more",
+            "# Heading <!-- PAYWALL --> more",
+        ):
+            assert "paywall" not in [
+                block["type"] for block in self.converter.convert(markdown)
+            ]
+
+    def test_paywall_marker_inside_a_paragraph_splits_it(self):
+        """Test a marker in the middle of paragraph text is a paywall between halves"""
+        for markdown in (
+            "intro <!-- PAYWALL --> paid",
+            "intro\nmore <!--paywall-->\npaid",
+            "intro\n\n<!-- PAYWALL --> paid",
+        ):
+            result = self.converter.convert(markdown)
+            assert [block["type"] for block in result] == [
+                "paragraph",
+                "paywall",
+                "paragraph",
+            ]
+            assert result[-1]["content"][0]["content"] == "paid"
+
+    def test_reconverting_an_edited_document_reuses_unchanged_blocks(self):
+        """Test only the edited part of a document with a document_id is rebuilt"""
+        markdown = "# Title\n\nFirst\n\n- a\n- b\n\n```\ncode\n```\n\nLast\n"
+        before = self.converter.convert_nodes(markdown, "post-1")
+
+        edited = markdown.replace("First", "First, edited")
+        after = self.converter.convert_nodes(edited, "post-1")
+
+        assert after == self.converter.convert_nodes(edited)
+        assert after[1]["content"][0]["content"] == "First, edited"
+        assert [a is b for a, b in zip(before, after)] == [
+            True,
+            False,
+            True,
+            True,
+            True,
+        ]
+        # Other documents and conversions without an id are not affected
+        assert self.converter.convert_nodes(markdown, "post-2")[0] is not before[0]
+
+    def test_text_after_the_last_block_is_reparsed_with_it(self):
+        """Test a paragraph closed by the end of the text is not reused mid-document"""
+        self.converter.convert_nodes("Intro\n\nEnd", "post-1")
+
+        result = self.converter.convert("Intro\n\nEnd\nmore\n===", "post-1")
+
+        assert result[1] == {
+            "type": "heading-one",
+            "content": [{"type": "text", "content": "End more"}],
+        }
+
+    def test_random_edits_convert_like_a_full_conversion(self):
+        """Test reconverting after random line edits matches converting afresh"""
+        lines = [
+            "", "- item", "  - nested", "1. one", "> quote", "```", "```python",
+            "    code", "# Heading", "text", "lazy", "***", "---", "===",
+            "<!-- PAYWALL -->", "\t- tab", "2) two", "~~~",
+        ]  # fmt: skip
+        rng = random.Random(7)
+        fresh = MarkdownConverter()
+
+        for document in range(100):
+            markdown = [rng.choice(lines) for _ in range(rng.randint(1, 30))]
+            for _ in range(6):
+                position = rng.randint(0, len(markdown))
+                action = rng.random()
+                if action < 0.4 or not markdown:
+                    markdown.insert(position, rng.choice(lines))
+                elif action < 0.7:
+                    del markdown[min(position, len(markdown) - 1)]
+                else:
+                    markdown[min(position, len(markdown) - 1)] = rng.choice(lines)
+                text = "\n".join(markdown) + rng.choice(["", "\n"])
+
+                assert self.converter.convert_nodes(
+                    text, document
+                ) == fresh.convert_nodes(text), text
+
+    def test_reconversion_is_proportional_to_the_edit(self, monkeypatch):
+        """Test editing one paragraph of a long post only parses lines near it"""
+        markdown = "".join(
+            f"## Section {n}\n\nSome *text* with a [link](https://x.com/{n}).\n\n"
+            f"- item {n}\n- another\n\n"
+            for n in range(2000)
+        )
+        edited = markdown.replace("Section 1000\n", "Section 1000, edited\n")
+        before = self.converter.convert_nodes(markdown, "post-1")
+
+        fed = []
+        feed = markdown_converter._BlockParser.feed
+        monkeypatch.setattr(
+            markdown_converter._BlockParser,
+            "feed",
+            lambda parser, line: fed.append(line) or feed(parser, line),
+        )
+        after = self.converter.convert_nodes(edited, "post-1")
+
+        # The list before the heading only closes at the heading line
+        assert fed == ["- item 999", "- another", "", "## Section 1000, edited"]
+        changed = [n for n, (a, b) in enumerate(zip(before, after)) if a is not b]
+        assert changed == [2999, 3000]
@@ -0,0 +1,149 @@
+# ABOUTME: Differential tests for MarkdownConverter's single-pass inline tokenizer
+# ABOUTME: Compares it against the original regex implementation on fixed and random input
+
+import random
+import re
+
+import pytest
+
+from src.converters import markdown_converter
+from src.converters.markdown_converter import MarkdownConverter
+
+LEGACY_PATTERNS = [
+    (r"\*\*\*([^*]+)\*\*\*", "bold_italic"),
+    (r"\*\*([^*]+)\*\*", "bold"),
+    (r"\*([^*]+)\*", "italic"),
+    (r"\[([^\]]+)\]\(([^)]+)\)", "link"),
+    (r"`([^`]+)`", "code"),
+]
+LEGACY_MARKS = {
+    "bold_italic": ["strong", "em"],
+    "bold": ["strong"],
+    "italic": ["em"],
+    "code": ["code"],
+}
+
+
+def legacy_parse_inline_formatting(converter, text):
+    """The original implementation: search every pattern, take the earliest"""
+    text = text.replace("\\*", "\x00ESCAPED_ASTERISK\x00")
+    text = text.replace("\\[", "\x00ESCAPED_BRACKET_OPEN\x00")
+    text = text.replace("\\]", "\x00ESCAPED_BRACKET_CLOSE\x00")
+
+    elements = []
+    remaining = text
+    while remaining:
+        next_match = None
+        next_type = None
+        earliest_pos = len(remaining)
+        for pattern, format_type in LEGACY_PATTERNS:
+            match = re.search(pattern, remaining)
+            if match and match.start() < earliest_pos:
+                earliest_pos = match.start()
+                next_match = match
+                next_type = format_type
+
+        if not next_match:
+            elements.append(
+                converter._restore_escaped_chars({"type": "text", "content": remaining})
+            )
+            break
+
+        if next_match.start() > 0:
+            elements.append(
+                converter._restore_escaped_chars(
+                    {"type": "text", "content": remaining[: next_match.start()]}
+                )
+            )
+        if next_type == "link":
+            element = converter.builder.link(next_match.group(1), next_match.group(2))
+        else:
+            element = converter.builder.text(
+                next_match.group(1), LEGACY_MARKS[next_type]
+            )
+        elements.append(converter._restore_escaped_chars(element))
+        remaining = remaining[next_match.end() :]
+
+    return elements if elements else [{"type": "text", "content": ""}]
+
+
+class TestInlineTokenizer:
+    """Test suite for MarkdownConverter._parse_inline_formatting"""
+
+    def setup_method(self):
+        """Set up test fixtures"""
+        self.converter = MarkdownConverter()
+
+    @pytest.mark.parametrize(
+        "text",
+        [
+            "",
+            "plain text",
+            "***both*** **bold** *em* `code` [link](http://x.com)",
+            "****four****",
+            "**unclosed *em*",
+            "*a**b*",
+            "***a** b*",
+            "[[nested](url)",
+            "[a] (not a link) [b]()",
+            "[link](http://x.com/a_(b)",
+            "\\*not em\\* and \\[not link\\](x)",
+            "`a` `` `b`",
+            "* * *",
+            "mix **b `c` b** [*e*](u) tail",
+        ],
+    )
+    def test_matches_legacy_on_edge_cases(self, text):
+        """Test output is identical to the original implementation"""
+        expected = legacy_parse_inline_formatting(self.converter, text)
+        assert self.converter._parse_inline_formatting(text) == expected
+
+    def test_matches_legacy_on_random_input(self):
+        """Test output is identical on random strings of markup characters"""
+        rng = random.Random(31)
+        alphabet = "***[]()`\\ab \n"
+        for _ in range(5000):
+            text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 30)))
+            expected = legacy_parse_inline_formatting(self.converter, text)
+            assert self.converter._parse_inline_formatting(text) == expected, text
+
+    def test_long_paragraph_is_linear(self, monkeypatch):
+        """Test each character is searched past a bounded number of times"""
+        scanned = []
+
+        class CountingFinder(markdown_converter._NextFinder):
+            __slots__ = ()
+
+            def __call__(self, start):
+                searched_from = self.searched_from
+                found = super().__call__(start)
+                if self.searched_from != searched_from:
+                    scanned.append((len(self.text) if found == -1 else found) - start)
+                return found
+
+        class CountingPattern:
+            def __init__(self, pattern):
+                self.pattern = pattern
+
+            def search(self, text, position=0):
+                match = self.pattern.search(text, position)
+                scanned.append((match.start() if match else len(text)) - position)
+                return match
+
+        monkeypatch.setattr(markdown_converter, "_NextFinder", CountingFinder)
+        monkeypatch.setattr(
+            markdown_converter,
+            "INLINE_START",
+            CountingPattern(markdown_converter.INLINE_START),
+        )
+
+        texts = [
+            "word **bold** and [link](http://x.com) and `c` " * 5000,
+            "*a " * 20000 + "[b " * 20000 + "`c " * 20000,
+        ]
+        for text in texts:
+            scanned.clear()
+            self.converter._parse_inline_formatting(text)
+            # The original implementation searches the rest of the text
+            # again after every span
+            assert sum(scanned) <= 2 * len(text)
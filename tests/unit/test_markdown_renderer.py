@@ -0,0 +1,217 @@
+# ABOUTME: Unit tests for MarkdownRenderer, the blocks to Markdown writer
+# ABOUTME: Checks specific block types and that random documents round-trip
+
+import io
+import random
+
+from src.converters.draft_body import DraftBodySerializer
+from src.converters.markdown_converter import MarkdownConverter
+from src.converters.markdown_renderer import MarkdownRenderer
+
+WORDS = ["alpha", "beta", "gamma", "x*y", "a[b]c", "#tag", "50%", "_u_", "1.", "é"]
+
+
+def random_inline(rng: random.Random) -> str:
+    """Build a line of text with the inline markup the converter reads"""
+    parts = []
+    for _ in range(rng.randint(1, 6)):
+        word = rng.choice(WORDS[:3])
+        parts.append(
+            rng.choice(
+                [
+                    rng.choice(WORDS),
+                    f"**{word}**",
+                    f"*{word}*",
+                    f"***{word}***",
+                    f"`{word} *x*`",
+                    f"[{word}](https://example.com/{word})",
+                    "\\*",
+                ]
+            )
+        )
+    return " ".join(parts)
+
+
+def random_block(rng: random.Random, depth: int) -> str:
+    """Build one random block, nesting lists and quotes a few levels deep"""
+    kind = rng.random() * (0.5 if depth > 2 else 1)
+    if kind < 0.3:
+        return random_inline(rng)
+    if kind < 0.38:
+        return "#" * rng.randint(1, 6) + " " + rng.choice(["Head", "Head *x*"])
+    if kind < 0.42:
+        return rng.choice(["---", "***", "___"])
+    if kind < 0.5:
+        language = rng.choice(["", "python"])
+        code = rng.choice(["x = 1", "a\n\n  b", ""])
+        if rng.random() < 0.3:
+            return f"````{language}\n```\ninner\n```\n````"
+        return f"```{language}\n{code}\n```"
+    if kind < 0.55:
+        title = ' "A caption"' if rng.random() < 0.5 else ""
+        return f"![alt](https://example.com/i.png{title})"
+    if kind < 0.75:
+        ordered = rng.random() < 0.5
+        start = rng.choice([1, 3, 10])
+        items = []
+        for number in range(rng.randint(1, 3)):
+            marker = f"{start + number}. " if ordered else "- "
+            body = "\n\n".join(
+                random_block(rng, depth + 1) for _ in range(rng.randint(0, 2))
+            )
+            lines = body.split("\n") if body else []
+            if not lines:
+                items.append(marker.rstrip())
+                continue
+            indent = " " * len(marker)
+            items.append(
+                "\n".join(
+                    [marker + lines[0]]
+                    + [indent + line if line else "" for line in lines[1:]]
+                )
+            )
+        return "\n\n".join(items)
+    body = "\n\n".join(random_block(rng, depth + 1) for _ in range(rng.randint(1, 2)))
+    return "\n".join("> " + line if line else ">" for line in body.split("\n"))
+
+
+class TestMarkdownRenderer:
+    """Test suite for MarkdownRenderer"""
+
+    def setup_method(self):
+        """Set up test fixtures"""
+        self.renderer = MarkdownRenderer()
+        self.converter = MarkdownConverter()
+        self.serializer = DraftBodySerializer()
+
+    def test_blocks_round_trip_through_markdown(self):
+        """Test random documents convert back to the same blocks"""
+        for seed in range(300):
+            rng = random.Random(seed)
+            markdown = "\n\n".join(
+                random_block(rng, 0) for _ in range(rng.randint(1, 6))
+            )
+            blocks = self.converter.convert(markdown)
+
+            rendered = self.renderer.render(blocks)
+
+            assert self.converter.convert(rendered) == blocks, (seed, rendered)
+
+    def test_draft_body_round_trips_through_markdown(self):
+        """Test a stored ProseMirror body renders to Markdown that rebuilds it"""
+        for seed in range(300):
+            rng = random.Random(seed)
+            markdown = "\n\n".join(
+                random_block(rng, 0) for _ in range(rng.randint(1, 6))
+            )
+            doc = self.serializer.serialize(self.converter.convert(markdown))
+
+            rendered = self.renderer.render(doc["content"])
+
+            assert self.serializer.serialize(self.converter.convert(rendered)) == doc, (
+                seed,
+                rendered,
+            )
+
+    def test_renders_draft_body_nodes(self):
+        """Test ProseMirror nodes render with their attrs and marks"""
+        nodes = [
+            {
+                "type": "heading",
+                "attrs": {"level": 2},
+                "content": [{"type": "text", "text": "Title"}],
+            },
+            {
+                "type": "paragraph",
+                "content": [
+                    {"type": "text", "text": "See "},
+                    {
+                        "type": "text",
+                        "text": "this",
+                        "marks": [
+                            {"type": "strong"},
+                            {"type": "link", "attrs": {"href": "https://e.com"}},
+                        ],
+                    },
+                ],
+            },
+            {
+                "type": "ordered_list",
+                "attrs": {"start": 3},
+                "content": [
+                    {
+                        "type": "list_item",
+                        "content": [
+                            {
+                                "type": "paragraph",
+                                "content": [{"type": "text", "text": "three"}],
+                            }
+                        ],
+                    }
+                ],
+            },
+            {
+                "type": "captionedImage",
+                "content": [
+                    {"type": "image2", "attrs": {"src": "a.png", "alt": "A"}},
+                    {"type": "caption", "content": [{"type": "text", "text": "Cap"}]},
+                ],
+            },
+            {"type": "paywall"},
+        ]
+
+        assert self.renderer.render(nodes) == (
+            "## Title\n\n"
+            "See [**this**](https://e.com)\n\n"
+            "3. three\n\n"
+            '![A](a.png "Cap")\n\n'
+            "<!-- PAYWALL -->"
+        )
+
+    def test_adjacent_lists_switch_markers(self):
+        """Test lists of the same kind next to each other stay separate"""
+        blocks = self.converter.convert("- a\n\n<!-- -->\n\n- b")
+        blocks = [block for block in blocks if block["type"] == "bulleted-list"]
+
+        rendered = self.renderer.render(blocks)
+
+        assert rendered == "- a\n\n* b"
+        assert self.converter.convert(rendered) == blocks
+
+    def test_code_fence_is_longer_than_fences_inside(self):
+        """Test code holding a fence is wrapped in a longer one"""
+        block = {"type": "code", "language": "md", "content": "```\nx\n```"}
+
+        assert self.renderer.render([block]) == "````md\n```\nx\n```\n````"
+
+    def test_text_is_escaped_outside_code(self):
+        """Test markup characters in text are escaped but code spans are not"""
+        block = {
+            "type": "paragraph",
+            "content": [
+                {"type": "text", "content": "2*3 [x] "},
+                {"type": "text", "content": "a*b", "marks": [{"type": "code"}]},
+            ],
+        }
+
+        assert self.renderer.render([block]) == "2\\*3 \\[x\\] `a*b`"
+
+    def test_write_streams_to_a_file(self):
+        """Test write produces the same text as render"""
+        blocks = self.converter.convert("# Hi\n\n- a\n- b\n\n> quote")
+        out = io.StringIO()
+
+        self.renderer.write(blocks, out)
+
+        assert out.getvalue() == self.renderer.render(blocks)
+        assert out.getvalue() == "# Hi\n\n- a\n- b\n\n> quote"
+
+    def test_skips_empty_and_unknown_blocks(self):
+        """Test empty paragraphs vanish and unknown blocks keep their text"""
+        blocks = [
+            {"type": "paragraph", "content": []},
+            {"type": "embed", "content": [{"type": "text", "text": "kept"}]},
+            "not a block",
+        ]
+
+        assert self.renderer.render(blocks) == "kept"
@@ -1,11 +1,16 @@
 # ABOUTME: Unit tests for PostHandler class that manages Substack post operations
 # ABOUTME: Tests creating, updating, publishing, and listing posts
 
+import json
+
 import pytest
 from unittest.mock import Mock, patch, AsyncMock, ANY
 from datetime import datetime
 from src.handlers.post_handler import PostHandler
+from src.converters.document_cache import DocumentCache
 from src.converters.markdown_converter import MarkdownConverter
+from src.utils.api_wrapper import APIWrapper
+from src.utils.json_codec import LazyJSON
 
 
 class TestPostHandler:
@@ -123,6 +128,31 @@ This is a test post with **bold** text.
 
         assert result["id"] == "post-123"
         self.mock_client.post_draft.assert_called_once()
+        draft = self.mock_client.post_draft.call_args[0][0]
+        assert draft["audience"] == "everyone"
+        assert draft["draft_body"] == self.handler.draft_serializer.dumps(
+            self.handler._plain_text_to_blocks(plain_content)
+        )
+
+    @pytest.mark.asyncio
+    async def test_update_draft_plain_text_is_diffed(self):
+        """Test plain text updates are skipped when unchanged and diffed otherwise"""
+        body = self.handler.draft_serializer.dumps_plain_text("One\n\nTwo")
+        self.mock_client.get_draft.return_value = {"id": "post-123", "draft_body": body}
+
+        plan = await self.handler.plan_update(
+            post_id="post-123", content="One\n\n\nTwo  ", content_type="plain"
+        )
+        assert plan["update_data"] == {}
+        assert plan["diff"]["identical"] is True
+
+        plan = await self.handler.plan_update(
+            post_id="post-123", content="One\n\nThree", content_type="plain"
+        )
+        assert plan["update_data"] == {
+            "draft_body": self.handler.draft_serializer.dumps_plain_text("One\n\nThree")
+        }
+        assert plan["diff"]["changed"][0]["after"] == "Three"
 
     @pytest.mark.asyncio
     async def test_update_draft(self):
@@ -150,6 +180,71 @@ This is a test post with **bold** text.
         assert "title" in kwargs
         assert kwargs["title"] == "Updated Post"
 
+    @pytest.mark.asyncio
+    async def test_update_draft_skips_unchanged_content(self):
+        """Test no PUT is sent when the body and title already match"""
+        content = "Intro\n\n- One\n- Two"
+        body = self.handler.draft_serializer.dumps(
+            self.handler.markdown_converter.convert_nodes(content)
+        )
+        current = {"id": "post-123", "draft_title": "Same", "draft_body": body}
+        self.mock_client.get_draft.return_value = current
+
+        result = await self.handler.update_draft(
+            post_id="post-123", title="Same", content=content
+        )
+
+        assert result is current
+        self.mock_client.put_draft.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_update_draft_reuses_the_previous_conversion(self):
+        """Test handlers sharing a DocumentCache keep each post's last conversion"""
+        cache = DocumentCache()
+        self.mock_client.get_draft.return_value = {"id": "post-123"}
+        content = "# Title\n\nFirst\n\nSecond\n"
+
+        await PostHandler(self.mock_client, document_cache=cache).plan_update(
+            post_id="post-123", content=content
+        )
+        title = cache.get("post-123").segments[0].blocks[0]
+
+        handler = PostHandler(self.mock_client, document_cache=cache)
+        blocks = handler._convert_content_to_blocks(
+            content.replace("Second", "Edited"), "markdown", "post-123"
+        )
+
+        assert blocks[0] is title
+        assert blocks[2]["content"][0]["content"] == "Edited"
+        await handler.delete_draft("post-123")
+        assert "post-123" not in cache
+
+    @pytest.mark.asyncio
+    async def test_update_draft_sends_only_changed_fields(self):
+        """Test an unchanged body is elided and a changed one is diffed"""
+        body = self.handler.draft_serializer.dumps(
+            self.handler.markdown_converter.convert_nodes("Intro\n\nOld end")
+        )
+        self.mock_client.get_draft.return_value = {
+            "id": "post-123",
+            "draft_title": "Old",
+            "draft_body": body,
+        }
+
+        plan = await self.handler.plan_update(
+            post_id="post-123", title="New", content="Intro\n\nOld end"
+        )
+        assert plan["update_data"] == {"draft_title": "New"}
+        assert plan["diff"]["identical"] is True
+
+        plan = await self.handler.plan_update(
+            post_id="post-123", content="Intro\n\nNew end\n\n---"
+        )
+        assert set(plan["update_data"]) == {"draft_body"}
+        assert plan["diff"]["changed"][0]["after"] == "New end"
+        assert plan["diff"]["inserted"][0]["type"] == "horizontal_rule"
+        assert plan["diff"]["unchanged"] == 1
+
     @pytest.mark.asyncio
     async def test_publish_draft_immediately(self):
         """Test publishing a draft immediately"""
@@ -181,6 +276,95 @@ This is a test post with **bold** text.
         assert result[0]["title"] == "Draft 1"
         self.mock_client.get_drafts.assert_called_once_with(limit=10)
 
+    @pytest.mark.asyncio
+    async def test_duplicate_post_copies_the_body_verbatim(self):
+        """Test the original body is copied without decoding it"""
+        body = LazyJSON(
+            '{"type": "doc", "content": [{"type": "bullet_list", "content": []},'
+            ' {"type": "captionedImage", "attrs": {"src": "a.png"}}]}'
+        )
+        self.mock_client.get_draft.return_value = {
+            "id": "post-123",
+            "draft_title": "Original",
+            "draft_subtitle": "Sub",
+            "draft_body": body,
+            "audience": "only_paid",
+        }
+        self.mock_client.post_draft.return_value = {"id": "post-456"}
+
+        with patch("src.handlers.post_handler.json_codec.loads") as loads:
+            await self.handler.duplicate_post("post-123")
+
+        loads.assert_not_called()
+        draft = self.mock_client.post_draft.call_args[0][0]
+        assert draft["draft_body"] is body
+        assert draft["draft_title"] == "Copy of Original"
+        assert draft["draft_subtitle"] == "Sub"
+        assert draft["audience"] == "only_paid"
+
+    @pytest.mark.asyncio
+    async def test_duplicate_post_encodes_a_decoded_body(self):
+        """Test a body returned as a dict is encoded as it is"""
+        body = {"type": "doc", "content": [{"type": "paragraph"}]}
+        self.mock_client.get_draft.return_value = {"id": "post-123", "body": body}
+        self.mock_client.post_draft.return_value = {"id": "post-456"}
+
+        await self.handler.duplicate_post("post-123", "New")
+
+        draft = self.mock_client.post_draft.call_args[0][0]
+        assert json.loads(draft["draft_body"]) == body
+
+    @pytest.mark.asyncio
+    async def test_duplicate_post_checks_an_unmarked_string_body(self):
+        """Test a string body not from get_draft is decoded, or kept as text"""
+        self.mock_client.post_draft.return_value = {"id": "post-456"}
+
+        self.mock_client.get_draft.return_value = {
+            "id": "post-123",
+            "body": '{"type": "doc", "content": []}',
+        }
+        await self.handler.duplicate_post("post-123")
+        draft = self.mock_client.post_draft.call_args[0][0]
+        assert json.loads(draft["draft_body"]) == {"type": "doc", "content": []}
+
+        self.mock_client.get_draft.return_value = {
+            "id": "post-123",
+            "body": "{curly} braces are not JSON",
+        }
+        await self.handler.duplicate_post("post-123")
+        draft = self.mock_client.post_draft.call_args[0][0]
+        paragraph = json.loads(draft["draft_body"])["content"][0]
+        assert paragraph["content"][0]["text"] == "{curly} braces are not JSON"
+
+    @pytest.mark.asyncio
+    async def test_duplicate_post_through_api_wrapper(self):
+        """Test bodies read by the real get_draft are copied only when a document"""
+        self.mock_client.post_draft.return_value = {"id": "post-456"}
+        handler = PostHandler(APIWrapper(self.mock_client))
+        document = '{"type":"doc","content":[{"type":"horizontal_rule"}]}'
+
+        self.mock_client.get_draft.return_value = {
+            "id": "post-123",
+            "draft_body": document,
+        }
+        await handler.duplicate_post("post-123")
+        draft = self.mock_client.post_draft.call_args[0][0]
+        assert draft["draft_body"] == document
+
+        for body in ("Just some plain text body", "{not json"):
+            self.mock_client.get_draft.return_value = {
+                "id": "post-123",
+                "draft_body": body,
+            }
+            await handler.duplicate_post("post-123")
+            draft = self.mock_client.post_draft.call_args[0][0]
+            assert json.loads(draft["draft_body"]) == {
+                "type": "doc",
+                "content": [
+                    {"type": "paragraph", "content": [{"type": "text", "text": body}]}
+                ],
+            }
+
     @pytest.mark.asyncio
     async def test_get_post_by_id(self):
         """Test getting a specific post by ID"""
@@ -232,8 +416,96 @@ This is for paid subscribers only."""
         # Get the draft data that was passed
         draft_data = self.mock_client.post_draft.call_args[0][0]
 
-        # The draft should have audience set to "only_paid" since it contains paywall
-        # Note: We can't directly check the blocks since they're inside the Post object
+        # The paywall is a block of its own and makes the post paid-only
+        assert draft_data["audience"] == "only_paid"
+        body = json.loads(draft_data["draft_body"])
+        assert [node["type"] for node in body["content"]] == [
+            "heading",
+            "paragraph",
+            "paywall",
+            "heading",
+            "paragraph",
+        ]
+
+    def test_build_draft_uses_given_user_and_audience(self):
+        """Test a payload built for later sending skips lookups it was given"""
+        blocks = self.handler.markdown_converter.convert_nodes(
+            "Free\n\n<!-- PAYWALL -->"
+        )
+
+        draft = self.handler.build_draft(
+            "Title",
+            "ignored, the blocks are used",
+            subtitle="Sub",
+            audience="founding",
+            user_id=42,
+            blocks=blocks,
+        )
+
+        self.mock_client.get_user_id.assert_not_called()
+        assert draft["draft_bylines"] == [{"id": 42, "is_guest": False}]
+        assert draft["audience"] == "founding"
+        assert draft["draft_subtitle"] == "Sub"
+        body = json.loads(draft["draft_body"])
+        assert [node["type"] for node in body["content"]] == ["paragraph", "paywall"]
+
+    def test_send_draft_creates_and_indexes_the_post(self):
+        """Test a built payload is posted and the new post can be resolved"""
+        self.mock_client.get_user_id.return_value = 7
+        self.mock_client.post_draft = Mock(
+            return_value={"id": 555, "slug": "built-post"}
+        )
+        draft = self.handler.build_draft("Built Post", "Body")
+
+        result = self.handler.send_draft(draft)
+
+        self.mock_client.post_draft.assert_called_once_with(draft)
+        assert result["id"] == 555
+        assert self.handler.post_index.lookup("Built Post") == ["555"]
+
+    @pytest.mark.asyncio
+    async def test_create_draft_with_inline_paywall(self):
+        """Test a paywall marker inside a paragraph splits it and gates the post"""
+        self.mock_client.post_draft = Mock(return_value={"id": "post-123"})
+
+        await self.handler.create_draft(
+            title="Inline",
+            content="Free <!-- PAYWALL --> paid",
+            content_type="markdown",
+        )
+
+        draft_data = self.mock_client.post_draft.call_args[0][0]
+        assert draft_data["audience"] == "only_paid"
+        body = json.loads(draft_data["draft_body"])
+        assert [node["type"] for node in body["content"]] == [
+            "paragraph",
+            "paywall",
+            "paragraph",
+        ]
+
+    @pytest.mark.asyncio
+    async def test_create_draft_parses_paywall_content_once(self):
+        """Test content with paywall markers is converted in a single pass"""
+        self.mock_client.post_draft = Mock(return_value={"id": "post-123"})
+        content = "Free\n\n<!-- PAYWALL -->\n\nPaid\n\n<!-- PAYWALL -->\n\nMore"
+
+        with patch.object(
+            self.handler.markdown_converter,
+            "convert_nodes",
+            wraps=self.handler.markdown_converter.convert_nodes,
+        ) as convert_nodes:
+            await self.handler.create_draft(
+                title="Paid", content=content, content_type="markdown"
+            )
+
+        assert convert_nodes.call_count == 1
+        body = json.loads(self.mock_client.post_draft.call_args[0][0]["draft_body"])
+        assert [node["type"] for node in body["content"]] == [
+            "paragraph",
+            "paywall",
+            "paragraph",
+            "paragraph",
+        ]
 
     @pytest.mark.asyncio
     async def test_invalid_content_type(self):
@@ -252,3 +524,24 @@ This is for paid subscribers only."""
             await self.handler.create_draft(
                 title="Test", content="Content", content_type="plain"
             )
+
+    @pytest.mark.asyncio
+    async def test_create_draft_writes_native_lists_and_marks(self):
+        """Test the draft body keeps lists, quotes and marks as native nodes"""
+        self.mock_client.post_draft = Mock(return_value={"id": "post-123"})
+        markdown = "## A heading\n\n- **Bold** item\n\n  3. Nested\n\n> Quote"
+
+        await self.handler.create_draft(title="Test", content=markdown)
+
+        draft = self.mock_client.post_draft.call_args[0][0]
+        body = json.loads(draft["draft_body"])
+        heading, bullets, quote = body["content"]
+        assert heading["attrs"] == {"level": 2}
+        assert heading["content"] == [{"type": "text", "text": "A heading"}]
+        item = bullets["content"][0]
+        assert bullets["type"] == "bullet_list"
+        assert item["content"][0]["content"][0]["marks"] == [{"type": "strong"}]
+        assert item["content"][1]["type"] == "ordered_list"
+        assert item["content"][1]["attrs"] == {"start": 3}
+        assert quote["content"][0]["content"] == [{"type": "text", "text": "Quote"}]
+        assert draft["draft_bylines"] == [{"id": 123456, "is_guest": False}]
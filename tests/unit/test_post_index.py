@@ -0,0 +1,117 @@
+# ABOUTME: Unit tests for PostIndex and title/slug resolution in PostHandler
+# ABOUTME: Tests normalization, index maintenance, listing fallback and ambiguity
+
+from unittest.mock import Mock
+
+import pytest
+
+from src.handlers.post_handler import PostHandler
+from src.utils.post_index import PostIndex, normalize_slug, normalize_title
+
+
+class TestPostIndex:
+    """Test suite for PostIndex class"""
+
+    def setup_method(self):
+        """Set up test fixtures"""
+        self.index = PostIndex()
+        self.index.update_many(
+            [
+                {"id": 1, "draft_title": "Hello, World!", "slug": "hello-world"},
+                {"id": 2, "title": "Café Notes", "slug": "cafe-notes"},
+            ]
+        )
+
+    def test_normalization(self):
+        """Test titles ignore case, accents and punctuation"""
+        assert normalize_title("  Café   NOTES!! ") == "cafe notes"
+        assert normalize_slug("https://x.substack.com/p/My-Post?utm=1#c") == "my-post"
+
+    def test_lookup_by_title_slug_and_url(self):
+        """Test posts are found by title, slug or URL"""
+        assert self.index.lookup("hello world") == ["1"]
+        assert self.index.lookup("cafe-notes") == ["2"]
+        assert self.index.lookup("https://x.substack.com/p/hello-world") == ["1"]
+        assert self.index.lookup("missing") == []
+        assert len(self.index) == 2
+
+    def test_update_replaces_old_keys(self):
+        """Test a renamed post is no longer found by its old title"""
+        self.index.update({"id": 1, "draft_title": "Goodbye"})
+
+        assert self.index.lookup("Hello, World!") == []
+        assert self.index.lookup("goodbye") == ["1"]
+        # Slug is kept when the update does not include one
+        assert self.index.lookup("hello-world") == ["1"]
+
+    def test_remove_and_search(self):
+        """Test removal and substring search"""
+        assert self.index.search("notes") == ["2"]
+
+        self.index.remove(2)
+
+        assert 2 not in self.index
+        assert self.index.lookup("cafe notes") == []
+        assert self.index.search("notes") == []
+
+
+class TestPostResolution:
+    """Test suite for resolving titles and slugs in PostHandler"""
+
+    def setup_method(self):
+        """Set up test fixtures"""
+        self.mock_client = Mock()
+        self.mock_client.get_drafts.return_value = [
+            {"id": 10, "draft_title": "Weekly Update", "slug": "weekly-update"},
+            {"id": 11, "draft_title": "Weekly Update", "slug": "weekly-update-2"},
+            {"id": 12, "draft_title": "Launch Day", "slug": "launch-day"},
+        ]
+        self.handler = PostHandler(self.mock_client)
+
+    @pytest.mark.asyncio
+    async def test_numeric_id_passes_through(self):
+        """Test numeric IDs are returned without any API call"""
+        assert await self.handler.resolve_post_id("12345") == "12345"
+        self.mock_client.get_drafts.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_resolve_scans_listing_once(self):
+        """Test a miss pages through the listing and later hits use the index"""
+        assert await self.handler.resolve_post_id("launch day") == "12"
+        assert await self.handler.resolve_post_id("launch-day") == "12"
+        assert self.mock_client.get_drafts.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_ambiguous_title_raises(self):
+        """Test a title shared by several posts is rejected"""
+        with pytest.raises(ValueError, match="Multiple posts match"):
+            await self.handler.resolve_post_id("Weekly Update")
+
+        # A slug is still unambiguous
+        assert await self.handler.resolve_post_id("weekly-update-2") == "11"
+
+    @pytest.mark.asyncio
+    async def test_unknown_identifier_passes_through(self):
+        """Test identifiers that match nothing are returned unchanged"""
+        assert await self.handler.resolve_post_id("no-such-post") == "no-such-post"
+
+    @pytest.mark.asyncio
+    async def test_find_posts_falls_back_to_search(self):
+        """Test find_posts returns substring matches when nothing is exact"""
+        result = await self.handler.find_posts("weekly")
+
+        assert [post["id"] for post in result] == ["10", "11"]
+        assert result[0]["title"] == "Weekly Update"
+
+    @pytest.mark.asyncio
+    async def test_index_maintained_on_create_and_delete(self):
+        """Test created drafts are indexed and deleted drafts are dropped"""
+        self.mock_client.get_user_id.return_value = 123
+        self.mock_client.post_draft.return_value = {"id": 99}
+
+        await self.handler.create_draft("Fresh Post", "Content")
+        assert await self.handler.resolve_post_id("fresh post") == "99"
+
+        await self.handler.delete_draft("99")
+        self.mock_client.delete_draft.assert_called_once_with("99")
+        assert "99" not in self.handler.post_index
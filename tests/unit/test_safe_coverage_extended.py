@@ -93,23 +93,21 @@ class TestSafeCoverageExtended(unittest.TestCase):
 
         # Test with markdown content containing paywall marker
         content = "Free content\n\n<!-- PAYWALL -->\n\nPaid content"
-        blocks = []  # Empty blocks to trigger conversion
 
-        processed = handler._process_paywall_markers(content, blocks, "markdown")
+        blocks, audience = handler._prepare_draft_blocks("Title", content, "markdown")
         # Should have a paywall divider
-        self.assertTrue(any(block.get("type") == "paywall" for block in processed))
+        self.assertEqual(
+            [block.get("type") for block in blocks],
+            ["paragraph", "paywall", "paragraph"],
+        )
+        self.assertEqual(audience, "only_paid")
 
         # Test without paywall marker
-        content = "Just regular content"
-        blocks = [
-            {
-                "type": "paragraph",
-                "content": [{"type": "text", "content": "Regular content"}],
-            }
-        ]
-        processed = handler._process_paywall_markers(content, blocks, "markdown")
-        # Should return original blocks
-        self.assertEqual(processed, blocks)
+        blocks, audience = handler._prepare_draft_blocks(
+            "Title", "Just regular content", "markdown"
+        )
+        self.assertEqual([block.get("type") for block in blocks], ["paragraph"])
+        self.assertEqual(audience, "everyone")
 
     def test_auth_handler_header_generation(self):
         """Test auth handler header generation."""